@@ -9,18 +9,19 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
 from django.core.cache import cache
-from django.db.models import Q, Avg, Count, F
+from django.db.models import Q, Avg, Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.db import models
 from django.utils import timezone
 from datetime import timedelta
 from core.models import Product, Category, Brand, Shop, User
 from core.discovery_service import discovery_service
+from core.renderers import StreamingJSONResponse, should_stream
 from core.ai_rating_system import ai_rating_system
 from store_integration.models import PriceHistory, ProductMapping
 from store_integration.analytics_service import store_analytics_service
 from store_integration.realtime_sync import realtime_sync_service
 from reviews.models import Review, StoreReview, EngagementEvent
-from reviews.services import SentimentAnalysisService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -87,9 +88,17 @@ class FrontendAPIViewSet(viewsets.ViewSet):
                 for product in deals_products
             ]
             
-            # Get featured categories
+            # Get featured categories from the materialised category statistics,
+            # counting live for categories whose statistics row is not built yet
+            live_product_count = Product.objects.filter(
+                category=OuterRef('pk'), is_active=True
+            ).order_by().values('category').annotate(count=Count('id')).values('count')
             featured_categories = Category.objects.annotate(
-                product_count=Count('products', filter=Q(products__is_active=True))
+                product_count=Coalesce(
+                    F('statistics__product_count'),
+                    Subquery(live_product_count),
+                    0
+                )
             ).filter(product_count__gt=0).order_by('-product_count')[:6]
             
             feed_data['featured_categories'] = [
@@ -230,6 +239,9 @@ class FrontendAPIViewSet(viewsets.ViewSet):
             sort_by = request.query_params.get('sort_by', 'relevance')
             page = int(request.query_params.get('page', 1))
             page_size = int(request.query_params.get('page_size', 20))
+            cursor = request.query_params.get('cursor') or None
+            include_total = request.query_params.get('include_total') == 'true'
+            stream = should_stream(request, page_size)
             
             # Build filters
             filters = {}
@@ -252,9 +264,14 @@ class FrontendAPIViewSet(viewsets.ViewSet):
                 filters=filters,
                 sort_by=sort_by,
                 page=page,
-                page_size=page_size
+                page_size=page_size,
+                cursor=cursor,
+                include_total=include_total,
+                stream=stream
             )
             
+            if stream:
+                return StreamingJSONResponse(search_result)
             return Response(search_result)
             
         except ValueError as e:
@@ -400,17 +417,6 @@ class FrontendAPIViewSet(viewsets.ViewSet):
                 cons=cons
             )
 
-            # Perform sentiment analysis
-            try:
-                sentiment_service = SentimentAnalysisService()
-                sentiment_data = sentiment_service.analyze_review(review)
-
-                review.sentiment_score = sentiment_data['score']
-                review.sentiment_label = sentiment_data['label']
-                review.save()
-            except Exception as e:
-                logger.warning(f"Failed to analyze sentiment: {e}")
-
             # Track engagement event
             try:
                 EngagementEvent.objects.create(
@@ -510,12 +516,12 @@ class FrontendAPIViewSet(viewsets.ViewSet):
 
             if event_type == 'product_like' and product:
                 product.likes += 1
-                product.save()
+                product.save(update_fields=['likes'])
                 response_data['new_likes_count'] = product.likes
 
             elif event_type == 'product_dislike' and product:
                 product.dislikes += 1
-                product.save()
+                product.save(update_fields=['dislikes'])
                 response_data['new_dislikes_count'] = product.dislikes
 
             return Response(response_data)
@@ -8,7 +8,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from rest_framework.authtoken.admin import TokenAdmin
 from rest_framework.authtoken.models import TokenProxy
-from .models import User, Shop, Product, Category, Brand
+from .models import User, Shop, Product, Category, Brand, ProductAIRating, DirtyProductRating
 
 # حل مشكلة TokenAdmin
 TokenAdmin.raw_id_fields = ['user']
@@ -24,4 +24,6 @@ admin.site.register(User, UserAdmin)
 admin.site.register(Shop)
 admin.site.register(Product)
 admin.site.register(Category)
-admin.site.register(Brand)
\ No newline at end of file
+admin.site.register(Brand)
+admin.site.register(ProductAIRating)
+admin.site.register(DirtyProductRating)
@@ -12,7 +12,8 @@ from datetime import timedelta
 from decimal import Decimal
 from .models import Product, Shop, Brand
 from reviews.models import Review, StoreReview, ProductEngagement, EngagementEvent
-from reviews.services import SentimentAnalysisService
+from .rating_cache import product_rating_cache
+from .rating_engine import BulkRatingEngine
 import math
 
 logger = logging.getLogger(__name__)
@@ -25,7 +26,7 @@ class AIProductRatingSystem:
     """
     
     def __init__(self):
-        self.sentiment_service = SentimentAnalysisService()
+        self.rating_cache = product_rating_cache
         
         # Weights for different rating components (must sum to 1.0)
         self.weights = {
@@ -50,9 +51,11 @@ class AIProductRatingSystem:
             Dict containing overall rating and component breakdowns
         """
         try:
-            # Check if we need to recalculate
-            if not recalculate and self._has_recent_rating(product):
-                return self._get_cached_rating(product)
+            # Serve the stored rating unless its inputs changed
+            if not recalculate:
+                cached = self._get_cached_rating(product)
+                if cached:
+                    return cached
             
             # Calculate individual components
             components = {
@@ -92,10 +95,10 @@ class AIProductRatingSystem:
             }
             
             # Update product rating
-            product.rating = Decimal(str(final_rating))
-            product.save()
+            product.rating = Decimal(str(round(final_rating, 2)))
+            product.save(update_fields=['rating'])
             
-            # Cache the rating data (you might want to store this in a separate model)
+            # Store the rating data for later reads
             self._cache_rating_data(product, rating_data)
             
             return rating_data
@@ -121,18 +124,12 @@ class AIProductRatingSystem:
             # Basic rating average
             avg_rating = reviews.aggregate(avg_rating=Avg('rating'))['avg_rating'] or 3.0
             
-            # Sentiment analysis boost/penalty
-            sentiment_scores = []
-            for review in reviews:
-                if review.sentiment_score is not None:
-                    sentiment_scores.append(float(review.sentiment_score))
-                else:
-                    # Calculate sentiment if not already done
-                    sentiment_data = self.sentiment_service.analyze_review(review)
-                    sentiment_scores.append(sentiment_data['score'])
+            # Sentiment analysis boost/penalty from stored scores; unscored
+            # reviews are queued for the sentiment worker
+            avg_sentiment = reviews.aggregate(avg_sentiment=Avg('sentiment_score'))['avg_sentiment']
             
-            if sentiment_scores:
-                avg_sentiment = sum(sentiment_scores) / len(sentiment_scores)
+            if avg_sentiment is not None:
+                avg_sentiment = float(avg_sentiment)
                 # Convert sentiment (-1 to 1) to rating adjustment (-1 to 1)
                 sentiment_adjustment = avg_sentiment * 0.5
             else:
@@ -172,7 +169,7 @@ class AIProductRatingSystem:
             like_ratio = engagement.total_likes / max(1, engagement.total_likes + engagement.total_dislikes)
             like_score = like_ratio * 5.0
             
-            conversion_score = min(5.0, engagement.conversion_rate / 10)  # 10% conversion = 5.0
+            conversion_score = min(5.0, float(engagement.conversion_rate) / 10)  # 10% conversion = 5.0
             share_score = min(5.0, math.log10(max(1, engagement.total_shares)))
             
             # Weighted combination
@@ -562,65 +559,31 @@ class AIProductRatingSystem:
 
     def _has_recent_rating(self, product: Product) -> bool:
         """
-        Check if product has a recent AI rating calculation.
+        Check if product has a stored AI rating that is still fresh.
         """
-        # This would check a cache or rating history table
-        # For now, return False to always recalculate
-        return False
+        return bool(self._get_cached_rating(product))
 
     def _get_cached_rating(self, product: Product) -> Dict:
         """
-        Get cached rating data for a product.
+        Get the fresh stored rating data for a product, or an empty dict.
         """
-        # This would retrieve cached rating data
-        # For now, return empty dict
-        return {}
+        return self.rating_cache.get(product)
 
     def _cache_rating_data(self, product: Product, rating_data: Dict):
         """
-        Cache rating data for future use.
+        Store rating data for future reads.
         """
-        # This would store rating data in cache or database
-        # For now, just log
-        logger.info(f"Caching rating data for product {product.id}: {rating_data['overall_rating']}")
+        self.rating_cache.store(product, rating_data)
 
-    def bulk_calculate_ratings(self, products: List[Product] = None) -> Dict:
+    def bulk_calculate_ratings(self, products: List[Product] = None, include_breakdown: bool = False) -> Dict:
         """
         Calculate AI ratings for multiple products in bulk.
-        """
-        if products is None:
-            products = Product.objects.filter(is_active=True)
-
-        results = {
-            'processed': 0,
-            'successful': 0,
-            'failed': 0,
-            'errors': []
-        }
 
-        for product in products:
-            try:
-                rating_data = self.calculate_ai_rating(product, recalculate=True)
-                if 'error' not in rating_data:
-                    results['successful'] += 1
-                else:
-                    results['failed'] += 1
-                    results['errors'].append({
-                        'product_id': str(product.id),
-                        'error': rating_data['error']
-                    })
-                results['processed'] += 1
-
-            except Exception as e:
-                results['failed'] += 1
-                results['processed'] += 1
-                results['errors'].append({
-                    'product_id': str(product.id),
-                    'error': str(e)
-                })
-                logger.error(f"Error processing product {product.id}: {e}")
-
-        return results
+        Ratings are computed columnar per chunk by ``BulkRatingEngine`` and
+        written with ``bulk_update``. With ``include_breakdown`` the rating
+        data of every product is returned under ``ratings``.
+        """
+        return BulkRatingEngine(self).run(products, include_breakdown=include_breakdown)
 
 
 # Create singleton instance
@@ -28,3 +28,6 @@ class CoreConfig(AppConfig):
 
         # إضافة استيراد الإشارة الخاصة بإنشاء Owner تلقائيًا
         from . import signals_owner
+
+        # Dirty-product marks for the AI rating worker
+        from . import signals_rating
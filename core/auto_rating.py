@@ -0,0 +1,85 @@
+"""
+core/auto_rating.py
+-------------------
+High-rating owner notifications for ``Product.rating``.
+"""
+
+import logging
+from datetime import timedelta
+from decimal import Decimal
+from typing import Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Notification, Product
+
+logger = logging.getLogger(__name__)
+
+
+class AutoRatingService:
+    """
+    Notifies owners when a product rating first reaches ``AUTO_RATING_NOTIFY_THRESHOLD``.
+
+    ``Product.rating`` is seeded from ``auto_rating`` when a product is
+    created and is afterwards the AI rating written by the rating tracker;
+    both writers report their changes here. A product is not announced
+    again within ``AUTO_RATING_NOTIFY_COOLDOWN_DAYS`` days.
+    """
+
+    def __init__(self):
+        self.threshold = Decimal(str(getattr(settings, 'AUTO_RATING_NOTIFY_THRESHOLD', '4.5')))
+        self.cooldown_days = getattr(settings, 'AUTO_RATING_NOTIFY_COOLDOWN_DAYS', 30)
+
+    def crossed(self, previous: Optional[Decimal], rating) -> bool:
+        """
+        Whether a rating change reaches the notification threshold from below.
+        """
+        return Decimal(str(rating)) >= self.threshold and (previous is None or Decimal(str(previous)) < self.threshold)
+
+    def notify_high_ratings(self, changes: Iterable[Tuple[Product, Optional[Decimal]]]) -> int:
+        """
+        Notify owners of products whose new rating crossed the threshold.
+
+        ``changes`` holds ``(product, previous_rating)`` pairs, previous being
+        None for new products.
+        """
+        crossings = []
+        for product, previous in changes:
+            if not self.crossed(previous, product.rating):
+                continue
+            owner = getattr(product.shop, 'owner', None)
+            if owner and owner.user_id:
+                crossings.append((product.pk, product.name, owner.user_id))
+        return self.notify(crossings)
+
+    def notify(self, crossings: List[Tuple]) -> int:
+        """
+        Create one notification per ``(product_id, name, owner_user_id)`` not announced recently.
+        """
+        if not crossings:
+            return 0
+        since = timezone.now() - timedelta(days=self.cooldown_days)
+        announced = set(
+            Notification.objects.filter(
+                notification_type='product_rating',
+                related_id__in=[str(pk) for pk, _, _ in crossings],
+                created_at__gte=since
+            ).values_list('related_id', flat=True)
+        )
+        notifications = {
+            str(pk): Notification(
+                recipient_id=owner_id,
+                content=f"🎉 منتجك '{name}' حصل على تقييم مرتفع جدًا!",
+                notification_type='product_rating',
+                related_id=str(pk)
+            )
+            for pk, name, owner_id in crossings
+            if str(pk) not in announced
+        }
+        Notification.objects.bulk_create(notifications.values())
+        return len(notifications)
+
+
+# Create singleton instance
+auto_rating_service = AutoRatingService()
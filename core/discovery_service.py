@@ -5,17 +5,22 @@ Smart product discovery service that aggregates and intelligently ranks products
 """
 
 import logging
+import numpy as np
 from typing import Dict, List, Optional, Tuple
+from django.conf import settings
 from django.db.models import Q, Avg, Count, Min, Max, F
-from django.core.paginator import Paginator
 from django.utils import timezone
 from datetime import timedelta
 from decimal import Decimal
 from .models import Product, Category, Brand, Shop
-from store_integration.models import PriceHistory, ProductMapping
-from reviews.models import Review, EngagementEvent
+from store_integration.models import ProductMapping
+from store_integration.latest_prices import latest_price_service
+from reviews.models import EngagementEvent
+from reviews.stats import review_stats_service
 from .ai_rating_system import ai_rating_system
-import re
+from .pagination import KeysetPaginator, InvalidCursor, approximate_count
+from .relevance import RelevanceScorer, tokenize
+from .search_cache import search_result_cache
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +33,9 @@ class SmartProductDiscoveryService:
     def __init__(self):
         self.default_page_size = 20
         self.max_page_size = 100
+        self.recommendation_candidate_limit = getattr(
+            settings, 'RECOMMENDATION_CANDIDATE_LIMIT', 5000
+        )
         self.search_boost_factors = {
             'exact_match': 10.0,
             'title_match': 5.0,
@@ -38,10 +46,13 @@ class SmartProductDiscoveryService:
             'popular': 1.5,
             'recent': 1.2
         }
+        self.relevance_scorer = RelevanceScorer(self.search_boost_factors)
     
     def search_products(self, query: str, filters: Dict = None, 
                        sort_by: str = 'relevance', page: int = 1, 
-                       page_size: int = None) -> Dict:
+                       page_size: int = None, cursor: str = None,
+                       include_total: bool = False, stream: bool = False,
+                       use_cache: bool = True) -> Dict:
         """
         Perform intelligent product search across all stores.
         
@@ -49,12 +60,44 @@ class SmartProductDiscoveryService:
             query: Search query string
             filters: Dictionary of filters to apply
             sort_by: Sorting method ('relevance', 'price_low', 'price_high', 'rating', 'popularity')
-            page: Page number
+            page: Page number, only used when no cursor is given
             page_size: Number of results per page
+            cursor: Opaque keyset cursor returned as ``next_cursor`` by the previous page
+            include_total: Include an approximate total result count
+            stream: Return results as a lazy generator for streaming responses
+            use_cache: Serve from the search result cache; cached results are
+                always materialised lists
             
         Returns:
             Dict containing search results and metadata
         """
+        if not use_cache:
+            return self._search_products(
+                query, filters, sort_by, page, page_size, cursor, include_total, stream
+            )
+
+        cache_key = search_result_cache.make_key(
+            'products', query, filters, sort_by, cursor,
+            page=None if cursor else page,
+            page_size=page_size,
+            include_total=include_total
+        )
+        result = search_result_cache.get_or_compute(
+            cache_key,
+            lambda: self._search_products(
+                query, filters, sort_by, page, page_size, cursor, include_total, False
+            ),
+            should_cache=lambda result: result.get('success', False)
+        )
+        # Cached entries are shared by queries that normalise the same way
+        return dict(result, query=query)
+
+    def _search_products(self, query: str, filters: Dict, sort_by: str, page: int,
+                         page_size: int, cursor: str, include_total: bool,
+                         stream: bool) -> Dict:
+        """
+        Run a product search without the result cache.
+        """
         try:
             # Validate and set page size
             if page_size is None:
@@ -75,21 +118,65 @@ class SmartProductDiscoveryService:
             if filters:
                 queryset = self._apply_filters(queryset, filters)
             
-            # Get total count before pagination
-            total_count = queryset.count()
-            
-            # Apply sorting
-            queryset = self._apply_sorting(queryset, sort_by, query)
-            
-            # Apply pagination
-            paginator = Paginator(queryset, page_size)
-            page_obj = paginator.get_page(page)
+            offset = (max(page, 1) - 1) * page_size
+            ranked = None
+            if sort_by == 'relevance' and query:
+                # Rank the candidate set in bulk and page through the ranking
+                ranked = self.relevance_scorer.rank(queryset, query)
+                page_obj = ranked.paginate(cursor=cursor, page_size=page_size, offset=offset)
+                products = {
+                    str(pk): product for pk, product in
+                    queryset.in_bulk([product_id for product_id, _ in page_obj]).items()
+                }
+                page_products = [
+                    products[product_id] for product_id, _ in page_obj
+                    if product_id in products
+                ]
+                relevance_scores = dict(page_obj.items)
+            else:
+                # Apply keyset pagination on the sort keys
+                paginator = KeysetPaginator(
+                    queryset, self._get_sort_ordering(sort_by, query), page_size
+                )
+                page_obj = paginator.paginate(cursor=cursor, offset=offset)
+                page_products = page_obj.items
+                relevance_scores = (
+                    self.relevance_scorer.score_products(page_products, query) if query else {}
+                )
             
             # Enhance results with additional data
-            enhanced_results = []
-            for product in page_obj:
-                enhanced_product = self._enhance_product_data(product, query)
-                enhanced_results.append(enhanced_product)
+            enhanced_results = (
+                self._enhance_product_data(
+                    product, query, relevance_score=relevance_scores.get(str(product.id))
+                )
+                for product in page_products
+            )
+            if not stream:
+                enhanced_results = list(enhanced_results)
+            
+            # total_pages needs a count, so it is only filled with include_total
+            pagination = {
+                'current_page': None if cursor else page,
+                'total_pages': None,
+                'page_size': page_size,
+                'has_next': page_obj.has_next,
+                'has_previous': bool(cursor) or page > 1,
+                'next_cursor': page_obj.next_cursor,
+                'total_results': None,
+                'total_is_exact': None,
+                'truncated': bool(ranked and ranked.truncated)
+            }
+            if include_total:
+                total = approximate_count(queryset)
+                if ranked is not None:
+                    # Relevance pages only reach the ranked candidates
+                    total = {
+                        'count': min(total['count'], len(ranked)),
+                        'is_exact': total['is_exact'] and not ranked.truncated,
+                    }
+                pagination['total_results'] = total['count']
+                pagination['total_is_exact'] = total['is_exact']
+                pagination['total_pages'] = max(1, -(-total['count'] // page_size))
             
             # Get aggregated data for filters
             filter_aggregations = self._get_filter_aggregations(
@@ -100,14 +187,7 @@ class SmartProductDiscoveryService:
                 'success': True,
                 'query': query,
                 'results': enhanced_results,
-                'pagination': {
-                    'current_page': page,
-                    'total_pages': paginator.num_pages,
-                    'total_results': total_count,
-                    'page_size': page_size,
-                    'has_next': page_obj.has_next(),
-                    'has_previous': page_obj.has_previous()
-                },
+                'pagination': pagination,
                 'filters': filter_aggregations,
                 'sort_by': sort_by,
                 'search_metadata': {
@@ -117,6 +197,8 @@ class SmartProductDiscoveryService:
                 }
             }
             
+        except InvalidCursor:
+            raise
         except Exception as e:
             logger.error(f"Error in product search: {e}")
             return {
@@ -332,30 +414,50 @@ class SmartProductDiscoveryService:
             # Analyze user preferences
             preferences = self._analyze_user_preferences(user_events)
             
-            # Get candidate products
+            # Get candidate products as columns
             candidates = Product.objects.filter(
                 is_active=True
             ).exclude(
                 id__in=user_events.filter(
                     event_type__in=['purchase_completed', 'product_view']
                 ).values_list('product_id', flat=True)
-            ).select_related('shop', 'brand', 'category')
-            
-            # Score and rank candidates
-            scored_recommendations = []
-            for product in candidates[:limit * 5]:  # Get more to score
-                score = self._calculate_recommendation_score(product, preferences)
-                if score > 0.1:
+            ).order_by('-rating', '-views')[:self.recommendation_candidate_limit]
+            
+            rows = list(candidates.values_list(
+                'id', 'category__name', 'brand__name', 'price', 'rating'
+            ))
+            
+            final_recommendations = []
+            if rows:
+                ids, category_names, brand_names, prices, ratings = zip(*rows)
+                scores = self._score_candidates(
+                    category_names, brand_names,
+                    np.array(prices, dtype=float), np.array(ratings, dtype=float),
+                    preferences
+                )
+                
+                # Keep the top-k above the score threshold
+                eligible = np.flatnonzero(scores > 0.1)
+                if len(eligible) > limit:
+                    eligible = eligible[np.argpartition(-scores[eligible], limit - 1)[:limit]]
+                top = eligible[np.argsort(-scores[eligible], kind='stable')]
+                
+                # Load full objects and build reasons only for the final top-k
+                top_ids = [ids[i] for i in top]
+                products = Product.objects.select_related(
+                    'shop', 'brand', 'category'
+                ).in_bulk(top_ids)
+                
+                for index, product_id in zip(top, top_ids):
+                    product = products.get(product_id)
+                    if product is None:
+                        continue
                     enhanced_product = self._enhance_product_data(product)
-                    enhanced_product['recommendation_score'] = round(score, 3)
+                    enhanced_product['recommendation_score'] = round(float(scores[index]), 3)
                     enhanced_product['recommendation_reasons'] = self._get_recommendation_reasons(
                         product, preferences
                     )
-                    scored_recommendations.append(enhanced_product)
-            
-            # Sort and limit
-            scored_recommendations.sort(key=lambda x: x['recommendation_score'], reverse=True)
-            final_recommendations = scored_recommendations[:limit]
+                    final_recommendations.append(enhanced_product)
             
             return {
                 'success': True,
@@ -389,8 +491,7 @@ class SmartProductDiscoveryService:
                 Q(name__icontains=term) |
                 Q(description__icontains=term) |
                 Q(brand__name__icontains=term) |
-                Q(category__name__icontains=term) |
-                Q(sku__icontains=term)
+                Q(category__name__icontains=term)
             )
             search_q &= term_q
 
@@ -426,38 +527,46 @@ class SmartProductDiscoveryService:
 
         return queryset
 
-    def _apply_sorting(self, queryset, sort_by: str, query: str = None):
+    def _get_sort_ordering(self, sort_by: str, query: str = None) -> List[str]:
         """
-        Apply sorting to the queryset.
+        Get the ordering columns for a sorting method.
+
+        Only stable, non-null columns are used so the ordering can double as a
+        keyset for cursor pagination.
         """
         if sort_by == 'price_low':
-            return queryset.order_by('price', '-rating')
+            return ['price', '-rating']
         elif sort_by == 'price_high':
-            return queryset.order_by('-price', '-rating')
+            return ['-price', '-rating']
         elif sort_by == 'rating':
-            return queryset.order_by('-rating', '-views')
+            return ['-rating', '-views']
         elif sort_by == 'popularity':
-            return queryset.order_by('-views', '-likes', '-rating')
+            return ['-views', '-likes', '-rating']
         elif sort_by == 'newest':
-            return queryset.order_by('-created_at')
+            return ['-created_at']
         elif sort_by == 'relevance' and query:
-            # For relevance, we'd ideally use search ranking
-            # For now, use a combination of factors
-            return queryset.order_by('-rating', '-views', 'price')
+            # Relevance with a query is ranked by RelevanceScorer; this
+            # column ordering is only used when the queryset is sorted in SQL
+            return ['-rating', '-views', 'price']
         else:
             # Default sorting
-            return queryset.order_by('-rating', '-views')
+            return ['-rating', '-views']
 
-    def _enhance_product_data(self, product, query: str = None) -> Dict:
+    def _apply_sorting(self, queryset, sort_by: str, query: str = None):
+        """
+        Apply sorting to the queryset.
+        """
+        return queryset.order_by(*self._get_sort_ordering(sort_by, query), 'id')
+
+    def _enhance_product_data(self, product, query: str = None,
+                              relevance_score: float = None) -> Dict:
         """
         Enhance product data with additional information.
         """
         # Get latest price from other stores
-        alternative_prices = PriceHistory.objects.filter(
-            product=product
-        ).exclude(
-            shop=product.shop
-        ).select_related('shop').order_by('shop', '-recorded_at').distinct('shop')
+        alternative_prices = latest_price_service.for_product(
+            product.id, exclude_shop_id=product.shop_id
+        )
 
         price_comparison = []
         for price_record in alternative_prices:
@@ -470,19 +579,13 @@ class SmartProductDiscoveryService:
             })
 
         # Get review summary
-        reviews = Review.objects.filter(product=product, status='approved')
+        review_stats = review_stats_service.for_product(product.id)
         review_summary = {
-            'total_reviews': reviews.count(),
-            'average_rating': float(reviews.aggregate(avg=Avg('rating'))['avg'] or 0),
-            'sentiment_distribution': {}
+            'total_reviews': review_stats.review_count,
+            'average_rating': float(review_stats.average_rating or 0),
+            'sentiment_distribution': review_stats.sentiment_distribution()
         }
 
-        if reviews.exists():
-            sentiment_counts = reviews.values('sentiment_label').annotate(count=Count('id'))
-            for sentiment in sentiment_counts:
-                if sentiment['sentiment_label']:
-                    review_summary['sentiment_distribution'][sentiment['sentiment_label']] = sentiment['count']
-
         # Calculate discount percentage
         discount_percentage = 0
         if product.original_price and product.original_price > product.price:
@@ -522,8 +625,10 @@ class SmartProductDiscoveryService:
         }
 
         # Add search relevance score if query provided
-        if query:
-            enhanced_data['relevance_score'] = self._calculate_relevance_score(product, query)
+        if relevance_score is not None:
+            enhanced_data['relevance_score'] = relevance_score
+        elif query:
+            enhanced_data['relevance_score'] = self.relevance_scorer.score_products([product], query)[str(product.id)]
 
         return enhanced_data
 
@@ -531,22 +636,7 @@ class SmartProductDiscoveryService:
         """
         Extract meaningful keywords from text.
         """
-        if not text:
-            return []
-
-        # Remove special characters and split
-        cleaned_text = re.sub(r'[^\w\s]', ' ', text.lower())
-        words = cleaned_text.split()
-
-        # Filter out common stop words
-        stop_words = {
-            'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
-            'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have',
-            'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should'
-        }
-
-        keywords = [word for word in words if len(word) > 2 and word not in stop_words]
-        return keywords[:10]  # Limit to 10 keywords
+        return tokenize(text)[:10]  # Limit to 10 keywords
 
     def _calculate_similarity_score(self, reference_product, candidate_product) -> float:
         """
@@ -581,51 +671,6 @@ class SmartProductDiscoveryService:
 
         return min(score, 1.0)
 
-    def _calculate_relevance_score(self, product, query: str) -> float:
-        """
-        Calculate relevance score for search query.
-        """
-        score = 0.0
-        query_lower = query.lower()
-
-        # Exact name match
-        if query_lower in product.name.lower():
-            score += self.search_boost_factors['exact_match']
-
-        # Title word matches
-        query_words = self._extract_keywords(query)
-        name_words = self._extract_keywords(product.name)
-
-        for query_word in query_words:
-            if query_word in name_words:
-                score += self.search_boost_factors['title_match']
-
-        # Description matches
-        if product.description and query_lower in product.description.lower():
-            score += self.search_boost_factors['description_match']
-
-        # Brand match
-        if product.brand and query_lower in product.brand.name.lower():
-            score += self.search_boost_factors['brand_match']
-
-        # Category match
-        if product.category and query_lower in product.category.name.lower():
-            score += self.search_boost_factors['category_match']
-
-        # Rating boost
-        if product.rating >= 4.0:
-            score += self.search_boost_factors['high_rating']
-
-        # Popularity boost
-        if product.views > 1000:
-            score += self.search_boost_factors['popular']
-
-        # Recent product boost
-        if (timezone.now() - product.created_at).days < 30:
-            score += self.search_boost_factors['recent']
-
-        return score
-
     def _get_filter_aggregations(self, base_queryset, query: str = None, current_filters: Dict = None):
         """
         Get aggregated data for filters.
@@ -735,33 +780,43 @@ class SmartProductDiscoveryService:
 
         return preferences
 
-    def _calculate_recommendation_score(self, product, preferences: Dict) -> float:
+    def _score_candidates(self, category_names, brand_names, prices: np.ndarray,
+                          ratings: np.ndarray, preferences: Dict) -> np.ndarray:
         """
-        Calculate recommendation score based on user preferences.
+        Recommendation scores of a candidate set from user preferences, as one array.
         """
-        score = 0.0
-
-        # Category preference match
-        if product.category and product.category.name in preferences['preferred_categories']:
-            category_weight = preferences['preferred_categories'][product.category.name]
-            score += min(category_weight * 0.1, 0.4)  # Max 0.4 for category
+        category_weights = self._preference_weights(
+            category_names, preferences['preferred_categories']
+        )
+        brand_weights = self._preference_weights(
+            brand_names, preferences['preferred_brands']
+        )
 
-        # Brand preference match
-        if product.brand and product.brand.name in preferences['preferred_brands']:
-            brand_weight = preferences['preferred_brands'][product.brand.name]
-            score += min(brand_weight * 0.05, 0.3)  # Max 0.3 for brand
+        scores = np.minimum(category_weights * 0.1, 0.4)  # Max 0.4 for category
+        scores += np.minimum(brand_weights * 0.05, 0.3)  # Max 0.3 for brand
 
         # Price preference match
-        if preferences['price_range'].get('average'):
-            avg_price = preferences['price_range']['average']
-            price_diff = abs(float(product.price) - avg_price)
-            price_similarity = 1 - min(price_diff / avg_price, 1.0)
-            score += price_similarity * 0.2
+        avg_price = preferences['price_range'].get('average')
+        if avg_price:
+            price_similarity = 1 - np.minimum(np.abs(prices - avg_price) / avg_price, 1.0)
+            scores += price_similarity * 0.2
 
         # Product quality factors
-        score += min(float(product.rating) / 5.0, 1.0) * 0.1  # Rating factor
+        scores += np.minimum(ratings / 5.0, 1.0) * 0.1  # Rating factor
 
-        return min(score, 1.0)
+        return np.minimum(scores, 1.0)
+
+    def _preference_weights(self, names, weights: Dict) -> np.ndarray:
+        """
+        Map a column of names to preference weights via their unique codes.
+        """
+        names = np.array([name or '' for name in names], dtype=object)
+        unique_names, codes = np.unique(names, return_inverse=True)
+        unique_weights = np.array(
+            [weights.get(name, 0) if name else 0 for name in unique_names],
+            dtype=float
+        )
+        return unique_weights[codes]
 
     def _get_recommendation_reasons(self, product, preferences: Dict) -> List[str]:
         """
@@ -6,6 +6,7 @@ from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 from core.models import Product, Category, Shop
 from core.ai_rating_system import ai_rating_system
+from core.rating_tracker import product_rating_tracker
 import logging
 
 logger = logging.getLogger(__name__)
@@ -35,6 +36,16 @@ class Command(BaseCommand):
             action='store_true',
             help='Calculate ratings for all active products',
         )
+        parser.add_argument(
+            '--dirty',
+            action='store_true',
+            help='Re-rate only products whose rating inputs changed since they were last rated',
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            help='Maximum number of dirty batches to process with --dirty',
+        )
         parser.add_argument(
             '--limit',
             type=int,
@@ -62,6 +73,19 @@ class Command(BaseCommand):
             self.style.SUCCESS(f'Starting AI rating calculation at {timezone.now()}')
         )
 
+        if options['dirty']:
+            self.stdout.write(f'Pending dirty products: {product_rating_tracker.pending_count()}')
+            result = product_rating_tracker.drain(max_batches=options['max_batches'])
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Re-rated {result['rated']} products in {result['batches']} batches "
+                    f"({result['skipped']} inactive skipped)"
+                )
+            )
+            if result['failed']:
+                self.stdout.write(self.style.ERROR(f"Failed calculations: {result['failed']}"))
+            return
+
         # Build queryset based on options
         queryset = Product.objects.filter(is_active=True).select_related(
             'shop', 'brand', 'category'
@@ -97,7 +121,7 @@ class Command(BaseCommand):
         
         else:
             raise CommandError(
-                'You must specify one of: --product-id, --category-id, --shop-id, or --all'
+                'You must specify one of: --product-id, --category-id, --shop-id, --all or --dirty'
             )
 
         if options['dry_run']:
@@ -118,47 +142,57 @@ class Command(BaseCommand):
 
         self.stdout.write(f'Processing {total_products} products...')
 
-        for i, product in enumerate(products, 1):
-            if options['verbose']:
-                self.stdout.write(
-                    f'[{i}/{total_products}] Processing: {product.name} (ID: {product.id})'
-                )
-            elif i % 50 == 0:  # Progress update every 50 products
-                self.stdout.write(f'Processed {i}/{total_products} products...')
+        if options['product_id']:
+            for i, product in enumerate(products, 1):
+                if options['verbose']:
+                    self.stdout.write(
+                        f'[{i}/{total_products}] Processing: {product.name} (ID: {product.id})'
+                    )
+                elif i % 50 == 0:  # Progress update every 50 products
+                    self.stdout.write(f'Processed {i}/{total_products} products...')
             
-            try:
-                rating_data = ai_rating_system.calculate_ai_rating(
-                    product, 
-                    recalculate=options['force_recalculate']
-                )
+                try:
+                    rating_data = ai_rating_system.calculate_ai_rating(
+                        product, 
+                        recalculate=options['force_recalculate']
+                    )
                 
-                if 'error' not in rating_data:
-                    successful += 1
-                    if options['verbose']:
-                        self.stdout.write(
-                            self.style.SUCCESS(
-                                f'  ✓ New rating: {rating_data["overall_rating"]}/5.0 '
-                                f'(confidence: {rating_data.get("confidence_level", "N/A")})'
+                    if 'error' not in rating_data:
+                        successful += 1
+                        if options['verbose']:
+                            self.stdout.write(
+                                self.style.SUCCESS(
+                                    f'  ✓ New rating: {rating_data["overall_rating"]}/5.0 '
+                                    f'(confidence: {rating_data.get("confidence_level", "N/A")})'
+                                )
                             )
-                        )
-                else:
+                    else:
+                        failed += 1
+                        error_msg = rating_data['error']
+                        errors.append(f'Product {product.id}: {error_msg}')
+                        if options['verbose']:
+                            self.stdout.write(
+                                self.style.ERROR(f'  ✗ Error: {error_msg}')
+                            )
+                    
+                except Exception as e:
                     failed += 1
-                    error_msg = rating_data['error']
+                    error_msg = str(e)
                     errors.append(f'Product {product.id}: {error_msg}')
                     if options['verbose']:
                         self.stdout.write(
-                            self.style.ERROR(f'  ✗ Error: {error_msg}')
+                            self.style.ERROR(f'  ✗ Exception: {error_msg}')
                         )
-                    
-            except Exception as e:
-                failed += 1
-                error_msg = str(e)
-                errors.append(f'Product {product.id}: {error_msg}')
-                if options['verbose']:
-                    self.stdout.write(
-                        self.style.ERROR(f'  ✗ Exception: {error_msg}')
-                    )
-                logger.error(f'Error processing product {product.id}: {e}', exc_info=True)
+                    logger.error(f'Error processing product {product.id}: {e}', exc_info=True)
+        else:
+            # Shop, category and catalogue runs are rated columnar in chunks
+            result = ai_rating_system.bulk_calculate_ratings(products)
+            successful = result['successful']
+            failed = result['failed']
+            errors = [f"Product {error['product_id']}: {error['error']}" for error in result['errors']]
+            if options['verbose']:
+                for error in errors:
+                    self.stdout.write(self.style.ERROR(f'  ✗ Error: {error}'))
 
         # Summary
         self.stdout.write('\n' + '='*60)
@@ -0,0 +1,37 @@
+# Generated by Django 5.1 on 2026-10-19 06:45
+
+import django.db.models.deletion
+import uuid
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_shop_api_endpoint_shop_average_delivery_days_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductAIRating',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('overall_rating', models.DecimalField(decimal_places=2, max_digits=3, verbose_name='Overall Rating')),
+                ('components', models.JSONField(default=dict, verbose_name='Component Scores')),
+                ('confidence_level', models.DecimalField(decimal_places=2, default=Decimal('0.5'), max_digits=3, verbose_name='Confidence Level')),
+                ('data_points', models.JSONField(default=dict, verbose_name='Data Points Used')),
+                ('recommendations', models.JSONField(default=list, verbose_name='Recommendations')),
+                ('review_count', models.PositiveIntegerField(default=0, verbose_name='Approved Reviews')),
+                ('last_review_at', models.DateTimeField(blank=True, null=True, verbose_name='Last Review Change')),
+                ('engagement_total', models.PositiveIntegerField(default=0, verbose_name='Engagement Total')),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Price')),
+                ('calculated_at', models.DateTimeField(db_index=True, verbose_name='Calculated At')),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='ai_rating', to='core.product')),
+            ],
+            options={
+                'verbose_name': 'Product AI Rating',
+                'verbose_name_plural': 'Product AI Ratings',
+            },
+        ),
+    ]
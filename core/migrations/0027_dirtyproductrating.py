@@ -0,0 +1,28 @@
+# Generated by Django 5.1 on 2026-10-19 06:48
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_productairating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtyProductRating',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('reason', models.CharField(choices=[('review', 'Review'), ('reaction', 'Reaction'), ('engagement', 'Engagement'), ('price', 'Price'), ('brand', 'Brand'), ('product', 'Product'), ('sync', 'Store Sync'), ('refresh', 'Full Refresh')], max_length=20, verbose_name='Reason')),
+                ('marked_at', models.DateTimeField(db_index=True, verbose_name='Marked At')),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rating_dirty_mark', to='core.product')),
+            ],
+            options={
+                'verbose_name': 'Dirty Product Rating',
+                'verbose_name_plural': 'Dirty Product Ratings',
+            },
+        ),
+    ]
@@ -335,6 +335,31 @@ class Category(models.Model):
 #----------------------------------------------------------------
 #                       Product models
 #----------------------------------------------------------------
+def compute_auto_rating(likes, dislikes, neutrals, views, brand_rating=None, brand_popularity=None):
+    """
+    معادلة auto_rating على قيم خام.
+    """
+    like_score = Decimal(likes) * Decimal('1.0')
+    dislike_score = Decimal(dislikes) * Decimal('-1.0')
+    neutral_score = Decimal(neutrals or 0) * Decimal('0.2')
+    brand_popularity_score = Decimal(brand_popularity) * Decimal('0.1') if brand_popularity else Decimal('0.0')
+    brand_rating_score = Decimal(brand_rating) * Decimal('1.0') if brand_rating else Decimal('0.0')
+
+    # إذا لم توجد أي تفاعلات على المنتج، استخدم فقط تقييم البراند وشهرتها
+    if likes == 0 and dislikes == 0 and not neutrals and views == 0:
+        # متوسط بين تقييم البراند وشهرتها (على مقياس 5)
+        base = (brand_rating_score + (brand_popularity_score / Decimal('2.0')))
+        return float(max(0, min(5, round(base, 2))))
+
+    # 65% للبراند (تقييم + شهرة)
+    brand_score = (brand_rating_score + (brand_popularity_score / Decimal('2.0')))
+    # 35% لتفاعل المستخدمين
+    user_score = (like_score + neutral_score + dislike_score) / Decimal('10.0')  # نفس مقياسك السابق
+    final_score = (brand_score * Decimal('0.65')) + (user_score * Decimal('0.35'))
+    final_score = max(0, min(5, round(final_score, 2)))
+    return float(final_score)
+
+
 class Product(models.Model):
     id = models.UUIDField(
         primary_key=True,
@@ -401,6 +426,7 @@ class Product(models.Model):
         null=True,
         verbose_name="Video URL"
     )
+    # يبدأ من auto_rating عند الإنشاء، ثم يكتب متتبع التقييم فيه تقييم الذكاء الاصطناعي
     rating = models.DecimalField(
         max_digits=3,
         decimal_places=2,
@@ -461,43 +487,34 @@ class Product(models.Model):
         65% من التقييم يعتمد على البراند (تقييمها وشهرتها)، و35% على تفاعل المستخدمين.
         إذا لم توجد أي تفاعلات على المنتج، يعتمد فقط على تقييم البراند وشهرتها.
         """
-        like_score = Decimal(self.likes) * Decimal('1.0')
-        dislike_score = Decimal(self.dislikes) * Decimal('-1.0')
-        neutral_score = Decimal(self.neutrals) * Decimal('0.2') if hasattr(self, 'neutrals') else Decimal('0.0')
-        brand_popularity_score = Decimal(self.brand.popularity) * Decimal('0.1') if self.brand and self.brand.popularity else Decimal('0.0')
-        brand_rating_score = Decimal(self.brand.rating) * Decimal('1.0') if self.brand and self.brand.rating else Decimal('0.0')
-
-        # إذا لم توجد أي تفاعلات على المنتج، استخدم فقط تقييم البراند وشهرتها
-        if self.likes == 0 and self.dislikes == 0 and self.neutrals == 0 and self.views == 0:
-            # متوسط بين تقييم البراند وشهرتها (على مقياس 5)
-            base = (brand_rating_score + (brand_popularity_score / Decimal('2.0')))
-            return float(max(0, min(5, round(base, 2))))
-
-        # 65% للبراند (تقييم + شهرة)
-        brand_score = (brand_rating_score + (brand_popularity_score / Decimal('2.0')))
-        # 35% لتفاعل المستخدمين
-        user_score = (like_score + neutral_score + dislike_score) / Decimal('10.0')  # نفس مقياسك السابق
-        final_score = (brand_score * Decimal('0.65')) + (user_score * Decimal('0.35'))
-        final_score = max(0, min(5, round(final_score, 2)))
-        return float(final_score)
-
-    def save(self, *args, **kwargs):
+        return compute_auto_rating(
+            self.likes, self.dislikes, getattr(self, 'neutrals', 0), self.views,
+            self.brand.rating if self.brand else None,
+            self.brand.popularity if self.brand else None
+        )
+
+    def save(self, *args, refresh_rating=None, **kwargs):
         """
-        تحديث التقييم تلقائيًا عند كل عملية حفظ ليعكس auto_rating.
-        إذا أصبح التقييم عاليًا جدًا (مثلاً >= 4.5)، يتم إرسال إشعار للمالك.
+        لا يُعاد حساب التقييم عند كل حفظ: يُحسب من auto_rating عند إنشاء منتج بلا تقييم،
+        أو عند طلب ذلك صراحةً عبر refresh_rating=True (ويُضاف rating إلى update_fields).
+        بعد ذلك يستبدله متتبع التقييم بتقييم الذكاء الاصطناعي عند تغيّر مدخلاته.
+        إشعار "التقييم المرتفع" يُرسل مرة واحدة عند تجاوز الحد فقط.
         """
-        self.rating = self.auto_rating
+        if refresh_rating is None:
+            refresh_rating = self._state.adding and self.rating is None
+
+        previous_rating = None if self._state.adding else self.rating
+        if refresh_rating:
+            self.rating = Decimal(str(self.auto_rating))
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'rating' not in update_fields:
+                kwargs['update_fields'] = list(update_fields) + ['rating']
+
         super().save(*args, **kwargs)
 
-        # إرسال إشعار إذا كان التقييم عاليًا جدًا
-        if self.rating >= 4.5:
-            # إشعار للمالك
-            if self.shop and self.shop.owner and self.shop.owner.user:
-                Notification.objects.create(
-                    recipient=self.shop.owner.user,
-                    content=f"🎉 منتجك '{self.name}' حصل على تقييم مرتفع جدًا!",
-                    notification_type='general'
-                )
+        if refresh_rating:
+            from .auto_rating import auto_rating_service
+            auto_rating_service.notify_high_ratings([(self, previous_rating)])
 
 #----------------------------------------------------------------
 #                    Specification models
@@ -688,3 +705,90 @@ class UserProductReaction(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.product.name} ({self.reaction_type})"
+
+#----------------------------------------------------------------
+#                   Product AI Rating model
+#----------------------------------------------------------------
+class ProductAIRating(models.Model):
+    """
+    Stored AI rating breakdown of a product, with a snapshot of the inputs
+    (reviews, engagement, price) it was computed from for staleness checks.
+    """
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='ai_rating')
+    overall_rating = models.DecimalField(max_digits=3, decimal_places=2, verbose_name="Overall Rating")
+    components = models.JSONField(default=dict, verbose_name="Component Scores")
+    confidence_level = models.DecimalField(
+        max_digits=3, decimal_places=2, default=Decimal('0.5'), verbose_name="Confidence Level"
+    )
+    data_points = models.JSONField(default=dict, verbose_name="Data Points Used")
+    recommendations = models.JSONField(default=list, verbose_name="Recommendations")
+
+    # Inputs at calculation time
+    review_count = models.PositiveIntegerField(default=0, verbose_name="Approved Reviews")
+    last_review_at = models.DateTimeField(null=True, blank=True, verbose_name="Last Review Change")
+    engagement_total = models.PositiveIntegerField(default=0, verbose_name="Engagement Total")
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name="Price")
+
+    calculated_at = models.DateTimeField(db_index=True, verbose_name="Calculated At")
+
+    class Meta:
+        verbose_name = "Product AI Rating"
+        verbose_name_plural = "Product AI Ratings"
+
+    def __str__(self):
+        return f"{self.product_id}: {self.overall_rating}"
+
+    def to_rating_data(self):
+        """
+        Stored rating in the ``calculate_ai_rating`` result format.
+        """
+        return {
+            'overall_rating': float(self.overall_rating),
+            'components': self.components,
+            'confidence_level': float(self.confidence_level),
+            'last_calculated': self.calculated_at,
+            'data_points_used': self.data_points,
+            'recommendations': self.recommendations,
+            'as_of': self.calculated_at.isoformat(),
+        }
+
+
+#----------------------------------------------------------------
+#                   Dirty Product Rating model
+#----------------------------------------------------------------
+class DirtyProductRating(models.Model):
+    """
+    A product whose AI rating inputs changed since it was last rated.
+    One row per product; marking it again only moves ``marked_at``.
+    """
+    REASON_CHOICES = (
+        ('review', 'Review'),
+        ('reaction', 'Reaction'),
+        ('engagement', 'Engagement'),
+        ('price', 'Price'),
+        ('brand', 'Brand'),
+        ('product', 'Product'),
+        ('sync', 'Store Sync'),
+        ('refresh', 'Full Refresh'),
+    )
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='rating_dirty_mark')
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES, verbose_name="Reason")
+    marked_at = models.DateTimeField(db_index=True, verbose_name="Marked At")
+
+    class Meta:
+        verbose_name = "Dirty Product Rating"
+        verbose_name_plural = "Dirty Product Ratings"
+
+    def __str__(self):
+        return f"{self.product_id} ({self.reason})"
@@ -0,0 +1,130 @@
+"""
+core/pagination.py
+------------------
+Keyset (cursor) pagination helpers for large product listings.
+"""
+
+import base64
+import json
+from typing import Dict, List, Optional, Sequence
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded for the current ordering."""
+
+
+class KeysetPage:
+    """
+    A single page of keyset-paginated results.
+    """
+
+    def __init__(self, items: List, next_cursor: Optional[str], has_next: bool, page_size: int):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.has_next = has_next
+        self.page_size = page_size
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by seeking past the last row of the previous page.
+
+    The ordering must be made of stable, non-null columns. The primary key is
+    always appended as a tie-breaker so every row has a unique position, which
+    lets each page be fetched with an indexed ``WHERE`` instead of an
+    ``OFFSET`` scan and without a ``COUNT(*)``.
+    """
+
+    def __init__(self, queryset, ordering: Sequence[str], page_size: int):
+        self.model = queryset.model
+        pk_name = self.model._meta.pk.name
+        ordering = [field for field in ordering if field.lstrip('-') not in ('pk', pk_name)]
+        self.ordering = list(ordering) + [pk_name]
+        self.queryset = queryset.order_by(*self.ordering)
+        self.page_size = page_size
+
+    def paginate(self, cursor: str = None, offset: int = 0) -> KeysetPage:
+        """
+        Return the page following ``cursor`` (or the first page).
+
+        ``offset`` is only honoured when no cursor is given, for clients that
+        still request numbered pages.
+        """
+        queryset = self.queryset
+        if cursor:
+            queryset = queryset.filter(self._seek_filter(self.decode_cursor(cursor)))
+            offset = 0
+
+        rows = list(queryset[offset:offset + self.page_size + 1])
+        has_next = len(rows) > self.page_size
+        items = rows[:self.page_size]
+        next_cursor = self.encode_cursor(items[-1]) if has_next and items else None
+
+        return KeysetPage(items, next_cursor, has_next, self.page_size)
+
+    def encode_cursor(self, obj) -> str:
+        """
+        Encode the ordering values of ``obj`` as an opaque cursor string.
+        """
+        values = [getattr(obj, field.lstrip('-')) for field in self.ordering]
+        payload = json.dumps(values, cls=DjangoJSONEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, cursor: str) -> List:
+        """
+        Decode a cursor back into typed ordering values.
+        """
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        except (ValueError, UnicodeError) as e:
+            raise InvalidCursor(f'Malformed cursor: {e}')
+
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise InvalidCursor('Cursor does not match the requested ordering')
+
+        try:
+            return [
+                self.model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except Exception as e:
+            raise InvalidCursor(f'Malformed cursor: {e}')
+
+    def _seek_filter(self, values: List) -> Q:
+        """
+        Build ``(a, b, c) > (x, y, z)`` for a mixed-direction ordering.
+        """
+        condition = Q()
+        equal_prefix = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal_prefix & Q(**{f'{name}__{lookup}': value})
+            equal_prefix &= Q(**{name: value})
+        return condition
+
+
+def approximate_count(queryset, cap: int = None) -> Dict:
+    """
+    Count rows up to ``cap``, so very broad queries stay cheap.
+
+    Returns the count and whether it is exact; past the cap the count is a
+    lower bound and ``is_exact`` is False.
+    """
+    if cap is None:
+        cap = getattr(settings, 'SEARCH_COUNT_CAP', 1000)
+
+    count = queryset.order_by()[:cap + 1].count()
+    if count > cap:
+        return {'count': cap, 'is_exact': False}
+    return {'count': count, 'is_exact': True}
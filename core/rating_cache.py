@@ -0,0 +1,183 @@
+"""
+core/rating_cache.py
+--------------------
+Stored AI rating breakdowns behind a shared cache, with input-based staleness.
+"""
+
+import logging
+from datetime import timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Product, ProductAIRating
+from reviews.models import ProductEngagement, Review
+
+logger = logging.getLogger(__name__)
+
+
+class ProductRatingCache:
+    """
+    Read-through store for AI rating breakdowns.
+
+    Ratings live in ``ProductAIRating`` rows together with the inputs they
+    were computed from. A stored rating is served until it becomes stale:
+    the approved review count or latest review change differs, the product's
+    price differs, engagement moved by more than ``AI_RATING_ENGAGEMENT_DELTA``
+    (relative, at least ``AI_RATING_ENGAGEMENT_MIN_DELTA`` interactions), or
+    it is older than ``AI_RATING_MAX_AGE`` seconds. Fresh rows are fronted by
+    the shared Django cache for ``AI_RATING_CACHE_TIMEOUT`` seconds, so
+    repeated reads skip the staleness queries; price changes are still
+    caught there because the cached entry carries the price it was rated at.
+    """
+
+    KEY_PREFIX = 'ai_rating'
+
+    def __init__(self):
+        self.timeout = getattr(settings, 'AI_RATING_CACHE_TIMEOUT', 300)
+        self.max_age = getattr(settings, 'AI_RATING_MAX_AGE', 24 * 3600)
+        self.engagement_delta = getattr(settings, 'AI_RATING_ENGAGEMENT_DELTA', 0.1)
+        self.engagement_min_delta = getattr(settings, 'AI_RATING_ENGAGEMENT_MIN_DELTA', 10)
+        self.batch_size = getattr(settings, 'AI_RATING_CHUNK_SIZE', 2000)
+
+    def key(self, product_id) -> str:
+        return f'{self.KEY_PREFIX}:{product_id}'
+
+    # Reads
+
+    def get(self, product: Product) -> Dict:
+        """
+        Fresh stored rating data of a product, or an empty dict.
+        """
+        return self.get_many([product]).get(str(product.id), {})
+
+    def get_many(self, products: Iterable[Product]) -> Dict[str, Dict]:
+        """
+        Fresh stored rating data keyed by product id; stale or unrated products are left out.
+        """
+        prices = {str(product.id): product.price for product in products}
+        results = {}
+
+        hits = cache.get_many([self.key(product_id) for product_id in prices])
+        for product_id, price in prices.items():
+            entry = hits.get(self.key(product_id))
+            if entry and Decimal(entry['price']) == Decimal(price):
+                results[product_id] = entry['data']
+
+        missing = [product_id for product_id in prices if product_id not in results]
+        if not missing:
+            return results
+
+        rows = list(ProductAIRating.objects.filter(product_id__in=missing))
+        inputs = self.inputs([str(row.product_id) for row in rows], prices)
+        now = timezone.now()
+        fresh = {}
+        for row in rows:
+            product_id = str(row.product_id)
+            if not self.is_stale(row, inputs[product_id], now):
+                fresh[product_id] = row.to_rating_data()
+
+        cache.set_many(
+            {self.key(product_id): {'data': data, 'price': str(prices[product_id])} for product_id, data in fresh.items()},
+            self.timeout
+        )
+        results.update(fresh)
+        return results
+
+    def inputs(self, product_ids: List[str], prices: Dict) -> Dict[str, Dict]:
+        """
+        Current rating inputs of products, in the shape stored on ``ProductAIRating``.
+        """
+        reviews = {
+            str(row['product_id']): row
+            for row in Review.objects.filter(product_id__in=product_ids, status='approved').order_by()
+            .values('product_id').annotate(count=Count('id'), last_change=Max('updated_at'))
+        }
+        engagement = {
+            str(row[0]): sum(row[1:])
+            for row in ProductEngagement.objects.filter(product_id__in=product_ids).values_list(
+                'product_id', 'total_views', 'total_likes', 'total_dislikes', 'total_shares', 'purchase_count'
+            )
+        }
+        return {
+            product_id: {
+                'review_count': reviews[product_id]['count'] if product_id in reviews else 0,
+                'last_review_at': reviews[product_id]['last_change'] if product_id in reviews else None,
+                'engagement_total': engagement.get(product_id, 0),
+                'price': prices.get(product_id),
+            }
+            for product_id in product_ids
+        }
+
+    def is_stale(self, rating: ProductAIRating, inputs: Dict, now=None) -> bool:
+        """
+        Whether the inputs moved enough since ``rating`` was calculated to recompute it.
+        """
+        now = now or timezone.now()
+        if now - rating.calculated_at > timedelta(seconds=self.max_age):
+            return True
+        if rating.price is None or inputs['price'] is None or Decimal(inputs['price']) != rating.price:
+            return True
+        if inputs['review_count'] != rating.review_count:
+            return True
+        if inputs['last_review_at'] and (
+            rating.last_review_at is None or inputs['last_review_at'] > rating.last_review_at
+        ):
+            return True
+        delta = abs(inputs['engagement_total'] - rating.engagement_total)
+        return delta >= max(self.engagement_min_delta, rating.engagement_total * self.engagement_delta)
+
+    # Writes
+
+    def store(self, product: Product, rating_data: Dict):
+        """
+        Store the rating data of one product.
+        """
+        self.store_many({str(product.id): rating_data}, {str(product.id): product.price})
+
+    def store_many(self, ratings: Dict[str, Dict], prices: Dict):
+        """
+        Upsert rating data keyed by product id, with the current inputs.
+        """
+        if not ratings:
+            return
+        inputs = self.inputs(list(ratings), prices)
+        now = timezone.now()
+        rows = [
+            ProductAIRating(
+                product_id=product_id,
+                overall_rating=Decimal(str(data['overall_rating'])),
+                components=data.get('components', {}),
+                confidence_level=Decimal(str(data.get('confidence_level', 0.5))),
+                data_points=data.get('data_points_used', {}),
+                recommendations=data.get('recommendations', []),
+                calculated_at=data.get('last_calculated') or now,
+                **inputs[product_id]
+            )
+            for product_id, data in ratings.items()
+        ]
+        ProductAIRating.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=[
+                'overall_rating', 'components', 'confidence_level', 'data_points', 'recommendations',
+                'review_count', 'last_review_at', 'engagement_total', 'price', 'calculated_at'
+            ],
+            batch_size=self.batch_size
+        )
+        cache.delete_many([self.key(product_id) for product_id in ratings])
+
+    def invalidate(self, product_ids: Iterable):
+        """
+        Drop the shared cache entries of products so the next read re-checks their inputs.
+        """
+        cache.delete_many([self.key(product_id) for product_id in product_ids])
+
+
+# Create singleton instance
+product_rating_cache = ProductRatingCache()
@@ -0,0 +1,417 @@
+"""
+core/rating_engine.py
+---------------------
+Columnar bulk computation of AI product ratings.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Avg, Count, Q, QuerySet
+from django.utils import timezone
+
+from .models import Brand, Product, Shop
+from .rating_cache import product_rating_cache
+from reviews.models import EngagementEvent, ProductEngagement, Review, StoreReview
+
+logger = logging.getLogger(__name__)
+
+
+# Number of recent price observations used for the availability score
+AVAILABILITY_SAMPLES = 10
+
+
+def aligned(keys: List, values: Dict, default: float = 0.0) -> np.ndarray:
+    """
+    Float array of ``values[key]`` for every key, ``default`` where missing or None.
+    """
+    return np.array(
+        [default if values.get(key) is None else float(values[key]) for key in keys],
+        dtype=float
+    )
+
+
+def trend(recent: np.ndarray, previous: np.ndarray) -> np.ndarray:
+    """
+    Relative change of ``recent`` over ``previous``; 1.0 for a new signal, 0.0 for none.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = (recent - previous) / previous
+    return np.where(previous > 0, change, np.where(recent > 0, 1.0, 0.0))
+
+
+class BulkRatingEngine:
+    """
+    Computes AI ratings for many products with grouped queries and NumPy.
+
+    Products are processed in chunks of ``AI_RATING_CHUNK_SIZE``. Each chunk
+    loads its inputs with one grouped query per source (reviews, engagement,
+    events, price history, shops, brands, category prices), computes every
+    component of ``AIProductRatingSystem`` as an array, and writes the
+    ratings with a single ``bulk_update``; ``save()`` and its signals are not
+    involved; the breakdowns are stored through ``product_rating_cache``.
+    Review sentiment is read from the stored ``sentiment_score`` only;
+    reviews that have not been analysed yet do not contribute to it.
+    """
+
+    def __init__(self, rating_system, chunk_size: int = None):
+        self.system = rating_system
+        self.weights = rating_system.weights
+        self.chunk_size = chunk_size or getattr(settings, 'AI_RATING_CHUNK_SIZE', 2000)
+        # category id -> sorted prices of its active products, shared by all chunks of a run
+        self._category_prices = {}
+
+    def run(self, products: Iterable = None, include_breakdown: bool = False, write: bool = True,
+            now=None) -> Dict:
+        """
+        Rate ``products`` (a queryset, product instances or ids; default all
+        active products). With ``include_breakdown`` the per-product rating
+        data is returned under ``ratings``, keyed by product id.
+        """
+        now = now or timezone.now()
+        product_ids = self.product_ids(products)
+
+        results = {'processed': 0, 'successful': 0, 'failed': 0, 'errors': []}
+        if include_breakdown:
+            results['ratings'] = {}
+
+        for start in range(0, len(product_ids), self.chunk_size):
+            chunk = product_ids[start:start + self.chunk_size]
+            try:
+                scored = self.score(chunk, now)
+                ratings = self.breakdown(scored, now) if include_breakdown or write else {}
+                if write:
+                    self.write(scored)
+                    product_rating_cache.store_many(ratings, scored['prices'])
+            except Exception as e:
+                logger.error(f"Error rating products {start}-{start + len(chunk)}: {e}")
+                results['processed'] += len(chunk)
+                results['failed'] += len(chunk)
+                results['errors'].extend({'product_id': str(pk), 'error': str(e)} for pk in chunk)
+                continue
+
+            found = set(scored['ids'])
+            for pk in chunk:
+                if str(pk) not in found:
+                    results['failed'] += 1
+                    results['errors'].append({'product_id': str(pk), 'error': 'Product not found'})
+            results['processed'] += len(chunk)
+            results['successful'] += len(found)
+            if include_breakdown:
+                results['ratings'].update(ratings)
+
+        return results
+
+    @staticmethod
+    def product_ids(products) -> List[str]:
+        if products is None:
+            products = Product.objects.filter(is_active=True)
+        if isinstance(products, QuerySet):
+            return [str(pk) for pk in products.values_list('id', flat=True)]
+        return [str(getattr(product, 'pk', product)) for product in products]
+
+    # Scoring
+
+    def score(self, product_ids: List[str], now) -> Dict:
+        """
+        Component scores and overall ratings of one chunk, as aligned arrays.
+        """
+        rows = list(
+            Product.objects.filter(id__in=product_ids).values_list(
+                'id', 'shop_id', 'brand_id', 'category_id', 'price', 'original_price', 'is_active', 'created_at'
+            )
+        )
+        ids = [str(row[0]) for row in rows]
+        product = {
+            'shop_id': [row[1] for row in rows],
+            'brand_id': [row[2] for row in rows],
+            'category_id': [row[3] for row in rows],
+            'price': np.array([float(row[4]) for row in rows], dtype=float),
+            'original_price': np.array([float(row[5]) if row[5] else 0.0 for row in rows], dtype=float),
+            'is_active': np.array([row[6] for row in rows], dtype=bool),
+            'age_days': np.array([(now - row[7]).days for row in rows], dtype=float),
+        }
+
+        counts = {}
+        components = {
+            'customer_reviews': self._review_scores(ids, counts),
+            'engagement_metrics': self._engagement_scores(ids),
+            'store_reliability': self._store_scores(product['shop_id'], counts),
+            'brand_reputation': self._brand_scores(product['brand_id']),
+            'price_competitiveness': self._price_scores(product, counts),
+            'availability_score': self._availability_scores(ids, product['is_active'], now),
+            'historical_performance': self._historical_scores(ids, product['age_days'], now),
+        }
+
+        overall = sum(components[name] * weight for name, weight in self.weights.items())
+        return {
+            'ids': ids,
+            'components': components,
+            'overall': np.round(np.clip(overall, 0.0, 5.0), 2),
+            'counts': counts,
+            'prices': {pk: row[4] for pk, row in zip(ids, rows)},
+        }
+
+    def _review_scores(self, ids: List[str], counts: Dict) -> np.ndarray:
+        stats = {
+            str(row['product_id']): row
+            for row in Review.objects.filter(product_id__in=ids, status='approved').order_by()
+            .values('product_id').annotate(
+                count=Count('id'),
+                avg_rating=Avg('rating'),
+                avg_sentiment=Avg('sentiment_score'),
+                verified=Count('id', filter=Q(verified_purchase=True)),
+                helpful=Count('id', filter=Q(helpfulness_score__gt=0)),
+            )
+        }
+        column = lambda name: {pk: row[name] for pk, row in stats.items()}
+
+        count = aligned(ids, column('count'))
+        counts['reviews'] = count
+        avg_rating = aligned(ids, column('avg_rating'), 3.0)
+        sentiment = aligned(ids, column('avg_sentiment')) * 0.5
+        with np.errstate(divide='ignore', invalid='ignore'):
+            verified = np.where(count > 0, aligned(ids, column('verified')) / count, 0.0) * 0.2
+            helpful = np.where(count > 0, aligned(ids, column('helpful')) / count, 0.0) * 0.1
+
+        score = np.clip(avg_rating + sentiment + verified + helpful, 0.0, 5.0)
+        return np.where(count > 0, score, 3.0)
+
+    def _engagement_scores(self, ids: List[str]) -> np.ndarray:
+        stats = {
+            str(row[0]): row[1:]
+            for row in ProductEngagement.objects.filter(product_id__in=ids).values_list(
+                'product_id', 'total_views', 'total_likes', 'total_dislikes', 'conversion_rate', 'total_shares'
+            )
+        }
+        present = np.array([pk in stats for pk in ids], dtype=bool)
+        views, likes, dislikes, conversion, shares = (
+            aligned(ids, {pk: row[i] for pk, row in stats.items()}) for i in range(5)
+        )
+
+        view_score = np.minimum(5.0, np.log10(np.maximum(1.0, views)) / 2)
+        like_score = likes / np.maximum(1.0, likes + dislikes) * 5.0
+        conversion_score = np.minimum(5.0, conversion / 10)
+        share_score = np.minimum(5.0, np.log10(np.maximum(1.0, shares)))
+
+        score = view_score * 0.3 + like_score * 0.4 + conversion_score * 0.2 + share_score * 0.1
+        return np.where(present, np.clip(score, 0.0, 5.0), 2.5)
+
+    def _store_scores(self, shop_ids: List, counts: Dict) -> np.ndarray:
+        unique = set(shop_ids)
+        shops = {
+            row[0]: row[1:]
+            for row in Shop.objects.filter(id__in=unique).values_list(
+                'id', 'reliability_score', 'customer_service_rating', 'average_delivery_days', 'return_policy_days'
+            )
+        }
+        reviews = {
+            row['shop_id']: row
+            for row in StoreReview.objects.filter(shop_id__in=unique).order_by()
+            .values('shop_id').annotate(count=Count('id'), avg_rating=Avg('overall_rating'))
+        }
+
+        reliability, service, delivery_days, return_days = (
+            aligned(shop_ids, {pk: row[i] for pk, row in shops.items()}) for i in range(4)
+        )
+        review_count = aligned(shop_ids, {pk: row['count'] for pk, row in reviews.items()})
+        counts['store_reviews'] = review_count
+        store_rating = aligned(shop_ids, {pk: row['avg_rating'] for pk, row in reviews.items()}, 3.0)
+        store_rating = np.where(review_count > 0, store_rating, reliability)
+
+        delivery = np.clip(5 - (delivery_days - 1) * 0.5, 0.0, 5.0)
+        returns = np.minimum(5.0, return_days / 30 * 5)
+
+        score = reliability * 0.3 + service * 0.2 + delivery * 0.2 + returns * 0.1 + store_rating * 0.2
+        return np.clip(score, 0.0, 5.0)
+
+    def _brand_scores(self, brand_ids: List) -> np.ndarray:
+        unique = {pk for pk in brand_ids if pk is not None}
+        if not unique:
+            return np.full(len(brand_ids), 3.0)
+
+        brands = {row[0]: row[1:] for row in Brand.objects.filter(id__in=unique).values_list('id', 'rating', 'popularity')}
+        product_ratings = {
+            row['brand_id']: row
+            for row in Product.objects.filter(brand_id__in=unique, is_active=True).order_by()
+            .values('brand_id').annotate(count=Count('id'), avg_rating=Avg('rating'))
+        }
+        sentiments = {
+            row['product__brand_id']: row
+            for row in Review.objects.filter(product__brand_id__in=unique, status='approved').order_by()
+            .values('product__brand_id').annotate(count=Count('id'), avg_sentiment=Avg('sentiment_score'))
+        }
+
+        has_brand = np.array([pk is not None for pk in brand_ids], dtype=bool)
+        brand_rating = aligned(brand_ids, {pk: row[0] for pk, row in brands.items()})
+        popularity = aligned(brand_ids, {pk: row[1] for pk, row in brands.items()}) / 20
+
+        has_products = aligned(brand_ids, {pk: row['count'] for pk, row in product_ratings.items()}) > 0
+        products_rating = aligned(brand_ids, {pk: row['avg_rating'] for pk, row in product_ratings.items()}, 3.0)
+        products_rating = np.where(has_products, products_rating, brand_rating)
+
+        sentiment = aligned(brand_ids, {pk: row['avg_sentiment'] for pk, row in sentiments.items()}, np.nan)
+        sentiment = np.where(np.isnan(sentiment), 3.0, (sentiment + 1) * 2.5)
+
+        score = brand_rating * 0.4 + popularity * 0.2 + products_rating * 0.3 + sentiment * 0.1
+        return np.where(has_brand, np.clip(score, 0.0, 5.0), 3.0)
+
+    def _price_scores(self, product: Dict, counts: Dict) -> np.ndarray:
+        category_ids = product['category_id']
+        missing = set(category_ids) - set(self._category_prices)
+        if missing:
+            prices = defaultdict(list)
+            for category_id, price in Product.objects.filter(
+                category_id__in=missing, is_active=True
+            ).order_by('category_id', 'price').values_list('category_id', 'price'):
+                prices[category_id].append(float(price))
+            for category_id in missing:
+                self._category_prices[category_id] = np.array(prices[category_id], dtype=float)
+
+        price = product['price']
+        # Rank among the other active products of the category: the product
+        # itself is in the sorted prices only when active, and never below itself
+        cheaper = np.array([
+            np.searchsorted(self._category_prices[category_id], value, side='left')
+            for category_id, value in zip(category_ids, price)
+        ], dtype=float)
+        similar = np.array(
+            [len(self._category_prices[category_id]) for category_id in category_ids], dtype=float
+        ) - product['is_active']
+        counts['similar_products'] = similar
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percentile = np.where(similar > 0, (similar - cheaper) / similar, 0.0)
+            discount = np.where(
+                product['original_price'] > price,
+                np.minimum(1.0, (product['original_price'] - price) / product['original_price'] * 2),
+                0.0
+            )
+
+        score = np.clip(percentile * 5.0 + discount, 0.0, 5.0)
+        return np.where(similar > 0, score, 3.0)
+
+    def _availability_scores(self, ids: List[str], is_active: np.ndarray, now) -> np.ndarray:
+        from store_integration.models import PriceHistory
+
+        samples = defaultdict(lambda: [0, 0])
+        for product_id, is_available in PriceHistory.objects.filter(
+            product_id__in=ids, recorded_at__gte=now - timedelta(days=7)
+        ).order_by('product_id', '-recorded_at').values_list('product_id', 'is_available'):
+            sample = samples[str(product_id)]
+            if sample[0] < AVAILABILITY_SAMPLES:
+                sample[0] += 1
+                sample[1] += int(is_available)
+
+        total = aligned(ids, {pk: sample[0] for pk, sample in samples.items()})
+        available = aligned(ids, {pk: sample[1] for pk, sample in samples.items()})
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(total > 0, available / total, 1.0)
+        return np.where(is_active, 5.0 * ratio, 0.0)
+
+    def _historical_scores(self, ids: List[str], age_days: np.ndarray, now) -> np.ndarray:
+        thirty_days_ago = now - timedelta(days=30)
+        sixty_days_ago = now - timedelta(days=60)
+        recent = Q(timestamp__gte=thirty_days_ago)
+        previous = Q(timestamp__lt=thirty_days_ago)
+        stats = {
+            str(row['product_id']): row
+            for row in EngagementEvent.objects.filter(
+                product_id__in=ids, timestamp__gte=sixty_days_ago,
+                event_type__in=['product_view', 'purchase_completed']
+            ).order_by().values('product_id').annotate(
+                recent_views=Count('id', filter=recent & Q(event_type='product_view')),
+                previous_views=Count('id', filter=previous & Q(event_type='product_view')),
+                recent_purchases=Count('id', filter=recent & Q(event_type='purchase_completed')),
+                previous_purchases=Count('id', filter=previous & Q(event_type='purchase_completed')),
+            )
+        }
+        column = lambda name: aligned(ids, {pk: row[name] for pk, row in stats.items()})
+
+        trend_score = (
+            trend(column('recent_views'), column('previous_views'))
+            + trend(column('recent_purchases'), column('previous_purchases'))
+        ) / 2
+        adjustment = np.select(
+            [trend_score > 0.5, trend_score > 0.1, trend_score > -0.1, trend_score > -0.5],
+            [1.0, 0.5, 0.0, -0.5],
+            default=-1.0
+        )
+        age_bonus = np.select([age_days < 30, age_days < 90], [0.5, 0.2], default=0.0)
+        return np.clip(3.0 + adjustment + age_bonus, 0.0, 5.0)
+
+    # Output
+
+    def write(self, scored: Dict):
+        """
+        Persist the overall ratings with one ``bulk_update``.
+        """
+        Product.objects.bulk_update(
+            [
+                Product(id=pk, rating=Decimal(str(rating)))
+                for pk, rating in zip(scored['ids'], scored['overall'])
+            ],
+            ['rating'],
+            batch_size=self.chunk_size
+        )
+
+    def breakdown(self, scored: Dict, now) -> Dict[str, Dict]:
+        """
+        Per-product rating data in the ``calculate_ai_rating`` format.
+        """
+        ids = scored['ids']
+        event_counts = dict(
+            EngagementEvent.objects.filter(product_id__in=ids).order_by()
+            .values('product_id').annotate(count=Count('id')).values_list('product_id', 'count')
+        )
+        event_counts = {str(pk): count for pk, count in event_counts.items()}
+        counts = scored['counts']
+
+        ratings = {}
+        for i, pk in enumerate(ids):
+            components = {name: float(values[i]) for name, values in scored['components'].items()}
+            ratings[pk] = {
+                'overall_rating': float(scored['overall'][i]),
+                'components': {
+                    name: {
+                        'score': round(score, 2),
+                        'weight': self.weights[name],
+                        'weighted_contribution': round(score * self.weights[name], 2)
+                    }
+                    for name, score in components.items()
+                },
+                'confidence_level': self.confidence(int(counts['reviews'][i])),
+                'last_calculated': now,
+                'data_points_used': {
+                    'reviews': int(counts['reviews'][i]),
+                    'engagement_events': event_counts.get(pk, 0),
+                    'price_history_records': 0,
+                    'store_reviews': int(counts['store_reviews'][i]),
+                    'similar_products': int(counts['similar_products'][i]),
+                },
+                'recommendations': self.system._generate_improvement_recommendations(components),
+            }
+        return ratings
+
+    @staticmethod
+    def confidence(review_count: int) -> float:
+        """
+        Confidence level from the number of approved reviews.
+        """
+        if review_count >= 20:
+            review_confidence = 1.0
+        elif review_count >= 10:
+            review_confidence = 0.8
+        elif review_count >= 5:
+            review_confidence = 0.6
+        elif review_count >= 1:
+            review_confidence = 0.4
+        else:
+            review_confidence = 0.2
+        # Engagement and store confidence are fixed until they are measured
+        return round((review_confidence + 0.7 + 0.8) / 3, 2)
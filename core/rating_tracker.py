@@ -0,0 +1,180 @@
+"""
+core/rating_tracker.py
+----------------------
+Tracks products whose AI rating inputs changed and re-rates them in batches.
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .ai_rating_system import ai_rating_system
+from .auto_rating import auto_rating_service
+from .models import DirtyProductRating, Product
+
+logger = logging.getLogger(__name__)
+
+
+class ProductRatingTracker:
+    """
+    Dirty set of products to re-rate, stored in ``DirtyProductRating``.
+
+    Signal handlers and bulk writers mark products when reviews, reactions,
+    engagement, prices or brand data change; marks are written when the
+    surrounding transaction commits. Single-product marks are debounced
+    through the shared cache for ``AI_RATING_DIRTY_DEBOUNCE`` seconds so a
+    burst of events costs one upsert. ``drain`` re-rates the marked products
+    with the bulk rating engine, ``AI_RATING_DIRTY_BATCH_SIZE`` at a time;
+    it clears the debounce keys of a batch before rating it, so products
+    marked again while their batch was being rated stay dirty. After
+    creation ``Product.rating`` is the AI rating written here, so the tracker
+    also sends the high-rating notifications for the ratings it writes.
+    """
+
+    KEY_PREFIX = 'rating_dirty'
+
+    def __init__(self):
+        self.batch_size = getattr(settings, 'AI_RATING_DIRTY_BATCH_SIZE', 1000)
+        self.debounce = getattr(settings, 'AI_RATING_DIRTY_DEBOUNCE', 60)
+        self._local = threading.local()
+
+    def key(self, product_id) -> str:
+        return f'{self.KEY_PREFIX}:{product_id}'
+
+    @contextmanager
+    def deferred(self):
+        """
+        Collect marks inside the block and write them once on exit.
+        """
+        pending = getattr(self._local, 'pending', None)
+        if pending is not None:
+            # Nested block: the outermost one writes
+            yield
+            return
+
+        self._local.pending = {}
+        try:
+            yield
+        finally:
+            marks = self._local.pending
+            self._local.pending = None
+            by_reason = {}
+            for product_id, reason in marks.items():
+                by_reason.setdefault(reason, []).append(product_id)
+            for reason, product_ids in by_reason.items():
+                self._write(product_ids, reason)
+
+    def mark(self, product_ids: Iterable, reason: str):
+        """
+        Mark products for re-rating after the current transaction commits.
+        """
+        product_ids = [str(product_id) for product_id in product_ids if product_id]
+        if not product_ids:
+            return
+
+        pending = getattr(self._local, 'pending', None)
+        if pending is not None:
+            pending.update((product_id, reason) for product_id in product_ids)
+            return
+
+        transaction.on_commit(lambda: self._write(product_ids, reason))
+
+    def mark_brand(self, brand_id, reason: str = 'brand'):
+        """
+        Mark every active product of a brand.
+        """
+        self.mark(
+            Product.objects.filter(brand_id=brand_id, is_active=True).values_list('id', flat=True),
+            reason
+        )
+
+    def _write(self, product_ids, reason: str):
+        if len(product_ids) == 1 and not cache.add(self.key(product_ids[0]), 1, self.debounce):
+            return
+
+        # Products deleted in the meantime cannot be marked
+        existing = [str(pk) for pk in Product.objects.filter(id__in=product_ids).values_list('id', flat=True)]
+        now = timezone.now()
+        for start in range(0, len(existing), self.batch_size):
+            DirtyProductRating.objects.bulk_create(
+                [
+                    DirtyProductRating(product_id=product_id, reason=reason, marked_at=now)
+                    for product_id in existing[start:start + self.batch_size]
+                ],
+                update_conflicts=True,
+                unique_fields=['product'],
+                update_fields=['reason', 'marked_at']
+            )
+        ai_rating_system.rating_cache.invalidate(existing)
+
+    def pending_count(self) -> int:
+        return DirtyProductRating.objects.count()
+
+    def drain(self, batch_size: int = None, max_batches: int = None) -> Dict:
+        """
+        Re-rate marked products batch by batch and clear their marks.
+        """
+        batch_size = batch_size or self.batch_size
+        totals = {'batches': 0, 'rated': 0, 'failed': 0, 'skipped': 0}
+
+        while max_batches is None or totals['batches'] < max_batches:
+            product_ids = [
+                str(pk) for pk in DirtyProductRating.objects.order_by('marked_at')
+                .values_list('product_id', flat=True)[:batch_size]
+            ]
+            if not product_ids:
+                break
+            totals['batches'] += 1
+
+            # Marks debounced before this point are covered by the rating below;
+            # clearing the keys first lets marks made during it bump marked_at
+            cache.delete_many([self.key(product_id) for product_id in product_ids])
+            claimed_at = timezone.now()
+
+            active = Product.objects.filter(id__in=product_ids, is_active=True)
+            previous = {
+                str(pk): (name, rating, owner_id)
+                for pk, name, rating, owner_id in active.values_list('id', 'name', 'rating', 'shop__owner__user_id')
+            }
+            result = ai_rating_system.bulk_calculate_ratings(active)
+            failed = {error['product_id'] for error in result['errors']}
+            self._notify_high_ratings(previous, failed)
+            totals['rated'] += result['successful']
+            totals['failed'] += len(failed)
+            totals['skipped'] += len(product_ids) - result['processed']
+
+            # Failed products stay marked and are retried on the next drain
+            done = [product_id for product_id in product_ids if product_id not in failed]
+            DirtyProductRating.objects.filter(product_id__in=done, marked_at__lte=claimed_at).delete()
+            if not done:
+                break
+
+        logger.info(
+            f"Re-rated {totals['rated']} dirty products in {totals['batches']} batches "
+            f"({totals['failed']} failed, {totals['skipped']} inactive)"
+        )
+        return totals
+
+    def _notify_high_ratings(self, previous: Dict, failed):
+        """
+        Notify owners of products whose new rating crossed the high-rating threshold.
+        """
+        ratings = Product.objects.filter(
+            id__in=[product_id for product_id in previous if product_id not in failed]
+        ).values_list('id', 'rating')
+        crossings = []
+        for pk, rating in ratings:
+            name, old_rating, owner_id = previous[str(pk)]
+            if owner_id and auto_rating_service.crossed(old_rating, rating):
+                crossings.append((pk, name, owner_id))
+        auto_rating_service.notify(crossings)
+
+
+# Create singleton instance
+product_rating_tracker = ProductRatingTracker()
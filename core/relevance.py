@@ -0,0 +1,274 @@
+"""
+core/relevance.py
+-----------------
+Bulk relevance scoring for product search (BM25F over product text fields).
+"""
+
+import base64
+import bisect
+import hashlib
+import json
+import math
+import re
+from collections import Counter
+from datetime import timedelta
+from typing import Dict, List, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, FloatField, Q, Value, When
+from django.utils import timezone
+
+from .pagination import InvalidCursor, KeysetPage
+
+STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have',
+    'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should'
+})
+
+TOKEN_RE = re.compile(r'[^\w\s]')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lower-case keywords, dropping stop words and short words.
+    """
+    if not text:
+        return []
+    words = TOKEN_RE.sub(' ', text.lower()).split()
+    return [word for word in words if len(word) > 2 and word not in STOP_WORDS]
+
+
+class RankedResults:
+    """
+    Product ids ordered by descending relevance, with cursor pagination.
+    """
+
+    def __init__(self, ids: List[str], scores: np.ndarray, truncated: bool = False):
+        # ``truncated`` is set when matches beyond the candidate limit were left out
+        self.truncated = truncated
+        # Order by (-score, id) so equal scores still have a stable position
+        keys = sorted((-float(score), pk) for pk, score in zip(ids, scores))
+        self.ids = [pk for _, pk in keys]
+        self.scores = [-score for score, _ in keys]
+        self._keys = keys
+        self._score_map = dict(zip(self.ids, self.scores))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def score_for(self, product_id) -> float:
+        return self._score_map.get(str(product_id), 0.0)
+
+    def paginate(self, cursor: str = None, page_size: int = 20, offset: int = 0) -> KeysetPage:
+        """
+        Return one page of ``(product_id, score)`` pairs after ``cursor``.
+        """
+        start = offset
+        if cursor:
+            score, pk = self.decode_cursor(cursor)
+            start = bisect.bisect_right(self._keys, (-score, pk))
+
+        end = start + page_size
+        items = list(zip(self.ids[start:end], self.scores[start:end]))
+        has_next = end < len(self.ids)
+        next_cursor = self.encode_cursor(*items[-1]) if has_next and items else None
+
+        return KeysetPage(items, next_cursor, has_next, page_size)
+
+    @staticmethod
+    def encode_cursor(pk: str, score: float) -> str:
+        payload = json.dumps([score, pk], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[float, str]:
+        try:
+            score, pk = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+            return float(score), str(pk)
+        except (ValueError, TypeError, UnicodeError) as e:
+            raise InvalidCursor(f'Malformed cursor: {e}')
+
+
+class RelevanceScorer:
+    """
+    Scores whole candidate sets against a query in one pass.
+
+    Query-term statistics (document frequencies and IDF) are computed once per
+    query and cached. Each candidate is tokenised once per field; term
+    frequencies and field lengths are then combined with BM25F in NumPy, and
+    the store's boost factors are added as vectorised terms.
+    """
+
+    # field -> (weight, length normalisation b)
+    FIELDS = {
+        'name': (3.0, 0.75),
+        'description': (1.0, 0.75),
+        'brand__name': (2.0, 0.5),
+        'category__name': (1.5, 0.5),
+    }
+    K1 = 1.2
+
+    def __init__(self, boost_factors: Dict[str, float]):
+        self.boost_factors = boost_factors
+        self.candidate_limit = getattr(settings, 'RELEVANCE_CANDIDATE_LIMIT', 2000)
+        self.stats_timeout = getattr(settings, 'RELEVANCE_STATS_CACHE_TIMEOUT', 600)
+
+    def query_terms(self, query: str) -> List[str]:
+        """
+        Unique query keywords in query order, at most 10.
+        """
+        return list(dict.fromkeys(tokenize(query)))[:10]
+
+    def term_statistics(self, terms: List[str]) -> Dict[str, float]:
+        """
+        Inverse document frequency of each term over the active catalogue.
+        """
+        from .models import Product
+
+        if not terms:
+            return {}
+
+        cache_key = 'relevance_idf_' + hashlib.md5(' '.join(terms).encode('utf-8')).hexdigest()
+        stats = cache.get(cache_key)
+        if stats is not None:
+            return stats
+
+        products = Product.objects.filter(is_active=True)
+        total = products.count()
+        stats = {}
+        for term in terms:
+            frequency = products.filter(self.term_filter([term])).count()
+            stats[term] = math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+
+        cache.set(cache_key, stats, self.stats_timeout)
+        return stats
+
+    def term_filter(self, terms: List[str]) -> Q:
+        """
+        Match products containing any of ``terms`` in a scored field.
+        """
+        term_q = Q()
+        for term in terms:
+            for field in self.FIELDS:
+                term_q |= Q(**{f'{field}__icontains': term})
+        return term_q
+
+    def rank(self, queryset, query: str) -> RankedResults:
+        """
+        Score the best matching candidates in ``queryset`` and order them by relevance.
+
+        Candidates are restricted to products matching a query term and, when
+        more than ``candidate_limit`` match, the ones with the most weighted
+        field matches are kept before the full BM25F scoring.
+        """
+        terms = self.query_terms(query)
+        if terms:
+            hits = Value(0.0, output_field=FloatField())
+            for term in terms:
+                for field, (weight, _) in self.FIELDS.items():
+                    hits = hits + Case(
+                        When(**{f'{field}__icontains': term}, then=Value(weight)),
+                        default=Value(0.0),
+                        output_field=FloatField(),
+                    )
+            queryset = queryset.filter(self.term_filter(terms)).annotate(
+                term_hits=hits
+            ).order_by('-term_hits', '-rating', '-views')
+        else:
+            queryset = queryset.order_by('-rating', '-views')
+
+        rows = list(
+            queryset.values_list(
+                'id', *self.FIELDS, 'rating', 'views', 'created_at'
+            )[:self.candidate_limit + 1]
+        )
+        truncated = len(rows) > self.candidate_limit
+        rows = rows[:self.candidate_limit]
+        ids = [str(row[0]) for row in rows]
+        scores = self.score_rows(rows, query)
+        return RankedResults(ids, np.round(scores, 6), truncated=truncated)
+
+    def score_products(self, products, query: str) -> Dict[str, float]:
+        """
+        Score already loaded products, keyed by product id.
+        """
+        rows = [
+            (
+                product.id,
+                product.name,
+                product.description,
+                product.brand.name if product.brand else None,
+                product.category.name if product.category else None,
+                product.rating,
+                product.views,
+                product.created_at,
+            )
+            for product in products
+        ]
+        scores = self.score_rows(rows, query)
+        return {str(row[0]): round(float(score), 6) for row, score in zip(rows, scores)}
+
+    def score_rows(self, rows: List[Tuple], query: str) -> np.ndarray:
+        """
+        Score rows of ``(id, name, description, brand, category, rating, views, created_at)``.
+        """
+        n = len(rows)
+        if n == 0:
+            return np.zeros(0)
+
+        terms = self.query_terms(query)
+        term_stats = self.term_statistics(terms)
+        idf = np.array([term_stats[term] for term in terms], dtype=float)
+        term_index = {term: j for j, term in enumerate(terms)}
+        query_lower = query.lower().strip()
+
+        # Tokenise each field once, collecting term frequencies and lengths
+        fields = list(self.FIELDS)
+        tf = np.zeros((len(fields), n, len(terms)))
+        lengths = np.zeros((len(fields), n))
+        phrase = np.zeros((len(fields), n), dtype=bool)
+
+        for i, row in enumerate(rows):
+            for f, text in enumerate(row[1:1 + len(fields)]):
+                if not text:
+                    continue
+                tokens = tokenize(text)
+                lengths[f, i] = len(tokens)
+                for term, count in Counter(tokens).items():
+                    j = term_index.get(term)
+                    if j is not None:
+                        tf[f, i, j] = count
+                if query_lower:
+                    phrase[f, i] = query_lower in text.lower()
+
+        # BM25F: length-normalised, weighted term frequency per field
+        combined = np.zeros((n, len(terms)))
+        for f, field in enumerate(fields):
+            weight, b = self.FIELDS[field]
+            avg_length = lengths[f].mean() or 1.0
+            norm = 1 - b + b * lengths[f] / avg_length
+            combined += weight * tf[f] / norm[:, None]
+
+        text_score = (idf * combined / (self.K1 + combined)).sum(axis=1) if len(terms) else np.zeros(n)
+        scores = text_score * self.boost_factors['title_match']
+
+        # Phrase matches per field
+        scores += phrase[fields.index('name')] * self.boost_factors['exact_match']
+        scores += phrase[fields.index('description')] * self.boost_factors['description_match']
+        scores += phrase[fields.index('brand__name')] * self.boost_factors['brand_match']
+        scores += phrase[fields.index('category__name')] * self.boost_factors['category_match']
+
+        # Quality, popularity and freshness boosts
+        ratings = np.array([float(row[5] or 0) for row in rows])
+        views = np.array([row[6] or 0 for row in rows])
+        recent_cutoff = timezone.now() - timedelta(days=30)
+        recent = np.array([row[7] is not None and row[7] > recent_cutoff for row in rows])
+
+        scores += (ratings >= 4.0) * self.boost_factors['high_rating']
+        scores += (views > 1000) * self.boost_factors['popular']
+        scores += recent * self.boost_factors['recent']
+
+        return scores
@@ -0,0 +1,77 @@
+"""
+core/renderers.py
+-----------------
+Streaming JSON responses for large API payloads.
+"""
+
+import json
+from collections.abc import Iterator
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+
+def iter_json(data, encoder=DjangoJSONEncoder):
+    """
+    Serialise ``data`` to JSON chunks.
+
+    Dicts and lists are walked so that any iterator or generator found inside
+    is consumed one item at a time and never materialised as a whole.
+    """
+    if isinstance(data, dict):
+        yield '{'
+        first = True
+        for key, value in data.items():
+            if not first:
+                yield ','
+            first = False
+            yield json.dumps(str(key))
+            yield ':'
+            yield from iter_json(value, encoder)
+        yield '}'
+    elif isinstance(data, (list, tuple, Iterator)):
+        yield '['
+        first = True
+        for item in data:
+            if not first:
+                yield ','
+            first = False
+            yield from iter_json(item, encoder)
+        yield ']'
+    else:
+        yield json.dumps(data, cls=encoder)
+
+
+class StreamingJSONResponse(StreamingHttpResponse):
+    """
+    JSON response built from a generator, so memory per request stays flat.
+    """
+
+    def __init__(self, data, status=200, encoder=DjangoJSONEncoder, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(self._chunks(data, encoder), status=status, **kwargs)
+
+    @staticmethod
+    def _chunks(data, encoder, chunk_size=8192):
+        # Join small fragments so the WSGI server does not write byte by byte
+        buffer = []
+        size = 0
+        for fragment in iter_json(data, encoder):
+            buffer.append(fragment)
+            size += len(fragment)
+            if size >= chunk_size:
+                yield ''.join(buffer).encode('utf-8')
+                buffer = []
+                size = 0
+        if buffer:
+            yield ''.join(buffer).encode('utf-8')
+
+
+def should_stream(request, page_size: int) -> bool:
+    """
+    Decide whether a listing response should be streamed.
+    """
+    if request.query_params.get('stream') == 'true':
+        return True
+    return page_size >= getattr(settings, 'STREAMING_RESPONSE_THRESHOLD', 50)
@@ -0,0 +1,162 @@
+"""
+core/search_cache.py
+--------------------
+Two-level cache for search results, invalidated by a catalogue version.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class SearchResultCache:
+    """
+    Cache for search and autocomplete results.
+
+    Keys are built from the normalised query, filters, sort and cursor, and
+    include the current catalogue version. Bumping the version on product
+    changes or sync completion makes every older entry unreachable without
+    having to delete it.
+
+    Lookups go through a small per-process LRU first, then the shared Django
+    cache. Entries carry a soft expiry: once it passes, a single caller takes
+    a short lock and recomputes while the others keep serving the stale copy,
+    so popular queries do not stampede the database when they expire.
+    """
+
+    VERSION_KEY = 'search_catalogue_version'
+
+    def __init__(self):
+        self.timeout = getattr(settings, 'SEARCH_CACHE_TIMEOUT', 300)
+        self.stale_grace = getattr(settings, 'SEARCH_CACHE_STALE_GRACE', 60)
+        self.local_size = getattr(settings, 'SEARCH_CACHE_LOCAL_SIZE', 256)
+        self.local_timeout = getattr(settings, 'SEARCH_CACHE_LOCAL_TIMEOUT', 30)
+        self.lock_timeout = getattr(settings, 'SEARCH_CACHE_LOCK_TIMEOUT', 10)
+        self.lock_wait = getattr(settings, 'SEARCH_CACHE_LOCK_WAIT', 2.0)
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def catalogue_version(self) -> int:
+        """
+        Current catalogue version (starts at 1).
+        """
+        version = cache.get(self.VERSION_KEY)
+        if version is None:
+            cache.add(self.VERSION_KEY, 1, None)
+            version = cache.get(self.VERSION_KEY, 1)
+        return version
+
+    def bump_catalogue_version(self) -> int:
+        """
+        Invalidate all cached search results.
+        """
+        try:
+            return cache.incr(self.VERSION_KEY)
+        except ValueError:
+            # Key missing (first run or evicted): start past the default
+            version = int(time.time())
+            cache.set(self.VERSION_KEY, version, None)
+            return version
+
+    def make_key(self, namespace: str, query: str = '', filters: Dict = None,
+                 sort_by: str = None, cursor: str = None, **extra) -> str:
+        """
+        Build a versioned cache key from normalised search parameters.
+        """
+        normalised = {
+            'query': self.normalise_query(query),
+            'filters': {k: v for k, v in (filters or {}).items() if v not in (None, '')},
+            'sort_by': sort_by,
+            'cursor': cursor,
+            'extra': extra,
+        }
+        payload = json.dumps(normalised, sort_keys=True, default=str)
+        digest = hashlib.md5(payload.encode('utf-8')).hexdigest()
+        return f"search:{namespace}:v{self.catalogue_version()}:{digest}"
+
+    @staticmethod
+    def normalise_query(query: str) -> str:
+        return re.sub(r'\s+', ' ', (query or '').strip().lower())
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], timeout: int = None,
+                       should_cache: Callable[[Any], bool] = None) -> Any:
+        """
+        Return the cached value for ``key`` or compute and store it.
+        """
+        timeout = timeout or self.timeout
+        entry = self._get_local(key)
+        if entry is None:
+            entry = cache.get(key)
+            if entry is not None:
+                self._set_local(key, entry)
+
+        now = time.time()
+        if entry is not None and entry['expires_at'] > now:
+            return entry['value']
+
+        lock_key = f"{key}:lock"
+        if cache.add(lock_key, 1, self.lock_timeout):
+            try:
+                return self._compute_and_store(key, compute, timeout, should_cache)
+            finally:
+                cache.delete(lock_key)
+
+        # Another worker is recomputing this key
+        if entry is not None:
+            return entry['value']
+
+        deadline = now + self.lock_wait
+        while time.time() < deadline:
+            time.sleep(0.05)
+            entry = cache.get(key)
+            if entry is not None:
+                self._set_local(key, entry)
+                return entry['value']
+
+        logger.warning(f"Timed out waiting for search cache key {key}, computing directly")
+        return self._compute_and_store(key, compute, timeout, should_cache)
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def _compute_and_store(self, key, compute, timeout, should_cache):
+        value = compute()
+        if should_cache is None or should_cache(value):
+            entry = {'value': value, 'expires_at': time.time() + timeout}
+            cache.set(key, entry, timeout + self.stale_grace)
+            self._set_local(key, entry)
+        return value
+
+    def _get_local(self, key):
+        with self._lock:
+            item = self._local.get(key)
+            if item is None:
+                return None
+            entry, stored_at = item
+            if time.time() - stored_at > self.local_timeout:
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return entry
+
+    def _set_local(self, key, entry):
+        with self._lock:
+            self._local[key] = (entry, time.time())
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+
+# Create singleton instance
+search_result_cache = SearchResultCache()
@@ -1,18 +1,19 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from core.models import Product, Brand
+from core.models import Product
+from core.search_cache import search_result_cache
+
+# حقول التفاعل والتقييم تتغير مع كل مشاهدة أو إعجاب، ونتائج البحث المخزنة تتحمل تأخرها حتى انتهاء مهلتها
+ENGAGEMENT_FIELDS = frozenset({'views', 'likes', 'dislikes', 'neutrals', 'rating'})
+
+# تقييم المنتج يكتبه متتبع التقييم (core.rating_tracker) وحده: الحفظ وتعديل البراند يعلّمان المنتجات فقط (signals_rating)
+
 
-# تحديث تقييم المنتج تلقائيًا عند كل تغيير في الإعجابات أو عدم الإعجاب أو المشاهدات أو البراند
 @receiver(post_save, sender=Product)
-def update_product_rating_on_save(sender, instance, **kwargs):
-    # لا تحدث إذا كان الحفظ فقط لحقل rating (لتفادي الحلقة اللانهائية)
+@receiver(post_delete, sender=Product)
+def invalidate_search_cache_on_product_change(sender, instance, **kwargs):
+    # تغيير الكتالوج يبطل كل نتائج البحث المخزنة مؤقتًا
     update_fields = kwargs.get('update_fields', None)
-    if update_fields is not None and 'rating' in update_fields and len(update_fields) == 1:
+    if update_fields is not None and set(update_fields) <= ENGAGEMENT_FIELDS:
         return
-    instance.rating = instance.auto_rating
-    instance.save(update_fields=["rating"])
-
-@receiver(post_save, sender=Brand)
-def update_brand_rating_on_save(sender, instance, **kwargs):
-    # يمكن إضافة منطق خاص بتحديث تقييم البراند هنا إذا كان هناك دوال مشابهة
-    pass
+    search_result_cache.bump_catalogue_version()
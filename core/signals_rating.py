@@ -0,0 +1,57 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from reviews.models import EngagementEvent, ProductEngagement, Review
+from store_integration.models import PriceHistory
+from .models import Brand, Product, UserProductReaction
+from .rating_tracker import product_rating_tracker
+
+# تعليم المنتجات التي تغيرت مدخلات تقييمها الذكي لإعادة حسابها دفعة واحدة لاحقًا
+
+REACTION_FIELDS = {'views', 'likes', 'dislikes', 'neutrals'}
+RATING_EVENT_TYPES = {'product_view', 'purchase_completed'}
+
+
+@receiver(post_save, sender=Product)
+def mark_product_rating_on_save(sender, instance, update_fields=None, **kwargs):
+    # كتابة التقييم نفسه لا تغير مدخلاته
+    if update_fields is not None and set(update_fields) <= {'rating'}:
+        return
+    reason = 'reaction' if update_fields is not None and set(update_fields) <= REACTION_FIELDS | {'rating'} else 'product'
+    product_rating_tracker.mark([instance.pk], reason)
+
+
+@receiver(post_save, sender=Brand)
+def mark_brand_products_on_save(sender, instance, created=False, **kwargs):
+    if not created:
+        product_rating_tracker.mark_brand(instance.pk)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def mark_product_rating_on_review(sender, instance, **kwargs):
+    product_rating_tracker.mark([instance.product_id], 'review')
+
+
+@receiver(post_save, sender=UserProductReaction)
+@receiver(post_delete, sender=UserProductReaction)
+def mark_product_rating_on_reaction(sender, instance, **kwargs):
+    product_rating_tracker.mark([instance.product_id], 'reaction')
+
+
+@receiver(post_save, sender=ProductEngagement)
+def mark_product_rating_on_engagement(sender, instance, **kwargs):
+    product_rating_tracker.mark([instance.product_id], 'engagement')
+
+
+@receiver(post_save, sender=EngagementEvent)
+def mark_product_rating_on_event(sender, instance, created=False, **kwargs):
+    if created and instance.product_id and instance.event_type in RATING_EVENT_TYPES:
+        product_rating_tracker.mark([instance.product_id], 'engagement')
+
+
+@receiver(post_save, sender=PriceHistory)
+def mark_product_rating_on_price(sender, instance, created=False, **kwargs):
+    # الكتابات المجمعة لسجل الأسعار تعلّم منتجاتها بنفسها
+    if created:
+        product_rating_tracker.mark([instance.product_id], 'price')
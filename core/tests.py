@@ -3,6 +3,20 @@ from core.models import Product
 from rest_framework.test import APITestCase
 from core.models import Product, Category, User
 from rest_framework import status
+from decimal import Decimal
+
+
+def create_shop(username='owner'):
+    from core.models import Shop
+    user = User.objects.create_user(
+        username=username, password="owner123",
+        email=f"{username}@example.com", user_type='owner'
+    )
+    return Shop.objects.create(
+        name="Shop", owner=user.owner_profile,
+        address="Main street", url="https://shop.example.com"
+    )
+
 
 class ProductModelTest(TestCase):
     def test_product_creation(self):
@@ -48,4 +62,296 @@ class AuthenticationTest(APITestCase):
         token = response.data['access']
         self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
         product_response = self.client.get('/core/api/products/')
-        self.assertEqual(product_response.status_code, status.HTTP_200_OK)
\ No newline at end of file
+        self.assertEqual(product_response.status_code, status.HTTP_200_OK)
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        shop = create_shop()
+        category = Category.objects.create(name="Electronics")
+        for index, price in enumerate([100, 200, 200, 300, 400]):
+            Product.objects.create(name=f"Product {index}", price=price, category=category, shop=shop)
+
+    def test_pages_cover_all_rows_once(self):
+        from core.pagination import KeysetPaginator
+        paginator = KeysetPaginator(Product.objects.all(), ['-price'], 2)
+        seen, cursor = [], None
+        while True:
+            page = paginator.paginate(cursor=cursor)
+            seen.extend(product.id for product in page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_invalid_cursor(self):
+        from core.pagination import KeysetPaginator, InvalidCursor
+        paginator = KeysetPaginator(Product.objects.all(), ['price'], 2)
+        with self.assertRaises(InvalidCursor):
+            paginator.paginate(cursor='not-a-cursor')
+
+    def test_streaming_json(self):
+        import json
+        from core.renderers import StreamingJSONResponse
+        response = StreamingJSONResponse({'results': (n for n in range(3)), 'query': 'x'})
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), {'results': [0, 1, 2], 'query': 'x'})
+
+
+class RecommendationScoringTest(TestCase):
+    def test_vectorised_scores(self):
+        import numpy as np
+        from core.discovery_service import discovery_service
+        preferences = {
+            'preferred_categories': {'Phones': 3},
+            'preferred_brands': {'Acme': 10},
+            'price_range': {'min': 100, 'max': 300, 'average': 200.0},
+        }
+        candidates = [('Phones', 'Acme', 150, 4.5), ('Laptops', None, 900, 3.0), (None, 'Acme', 200, 0)]
+        scores = discovery_service._score_candidates(
+            [c[0] for c in candidates], [c[1] for c in candidates],
+            np.array([c[2] for c in candidates], dtype=float),
+            np.array([c[3] for c in candidates], dtype=float),
+            preferences
+        )
+        # Category and brand weights are capped; price similarity bottoms out at zero
+        np.testing.assert_allclose(scores, [0.84, 0.06, 0.5])
+
+
+class RelevanceRankingTest(TestCase):
+    def test_ranked_pages_follow_score_order(self):
+        import numpy as np
+        from core.relevance import RankedResults
+        ranked = RankedResults(['a', 'b', 'c', 'd'], np.array([1.0, 3.0, 3.0, 2.0]))
+        first = ranked.paginate(page_size=2)
+        self.assertEqual([pk for pk, _ in first], ['b', 'c'])
+        second = ranked.paginate(cursor=first.next_cursor, page_size=2)
+        self.assertEqual([pk for pk, _ in second], ['d', 'a'])
+        self.assertFalse(second.has_next)
+
+    def test_exact_name_match_ranks_first(self):
+        from core.discovery_service import discovery_service
+        scorer = discovery_service.relevance_scorer
+        rows = [
+            (1, 'Phone charger', 'Charger for any phone', None, 'Accessories', 3, 0, None),
+            (2, 'Galaxy phone', '', 'Samsung', 'Phones', 3, 0, None),
+        ]
+        scores = scorer.score_rows(rows, 'galaxy phone')
+        self.assertGreater(scores[1], scores[0])
+
+    def test_candidates_are_chosen_by_term_matches(self):
+        from core.discovery_service import discovery_service
+        shop = create_shop()
+        category = Category.objects.create(name="Electronics")
+        match = Product.objects.create(name="Galaxy phone", price=500, category=category, shop=shop)
+        Product.objects.create(name="Tablet", description="Works with a galaxy", price=400,
+                               category=category, shop=shop, views=5000)
+        Product.objects.filter(id=match.id).update(rating=Decimal('1.0'))
+        scorer = discovery_service.relevance_scorer
+        scorer.candidate_limit, limit = 1, scorer.candidate_limit
+        try:
+            ranked = scorer.rank(Product.objects.all(), 'galaxy phone')
+        finally:
+            scorer.candidate_limit = limit
+        self.assertEqual(ranked.ids, [str(match.id)])
+        self.assertTrue(ranked.truncated)
+
+
+class SearchResultCacheTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from core.search_cache import search_result_cache
+        cache.clear()
+        search_result_cache.clear_local()
+        self.search_cache = search_result_cache
+
+    def test_keys_are_normalised(self):
+        first = self.search_cache.make_key('products', '  Galaxy   Phone ', {'brand_id': None}, 'relevance')
+        second = self.search_cache.make_key('products', 'galaxy phone', {}, 'relevance')
+        self.assertEqual(first, second)
+
+    def test_version_bump_invalidates(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {'success': True}
+
+        key = self.search_cache.make_key('products', 'phone')
+        self.search_cache.get_or_compute(key, compute)
+        self.search_cache.get_or_compute(key, compute)
+        self.assertEqual(len(calls), 1)
+
+        self.search_cache.bump_catalogue_version()
+        key = self.search_cache.make_key('products', 'phone')
+        self.search_cache.get_or_compute(key, compute)
+        self.assertEqual(len(calls), 2)
+
+    def test_engagement_saves_keep_cached_results(self):
+        shop = create_shop()
+        product = Product.objects.create(name="Phone", price=500, category=Category.objects.create(name="Phones"), shop=shop)
+        version = self.search_cache.catalogue_version()
+
+        product.likes += 1
+        product.save(update_fields=['likes'], refresh_rating=True)
+        self.assertEqual(self.search_cache.catalogue_version(), version)
+
+        product.name = "Smart phone"
+        product.save(update_fields=['name'])
+        self.assertGreater(self.search_cache.catalogue_version(), version)
+
+
+class BulkRatingEngineTest(TestCase):
+    def setUp(self):
+        from reviews.models import EngagementEvent, ProductEngagement, Review
+        shop = create_shop()
+        user = shop.owner.user
+        category = Category.objects.create(name="Electronics")
+        self.products = [
+            Product.objects.create(name=f"Product {index}", price=price, original_price=original, category=category, shop=shop)
+            for index, (price, original) in enumerate([(100, 150), (200, None), (300, None)])
+        ]
+        reviewer = User.objects.create_user(username='reviewer', password='reviewer123', user_type='customer')
+        Review.objects.create(product=self.products[0], user=reviewer, rating=5, comment="Great",
+                              status='approved', verified_purchase=True, sentiment_score=Decimal('0.8'))
+        Review.objects.create(product=self.products[0], user=user, rating=3, comment="Fine",
+                              status='approved', helpfulness_score=2, sentiment_score=Decimal('-0.2'))
+        ProductEngagement.objects.create(product=self.products[1], total_views=500, total_likes=8,
+                                         total_dislikes=2, total_shares=12, conversion_rate=Decimal('4.5'))
+        EngagementEvent.objects.create(product=self.products[1], session_id='s', event_type='product_view')
+
+    def test_bulk_components_match_single_product_calculators(self):
+        from core.ai_rating_system import ai_rating_system
+        calculators = {
+            'customer_reviews': ai_rating_system._calculate_review_score,
+            'engagement_metrics': ai_rating_system._calculate_engagement_score,
+            'store_reliability': ai_rating_system._calculate_store_score,
+            'brand_reputation': ai_rating_system._calculate_brand_score,
+            'price_competitiveness': ai_rating_system._calculate_price_score,
+            'availability_score': ai_rating_system._calculate_availability_score,
+            'historical_performance': ai_rating_system._calculate_historical_score,
+        }
+        expected = {
+            str(product.id): {name: calculate(product) for name, calculate in calculators.items()}
+            for product in self.products
+        }
+        results = ai_rating_system.bulk_calculate_ratings(Product.objects.all(), include_breakdown=True)
+        self.assertEqual((results['successful'], results['failed']), (3, 0))
+        for product in self.products:
+            rating = results['ratings'][str(product.id)]
+            for name, score in expected[str(product.id)].items():
+                self.assertAlmostEqual(rating['components'][name]['score'], round(score, 2), places=2)
+            product.refresh_from_db()
+            self.assertEqual(float(product.rating), rating['overall_rating'])
+
+
+class ProductRatingCacheTest(TestCase):
+    def setUp(self):
+        shop = create_shop()
+        category = Category.objects.create(name="Electronics")
+        self.product = Product.objects.create(name="Laptop", price=1000, category=category, shop=shop)
+        self.reviewer = User.objects.create_user(username='reviewer', password='reviewer123', user_type='customer')
+
+    def test_stored_rating_is_served_until_inputs_change(self):
+        from core.ai_rating_system import ai_rating_system
+        from reviews.models import Review
+        ai_rating_system.calculate_ai_rating(self.product)
+        self.assertIn('as_of', ai_rating_system.calculate_ai_rating(self.product))
+
+        Review.objects.create(product=self.product, user=self.reviewer, rating=4, comment="Good",
+                              status='approved', sentiment_score=Decimal('0.5'))
+        ai_rating_system.rating_cache.invalidate([self.product.id])
+        self.assertNotIn('as_of', ai_rating_system.calculate_ai_rating(self.product))
+        self.assertIn('as_of', ai_rating_system.calculate_ai_rating(self.product))
+
+        Product.objects.filter(id=self.product.id).update(price=900)
+        self.product.refresh_from_db()
+        self.assertEqual(ai_rating_system.rating_cache.get(self.product), {})
+
+
+class ProductRatingTrackerTest(TestCase):
+    def setUp(self):
+        shop = create_shop()
+        category = Category.objects.create(name="Electronics")
+        self.product = Product.objects.create(name="Laptop", price=1000, category=category, shop=shop)
+        self.other = Product.objects.create(name="Phone", price=500, category=category, shop=shop)
+        self.reviewer = User.objects.create_user(username='reviewer', password='reviewer123', user_type='customer')
+
+    def test_review_marks_product_and_drain_rerates_it(self):
+        from core.models import DirtyProductRating, ProductAIRating
+        from core.rating_tracker import product_rating_tracker
+        from reviews.models import Review
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(product=self.product, user=self.reviewer, rating=5, comment="Great",
+                                  status='approved', sentiment_score=Decimal('0.9'))
+        self.assertEqual(list(DirtyProductRating.objects.values_list('product_id', 'reason')), [(self.product.id, 'review')])
+
+        result = product_rating_tracker.drain()
+        self.assertEqual((result['rated'], result['failed']), (1, 0))
+        self.assertFalse(DirtyProductRating.objects.exists())
+        stored = ProductAIRating.objects.get(product=self.product)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating, stored.overall_rating)
+        self.assertFalse(ProductAIRating.objects.filter(product=self.other).exists())
+
+    def test_marks_during_a_drain_are_kept(self):
+        from unittest import mock
+        from django.core.cache import cache
+        from core.ai_rating_system import ai_rating_system
+        from core.models import DirtyProductRating
+        from core.rating_tracker import product_rating_tracker
+        cache.clear()
+        product_rating_tracker._write([str(self.product.id)], 'review')
+        bulk_calculate = ai_rating_system.bulk_calculate_ratings
+
+        def rate_while_reviewed(products):
+            product_rating_tracker._write([str(self.product.id)], 'review')
+            return bulk_calculate(products)
+
+        with mock.patch.object(ai_rating_system, 'bulk_calculate_ratings', side_effect=rate_while_reviewed):
+            product_rating_tracker.drain(max_batches=1)
+        self.assertTrue(DirtyProductRating.objects.filter(product=self.product).exists())
+
+
+class AutoRatingServiceTest(TestCase):
+    def setUp(self):
+        from core.models import Brand
+        shop = create_shop()
+        self.owner = shop.owner.user
+        category = Category.objects.create(name="Electronics")
+        brand = Brand.objects.create(name="Acme", rating=Decimal('4.8'), popularity=Decimal('20'))
+        self.products = [
+            Product.objects.create(name="Laptop", price=1000, category=category, shop=shop, brand=brand, likes=40, dislikes=5),
+            Product.objects.create(name="Phone", price=500, category=category, shop=shop, neutrals=3, views=9),
+        ]
+
+    def test_plain_save_writes_once(self):
+        product = self.products[1]
+        product.description = "Updated"
+        with self.assertNumQueries(1):
+            product.save()
+
+    def test_counter_saves_leave_rating_to_tracker(self):
+        from unittest import mock
+        from core.ai_rating_system import ai_rating_system
+        from core.models import DirtyProductRating, Notification
+        from core.rating_tracker import product_rating_tracker
+        product = self.products[1]
+        Product.objects.filter(id=product.id).update(rating=Decimal('3.00'))
+        product.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            product.likes += 1
+            product.save(update_fields=['likes'])
+        product.refresh_from_db()
+        self.assertEqual(product.rating, Decimal('3.00'))
+        self.assertEqual(DirtyProductRating.objects.get().reason, 'reaction')
+
+        def rate(products):
+            products.update(rating=Decimal('4.90'))
+            return {'successful': 1, 'processed': 1, 'errors': []}
+
+        with mock.patch.object(ai_rating_system, 'bulk_calculate_ratings', side_effect=rate):
+            product_rating_tracker.drain()
+        self.assertTrue(Notification.objects.filter(
+            recipient=self.owner, notification_type='product_rating', related_id=str(product.id)
+        ).exists())
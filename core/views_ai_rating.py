@@ -8,11 +8,13 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
-from django.db.models import Q, Avg, Count
+from django.db.models import Q, Avg, Count, Max, Min
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 from datetime import timedelta
-from .models import Product, Shop, Brand
+from .models import Product, ProductAIRating, Shop, Brand
 from .ai_rating_system import ai_rating_system
+from .rating_cache import product_rating_cache
 from .serializers import ProductSerializer
 import logging
 
@@ -134,13 +136,14 @@ class AIRatingViewSet(viewsets.ViewSet):
             queryset = queryset.filter(shop_id=shop_id)
         
         # Order by AI rating (stored in rating field)
-        top_products = queryset.order_by('-rating', '-views')[:limit]
+        top_products = list(queryset.order_by('-rating', '-views')[:limit])
+        # Stored breakdowns; products without a fresh one fall back to the rating field
+        stored_ratings = product_rating_cache.get_many(top_products)
         
         results = []
         for product in top_products:
             try:
-                # Get detailed AI rating breakdown
-                rating_data = ai_rating_system.calculate_ai_rating(product, recalculate=False)
+                rating_data = stored_ratings.get(str(product.id), {})
                 
                 product_data = {
                     'id': str(product.id),
@@ -252,8 +255,22 @@ class AIRatingViewSet(viewsets.ViewSet):
                 is_active=True
             ).aggregate(avg_rating=Avg('rating'))['avg_rating']
             
+            # Stored AI rating breakdowns
+            stored = ProductAIRating.objects.filter(product__is_active=True).aggregate(
+                count=Count('id'),
+                avg_confidence=Avg('confidence_level'),
+                oldest=Min('calculated_at'),
+                newest=Max('calculated_at')
+            )
+            
             analytics = {
                 'total_products': total_products,
+                'stored_ratings': {
+                    'count': stored['count'],
+                    'average_confidence': round(float(stored['avg_confidence']), 2) if stored['avg_confidence'] else None,
+                    'oldest_calculation': stored['oldest'],
+                    'newest_calculation': stored['newest']
+                },
                 'platform_average_rating': round(float(platform_avg_rating), 2) if platform_avg_rating else 0,
                 'rating_distribution': rating_distribution,
                 'top_categories': list(top_categories),
@@ -282,7 +299,21 @@ class AIRatingViewSet(viewsets.ViewSet):
     def rating_explanation(self, request):
         """
         Get explanation of how AI ratings are calculated.
+
+        With ``product_id`` the stored rating breakdown of that product is included.
         """
+        product_breakdown = None
+        product_id = request.query_params.get('product_id')
+        if product_id:
+            try:
+                product = Product.objects.get(id=product_id, is_active=True)
+            except (Product.DoesNotExist, ValueError, ValidationError):
+                return Response(
+                    {'error': 'Product not found'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            product_breakdown = ai_rating_system.calculate_ai_rating(product)
+
         explanation = {
             'overview': 'AI ratings combine multiple data sources to provide comprehensive product scores',
             'components': {
@@ -373,5 +404,7 @@ class AIRatingViewSet(viewsets.ViewSet):
             },
             'update_frequency': 'Ratings are recalculated when new data becomes available or manually triggered'
         }
+        if product_breakdown is not None:
+            explanation['product_rating'] = product_breakdown
         
         return Response(explanation)
@@ -11,6 +11,8 @@ from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from django.core.cache import cache
 from django.utils import timezone
 from .discovery_service import discovery_service
+from .renderers import StreamingJSONResponse, should_stream
+from .search_cache import search_result_cache
 from .models import Product
 from reviews.models import EngagementEvent
 import logging
@@ -34,6 +36,9 @@ class ProductDiscoveryViewSet(viewsets.ViewSet):
             sort_by = request.query_params.get('sort_by', 'relevance')
             page = int(request.query_params.get('page', 1))
             page_size = int(request.query_params.get('page_size', 20))
+            cursor = request.query_params.get('cursor') or None
+            include_total = request.query_params.get('include_total') == 'true'
+            stream = should_stream(request, page_size)
             
             # Build filters from query parameters
             filters = {}
@@ -77,7 +82,10 @@ class ProductDiscoveryViewSet(viewsets.ViewSet):
                 filters=filters,
                 sort_by=sort_by,
                 page=page,
-                page_size=page_size
+                page_size=page_size,
+                cursor=cursor,
+                include_total=include_total,
+                stream=stream
             )
             
             # Track search event if user is authenticated
@@ -91,12 +99,14 @@ class ProductDiscoveryViewSet(viewsets.ViewSet):
                             'query': query,
                             'filters': filters,
                             'sort_by': sort_by,
-                            'results_count': result.get('pagination', {}).get('total_results', 0)
+                            'results_count': result.get('pagination', {}).get('total_results') or 0
                         }
                     )
                 except Exception as e:
                     logger.warning(f"Failed to track search event: {e}")
             
+            if stream:
+                return StreamingJSONResponse(result)
             return Response(result)
             
         except ValueError as e:
@@ -284,63 +294,15 @@ class ProductDiscoveryViewSet(viewsets.ViewSet):
                     'message': 'Query too short'
                 })
             
-            # Check cache first
-            cache_key = f"autocomplete_{query.lower()}_{limit}"
-            cached_result = cache.get(cache_key)
-            if cached_result:
-                return Response(cached_result)
-            
-            # Get product name suggestions
-            product_suggestions = Product.objects.filter(
-                name__icontains=query,
-                is_active=True
-            ).values_list('name', flat=True).distinct()[:limit//2]
-            
-            # Get brand suggestions
-            brand_suggestions = Product.objects.filter(
-                brand__name__icontains=query,
-                is_active=True
-            ).values_list('brand__name', flat=True).distinct()[:limit//4]
-            
-            # Get category suggestions
-            category_suggestions = Product.objects.filter(
-                category__name__icontains=query,
-                is_active=True
-            ).values_list('category__name', flat=True).distinct()[:limit//4]
-            
-            # Combine and format suggestions
-            suggestions = []
-            
-            for name in product_suggestions:
-                suggestions.append({
-                    'text': name,
-                    'type': 'product',
-                    'category': 'Products'
-                })
-            
-            for brand in brand_suggestions:
-                suggestions.append({
-                    'text': brand,
-                    'type': 'brand',
-                    'category': 'Brands'
-                })
-            
-            for category in category_suggestions:
-                suggestions.append({
-                    'text': category,
-                    'type': 'category',
-                    'category': 'Categories'
-                })
-            
-            result = {
-                'query': query,
-                'suggestions': suggestions[:limit]
-            }
-            
-            # Cache result for 1 hour
-            cache.set(cache_key, result, 3600)
+            cache_key = search_result_cache.make_key('autocomplete', query, limit=limit)
+            result = search_result_cache.get_or_compute(
+                cache_key,
+                lambda: self._get_autocomplete_suggestions(query, limit),
+                timeout=3600
+            )
             
-            return Response(result)
+            # Cached entries are shared by queries that normalise the same way
+            return Response(dict(result, query=query))
             
         except ValueError:
             return Response(
@@ -354,6 +316,57 @@ class ProductDiscoveryViewSet(viewsets.ViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    def _get_autocomplete_suggestions(self, query: str, limit: int):
+        """
+        Build autocomplete suggestions for a query.
+        """
+        # Get product name suggestions
+        product_suggestions = Product.objects.filter(
+            name__icontains=query,
+            is_active=True
+        ).values_list('name', flat=True).distinct()[:limit//2]
+        
+        # Get brand suggestions
+        brand_suggestions = Product.objects.filter(
+            brand__name__icontains=query,
+            is_active=True
+        ).values_list('brand__name', flat=True).distinct()[:limit//4]
+        
+        # Get category suggestions
+        category_suggestions = Product.objects.filter(
+            category__name__icontains=query,
+            is_active=True
+        ).values_list('category__name', flat=True).distinct()[:limit//4]
+        
+        # Combine and format suggestions
+        suggestions = []
+        
+        for name in product_suggestions:
+            suggestions.append({
+                'text': name,
+                'type': 'product',
+                'category': 'Products'
+            })
+        
+        for brand in brand_suggestions:
+            suggestions.append({
+                'text': brand,
+                'type': 'brand',
+                'category': 'Brands'
+            })
+        
+        for category in category_suggestions:
+            suggestions.append({
+                'text': category,
+                'type': 'category',
+                'category': 'Categories'
+            })
+        
+        return {
+            'query': query,
+            'suggestions': suggestions[:limit]
+        }
+    
     @action(detail=False, methods=['post'])
     def track_interaction(self, request):
         """
@@ -1,22 +1,22 @@
 from celery import shared_task
 from core.models import Product
-from products.rating_service import rating_service
+from core.rating_tracker import product_rating_tracker
 import logging
 
 logger = logging.getLogger(__name__)
 
+@shared_task
+def update_dirty_product_ratings(max_batches=None):
+    """مهمة دورية لإعادة تقييم المنتجات التي تغيرت مدخلات تقييمها فقط"""
+    result = product_rating_tracker.drain(max_batches=max_batches)
+    logger.info(f"تم تحديث تقييمات {result['rated']} منتج في {result['batches']} دفعة")
+    return result
+
 @shared_task
 def update_all_product_ratings():
-    """مهمة دورية لتحديث تقييمات جميع المنتجات"""
-    products = Product.objects.all()
-    updated_count = 0
-    
-    for product in products:
-        try:
-            rating_service.calculate_product_rating(product.id)
-            updated_count += 1
-        except Exception as e:
-            logger.error(f"فشل تحديث تقييم المنتج {product.id}: {e}")
-    
-    logger.info(f"تم تحديث تقييمات {updated_count} منتج بنجاح")
-    return updated_count
\ No newline at end of file
+    """مهمة لتحديث تقييمات جميع المنتجات عبر تعليمها وإعادة تقييمها على دفعات"""
+    product_ids = list(Product.objects.filter(is_active=True).values_list('id', flat=True))
+    product_rating_tracker.mark(product_ids, 'refresh')
+    result = product_rating_tracker.drain()
+    logger.info(f"تم تحديث تقييمات {result['rated']} منتج بنجاح")
+    return result['rated']
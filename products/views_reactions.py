@@ -132,5 +132,5 @@ class ProductReactionView(APIView):
         elif new_reaction == 'neutral':
             product.neutrals += 1
 
-        product.save()
+        product.save(update_fields=['likes', 'dislikes', 'neutrals'])
 
@@ -874,7 +874,8 @@ class EnhancedRecommendationService(AIRecommendationService):
         try:
             from store_integration.models import PriceHistory
             from core.models import Product
-            from django.db.models import Min, Avg
+            from django.db.models import Min, Avg, F, Window
+            from django.db.models.functions import RowNumber
 
             # Find products in same category with better prices
             category_avg_price = Product.objects.filter(
@@ -888,19 +889,29 @@ class EnhancedRecommendationService(AIRecommendationService):
                 price__lt=float(product.price) * 0.9  # At least 10% cheaper
             ).order_by('price', '-rating')[:8]
 
+            better_deals = list(better_deals.select_related('shop'))
+
+            # Last 10 recorded prices of every deal in one query
+            recent_prices = {}
+            for product_id, price in PriceHistory.objects.filter(
+                product_id__in=[deal_product.id for deal_product in better_deals]
+            ).annotate(
+                recency=Window(
+                    RowNumber(), partition_by=[F('product_id')], order_by=F('recorded_at').desc()
+                )
+            ).filter(recency__lte=10).values_list('product_id', 'price'):
+                recent_prices.setdefault(product_id, []).append(float(price))
+
             recommendations = []
             for deal_product in better_deals:
                 savings = float(product.price) - float(deal_product.price)
                 savings_percentage = (savings / float(product.price)) * 100
 
                 # Check if this is historically a good price
-                recent_prices = PriceHistory.objects.filter(
-                    product=deal_product
-                ).order_by('-recorded_at')[:10]
-
                 is_good_deal = True
-                if recent_prices.exists():
-                    avg_recent_price = sum(float(p.price) for p in recent_prices) / len(recent_prices)
+                if deal_product.id in recent_prices:
+                    prices = recent_prices[deal_product.id]
+                    avg_recent_price = sum(prices) / len(prices)
                     is_good_deal = float(deal_product.price) <= avg_recent_price
 
                 rec = {
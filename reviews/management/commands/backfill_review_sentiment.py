@@ -0,0 +1,87 @@
+"""
+Management command to backfill sentiment scores of existing reviews.
+"""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from reviews.sentiment_queue import review_sentiment_queue
+
+
+class Command(BaseCommand):
+    help = 'Score the sentiment of historical reviews in batches, resuming from the last checkpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind',
+            choices=['review', 'store_review', 'all'],
+            default='all',
+            help='Which reviews to backfill (default: all)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Number of reviews scored per batch',
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            help='Stop after this many batches; the next run resumes from the checkpoint',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore the stored checkpoint and start from the first review',
+        )
+        parser.add_argument(
+            '--only-missing',
+            action='store_true',
+            help='Score only reviews that have no sentiment score yet',
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            help='Worker processes for scoring large batches',
+        )
+        parser.add_argument(
+            '--drain',
+            action='store_true',
+            help='Score the queue of new and edited reviews instead of backfilling',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            self.style.SUCCESS(f'Starting review sentiment scoring at {timezone.now()}')
+        )
+
+        if options['drain']:
+            self.stdout.write(f'Queued reviews: {review_sentiment_queue.pending_count()}')
+            result = review_sentiment_queue.drain(
+                batch_size=options['batch_size'],
+                max_batches=options['max_batches'],
+                processes=options['processes']
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Scored {result['scored']} reviews in {result['batches']} batches "
+                    f"({result['skipped']} deleted reviews skipped)"
+                )
+            )
+            return
+
+        kinds = ['review', 'store_review'] if options['kind'] == 'all' else [options['kind']]
+        for kind in kinds:
+            result = review_sentiment_queue.backfill(
+                kind,
+                batch_size=options['batch_size'],
+                max_batches=options['max_batches'],
+                restart=options['restart'],
+                only_missing=options['only_missing'],
+                processes=options['processes']
+            )
+            status = 'completed' if result['completed'] else 'paused at checkpoint'
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{kind}: {result['processed']} reviews processed, "
+                    f"{result['batches']} batches this run ({status})"
+                )
+            )
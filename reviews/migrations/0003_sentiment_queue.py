@@ -0,0 +1,43 @@
+# Generated by Django 5.1 on 2026-10-19 06:58
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_engagementevent_productengagement_reviewhelpfulness_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SentimentBackfillCheckpoint',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('review', 'Product Review'), ('store_review', 'Store Review')], max_length=20, unique=True, verbose_name='Kind')),
+                ('last_id', models.UUIDField(blank=True, null=True, verbose_name='Last Review ID')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='Processed')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='Completed At')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Sentiment Backfill Checkpoint',
+                'verbose_name_plural': 'Sentiment Backfill Checkpoints',
+            },
+        ),
+        migrations.CreateModel(
+            name='PendingSentiment',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('review', 'Product Review'), ('store_review', 'Store Review')], max_length=20, verbose_name='Kind')),
+                ('object_id', models.UUIDField(verbose_name='Review ID')),
+                ('enqueued_at', models.DateTimeField(db_index=True, verbose_name='Enqueued At')),
+            ],
+            options={
+                'verbose_name': 'Pending Sentiment',
+                'verbose_name_plural': 'Pending Sentiments',
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+    ]
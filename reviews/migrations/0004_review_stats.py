@@ -0,0 +1,45 @@
+# Generated by Django 5.1 on 2026-10-19 07:02
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_dirtyproductrating'),
+        ('reviews', '0003_sentiment_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewStats',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('review_count', models.PositiveIntegerField(default=0, verbose_name='Reviews')),
+                ('rating_sum', models.PositiveIntegerField(default=0, verbose_name='Rating Sum')),
+                ('rating_1', models.PositiveIntegerField(default=0, verbose_name='1 Star')),
+                ('rating_2', models.PositiveIntegerField(default=0, verbose_name='2 Stars')),
+                ('rating_3', models.PositiveIntegerField(default=0, verbose_name='3 Stars')),
+                ('rating_4', models.PositiveIntegerField(default=0, verbose_name='4 Stars')),
+                ('rating_5', models.PositiveIntegerField(default=0, verbose_name='5 Stars')),
+                ('positive_count', models.PositiveIntegerField(default=0, verbose_name='Positive Reviews')),
+                ('neutral_count', models.PositiveIntegerField(default=0, verbose_name='Neutral Reviews')),
+                ('negative_count', models.PositiveIntegerField(default=0, verbose_name='Negative Reviews')),
+                ('verified_count', models.PositiveIntegerField(default=0, verbose_name='Verified Purchases')),
+                ('helpful_votes', models.PositiveIntegerField(default=0, verbose_name='Helpful Votes')),
+                ('delivery_sum', models.PositiveIntegerField(default=0, verbose_name='Delivery Rating Sum')),
+                ('customer_service_sum', models.PositiveIntegerField(default=0, verbose_name='Customer Service Rating Sum')),
+                ('product_quality_sum', models.PositiveIntegerField(default=0, verbose_name='Product Quality Rating Sum')),
+                ('value_for_money_sum', models.PositiveIntegerField(default=0, verbose_name='Value for Money Rating Sum')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='review_stats', to='core.product')),
+                ('shop', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='review_stats', to='core.shop')),
+            ],
+            options={
+                'verbose_name': 'Review Statistics',
+                'verbose_name_plural': 'Review Statistics',
+            },
+        ),
+    ]
@@ -9,6 +9,7 @@ from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from core.models import Product, Shop
 import uuid
+from typing import Dict, Optional
 from decimal import Decimal
 
 
@@ -573,3 +574,137 @@ class EngagementEvent(models.Model):
     def __str__(self):
         user_info = self.user.username if self.user else f"Session {self.session_id[:8]}"
         return f"{self.event_type} by {user_info} at {self.timestamp}"
+
+
+class PendingSentiment(models.Model):
+    """
+    A product or store review waiting for sentiment scoring.
+    One row per review; enqueuing it again only moves ``enqueued_at``.
+    """
+    KIND_CHOICES = (
+        ('review', 'Product Review'),
+        ('store_review', 'Store Review'),
+    )
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name="Kind")
+    object_id = models.UUIDField(verbose_name="Review ID")
+    enqueued_at = models.DateTimeField(db_index=True, verbose_name="Enqueued At")
+
+    class Meta:
+        unique_together = ('kind', 'object_id')
+        verbose_name = "Pending Sentiment"
+        verbose_name_plural = "Pending Sentiments"
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
+
+
+class SentimentBackfillCheckpoint(models.Model):
+    """Progress of a sentiment backfill over one kind of review."""
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    kind = models.CharField(
+        max_length=20,
+        choices=PendingSentiment.KIND_CHOICES,
+        unique=True,
+        verbose_name="Kind"
+    )
+    last_id = models.UUIDField(null=True, blank=True, verbose_name="Last Review ID")
+    processed = models.PositiveIntegerField(default=0, verbose_name="Processed")
+    completed_at = models.DateTimeField(null=True, blank=True, verbose_name="Completed At")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Sentiment Backfill Checkpoint"
+        verbose_name_plural = "Sentiment Backfill Checkpoints"
+
+    def __str__(self):
+        return f"{self.kind}: {self.processed} processed"
+
+
+class ReviewStats(models.Model):
+    """
+    Running review totals of one product or one shop.
+
+    Product rows summarise approved product reviews and shop rows summarise
+    store reviews. ``ReviewStatsService`` keeps them in step with atomic
+    ``F()`` updates on every review create, update, delete and helpfulness
+    vote, so analytics and product cards read one row instead of
+    aggregating the reviews on every request.
+    """
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='review_stats'
+    )
+    shop = models.OneToOneField(
+        Shop,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='review_stats'
+    )
+    review_count = models.PositiveIntegerField(default=0, verbose_name="Reviews")
+    rating_sum = models.PositiveIntegerField(default=0, verbose_name="Rating Sum")
+    rating_1 = models.PositiveIntegerField(default=0, verbose_name="1 Star")
+    rating_2 = models.PositiveIntegerField(default=0, verbose_name="2 Stars")
+    rating_3 = models.PositiveIntegerField(default=0, verbose_name="3 Stars")
+    rating_4 = models.PositiveIntegerField(default=0, verbose_name="4 Stars")
+    rating_5 = models.PositiveIntegerField(default=0, verbose_name="5 Stars")
+    positive_count = models.PositiveIntegerField(default=0, verbose_name="Positive Reviews")
+    neutral_count = models.PositiveIntegerField(default=0, verbose_name="Neutral Reviews")
+    negative_count = models.PositiveIntegerField(default=0, verbose_name="Negative Reviews")
+    verified_count = models.PositiveIntegerField(default=0, verbose_name="Verified Purchases")
+    helpful_votes = models.PositiveIntegerField(default=0, verbose_name="Helpful Votes")
+
+    # Store review aspect ratings
+    delivery_sum = models.PositiveIntegerField(default=0, verbose_name="Delivery Rating Sum")
+    customer_service_sum = models.PositiveIntegerField(default=0, verbose_name="Customer Service Rating Sum")
+    product_quality_sum = models.PositiveIntegerField(default=0, verbose_name="Product Quality Rating Sum")
+    value_for_money_sum = models.PositiveIntegerField(default=0, verbose_name="Value for Money Rating Sum")
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Review Statistics"
+        verbose_name_plural = "Review Statistics"
+
+    def __str__(self):
+        owner = f"product {self.product_id}" if self.product_id else f"shop {self.shop_id}"
+        return f"Review stats for {owner}: {self.review_count} reviews"
+
+    def average(self, total) -> Optional[float]:
+        """Average of a summed rating, or None without reviews."""
+        return total / self.review_count if self.review_count else None
+
+    @property
+    def average_rating(self) -> Optional[float]:
+        return self.average(self.rating_sum)
+
+    def rating_distribution(self) -> Dict[int, int]:
+        return {rating: getattr(self, f'rating_{rating}') for rating in range(1, 6)}
+
+    def sentiment_distribution(self) -> Dict[str, int]:
+        """Review counts per sentiment label, for labels that occur."""
+        counts = {
+            'positive': self.positive_count,
+            'neutral': self.neutral_count,
+            'negative': self.negative_count,
+        }
+        return {label: count for label, count in counts.items() if count}
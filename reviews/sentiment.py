@@ -0,0 +1,242 @@
+"""
+reviews/sentiment.py
+--------------------
+Batch lexicon sentiment engine for reviews.
+"""
+
+import logging
+import re
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from typing import Dict, Iterable, List, NamedTuple, Sequence
+
+from django.conf import settings
+from django.db.models import QuerySet
+
+from .models import Review, StoreReview
+
+logger = logging.getLogger(__name__)
+
+
+POSITIVE_WORDS = frozenset({
+    'excellent', 'amazing', 'great', 'fantastic', 'wonderful', 'perfect',
+    'outstanding', 'superb', 'brilliant', 'awesome', 'love', 'best',
+    'good', 'nice', 'happy', 'satisfied', 'recommend', 'quality',
+    'fast', 'quick', 'helpful', 'friendly', 'professional', 'reliable'
+})
+
+NEGATIVE_WORDS = frozenset({
+    'terrible', 'awful', 'horrible', 'bad', 'worst', 'hate', 'disappointed',
+    'poor', 'slow', 'expensive', 'cheap', 'broken', 'defective', 'useless',
+    'waste', 'scam', 'fraud', 'rude', 'unprofessional', 'unreliable',
+    'delayed', 'damaged', 'wrong', 'missing'
+})
+
+INTENSIFIERS = frozenset({
+    'very', 'extremely', 'really', 'absolutely', 'completely', 'totally',
+    'quite', 'rather', 'pretty', 'so', 'too', 'highly'
+})
+
+# Negators only flip the next sentiment word; they carry no score of their own
+NEGATIONS = frozenset({'not', 'no', 'never', 'none'})
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+class TextSentiment(NamedTuple):
+    """Lexicon sentiment of one text."""
+    score: float
+    word_count: int
+    positive: int
+    negative: int
+
+    @property
+    def confidence(self) -> float:
+        """Confidence from sentiment word density and score magnitude."""
+        if not self.word_count:
+            return 0.0
+        density = (self.positive + self.negative) / self.word_count
+        return round(min(1.0, (density * 2 + abs(self.score)) / 2), 2)
+
+
+def tokenize(*texts) -> List[str]:
+    """
+    Lower-case word tokens of the given texts, in one pass.
+    """
+    return TOKEN_RE.findall(' '.join(filter(None, texts)).lower())
+
+
+def score_tokens(tokens: Sequence[str]) -> TextSentiment:
+    """
+    Score tokens in a single loop.
+
+    Lexicon words count +1/-1, scaled by 1.5 after an intensifier and
+    flipped after a negation; the sum is normalised by the token count.
+    """
+    if not tokens:
+        return TextSentiment(0.0, 0, 0, 0)
+
+    score = 0.0
+    positive = negative = 0
+    previous = None
+    for word in tokens:
+        if word in POSITIVE_WORDS:
+            word_score = 1.0
+            positive += 1
+        elif word in NEGATIVE_WORDS:
+            word_score = -1.0
+            negative += 1
+        else:
+            word_score = 0.0
+
+        if word_score and previous is not None:
+            if previous in INTENSIFIERS:
+                word_score *= 1.5
+            if previous in NEGATIONS:
+                word_score = -word_score
+        score += word_score
+        previous = word
+
+    normalised = max(-1.0, min(1.0, score / len(tokens)))
+    return TextSentiment(normalised, len(tokens), positive, negative)
+
+
+def analyze_text(text: str) -> TextSentiment:
+    """
+    Sentiment of a single text.
+    """
+    return score_tokens(tokenize(text))
+
+
+def _analyze_chunk(texts: List[str]) -> List[TextSentiment]:
+    # Runs in pool workers; module level so it can be pickled
+    return [analyze_text(text) for text in texts]
+
+
+def sentiment_label(score: float) -> str:
+    """
+    Convert a sentiment score to a label.
+    """
+    if score > 0.1:
+        return 'positive'
+    elif score < -0.1:
+        return 'negative'
+    return 'neutral'
+
+
+class SentimentEngine:
+    """
+    Scores many texts at once and persists review sentiment in bulk.
+
+    ``analyze_texts`` fans large inputs (at least ``SENTIMENT_POOL_THRESHOLD``
+    texts) out to a process pool of ``SENTIMENT_PROCESSES`` workers; smaller
+    inputs, or a single configured process, are scored in-process.
+    ``persist_reviews`` and ``persist_store_reviews`` write scores with
+    ``bulk_update`` in batches of ``SENTIMENT_BATCH_SIZE``.
+    """
+
+    def __init__(self):
+        self.processes = getattr(settings, 'SENTIMENT_PROCESSES', 1)
+        self.pool_threshold = getattr(settings, 'SENTIMENT_POOL_THRESHOLD', 2000)
+        self.batch_size = getattr(settings, 'SENTIMENT_BATCH_SIZE', 500)
+
+    def analyze_texts(self, texts: Sequence[str], processes: int = None) -> List[TextSentiment]:
+        """
+        Sentiment of every text, in input order.
+        """
+        texts = list(texts)
+        processes = processes or self.processes
+        if processes <= 1 or len(texts) < self.pool_threshold:
+            return _analyze_chunk(texts)
+
+        size = -(-len(texts) // (processes * 4))
+        chunks = [texts[start:start + size] for start in range(0, len(texts), size)]
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            return [result for chunk in pool.map(_analyze_chunk, chunks) for result in chunk]
+
+    def review_result(self, sentiment: TextSentiment, rating: int, label_from_final: bool = False) -> Dict:
+        """
+        Combine text sentiment with the star rating, in the ``analyze_review`` format.
+        """
+        rating_influence = (rating - 3) * 0.2  # -0.4 to +0.4
+        final_score = max(-1.0, min(1.0, sentiment.score + rating_influence))
+        return {
+            'score': round(final_score, 2),
+            'label': sentiment_label(final_score if label_from_final else sentiment.score),
+            'confidence': sentiment.confidence,
+            'details': {
+                'text_sentiment': sentiment.score,
+                'rating_influence': rating_influence,
+                'word_count': sentiment.word_count,
+                'positive_words_found': sentiment.positive,
+                'negative_words_found': sentiment.negative
+            }
+        }
+
+    def persist_reviews(self, reviews, processes: int = None) -> int:
+        """
+        Score product reviews (a queryset or instances) and store
+        ``sentiment_score``/``sentiment_label`` in bulk. Returns the number written.
+        """
+        from .stats import review_stats_service
+
+        written = 0
+        fields = ('id', 'rating', 'product_id', 'status', 'sentiment_label', 'comment', 'pros', 'cons')
+        for batch in self._batches(reviews, fields):
+            sentiments = self.analyze_texts([' '.join(filter(None, row[5:])) for row in batch], processes)
+            updates, changes = [], []
+            for (pk, rating, product_id, status, previous, *_), sentiment in zip(batch, sentiments):
+                result = self.review_result(sentiment, rating)
+                updates.append(Review(id=pk, sentiment_score=Decimal(str(result['score'])), sentiment_label=result['label']))
+                if status == 'approved':
+                    changes.append((product_id, previous, result['label']))
+            Review.objects.bulk_update(updates, ['sentiment_score', 'sentiment_label'], batch_size=self.batch_size)
+            review_stats_service.sentiment_changed('product', changes)
+            written += len(updates)
+        return written
+
+    def persist_store_reviews(self, store_reviews, processes: int = None) -> int:
+        """
+        Score store reviews and store ``sentiment_score`` in bulk. Returns the number written.
+        """
+        from .stats import review_stats_service
+
+        written = 0
+        for batch in self._batches(store_reviews, ('id', 'overall_rating', 'shop_id', 'sentiment_score', 'comment')):
+            sentiments = self.analyze_texts([row[4] or '' for row in batch], processes)
+            updates, changes = [], []
+            for (pk, rating, shop_id, previous, _), sentiment in zip(batch, sentiments):
+                score = self.review_result(sentiment, rating)['score']
+                updates.append(StoreReview(id=pk, sentiment_score=Decimal(str(score))))
+                changes.append((
+                    shop_id,
+                    sentiment_label(float(previous)) if previous is not None else None,
+                    sentiment_label(score)
+                ))
+            StoreReview.objects.bulk_update(updates, ['sentiment_score'], batch_size=self.batch_size)
+            review_stats_service.sentiment_changed('shop', changes)
+            written += len(updates)
+        return written
+
+    def _batches(self, reviews, fields) -> Iterable[List]:
+        if not isinstance(reviews, QuerySet):
+            rows = [tuple(getattr(review, field) for field in fields) for review in reviews]
+            for start in range(0, len(rows), self.batch_size):
+                yield rows[start:start + self.batch_size]
+            return
+
+        # Keyset pages stay correct while the scored rows are being updated
+        last_id = None
+        while True:
+            page = reviews.order_by('id')
+            if last_id is not None:
+                page = page.filter(id__gt=last_id)
+            batch = list(page.values_list(*fields)[:self.batch_size])
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1][0]
+
+
+# Create singleton instance
+sentiment_engine = SentimentEngine()
@@ -0,0 +1,151 @@
+"""
+reviews/sentiment_queue.py
+--------------------------
+Queue of reviews awaiting sentiment scoring, drained in batches by a worker.
+"""
+
+import logging
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import PendingSentiment, Review, SentimentBackfillCheckpoint, StoreReview
+from .sentiment import sentiment_engine
+
+logger = logging.getLogger(__name__)
+
+
+class ReviewSentimentQueue:
+    """
+    Pending set of reviews to score, stored in ``PendingSentiment``.
+
+    Signal handlers enqueue new and edited ``Review``/``StoreReview`` rows
+    when the surrounding transaction commits. ``drain`` scores the queue
+    ``SENTIMENT_QUEUE_BATCH_SIZE`` reviews at a time with the batch
+    sentiment engine, which writes the scores with ``bulk_update``; reviews
+    enqueued again while their batch was being scored stay queued.
+    ``backfill`` scores historical reviews in id order and records its
+    position in ``SentimentBackfillCheckpoint`` after every batch, so an
+    interrupted run resumes where it stopped.
+    """
+
+    MODELS = {'review': Review, 'store_review': StoreReview}
+
+    def __init__(self):
+        self.batch_size = getattr(settings, 'SENTIMENT_QUEUE_BATCH_SIZE', 500)
+
+    def enqueue(self, kind: str, review_ids: Iterable):
+        """
+        Queue reviews for scoring after the current transaction commits.
+        """
+        review_ids = [review_id for review_id in review_ids if review_id]
+        if review_ids:
+            transaction.on_commit(lambda: self._write(kind, review_ids))
+
+    def _write(self, kind: str, review_ids: List):
+        now = timezone.now()
+        PendingSentiment.objects.bulk_create(
+            [PendingSentiment(kind=kind, object_id=review_id, enqueued_at=now) for review_id in review_ids],
+            update_conflicts=True,
+            unique_fields=['kind', 'object_id'],
+            update_fields=['enqueued_at'],
+            batch_size=self.batch_size
+        )
+
+    def pending_count(self) -> int:
+        return PendingSentiment.objects.count()
+
+    def drain(self, batch_size: int = None, max_batches: int = None, processes: int = None) -> Dict:
+        """
+        Score queued reviews batch by batch and remove them from the queue.
+        """
+        batch_size = batch_size or self.batch_size
+        totals = {'batches': 0, 'scored': 0, 'skipped': 0}
+
+        while max_batches is None or totals['batches'] < max_batches:
+            claimed_at = timezone.now()
+            rows = list(PendingSentiment.objects.order_by('enqueued_at').values_list('id', 'kind', 'object_id')[:batch_size])
+            if not rows:
+                break
+            totals['batches'] += 1
+
+            by_kind = {}
+            for _, kind, object_id in rows:
+                by_kind.setdefault(kind, []).append(object_id)
+            for kind, review_ids in by_kind.items():
+                scored = self.score(kind, review_ids, processes)
+                totals['scored'] += scored
+                # Reviews deleted since they were queued
+                totals['skipped'] += len(review_ids) - scored
+
+            PendingSentiment.objects.filter(
+                id__in=[pk for pk, _, _ in rows], enqueued_at__lte=claimed_at
+            ).delete()
+
+        logger.info(
+            f"Scored sentiment of {totals['scored']} reviews in {totals['batches']} batches "
+            f"({totals['skipped']} deleted)"
+        )
+        return totals
+
+    def backfill(self, kind: str, batch_size: int = None, max_batches: int = None,
+                 restart: bool = False, only_missing: bool = False, processes: int = None) -> Dict:
+        """
+        Score historical reviews of one kind, resuming from the stored checkpoint.
+        """
+        batch_size = batch_size or self.batch_size
+        model = self.MODELS[kind]
+        checkpoint, _ = SentimentBackfillCheckpoint.objects.get_or_create(kind=kind)
+        if restart:
+            checkpoint.last_id = None
+            checkpoint.processed = 0
+            checkpoint.completed_at = None
+            checkpoint.save()
+
+        batches = 0
+        while checkpoint.completed_at is None and (max_batches is None or batches < max_batches):
+            queryset = model.objects.order_by('id')
+            if checkpoint.last_id is not None:
+                queryset = queryset.filter(id__gt=checkpoint.last_id)
+            review_ids = list(queryset.values_list('id', flat=True)[:batch_size])
+            if not review_ids:
+                checkpoint.completed_at = timezone.now()
+                checkpoint.save(update_fields=['completed_at', 'updated_at'])
+                break
+
+            batches += 1
+            self.score(kind, review_ids, processes, only_missing=only_missing)
+            checkpoint.last_id = review_ids[-1]
+            checkpoint.processed += len(review_ids)
+            checkpoint.save(update_fields=['last_id', 'processed', 'updated_at'])
+
+        return {
+            'batches': batches,
+            'processed': checkpoint.processed,
+            'completed': checkpoint.completed_at is not None,
+        }
+
+    def score(self, kind: str, review_ids: List, processes: int = None, only_missing: bool = False) -> int:
+        """
+        Score and store the sentiment of reviews of one kind; returns the number written.
+        """
+        queryset = self.MODELS[kind].objects.filter(id__in=review_ids)
+        if only_missing:
+            queryset = queryset.filter(sentiment_score__isnull=True)
+
+        if kind == 'store_review':
+            return sentiment_engine.persist_store_reviews(queryset, processes)
+
+        product_ids = set(queryset.values_list('product_id', flat=True))
+        written = sentiment_engine.persist_reviews(queryset, processes)
+        if written:
+            # Stored sentiment feeds the AI rating of the reviewed products
+            from core.rating_tracker import product_rating_tracker
+            product_rating_tracker.mark(product_ids, 'review')
+        return written
+
+
+# Create singleton instance
+review_sentiment_queue = ReviewSentimentQueue()
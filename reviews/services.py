@@ -10,7 +10,10 @@ from django.conf import settings
 from django.utils import timezone
 from decimal import Decimal
 from .models import Review, StoreReview, EngagementEvent, ProductEngagement
-import re
+from .sentiment import (
+    INTENSIFIERS, NEGATIVE_WORDS, POSITIVE_WORDS, analyze_text, score_tokens,
+    sentiment_engine, sentiment_label, tokenize
+)
 
 logger = logging.getLogger(__name__)
 
@@ -18,57 +21,23 @@ logger = logging.getLogger(__name__)
 class SentimentAnalysisService:
     """
     Service for analyzing sentiment in reviews and feedback.
+
+    Scoring is delegated to the batch ``sentiment_engine``.
     """
     
     def __init__(self):
-        self.positive_words = [
-            'excellent', 'amazing', 'great', 'fantastic', 'wonderful', 'perfect',
-            'outstanding', 'superb', 'brilliant', 'awesome', 'love', 'best',
-            'good', 'nice', 'happy', 'satisfied', 'recommend', 'quality',
-            'fast', 'quick', 'helpful', 'friendly', 'professional', 'reliable'
-        ]
-        
-        self.negative_words = [
-            'terrible', 'awful', 'horrible', 'bad', 'worst', 'hate', 'disappointed',
-            'poor', 'slow', 'expensive', 'cheap', 'broken', 'defective', 'useless',
-            'waste', 'scam', 'fraud', 'rude', 'unprofessional', 'unreliable',
-            'delayed', 'damaged', 'wrong', 'missing', 'never', 'not'
-        ]
-        
-        self.intensifiers = [
-            'very', 'extremely', 'really', 'absolutely', 'completely', 'totally',
-            'quite', 'rather', 'pretty', 'so', 'too', 'highly'
-        ]
+        self.engine = sentiment_engine
+        self.positive_words = POSITIVE_WORDS
+        self.negative_words = NEGATIVE_WORDS
+        self.intensifiers = INTENSIFIERS
     
     def analyze_review(self, review: Review) -> Dict:
         """
         Analyze sentiment of a review and return score and label.
         """
         try:
-            text = self._prepare_text(review.comment, review.pros, review.cons)
-            
-            # Calculate sentiment score
-            score = self._calculate_sentiment_score(text)
-            
-            # Determine sentiment label
-            label = self._get_sentiment_label(score)
-            
-            # Consider rating in final score
-            rating_influence = (review.rating - 3) * 0.2  # -0.4 to +0.4
-            final_score = max(-1.0, min(1.0, score + rating_influence))
-            
-            return {
-                'score': round(final_score, 2),
-                'label': label,
-                'confidence': self._calculate_confidence(text, score),
-                'details': {
-                    'text_sentiment': score,
-                    'rating_influence': rating_influence,
-                    'word_count': len(text.split()),
-                    'positive_words_found': self._count_sentiment_words(text, self.positive_words),
-                    'negative_words_found': self._count_sentiment_words(text, self.negative_words)
-                }
-            }
+            sentiment = score_tokens(tokenize(review.comment, review.pros, review.cons))
+            return self.engine.review_result(sentiment, review.rating)
             
         except Exception as e:
             logger.error(f"Error analyzing sentiment for review {review.id}: {e}")
@@ -84,18 +53,9 @@ class SentimentAnalysisService:
         Analyze sentiment of a store review.
         """
         try:
-            text = self._prepare_text(store_review.comment)
-            score = self._calculate_sentiment_score(text)
-            
-            # Consider overall rating
-            rating_influence = (store_review.overall_rating - 3) * 0.2
-            final_score = max(-1.0, min(1.0, score + rating_influence))
-            
-            return {
-                'score': round(final_score, 2),
-                'label': self._get_sentiment_label(final_score),
-                'confidence': self._calculate_confidence(text, score)
-            }
+            sentiment = score_tokens(tokenize(store_review.comment))
+            result = self.engine.review_result(sentiment, store_review.overall_rating, label_from_final=True)
+            return {key: result[key] for key in ('score', 'label', 'confidence')}
             
         except Exception as e:
             logger.error(f"Error analyzing sentiment for store review {store_review.id}: {e}")
@@ -105,12 +65,16 @@ class SentimentAnalysisService:
         """
         Analyze sentiment for multiple reviews and return aggregated results.
         """
+        reviews = list(reviews)
         results = []
         total_score = 0
         sentiment_counts = {'positive': 0, 'neutral': 0, 'negative': 0}
         
-        for review in reviews:
-            analysis = self.analyze_review(review)
+        sentiments = self.engine.analyze_texts(
+            [' '.join(filter(None, (review.comment, review.pros, review.cons))) for review in reviews]
+        )
+        for review, sentiment in zip(reviews, sentiments):
+            analysis = self.engine.review_result(sentiment, review.rating)
             results.append({
                 'review_id': str(review.id),
                 'analysis': analysis
@@ -144,87 +108,31 @@ class SentimentAnalysisService:
         """
         Prepare text for sentiment analysis by combining and cleaning.
         """
-        combined_text = ' '.join(filter(None, texts))
-        # Clean and normalize text
-        cleaned_text = re.sub(r'[^\w\s]', ' ', combined_text.lower())
-        cleaned_text = re.sub(r'\s+', ' ', cleaned_text).strip()
-        return cleaned_text
+        return ' '.join(tokenize(*texts))
     
     def _calculate_sentiment_score(self, text: str) -> float:
         """
         Calculate sentiment score using word-based approach.
         """
-        words = text.split()
-        if not words:
-            return 0.0
-        
-        score = 0
-        word_count = len(words)
-        
-        for i, word in enumerate(words):
-            word_score = 0
-            
-            # Check for positive words
-            if word in self.positive_words:
-                word_score = 1
-            # Check for negative words
-            elif word in self.negative_words:
-                word_score = -1
-            
-            # Apply intensifier if present
-            if i > 0 and words[i-1] in self.intensifiers:
-                word_score *= 1.5
-            
-            # Apply negation if present
-            if i > 0 and words[i-1] in ['not', 'no', 'never', 'none']:
-                word_score *= -1
-            
-            score += word_score
-        
-        # Normalize score
-        if word_count > 0:
-            normalized_score = score / word_count
-            return max(-1.0, min(1.0, normalized_score))
-        
-        return 0.0
+        return analyze_text(text).score
     
     def _get_sentiment_label(self, score: float) -> str:
         """
         Convert sentiment score to label.
         """
-        if score > 0.1:
-            return 'positive'
-        elif score < -0.1:
-            return 'negative'
-        else:
-            return 'neutral'
+        return sentiment_label(score)
     
     def _calculate_confidence(self, text: str, score: float) -> float:
         """
         Calculate confidence level of sentiment analysis.
         """
-        words = text.split()
-        if not words:
-            return 0.0
-        
-        sentiment_word_count = (
-            self._count_sentiment_words(text, self.positive_words) +
-            self._count_sentiment_words(text, self.negative_words)
-        )
-        
-        # Confidence based on sentiment word density and score magnitude
-        word_density = sentiment_word_count / len(words)
-        score_magnitude = abs(score)
-        
-        confidence = min(1.0, (word_density * 2 + score_magnitude) / 2)
-        return round(confidence, 2)
+        return analyze_text(text)._replace(score=score).confidence
     
-    def _count_sentiment_words(self, text: str, word_list: List[str]) -> int:
+    def _count_sentiment_words(self, text: str, word_list) -> int:
         """
         Count occurrences of sentiment words in text.
         """
-        words = text.split()
-        return sum(1 for word in words if word in word_list)
+        return sum(1 for word in tokenize(text) if word in word_list)
 
 
 class EngagementTrackingService:
@@ -0,0 +1,67 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Review, StoreReview
+from .sentiment_queue import review_sentiment_queue
+from .stats import review_stats_service
+
+# Fields whose changes require the sentiment to be scored again
+REVIEW_SENTIMENT_FIELDS = {'rating', 'comment', 'pros', 'cons'}
+STORE_REVIEW_SENTIMENT_FIELDS = {'overall_rating', 'comment'}
+
+
+def needs_scoring(created, update_fields, fields):
+    return created or update_fields is None or bool(fields & set(update_fields))
+
+
+@receiver(post_save, sender=Review)
+def enqueue_review_sentiment(sender, instance, created=False, update_fields=None, **kwargs):
+    if needs_scoring(created, update_fields, REVIEW_SENTIMENT_FIELDS):
+        review_sentiment_queue.enqueue('review', [instance.pk])
+
+
+@receiver(post_save, sender=StoreReview)
+def enqueue_store_review_sentiment(sender, instance, created=False, update_fields=None, **kwargs):
+    if needs_scoring(created, update_fields, STORE_REVIEW_SENTIMENT_FIELDS):
+        review_sentiment_queue.enqueue('store_review', [instance.pk])
+
+
+# Fields counted in ReviewStats, as accepted by save(update_fields=...)
+REVIEW_STATS_FIELDS = {
+    Review: {'product', 'status', 'rating', 'sentiment_label', 'verified_purchase', 'helpfulness_score'},
+    StoreReview: {
+        'shop', 'overall_rating', 'sentiment_score', 'helpfulness_score', 'delivery_rating',
+        'customer_service_rating', 'product_quality_rating', 'value_for_money_rating'
+    },
+}
+
+
+@receiver(pre_save, sender=Review)
+@receiver(pre_save, sender=StoreReview)
+def remember_review_stats_values(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not REVIEW_STATS_FIELDS[sender] & set(update_fields):
+        instance._review_stats_previous = False
+        return
+    instance._review_stats_previous = review_stats_service.stored_values(instance)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=StoreReview)
+def update_review_stats_on_save(sender, instance, **kwargs):
+    previous = getattr(instance, '_review_stats_previous', None)
+    if previous is not False:
+        review_stats_service.review_changed(instance, previous, review_stats_service.values(instance))
+
+
+@receiver(pre_delete, sender=Review)
+@receiver(pre_delete, sender=StoreReview)
+def remember_review_stats_values_on_delete(sender, instance, **kwargs):
+    # The instance may be stale, e.g. after a bulk sentiment update
+    instance._review_stats_previous = review_stats_service.stored_values(instance)
+
+
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=StoreReview)
+def update_review_stats_on_delete(sender, instance, **kwargs):
+    previous = getattr(instance, '_review_stats_previous', None)
+    review_stats_service.review_changed(instance, previous or review_stats_service.values(instance), None)
@@ -0,0 +1,237 @@
+"""
+reviews/stats.py
+----------------
+Incremental per-product and per-shop review statistics.
+"""
+
+import logging
+from collections import Counter
+from decimal import Decimal
+from typing import Dict, Iterable, Optional
+
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.models import Product, Shop
+from .models import Review, ReviewStats, StoreReview
+from .sentiment import sentiment_label
+
+logger = logging.getLogger(__name__)
+
+SENTIMENT_COUNT_FIELDS = {
+    'positive': 'positive_count',
+    'neutral': 'neutral_count',
+    'negative': 'negative_count',
+}
+ASPECT_SUM_FIELDS = {
+    'delivery_rating': 'delivery_sum',
+    'customer_service_rating': 'customer_service_sum',
+    'product_quality_rating': 'product_quality_sum',
+    'value_for_money_rating': 'value_for_money_sum',
+}
+REVIEW_FIELDS = ('product_id', 'status', 'rating', 'sentiment_label', 'verified_purchase', 'helpfulness_score')
+STORE_REVIEW_FIELDS = ('shop_id', 'overall_rating', 'sentiment_score', 'helpfulness_score', *ASPECT_SUM_FIELDS)
+COUNTER_FIELDS = (
+    'review_count', 'rating_sum', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5',
+    'positive_count', 'neutral_count', 'negative_count', 'verified_count', 'helpful_votes',
+    *ASPECT_SUM_FIELDS.values()
+)
+POSITIVE_THRESHOLD = Decimal('0.1')
+
+
+class ReviewStatsService:
+    """
+    Keeps ``ReviewStats`` rows in step with product and store reviews.
+
+    Every review write is turned into a delta of the counters it contributes
+    to (nothing for unapproved product reviews) and applied with a single
+    ``F()`` update, so concurrent writers never lose increments. Rows are
+    built from grouped aggregates the first time a product or shop is read;
+    deltas for owners without a row are skipped because that build
+    includes them.
+    """
+
+    # Contributions
+
+    def review_counts(self, values: Optional[Dict]) -> Counter:
+        """
+        Counters contributed by one product review, given its ``REVIEW_FIELDS`` values.
+        """
+        if not values or values['status'] != 'approved':
+            return Counter()
+        counts = Counter({
+            'review_count': 1,
+            'rating_sum': values['rating'],
+            f"rating_{values['rating']}": 1,
+            'verified_count': int(values['verified_purchase']),
+            'helpful_votes': values['helpfulness_score'],
+        })
+        if values['sentiment_label'] in SENTIMENT_COUNT_FIELDS:
+            counts[SENTIMENT_COUNT_FIELDS[values['sentiment_label']]] += 1
+        return counts
+
+    def store_review_counts(self, values: Optional[Dict]) -> Counter:
+        """
+        Counters contributed by one store review, given its ``STORE_REVIEW_FIELDS`` values.
+        """
+        if not values:
+            return Counter()
+        counts = Counter({
+            'review_count': 1,
+            'rating_sum': values['overall_rating'],
+            f"rating_{values['overall_rating']}": 1,
+            'helpful_votes': values['helpfulness_score'],
+        })
+        for field, total in ASPECT_SUM_FIELDS.items():
+            counts[total] = values[field]
+        if values['sentiment_score'] is not None:
+            counts[SENTIMENT_COUNT_FIELDS[sentiment_label(float(values['sentiment_score']))]] += 1
+        return counts
+
+    def values(self, instance) -> Dict:
+        fields = REVIEW_FIELDS if isinstance(instance, Review) else STORE_REVIEW_FIELDS
+        return {field: getattr(instance, field) for field in fields}
+
+    def stored_values(self, instance) -> Optional[Dict]:
+        """
+        Values of a review as currently stored, before it is saved again.
+        """
+        if instance._state.adding:
+            return None
+        fields = REVIEW_FIELDS if isinstance(instance, Review) else STORE_REVIEW_FIELDS
+        return type(instance).objects.filter(pk=instance.pk).values(*fields).first()
+
+    # Incremental updates
+
+    def review_changed(self, instance, previous: Optional[Dict], current: Optional[Dict]):
+        """
+        Apply the change of a review from ``previous`` to ``current`` values (None when absent).
+        """
+        if isinstance(instance, Review):
+            owner, counts = 'product', self.review_counts
+        else:
+            owner, counts = 'shop', self.store_review_counts
+
+        deltas = {}
+        if previous:
+            deltas[previous[f'{owner}_id']] = Counter({field: -value for field, value in counts(previous).items()})
+        if current:
+            deltas.setdefault(current[f'{owner}_id'], Counter()).update(counts(current))
+        self.apply(owner, deltas)
+
+    def sentiment_changed(self, owner: str, changes: Iterable):
+        """
+        Move reviews between sentiment counters; ``changes`` holds
+        ``(owner_id, previous_label, label)`` for counted reviews.
+        """
+        deltas = {}
+        for owner_id, previous, label in changes:
+            if previous == label:
+                continue
+            delta = deltas.setdefault(owner_id, Counter())
+            if previous in SENTIMENT_COUNT_FIELDS:
+                delta[SENTIMENT_COUNT_FIELDS[previous]] -= 1
+            if label in SENTIMENT_COUNT_FIELDS:
+                delta[SENTIMENT_COUNT_FIELDS[label]] += 1
+        self.apply(owner, deltas)
+
+    def apply(self, owner: str, deltas: Dict):
+        """
+        Add counter deltas, keyed by product or shop id, to the existing rows.
+        """
+        now = timezone.now()
+        for owner_id, delta in deltas.items():
+            changes = {field: F(field) + value for field, value in delta.items() if value}
+            if changes:
+                ReviewStats.objects.filter(**{f'{owner}_id': owner_id}).update(updated_at=now, **changes)
+
+    # Reads
+
+    def for_product(self, product_id) -> ReviewStats:
+        return self._get('product', product_id)
+
+    def for_shop(self, shop_id) -> ReviewStats:
+        return self._get('shop', shop_id)
+
+    def _get(self, owner: str, owner_id) -> ReviewStats:
+        stats = ReviewStats.objects.filter(**{f'{owner}_id': owner_id}).first()
+        if stats is None and self.rebuild(owner, [owner_id]):
+            stats = ReviewStats.objects.get(**{f'{owner}_id': owner_id})
+        # Unknown products and shops read as having no reviews
+        return stats or ReviewStats(**{f'{owner}_id': owner_id})
+
+    def summarize(self, queryset) -> ReviewStats:
+        """
+        Unsaved statistics of an arbitrary review or store review queryset, in one query.
+        """
+        totals = queryset.order_by().aggregate(**self.aggregates(queryset.model))
+        return ReviewStats(**totals)
+
+    # Rebuilds
+
+    def aggregates(self, model) -> Dict:
+        """
+        Aggregate expressions producing the ``ReviewStats`` counters of ``model`` rows.
+        """
+        def total(field):
+            return Coalesce(Sum(field), 0)
+
+        if model is Review:
+            rating = 'rating'
+            expressions = {
+                'verified_count': Count('id', filter=Q(verified_purchase=True)),
+                'positive_count': Count('id', filter=Q(sentiment_label='positive')),
+                'neutral_count': Count('id', filter=Q(sentiment_label='neutral')),
+                'negative_count': Count('id', filter=Q(sentiment_label='negative')),
+            }
+        else:
+            rating = 'overall_rating'
+            expressions = {
+                'positive_count': Count('id', filter=Q(sentiment_score__gt=POSITIVE_THRESHOLD)),
+                'neutral_count': Count('id', filter=Q(
+                    sentiment_score__gte=-POSITIVE_THRESHOLD, sentiment_score__lte=POSITIVE_THRESHOLD
+                )),
+                'negative_count': Count('id', filter=Q(sentiment_score__lt=-POSITIVE_THRESHOLD)),
+            }
+            expressions.update({total_field: total(field) for field, total_field in ASPECT_SUM_FIELDS.items()})
+
+        expressions.update({
+            'review_count': Count('id'),
+            'rating_sum': total(rating),
+            'helpful_votes': total('helpfulness_score'),
+        })
+        expressions.update({
+            f'rating_{stars}': Count('id', filter=Q(**{rating: stars})) for stars in range(1, 6)
+        })
+        return expressions
+
+    def rebuild(self, owner: str, owner_ids: Iterable) -> int:
+        """
+        Recompute the rows of products or shops from their reviews with one grouped query.
+        """
+        if owner == 'product':
+            owner_ids = list(Product.objects.filter(id__in=owner_ids).values_list('id', flat=True))
+            queryset = Review.objects.filter(product_id__in=owner_ids, status='approved')
+        else:
+            owner_ids = list(Shop.objects.filter(id__in=owner_ids).values_list('id', flat=True))
+            queryset = StoreReview.objects.filter(shop_id__in=owner_ids)
+        if not owner_ids:
+            return 0
+
+        key = f'{owner}_id'
+        totals = {
+            str(row.pop(key)): row
+            for row in queryset.order_by().values(key).annotate(**self.aggregates(queryset.model))
+        }
+        ReviewStats.objects.bulk_create(
+            [ReviewStats(**{key: owner_id}, **totals.get(str(owner_id), {})) for owner_id in owner_ids],
+            update_conflicts=True,
+            unique_fields=[owner],
+            update_fields=[*COUNTER_FIELDS, 'updated_at']
+        )
+        return len(owner_ids)
+
+
+# Create singleton instance
+review_stats_service = ReviewStatsService()
@@ -0,0 +1,12 @@
+from celery import shared_task
+from .sentiment_queue import review_sentiment_queue
+import logging
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def score_pending_review_sentiment(max_batches=None):
+    """Periodic task scoring the sentiment of queued new and edited reviews"""
+    result = review_sentiment_queue.drain(max_batches=max_batches)
+    logger.info(f"Scored sentiment of {result['scored']} reviews in {result['batches']} batches")
+    return result
@@ -1,5 +1,134 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-class ReviewTests(TestCase):
-    """Placeholder for review-related tests."""
-    pass
+from core.models import Category, Product, Shop
+from .models import Review, StoreReview
+from .sentiment import analyze_text, sentiment_engine
+from .sentiment_queue import review_sentiment_queue
+from .services import SentimentAnalysisService
+from .stats import COUNTER_FIELDS, review_stats_service
+
+User = get_user_model()
+
+
+def create_product():
+    owner = User.objects.create_user(username='owner', password='owner123', email='owner@example.com', user_type='owner')
+    shop = Shop.objects.create(name="Shop", owner=owner.owner_profile, address="Main street", url="https://shop.example.com")
+    return Product.objects.create(name="Kettle", price=40, category=Category.objects.create(name="Kitchen"), shop=shop)
+
+
+def create_reviewer(index):
+    return User.objects.create_user(username=f'reviewer{index}', password='pass1234', email=f'reviewer{index}@example.com')
+
+
+class SentimentEngineTest(TestCase):
+    def test_negation_and_intensifier_in_one_pass(self):
+        sentiment = analyze_text("Very good, but NOT bad!")
+        self.assertAlmostEqual(sentiment.score, 0.5)
+        self.assertEqual((sentiment.word_count, sentiment.positive, sentiment.negative), (5, 1, 1))
+        self.assertEqual(sentiment.confidence, 0.65)
+        self.assertEqual(analyze_text("Never slow").score, 0.5)
+        self.assertEqual(sentiment_engine.analyze_texts(["Very good, but NOT bad!", ""]), [sentiment, analyze_text("")])
+
+    def test_persist_reviews_in_bulk(self):
+        product = create_product()
+        for index, (rating, comment) in enumerate([(5, "Great kettle, fast and reliable"), (1, "Broken and useless")]):
+            Review.objects.create(product=product, user=create_reviewer(index), rating=rating, comment=comment)
+
+        reviews = Review.objects.filter(product=product)
+        self.assertEqual(sentiment_engine.persist_reviews(reviews), 2)
+
+        service = SentimentAnalysisService()
+        for review in reviews:
+            expected = service.analyze_review(review)
+            self.assertEqual(review.sentiment_score, Decimal(str(expected['score'])))
+            self.assertEqual(review.sentiment_label, expected['label'])
+        self.assertEqual(reviews.get(rating=5).sentiment_label, 'positive')
+        self.assertEqual(reviews.get(rating=1).sentiment_label, 'negative')
+
+
+class ReviewSentimentQueueTest(TestCase):
+    def setUp(self):
+        self.product = create_product()
+
+    def test_new_and_edited_reviews_are_scored_by_the_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            review = Review.objects.create(product=self.product, user=create_reviewer(0), rating=5,
+                                           comment="Excellent and reliable")
+        self.assertIsNone(review.sentiment_score)
+        self.assertEqual(review_sentiment_queue.pending_count(), 1)
+
+        self.assertEqual(review_sentiment_queue.drain()['scored'], 1)
+        self.assertEqual(review_sentiment_queue.pending_count(), 0)
+        review.refresh_from_db()
+        self.assertEqual(review.sentiment_label, 'positive')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            review.helpfulness_score = 3
+            review.save(update_fields=['helpfulness_score'])
+        self.assertEqual(review_sentiment_queue.pending_count(), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            review.comment = "Broken and useless"
+            review.save()
+        self.assertEqual(review_sentiment_queue.pending_count(), 1)
+
+    def test_backfill_resumes_from_checkpoint(self):
+        for index in range(3):
+            Review.objects.create(product=self.product, user=create_reviewer(index), rating=4, comment="Good value")
+
+        result = review_sentiment_queue.backfill('review', batch_size=2, max_batches=1)
+        self.assertEqual((result['processed'], result['completed']), (2, False))
+        self.assertEqual(Review.objects.filter(sentiment_score__isnull=True).count(), 1)
+
+        result = review_sentiment_queue.backfill('review', batch_size=2)
+        self.assertEqual((result['processed'], result['completed']), (3, True))
+        self.assertFalse(Review.objects.filter(sentiment_score__isnull=True).exists())
+
+
+class ReviewStatsTest(TestCase):
+    def setUp(self):
+        self.product = create_product()
+
+    def assertStatsMatch(self, stats, queryset):
+        expected = review_stats_service.summarize(queryset)
+        for field in COUNTER_FIELDS:
+            self.assertEqual(getattr(stats, field), getattr(expected, field), field)
+
+    def test_product_stats_follow_review_writes(self):
+        self.assertEqual(review_stats_service.for_product(self.product.id).review_count, 0)
+        approved = Review.objects.filter(product=self.product, status='approved')
+
+        first = Review.objects.create(product=self.product, user=create_reviewer(0), rating=5, status='approved',
+                                      verified_purchase=True, comment="Excellent")
+        second = Review.objects.create(product=self.product, user=create_reviewer(1), rating=1, comment="Broken")
+        stats = review_stats_service.for_product(self.product.id)
+        self.assertEqual((stats.review_count, stats.rating_5, stats.verified_count), (1, 1, 1))
+
+        second.status = 'approved'
+        second.save()
+        first.helpfulness_score = 2
+        first.save(update_fields=['helpfulness_score'])
+        sentiment_engine.persist_reviews(approved)
+        stats = review_stats_service.for_product(self.product.id)
+        self.assertEqual((stats.review_count, stats.average_rating, stats.helpful_votes), (2, 3.0, 2))
+        self.assertEqual(stats.sentiment_distribution(), {'positive': 1, 'negative': 1})
+        self.assertStatsMatch(stats, approved)
+
+        second.delete()
+        self.assertStatsMatch(review_stats_service.for_product(self.product.id), approved)
+
+    def test_shop_stats_follow_store_reviews(self):
+        shop = self.product.shop
+        for index, rating in enumerate([5, 2]):
+            StoreReview.objects.create(shop=shop, user=create_reviewer(index), overall_rating=rating,
+                                       delivery_rating=4, customer_service_rating=rating,
+                                       product_quality_rating=3, value_for_money_rating=3)
+        stats = review_stats_service.for_shop(shop.id)
+        self.assertEqual((stats.review_count, stats.average(stats.customer_service_sum)), (2, 3.5))
+
+        StoreReview.objects.create(shop=shop, user=create_reviewer(2), overall_rating=4, delivery_rating=1,
+                                   customer_service_rating=4, product_quality_rating=5, value_for_money_rating=5)
+        self.assertStatsMatch(review_stats_service.for_shop(shop.id), StoreReview.objects.filter(shop=shop))
@@ -19,7 +19,8 @@ from .serializers import (
     ReviewHelpfulnessSerializer, ProductEngagementSerializer,
     UserFeedbackSerializer, EngagementEventSerializer
 )
-from .services import SentimentAnalysisService, EngagementTrackingService
+from .services import EngagementTrackingService
+from .stats import review_stats_service
 import logging
 
 logger = logging.getLogger(__name__)
@@ -92,21 +93,8 @@ class EnhancedReviewViewSet(viewsets.ModelViewSet):
         return ReviewSerializer
 
     def perform_create(self, serializer):
-        """Create review with sentiment analysis."""
-        review = serializer.save(user=self.request.user)
-
-        # Perform sentiment analysis (placeholder - will implement service)
-        try:
-            # This would call the sentiment analysis service
-            # sentiment_service = SentimentAnalysisService()
-            # sentiment_data = sentiment_service.analyze_review(review)
-            # review.sentiment_score = sentiment_data['score']
-            # review.sentiment_label = sentiment_data['label']
-            # review.save()
-            pass
-
-        except Exception as e:
-            logger.error(f"Error analyzing sentiment for review {review.id}: {e}")
+        """Create review; its sentiment is scored by the background queue."""
+        serializer.save(user=self.request.user)
 
         # Track engagement event (placeholder)
         try:
@@ -141,7 +129,7 @@ class EnhancedReviewViewSet(viewsets.ModelViewSet):
         # Update review helpfulness score
         helpful_count = review.helpfulness_votes.filter(vote='helpful').count()
         review.helpfulness_score = helpful_count
-        review.save()
+        review.save(update_fields=['helpfulness_score', 'updated_at'])
 
         return Response({
             'message': f'Review marked as {vote}',
@@ -157,40 +145,41 @@ class EnhancedReviewViewSet(viewsets.ModelViewSet):
         if product_id:
             queryset = queryset.filter(product_id=product_id)
 
+        # Approved reviews of one product are summarised in ReviewStats;
+        # other filters are aggregated in a single query
+        default_filters = set(request.query_params) <= {'product_id', 'status'}
+        if product_id and default_filters and request.query_params.get('status', 'approved') == 'approved':
+            stats = review_stats_service.for_product(product_id)
+        else:
+            stats = review_stats_service.summarize(queryset)
+
         # Calculate analytics
-        total_reviews = queryset.count()
+        total_reviews = stats.review_count
         if total_reviews == 0:
             return Response({'message': 'No reviews found'})
 
         analytics = {
             'total_reviews': total_reviews,
-            'average_rating': queryset.aggregate(avg_rating=Avg('rating'))['avg_rating'],
+            'average_rating': stats.average_rating,
             'rating_distribution': {},
             'sentiment_distribution': {},
-            'verified_purchase_percentage': 0,
+            'verified_purchase_percentage': (stats.verified_count / total_reviews) * 100,
             'recent_trends': {}
         }
 
         # Rating distribution
-        for rating in range(1, 6):
-            count = queryset.filter(rating=rating).count()
+        for rating, count in stats.rating_distribution().items():
             analytics['rating_distribution'][f'{rating}_star'] = {
                 'count': count,
                 'percentage': (count / total_reviews) * 100
             }
 
         # Sentiment distribution
-        sentiment_counts = queryset.values('sentiment_label').annotate(count=Count('id'))
-        for sentiment in sentiment_counts:
-            if sentiment['sentiment_label']:
-                analytics['sentiment_distribution'][sentiment['sentiment_label']] = {
-                    'count': sentiment['count'],
-                    'percentage': (sentiment['count'] / total_reviews) * 100
-                }
-
-        # Verified purchase percentage
-        verified_count = queryset.filter(verified_purchase=True).count()
-        analytics['verified_purchase_percentage'] = (verified_count / total_reviews) * 100
+        for label, count in stats.sentiment_distribution().items():
+            analytics['sentiment_distribution'][label] = {
+                'count': count,
+                'percentage': (count / total_reviews) * 100
+            }
 
         # Recent trends (last 30 days vs previous 30 days)
         thirty_days_ago = timezone.now() - timedelta(days=30)
@@ -244,18 +233,12 @@ class StoreReviewViewSet(viewsets.ModelViewSet):
         """Create store review and update shop metrics."""
         store_review = serializer.save(user=self.request.user)
 
-        # Update shop's average ratings
+        # Update shop's average ratings from its review statistics
         shop = store_review.shop
-        shop_reviews = StoreReview.objects.filter(shop=shop)
-
-        # Calculate new averages
-        shop.reliability_score = shop_reviews.aggregate(
-            avg_rating=Avg('overall_rating')
-        )['avg_rating'] or 5.0
+        stats = review_stats_service.for_shop(shop.id)
 
-        shop.customer_service_rating = shop_reviews.aggregate(
-            avg_rating=Avg('customer_service_rating')
-        )['avg_rating'] or 5.0
+        shop.reliability_score = stats.average_rating or 5.0
+        shop.customer_service_rating = stats.average(stats.customer_service_sum) or 5.0
 
         shop.save()
 
@@ -269,26 +252,28 @@ class StoreReviewViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        reviews = self.get_queryset().filter(shop_id=shop_id)
-        total_reviews = reviews.count()
+        if set(request.query_params) <= {'shop_id'}:
+            stats = review_stats_service.for_shop(shop_id)
+        else:
+            stats = review_stats_service.summarize(self.get_queryset().filter(shop_id=shop_id))
+        total_reviews = stats.review_count
 
         if total_reviews == 0:
             return Response({'message': 'No reviews found for this shop'})
 
         analytics = {
             'total_reviews': total_reviews,
-            'overall_rating': reviews.aggregate(avg=Avg('overall_rating'))['avg'],
-            'delivery_rating': reviews.aggregate(avg=Avg('delivery_rating'))['avg'],
-            'customer_service_rating': reviews.aggregate(avg=Avg('customer_service_rating'))['avg'],
-            'product_quality_rating': reviews.aggregate(avg=Avg('product_quality_rating'))['avg'],
-            'value_for_money_rating': reviews.aggregate(avg=Avg('value_for_money_rating'))['avg'],
+            'overall_rating': stats.average_rating,
+            'delivery_rating': stats.average(stats.delivery_sum),
+            'customer_service_rating': stats.average(stats.customer_service_sum),
+            'product_quality_rating': stats.average(stats.product_quality_sum),
+            'value_for_money_rating': stats.average(stats.value_for_money_sum),
             'rating_distribution': {},
             'recent_trends': {}
         }
 
         # Rating distribution
-        for rating in range(1, 6):
-            count = reviews.filter(overall_rating=rating).count()
+        for rating, count in stats.rating_distribution().items():
             analytics['rating_distribution'][f'{rating}_star'] = {
                 'count': count,
                 'percentage': (count / total_reviews) * 100
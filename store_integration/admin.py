@@ -8,7 +8,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import StoreIntegrationConfig, ProductMapping, PriceHistory, SyncLog
+from .models import StoreIntegrationConfig, ProductMapping, PriceHistory, PriceHistoryRollup, SyncLog, WebhookEvent, StorePerformanceSnapshot
 from .services import StoreIntegrationService
 import json
 
@@ -139,6 +139,40 @@ class PriceHistoryAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('product', 'shop')
 
 
+@admin.register(PriceHistoryRollup)
+class PriceHistoryRollupAdmin(admin.ModelAdmin):
+    list_display = [
+        'product', 'shop', 'resolution', 'period_start',
+        'open_price', 'low_price', 'high_price', 'close_price', 'sample_count'
+    ]
+    list_filter = ['resolution', 'shop']
+    search_fields = ['product__name', 'shop__name']
+    date_hierarchy = 'period_start'
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product', 'shop')
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = [
+        'topic', 'external_product_id', 'integration_config',
+        'status', 'attempts', 'received_at', 'processed_at'
+    ]
+    list_filter = ['status', 'action', 'integration_config__platform']
+    search_fields = ['external_product_id', 'integration_config__shop__name']
+    readonly_fields = ['received_at', 'processed_at', 'claimed_at', 'claim_token']
+    date_hierarchy = 'received_at'
+
+
+@admin.register(StorePerformanceSnapshot)
+class StorePerformanceSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['shop', 'period_days', 'overall_score', 'calculated_at']
+    list_filter = ['period_days']
+    search_fields = ['shop__name']
+    readonly_fields = ['calculated_at']
+
+
 @admin.register(SyncLog)
 class SyncLogAdmin(admin.ModelAdmin):
     list_display = [
@@ -7,12 +7,14 @@ Services for aggregating and unifying products from multiple stores.
 from typing import Dict, List, Optional, Tuple
 from django.db.models import Q, Count, Avg, Min, Max, F
 from django.utils import timezone
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 from core.models import Product, Shop, Brand, Category
-from .models import PriceHistory, ProductMapping, StoreIntegrationConfig
+from .models import PriceHistory, ProductMapping, StoreIntegrationConfig, LatestPrice
+from core.pagination import KeysetPaginator, InvalidCursor, approximate_count
+import base64
+import json
 import logging
 from difflib import SequenceMatcher
-import re
 
 logger = logging.getLogger(__name__)
 
@@ -35,31 +37,38 @@ class ProductAggregationService:
             shop=product.shop
         ).select_related('shop', 'brand')
         
-        similar_products = []
-        
+        matches = []
         for other_product in other_products:
             similarity_score = ProductAggregationService._calculate_similarity(
                 product, other_product
             )
-            
             if similarity_score >= similarity_threshold:
-                # Get latest price for comparison
-                latest_price = PriceHistory.objects.filter(
-                    product=other_product,
-                    shop=other_product.shop
-                ).first()
-                
-                similar_products.append({
-                    'product': other_product,
-                    'similarity_score': similarity_score,
-                    'price_difference': float(other_product.price - product.price),
-                    'price_difference_percentage': float(
-                        ((other_product.price - product.price) / product.price) * 100
-                    ) if product.price > 0 else 0,
-                    'shop_reliability': float(other_product.shop.reliability_score),
-                    'delivery_days': other_product.shop.average_delivery_days,
-                    'latest_price_record': latest_price
-                })
+                matches.append((other_product, similarity_score))
+        
+        # Latest prices of all matches in one query
+        latest_prices = {
+            (latest.product_id, latest.shop_id): latest
+            for latest in LatestPrice.objects.filter(
+                product_id__in=[other_product.id for other_product, _ in matches]
+            )
+        }
+        
+        similar_products = []
+        
+        for other_product, similarity_score in matches:
+            latest_price = latest_prices.get((other_product.id, other_product.shop_id))
+            
+            similar_products.append({
+                'product': other_product,
+                'similarity_score': similarity_score,
+                'price_difference': float(other_product.price - product.price),
+                'price_difference_percentage': float(
+                    ((other_product.price - product.price) / product.price) * 100
+                ) if product.price > 0 else 0,
+                'shop_reliability': float(other_product.shop.reliability_score),
+                'delivery_days': other_product.shop.average_delivery_days,
+                'latest_price_record': latest_price
+            })
         
         # Sort by similarity score and price
         similar_products.sort(
@@ -108,7 +117,7 @@ class ProductAggregationService:
         if product1.price > 0 and product2.price > 0:
             price_diff = abs(product1.price - product2.price)
             max_price = max(product1.price, product2.price)
-            price_similarity = max(0, 1 - (price_diff / max_price))
+            price_similarity = max(0.0, 1 - float(price_diff / max_price))
         
         # Calculate weighted similarity
         total_similarity = (
@@ -231,6 +240,31 @@ class ProductAggregationService:
         """
         Search products across all stores and return unified results.
         """
+        page = ProductAggregationService.get_unified_search_page(
+            query, filters, page_size=100
+        )
+        return page['results']
+
+    @staticmethod
+    def get_unified_search_page(query: str, filters: Dict = None, cursor: str = None,
+                                page_size: int = 20, include_total: bool = False) -> Dict:
+        """
+        Search products across all stores and return one page of unified results.
+
+        Products are walked in price order with keyset pagination and grouped
+        with their similar products until ``page_size`` groups are collected
+        (or ``page_size * 5`` products are scanned). Each group is keyed by its
+        representative, the first product of the group reached by the walk.
+        ``next_cursor`` holds the position of the last product scanned plus
+        the ids and prices of grouped products not reached yet, so a product
+        folded into a group is not shown again on a later page.
+
+        Raises:
+            ValueError: If ``page_size`` is below 1
+            InvalidCursor: If ``cursor`` is malformed
+        """
+        if page_size < 1:
+            raise ValueError('page_size must be at least 1')
         filters = filters or {}
         
         # Build base queryset
@@ -264,10 +298,28 @@ class ProductAggregationService:
         
         # Group similar products
         grouped_results = {}
-        processed_products = set()
-        
-        for product in products[:100]:  # Limit for performance
-            if product.id in processed_products:
+        # Grouped product id -> price, for products shown in a group but not reached yet
+        keyset_cursor, processed_products = ProductAggregationService._decode_search_cursor(cursor)
+        paginator = KeysetPaginator(products, ['price'], page_size)
+        next_cursor = None
+        max_scan = page_size * 5  # Limit for performance
+        scanned = 0
+        
+        for product in ProductAggregationService._iter_keyset(paginator, keyset_cursor):
+            if len(grouped_results) >= page_size or scanned >= max_scan:
+                # Grouped products priced below the last one scanned are behind the cursor
+                ahead = {
+                    product_id: price for product_id, price in processed_products.items()
+                    if price >= last_product.price and product_id != str(last_product.id)
+                }
+                next_cursor = ProductAggregationService._encode_search_cursor(
+                    paginator.encode_cursor(last_product), ahead
+                )
+                break
+            scanned += 1
+            last_product = product
+            
+            if str(product.id) in processed_products:
                 continue
             
             # Find similar products for this one
@@ -275,13 +327,16 @@ class ProductAggregationService:
                 product, similarity_threshold=0.7
             )
             
-            # Create group key based on product name and brand
-            group_key = f"{product.name.lower()}_{product.brand.name.lower() if product.brand else 'no_brand'}"
-            group_key = re.sub(r'[^a-z0-9_]', '', group_key)
+            # Key the group by its representative product
+            group_key = str(product.id)
             
             if group_key not in grouped_results:
-                # Get all prices for this product group
-                group_products = [product] + [sp['product'] for sp in similar_products]
+                # Get all prices for this product group, leaving out products
+                # already shown in an earlier group
+                group_products = [product] + [
+                    sp['product'] for sp in similar_products
+                    if str(sp['product'].id) not in processed_products
+                ]
                 prices = [float(p.price) for p in group_products]
                 
                 grouped_results[group_key] = {
@@ -316,7 +371,7 @@ class ProductAggregationService:
                 
                 # Mark all products in this group as processed
                 for p in group_products:
-                    processed_products.add(p.id)
+                    processed_products[str(p.id)] = p.price
         
         # Convert to list and sort by relevance
         results = list(grouped_results.values())
@@ -324,63 +379,90 @@ class ProductAggregationService:
         # Sort by best price and store count
         results.sort(key=lambda x: (x['best_price'], -x['stores_count']))
         
-        return results
+        page = {
+            'results': results,
+            'next_cursor': next_cursor,
+            'has_next': next_cursor is not None,
+            'total_products': None,
+            'total_is_exact': None
+        }
+        if include_total:
+            total = approximate_count(products)
+            page['total_products'] = total['count']
+            page['total_is_exact'] = total['is_exact']
+        
+        return page
+
+    @staticmethod
+    def _encode_search_cursor(keyset_cursor: str, grouped: Dict[str, Decimal]) -> str:
+        """
+        Encode a keyset position and the grouped products (id -> price) still ahead of it.
+        """
+        payload = json.dumps(
+            {'after': keyset_cursor, 'grouped': {product_id: str(price) for product_id, price in sorted(grouped.items())}},
+            separators=(',', ':')
+        )
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def _decode_search_cursor(cursor: str = None) -> Tuple[Optional[str], Dict[str, Decimal]]:
+        """
+        Decode a unified search cursor into its keyset cursor and grouped products (id -> price).
+        """
+        if not cursor:
+            return None, {}
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+            grouped = {str(product_id): Decimal(price) for product_id, price in payload['grouped'].items()}
+            return payload['after'], grouped
+        except (ValueError, UnicodeError, KeyError, TypeError, AttributeError, InvalidOperation) as e:
+            raise InvalidCursor(f'Malformed cursor: {e}')
+
+    @staticmethod
+    def _iter_keyset(paginator: KeysetPaginator, cursor: str = None):
+        """
+        Yield products page by page from a keyset paginator.
+        """
+        while True:
+            page = paginator.paginate(cursor=cursor)
+            yield from page.items
+            if not page.has_next:
+                return
+            cursor = page.next_cursor
     
     @staticmethod
     def get_category_aggregation(category_id: str) -> Dict:
         """
         Get aggregated data for all products in a category across stores.
         """
-        try:
-            category = Category.objects.get(id=category_id)
-        except Category.DoesNotExist:
+        from .category_stats import category_statistics_service
+
+        if not Category.objects.filter(id=category_id).exists():
             return None
-        
-        products = Product.objects.filter(
-            category=category,
-            is_active=True
-        ).select_related('shop', 'brand')
-        
-        # Group by store
-        store_stats = {}
-        for product in products:
-            shop_id = str(product.shop.id)
-            if shop_id not in store_stats:
-                store_stats[shop_id] = {
-                    'shop_name': product.shop.name,
-                    'product_count': 0,
-                    'avg_price': 0,
-                    'min_price': float('inf'),
-                    'max_price': 0,
-                    'total_price': 0,
-                    'reliability_score': float(product.shop.reliability_score)
-                }
-            
-            stats = store_stats[shop_id]
-            stats['product_count'] += 1
-            stats['total_price'] += float(product.price)
-            stats['min_price'] = min(stats['min_price'], float(product.price))
-            stats['max_price'] = max(stats['max_price'], float(product.price))
-        
-        # Calculate averages
-        for stats in store_stats.values():
-            if stats['product_count'] > 0:
-                stats['avg_price'] = stats['total_price'] / stats['product_count']
-                if stats['min_price'] == float('inf'):
-                    stats['min_price'] = 0
-        
+
+        # Read the materialised statistics row instead of scanning the category
+        stats = category_statistics_service.get_statistics(category_id)
+        if stats is None:
+            return None
+
+        category = stats.category
+        store_breakdown = stats.store_breakdown
+
         return {
             'category': {
                 'id': str(category.id),
                 'name': category.name,
                 'description': category.description
             },
-            'total_products': products.count(),
-            'total_stores': len(store_stats),
-            'store_breakdown': list(store_stats.values()),
+            'total_products': stats.product_count,
+            'total_stores': stats.shop_count,
+            'store_breakdown': store_breakdown,
             'overall_price_range': {
-                'min': min([s['min_price'] for s in store_stats.values()]) if store_stats else 0,
-                'max': max([s['max_price'] for s in store_stats.values()]) if store_stats else 0,
-                'average': sum([s['avg_price'] for s in store_stats.values()]) / len(store_stats) if store_stats else 0
-            }
+                'min': min([s['min_price'] for s in store_breakdown]) if store_breakdown else 0,
+                'max': max([s['max_price'] for s in store_breakdown]) if store_breakdown else 0,
+                'average': sum([s['avg_price'] for s in store_breakdown]) / len(store_breakdown) if store_breakdown else 0
+            },
+            'price_quantiles': stats.price_quantiles,
+            'brand_distribution': stats.brand_distribution,
+            'as_of': stats.updated_at.isoformat()
         }
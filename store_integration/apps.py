@@ -5,3 +5,7 @@ class StoreIntegrationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'store_integration'
     verbose_name = 'Store Integration'
+
+    def ready(self):
+        # Import signals to ensure they are registered
+        from . import signals  # noqa: F401
@@ -0,0 +1,258 @@
+"""
+store_integration/category_stats.py
+-----------------------------------
+Materialiser for per-category product statistics (counts, price quantiles,
+shop coverage and brand distribution).
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum, Min, Max
+from django.utils import timezone
+
+from core.models import Product, Category
+from .models import CategoryStatistics, DirtyCategoryStatistics
+
+logger = logging.getLogger(__name__)
+
+
+class CategoryStatisticsService:
+    """
+    Service that keeps ``CategoryStatistics`` rows in step with the catalogue.
+
+    Product changes queue their categories in ``DirtyCategoryStatistics``
+    when the transaction commits (one upsert per commit), and the periodic
+    ``refresh_dirty_category_statistics`` task recomputes each queued
+    category once. During a store sync, refreshes are deferred and applied
+    once per category when the sync finishes.
+    """
+
+    QUANTILES = (10, 25, 50, 75, 90)
+
+    def __init__(self):
+        self.batch_size = getattr(settings, 'CATEGORY_STATS_BATCH_SIZE', 200)
+        self._local = threading.local()
+
+    @contextmanager
+    def deferred(self):
+        """
+        Collect dirty categories inside the block and refresh them once on exit.
+        """
+        pending = getattr(self._local, 'pending', None)
+        if pending is not None:
+            # Nested block: the outermost one does the refresh
+            yield
+            return
+
+        self._local.pending = set()
+        try:
+            yield
+        finally:
+            dirty = self._local.pending
+            self._local.pending = None
+            if dirty:
+                self.refresh_categories(dirty)
+
+    def mark_dirty(self, category_id):
+        """
+        Queue a category for refresh after the current transaction commits.
+        """
+        if not category_id:
+            return
+
+        pending = getattr(self._local, 'pending', None)
+        if pending is not None:
+            pending.add(category_id)
+            return
+
+        # Every save registers a callback, but each commit writes the queue once
+        queued = self._queued()
+        queued.add(category_id)
+        transaction.on_commit(self._write_queued)
+
+    def _queued(self) -> set:
+        queued = getattr(self._local, 'queued', None)
+        if queued is None:
+            queued = self._local.queued = set()
+        return queued
+
+    def _write_queued(self):
+        queued = self._queued()
+        if not queued:
+            return
+        category_ids = set(queued)
+        queued.clear()
+        now = timezone.now()
+        DirtyCategoryStatistics.objects.bulk_create(
+            [
+                DirtyCategoryStatistics(category_id=category_id, marked_at=now)
+                for category_id in Category.objects.filter(id__in=category_ids).values_list('id', flat=True)
+            ],
+            update_conflicts=True,
+            unique_fields=['category'],
+            update_fields=['marked_at']
+        )
+
+    def pending_count(self) -> int:
+        return DirtyCategoryStatistics.objects.count()
+
+    def refresh_dirty(self, batch_size: int = None) -> int:
+        """
+        Refresh queued categories and clear their marks; returns the number refreshed.
+        """
+        batch_size = batch_size or self.batch_size
+        refreshed = 0
+        while True:
+            claimed_at = timezone.now()
+            category_ids = list(
+                DirtyCategoryStatistics.objects.order_by('marked_at')
+                .values_list('category_id', flat=True)[:batch_size]
+            )
+            if not category_ids:
+                break
+            refreshed += self.refresh_categories(category_ids)
+            # Categories marked again while being refreshed stay queued
+            DirtyCategoryStatistics.objects.filter(
+                category_id__in=category_ids, marked_at__lte=claimed_at
+            ).delete()
+            if len(category_ids) < batch_size:
+                break
+        return refreshed
+
+    def refresh_categories(self, category_ids: Iterable) -> int:
+        """
+        Refresh statistics for several categories.
+        """
+        refreshed = 0
+        for category_id in set(category_ids):
+            if self.refresh_category(category_id):
+                refreshed += 1
+        return refreshed
+
+    def refresh_all(self) -> int:
+        """
+        Rebuild statistics for every category.
+        """
+        return self.refresh_categories(Category.objects.values_list('id', flat=True))
+
+    def refresh_category(self, category_id) -> Optional[CategoryStatistics]:
+        """
+        Recompute the statistics row for a single category.
+        """
+        try:
+            category = Category.objects.get(id=category_id)
+        except Category.DoesNotExist:
+            CategoryStatistics.objects.filter(category_id=category_id).delete()
+            return None
+
+        try:
+            values = self._compute(category)
+            stats, _ = CategoryStatistics.objects.update_or_create(
+                category=category,
+                defaults=values
+            )
+            return stats
+        except Exception as e:
+            logger.error(f"Error refreshing statistics for category {category_id}: {e}")
+            return None
+
+    def get_statistics(self, category_id) -> Optional[CategoryStatistics]:
+        """
+        Return the statistics row for a category, materialising it if missing.
+        """
+        stats = CategoryStatistics.objects.select_related('category').filter(
+            category_id=category_id
+        ).first()
+        if stats is None:
+            stats = self.refresh_category(category_id)
+        return stats
+
+    def _compute(self, category: Category) -> Dict:
+        """
+        Compute statistics for a category from grouped aggregate queries.
+        """
+        products = Product.objects.filter(category=category, is_active=True)
+
+        prices = np.array(
+            products.values_list('price', flat=True),
+            dtype=float
+        )
+
+        shop_rows = products.values(
+            'shop_id', 'shop__name', 'shop__reliability_score'
+        ).annotate(
+            product_count=Count('id'),
+            total_price=Sum('price'),
+            min_price=Min('price'),
+            max_price=Max('price')
+        ).order_by('-product_count')
+
+        brand_rows = products.filter(brand__isnull=False).values(
+            'brand_id', 'brand__name'
+        ).annotate(
+            product_count=Count('id')
+        ).order_by('-product_count')
+
+        store_breakdown = []
+        for row in shop_rows:
+            total_price = float(row['total_price'] or 0)
+            store_breakdown.append({
+                'shop_id': str(row['shop_id']),
+                'shop_name': row['shop__name'],
+                'product_count': row['product_count'],
+                'avg_price': total_price / row['product_count'] if row['product_count'] else 0,
+                'min_price': float(row['min_price'] or 0),
+                'max_price': float(row['max_price'] or 0),
+                'total_price': total_price,
+                'reliability_score': float(row['shop__reliability_score'] or 0)
+            })
+
+        brand_distribution = [
+            {
+                'brand_id': str(row['brand_id']),
+                'brand_name': row['brand__name'],
+                'product_count': row['product_count'],
+                'share': row['product_count'] / len(prices) if len(prices) else 0
+            }
+            for row in brand_rows
+        ]
+
+        if len(prices):
+            quantiles = np.percentile(prices, self.QUANTILES)
+            price_quantiles = {
+                f'p{q}': round(float(value), 2)
+                for q, value in zip(self.QUANTILES, quantiles)
+            }
+            min_price = self._to_decimal(prices.min())
+            max_price = self._to_decimal(prices.max())
+            avg_price = self._to_decimal(prices.mean())
+        else:
+            price_quantiles = {}
+            min_price = max_price = avg_price = None
+
+        return {
+            'product_count': len(prices),
+            'shop_count': len(store_breakdown),
+            'brand_count': len(brand_distribution),
+            'min_price': min_price,
+            'max_price': max_price,
+            'avg_price': avg_price,
+            'price_quantiles': price_quantiles,
+            'store_breakdown': store_breakdown,
+            'brand_distribution': brand_distribution
+        }
+
+    @staticmethod
+    def _to_decimal(value: float) -> Decimal:
+        return Decimal(str(round(float(value), 2)))
+
+
+# Create singleton instance
+category_statistics_service = CategoryStatisticsService()
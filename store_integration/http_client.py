@@ -0,0 +1,288 @@
+"""
+store_integration/http_client.py
+--------------------------------
+Shared HTTP layer for store integrations: per-store keep-alive connection
+pools, bounded concurrency, platform rate limits and retries with jittered
+backoff, with a thread-based async variant.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+# platform -> rate limiter settings
+DEFAULT_RATE_LIMITS = {
+    # Shopify REST Admin API: bucket of 40 calls leaking 2 calls per second
+    'shopify': {'type': 'leaky_bucket', 'capacity': 40, 'leak_rate': 2.0},
+    # WooCommerce has no built-in limit; stay polite towards shared hosting
+    'woocommerce': {'type': 'token_bucket', 'rate': 5.0, 'burst': 10},
+    'magento': {'type': 'token_bucket', 'rate': 10.0, 'burst': 20},
+}
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class StoreHTTPError(Exception):
+    """Raised when a store API request keeps failing after all retries."""
+
+
+class TokenBucket:
+    """
+    Token bucket allowing ``rate`` requests per second with bursts up to ``burst``.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token, returning how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def update_from_response(self, response):
+        pass
+
+
+class LeakyBucket(TokenBucket):
+    """
+    Shopify-style leaky bucket that also syncs with the
+    ``X-Shopify-Shop-Api-Call-Limit`` header (``used/capacity``).
+    """
+
+    def __init__(self, capacity: int, leak_rate: float):
+        super().__init__(rate=leak_rate, burst=capacity)
+
+    def update_from_response(self, response):
+        header = response.headers.get('X-Shopify-Shop-Api-Call-Limit')
+        if not header:
+            return
+        try:
+            used, capacity = (int(part) for part in header.split('/'))
+        except ValueError:
+            return
+        with self._lock:
+            self.capacity = capacity
+            self.tokens = min(self.tokens, float(capacity - used))
+            self.updated_at = time.monotonic()
+
+
+def build_rate_limiter(platform: str):
+    limits = getattr(settings, 'STORE_HTTP_RATE_LIMITS', {}).get(
+        platform, DEFAULT_RATE_LIMITS.get(platform)
+    )
+    if not limits:
+        return None
+    if limits['type'] == 'leaky_bucket':
+        return LeakyBucket(limits['capacity'], limits['leak_rate'])
+    return TokenBucket(limits['rate'], limits['burst'])
+
+
+class StoreHTTPClient:
+    """
+    HTTP client bound to one store.
+
+    Requests share a keep-alive ``requests.Session`` whose pool holds
+    ``max_concurrency`` connections, a semaphore caps in-flight requests, and
+    every request passes the store's rate limiter. Connection errors, 429 and
+    5xx responses are retried with full-jitter exponential backoff, honouring
+    ``Retry-After`` when the store sends it.
+    """
+
+    def __init__(self, base_url: str = '', headers: Dict = None, rate_limiter=None,
+                 max_concurrency: int = None, timeout: float = None,
+                 max_retries: int = None, backoff_base: float = None,
+                 backoff_max: float = None):
+        self.base_url = base_url.rstrip('/')
+        self.rate_limiter = rate_limiter
+        self.max_concurrency = max_concurrency or getattr(settings, 'STORE_HTTP_MAX_CONCURRENCY', 8)
+        self.timeout = timeout or getattr(settings, 'STORE_HTTP_TIMEOUT', 30)
+        self.max_retries = max_retries if max_retries is not None else getattr(settings, 'STORE_HTTP_MAX_RETRIES', 3)
+        self.backoff_base = backoff_base if backoff_base is not None else getattr(settings, 'STORE_HTTP_BACKOFF_BASE', 0.5)
+        self.backoff_max = backoff_max if backoff_max is not None else getattr(settings, 'STORE_HTTP_BACKOFF_MAX', 30)
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+    def url(self, path: str) -> str:
+        if path.startswith(('http://', 'https://')):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Send a request, retrying transient failures.
+
+        Returns the final response; non-retryable error statuses are returned
+        as-is so callers can keep their existing status handling.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        url = self.url(path)
+
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            try:
+                with self._semaphore:
+                    response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise StoreHTTPError(f"{method} {url} failed: {e}") from e
+                delay = self._backoff(attempt)
+                logger.warning(f"{method} {url} failed ({e}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+
+            if self.rate_limiter:
+                self.rate_limiter.update_from_response(response)
+
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                return response
+
+            delay = self._retry_after(response) or self._backoff(attempt)
+            logger.warning(f"{method} {url} returned {response.status_code}, retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+        return response
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request('POST', path, **kwargs)
+
+    def map(self, func: Callable, items: Iterable) -> List:
+        """
+        Call ``func(item)`` concurrently for every item, bounded by the
+        client's concurrency. Results keep the input order; a failed call
+        yields its exception instead of a result.
+        """
+        items = list(items)
+        if not items:
+            return []
+
+        def call(item):
+            try:
+                return func(item)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(items))) as executor:
+            return list(executor.map(call, items))
+
+    def close(self):
+        self.session.close()
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform between 0 and the exponential ceiling
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _retry_after(self, response) -> Optional[float]:
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                delay = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+        return max(0.0, min(delay, self.backoff_max))
+
+
+class AsyncStoreHTTPClient:
+    """
+    Async variant of ``StoreHTTPClient``.
+
+    Requests run on the wrapped client's pooled session in worker threads, so
+    coroutines can fan out many calls while sharing the same keep-alive pool,
+    concurrency limit and rate limiter.
+    """
+
+    def __init__(self, client: StoreHTTPClient):
+        self.client = client
+        self._semaphore = None
+
+    async def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.client.max_concurrency)
+        async with self._semaphore:
+            return await asyncio.to_thread(self.client.request, method, path, **kwargs)
+
+    async def get(self, path: str, **kwargs) -> requests.Response:
+        return await self.request('GET', path, **kwargs)
+
+    async def post(self, path: str, **kwargs) -> requests.Response:
+        return await self.request('POST', path, **kwargs)
+
+    async def gather(self, coroutines: Iterable) -> List:
+        return await asyncio.gather(*coroutines, return_exceptions=True)
+
+
+_clients: Dict[str, StoreHTTPClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_store_client(config) -> StoreHTTPClient:
+    """
+    Return the shared client (and connection pool) for an integration config.
+    """
+    key = str(config.id)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None or client.base_url != config.store_url.rstrip('/'):
+            if client is not None:
+                client.close()
+            client = StoreHTTPClient(
+                base_url=config.store_url,
+                rate_limiter=build_rate_limiter(config.platform)
+            )
+            _clients[key] = client
+        return client
+
+
+def close_store_clients():
+    """
+    Close every pooled store client.
+    """
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
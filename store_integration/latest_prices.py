@@ -0,0 +1,124 @@
+"""
+store_integration/latest_prices.py
+----------------------------------
+Maintains and reads the ``LatestPrice`` table (current price per product and shop).
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+
+from core.rating_tracker import product_rating_tracker
+
+from .models import LatestPrice, PriceHistory
+
+logger = logging.getLogger(__name__)
+
+
+class LatestPriceService:
+    """
+    Service that records price history together with the latest price rows.
+
+    Writers go through ``record`` so the ``PriceHistory`` insert and the
+    ``LatestPrice`` upsert share one transaction; an observation older than
+    the stored latest price leaves it unchanged. Bulk inserts skip the
+    ``PriceHistory`` post_save receiver, so ``record`` marks the products
+    for re-rating itself once the transaction commits. Readers get the current
+    price per shop with one indexed lookup, or for many products with a
+    single ``IN`` query.
+    """
+
+    UPDATE_FIELDS = ['price', 'original_price', 'currency', 'is_available', 'stock_quantity', 'recorded_at']
+
+    def __init__(self):
+        self.batch_size = getattr(settings, 'LATEST_PRICE_BATCH_SIZE', 500)
+
+    def record(self, history: Iterable[PriceHistory]) -> List[PriceHistory]:
+        """
+        Insert price history rows and upsert the matching latest prices.
+        """
+        history = list(history)
+        if not history:
+            return history
+        with transaction.atomic():
+            PriceHistory.objects.bulk_create(history, batch_size=self.batch_size)
+            self.upsert(history)
+            product_rating_tracker.mark({record.product_id for record in history}, 'price')
+        return history
+
+    def upsert(self, history: Iterable[PriceHistory]):
+        """
+        Make the given (already saved) history rows the latest prices of their product and shop.
+        """
+        latest = {}
+        for record in history:
+            key = (record.product_id, record.shop_id)
+            current = latest.get(key)
+            if current is None or record.recorded_at >= current.recorded_at:
+                latest[key] = LatestPrice(
+                    product_id=record.product_id,
+                    shop_id=record.shop_id,
+                    price=record.price,
+                    original_price=record.original_price,
+                    currency=record.currency,
+                    is_available=record.is_available,
+                    stock_quantity=record.stock_quantity,
+                    recorded_at=record.recorded_at,
+                )
+        if not latest:
+            return
+
+        with transaction.atomic():
+            # Observations older than the stored latest price arrive late and must not replace it
+            stored = LatestPrice.objects.select_for_update().filter(
+                product_id__in={product_id for product_id, _ in latest},
+                shop_id__in={shop_id for _, shop_id in latest}
+            ).values_list('product_id', 'shop_id', 'recorded_at')
+            for product_id, shop_id, recorded_at in stored:
+                current = latest.get((product_id, shop_id))
+                if current is not None and current.recorded_at < recorded_at:
+                    del latest[(product_id, shop_id)]
+
+            LatestPrice.objects.bulk_create(
+                list(latest.values()),
+                update_conflicts=True,
+                unique_fields=['product', 'shop'],
+                update_fields=self.UPDATE_FIELDS,
+                batch_size=self.batch_size
+            )
+
+    def get(self, product_id, shop_id) -> Optional[LatestPrice]:
+        return LatestPrice.objects.filter(product_id=product_id, shop_id=shop_id).first()
+
+    def for_product(self, product_id, exclude_shop_id=None):
+        """
+        Latest price of a product in every shop, with shops loaded.
+        """
+        queryset = LatestPrice.objects.filter(product_id=product_id).select_related('shop')
+        if exclude_shop_id is not None:
+            queryset = queryset.exclude(shop_id=exclude_shop_id)
+        return queryset
+
+    def for_products(self, product_ids: Iterable) -> Dict:
+        """
+        Latest prices of many products in every shop, keyed by product id.
+        """
+        prices = {}
+        for latest in LatestPrice.objects.filter(product_id__in=list(product_ids)).select_related('shop'):
+            prices.setdefault(latest.product_id, []).append(latest)
+        return prices
+
+    def in_shop(self, product_ids: Iterable, shop_id) -> Dict:
+        """
+        Latest price of many products in one shop, keyed by product id.
+        """
+        return {
+            latest.product_id: latest
+            for latest in LatestPrice.objects.filter(product_id__in=list(product_ids), shop_id=shop_id)
+        }
+
+
+# Create singleton instance
+latest_price_service = LatestPriceService()
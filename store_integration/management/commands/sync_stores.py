@@ -4,8 +4,8 @@ Management command to synchronize all store integrations.
 
 from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
-from store_integration.services import StoreIntegrationService
 from store_integration.models import StoreIntegrationConfig
+from store_integration.scheduler import store_sync_scheduler
 import logging
 
 logger = logging.getLogger(__name__)
@@ -31,6 +31,16 @@ class Command(BaseCommand):
             action='store_true',
             help='Perform full synchronization instead of incremental',
         )
+        parser.add_argument(
+            '--due-only',
+            action='store_true',
+            help='Skip stores that are not yet due according to their sync frequency',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Number of stores to sync concurrently',
+        )
         parser.add_argument(
             '--dry-run',
             action='store_true',
@@ -43,7 +53,7 @@ class Command(BaseCommand):
         )
 
         # Build queryset based on options
-        configs = StoreIntegrationConfig.objects.filter(is_active=True)
+        configs = StoreIntegrationConfig.objects.filter(is_active=True).select_related('shop')
         
         if options['shop_id']:
             configs = configs.filter(shop_id=options['shop_id'])
@@ -55,52 +65,56 @@ class Command(BaseCommand):
             if not configs.exists():
                 raise CommandError(f'No active integrations found for platform {options["platform"]}')
 
+        configs = store_sync_scheduler.prioritise(configs, due_only=options['due_only'])
+
         if options['dry_run']:
             self.stdout.write(
-                self.style.WARNING(f'DRY RUN: Would sync {configs.count()} store configurations:')
+                self.style.WARNING(f'DRY RUN: Would sync {len(configs)} store configurations:')
             )
             for config in configs:
                 self.stdout.write(f'  - {config.shop.name} ({config.get_platform_display()})')
             return
 
-        # Perform synchronization
-        total_configs = configs.count()
-        successful_syncs = 0
-        failed_syncs = 0
+        # Perform synchronization; stores run concurrently, most stale first
+        total_configs = len(configs)
+        counts = {'done': 0, 'successful': 0, 'failed': 0}
 
-        for i, config in enumerate(configs, 1):
+        def report(config, result):
+            counts['done'] += 1
             self.stdout.write(
-                f'[{i}/{total_configs}] Syncing {config.shop.name} ({config.get_platform_display()})...'
+                f'[{counts["done"]}/{total_configs}] {config.shop.name} ({config.get_platform_display()})'
             )
-            
-            try:
-                integration = StoreIntegrationService.get_integration(config)
-                result = integration.sync_products(full_sync=options['full_sync'])
-                
-                if result['success']:
-                    successful_syncs += 1
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f'  ✓ Success: {result["processed"]} processed, '
-                            f'{result["created"]} created, {result["updated"]} updated'
-                        )
+
+            if result['success']:
+                counts['successful'] += 1
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f'  ✓ Success: {result["processed"]} processed, '
+                        f'{result["created"]} created, {result["updated"]} updated'
                     )
-                    if result.get('errors', 0) > 0:
-                        self.stdout.write(
-                            self.style.WARNING(f'  ⚠ {result["errors"]} errors occurred')
-                        )
-                else:
-                    failed_syncs += 1
+                )
+                if result.get('errors', 0) > 0:
                     self.stdout.write(
-                        self.style.ERROR(f'  ✗ Failed: {result.get("error", "Unknown error")}')
+                        self.style.WARNING(f'  ⚠ {result["errors"]} errors occurred')
                     )
-                    
-            except Exception as e:
-                failed_syncs += 1
+            elif result.get('skipped'):
                 self.stdout.write(
-                    self.style.ERROR(f'  ✗ Exception: {str(e)}')
+                    self.style.WARNING(f'  - Skipped: {result["error"]}')
                 )
-                logger.error(f'Sync failed for {config.shop.name}: {e}', exc_info=True)
+            else:
+                counts['failed'] += 1
+                self.stdout.write(
+                    self.style.ERROR(f'  ✗ Failed: {result.get("error", "Unknown error")}')
+                )
+
+        store_sync_scheduler.run(
+            configs,
+            full_sync=options['full_sync'],
+            max_workers=options['workers'],
+            on_complete=report
+        )
+        successful_syncs = counts['successful']
+        failed_syncs = counts['failed']
 
         # Summary
         self.stdout.write('\n' + '='*50)
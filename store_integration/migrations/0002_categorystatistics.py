@@ -0,0 +1,37 @@
+# Generated by Django 5.1 on 2026-10-19 05:59
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_shop_api_endpoint_shop_average_delivery_days_and_more'),
+        ('store_integration', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryStatistics',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('product_count', models.PositiveIntegerField(default=0, verbose_name='Active Products')),
+                ('shop_count', models.PositiveIntegerField(default=0, verbose_name='Shops Covering Category')),
+                ('brand_count', models.PositiveIntegerField(default=0, verbose_name='Brands In Category')),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Minimum Price')),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Maximum Price')),
+                ('avg_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Average Price')),
+                ('price_quantiles', models.JSONField(blank=True, default=dict, help_text='Price percentiles (p10, p25, p50, p75, p90)', verbose_name='Price Quantiles')),
+                ('store_breakdown', models.JSONField(blank=True, default=list, help_text='Per-shop product counts and price statistics', verbose_name='Store Breakdown')),
+                ('brand_distribution', models.JSONField(blank=True, default=list, help_text='Per-brand product counts', verbose_name='Brand Distribution')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='core.category')),
+            ],
+            options={
+                'verbose_name_plural': 'Category statistics',
+                'indexes': [models.Index(fields=['-product_count'], name='store_integ_product_83872c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1 on 2026-10-19 06:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store_integration', '0002_categorystatistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productmapping',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='Hash of the last synced external payload', max_length=64, null=True, verbose_name='Content Hash'),
+        ),
+        migrations.AddField(
+            model_name='storeintegrationconfig',
+            name='sync_watermark',
+            field=models.JSONField(blank=True, default=dict, help_text='High-water mark of the last successful sync (updated_at, ETag, Last-Modified)', verbose_name='Sync Watermark'),
+        ),
+    ]
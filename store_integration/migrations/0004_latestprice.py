@@ -0,0 +1,63 @@
+# Generated by Django 5.1 on 2026-10-19 06:23
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+from django.db.models.functions import RowNumber
+
+
+def populate_latest_prices(apps, schema_editor):
+    PriceHistory = apps.get_model('store_integration', 'PriceHistory')
+    LatestPrice = apps.get_model('store_integration', 'LatestPrice')
+
+    latest = PriceHistory.objects.annotate(
+        row_number=models.Window(
+            RowNumber(),
+            partition_by=[models.F('product_id'), models.F('shop_id')],
+            order_by=models.F('recorded_at').desc()
+        )
+    ).filter(row_number=1)
+
+    LatestPrice.objects.bulk_create([
+        LatestPrice(
+            product_id=record.product_id,
+            shop_id=record.shop_id,
+            price=record.price,
+            original_price=record.original_price,
+            currency=record.currency,
+            is_available=record.is_available,
+            stock_quantity=record.stock_quantity,
+            recorded_at=record.recorded_at,
+        )
+        for record in latest.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_shop_api_endpoint_shop_average_delivery_days_and_more'),
+        ('store_integration', '0003_sync_watermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatestPrice',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Price')),
+                ('original_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Original Price')),
+                ('currency', models.CharField(default='USD', max_length=3, verbose_name='Currency')),
+                ('is_available', models.BooleanField(default=True, verbose_name='Is Available')),
+                ('stock_quantity', models.PositiveIntegerField(blank=True, null=True, verbose_name='Stock Quantity')),
+                ('recorded_at', models.DateTimeField(verbose_name='Recorded At')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='latest_prices', to='core.product')),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='latest_prices', to='core.shop')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['shop', 'product'], name='store_integ_shop_id_cbcc48_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'shop'), name='unique_latest_price_product_shop')],
+            },
+        ),
+        migrations.RunPython(populate_latest_prices, migrations.RunPython.noop),
+    ]
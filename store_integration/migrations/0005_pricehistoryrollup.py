@@ -0,0 +1,38 @@
+# Generated by Django 5.1 on 2026-10-19 06:27
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_shop_api_endpoint_shop_average_delivery_days_and_more'),
+        ('store_integration', '0004_latestprice'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceHistoryRollup',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('resolution', models.CharField(choices=[('daily', 'Daily'), ('weekly', 'Weekly')], max_length=10, verbose_name='Resolution')),
+                ('period_start', models.DateTimeField(verbose_name='Period Start')),
+                ('open_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Open Price')),
+                ('high_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='High Price')),
+                ('low_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Low Price')),
+                ('close_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Close Price')),
+                ('currency', models.CharField(default='USD', max_length=3, verbose_name='Currency')),
+                ('sample_count', models.PositiveIntegerField(default=0, verbose_name='Sample Count')),
+                ('available_count', models.PositiveIntegerField(default=0, verbose_name='Available Count')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_rollups', to='core.product')),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_rollups', to='core.shop')),
+            ],
+            options={
+                'ordering': ['period_start'],
+                'indexes': [models.Index(fields=['product', 'resolution', 'period_start'], name='store_integ_product_195c3e_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'shop', 'resolution', 'period_start'), name='unique_price_rollup_period')],
+            },
+        ),
+    ]
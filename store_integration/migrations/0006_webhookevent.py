@@ -0,0 +1,37 @@
+# Generated by Django 5.1 on 2026-10-19 06:32
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store_integration', '0005_pricehistoryrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('topic', models.CharField(max_length=100, verbose_name='Topic')),
+                ('action', models.CharField(choices=[('upsert', 'Create or Update'), ('delete', 'Delete'), ('inventory', 'Inventory Update')], max_length=20, verbose_name='Action')),
+                ('external_product_id', models.CharField(blank=True, max_length=255, verbose_name='External Product ID')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Payload')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('processed', 'Processed'), ('superseded', 'Superseded'), ('failed', 'Failed')], default='pending', max_length=20, verbose_name='Status')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Attempts')),
+                ('claim_token', models.UUIDField(blank=True, null=True, verbose_name='Claim Token')),
+                ('claimed_at', models.DateTimeField(blank=True, null=True, verbose_name='Claimed At')),
+                ('error', models.TextField(blank=True, null=True, verbose_name='Error')),
+                ('received_at', models.DateTimeField(auto_now_add=True, verbose_name='Received At')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Processed At')),
+                ('integration_config', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='webhook_events', to='store_integration.storeintegrationconfig')),
+            ],
+            options={
+                'ordering': ['received_at'],
+                'indexes': [models.Index(fields=['status', 'received_at'], name='store_integ_status_9afa44_idx'), models.Index(fields=['integration_config', 'external_product_id'], name='store_integ_integra_a736de_idx')],
+            },
+        ),
+    ]
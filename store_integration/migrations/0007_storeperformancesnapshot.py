@@ -0,0 +1,36 @@
+# Generated by Django 5.1 on 2026-10-19 06:38
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_shop_api_endpoint_shop_average_delivery_days_and_more'),
+        ('store_integration', '0006_webhookevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StorePerformanceSnapshot',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('period_days', models.PositiveIntegerField(default=30, verbose_name='Period (days)')),
+                ('overall_score', models.DecimalField(decimal_places=2, max_digits=4, verbose_name='Overall Score')),
+                ('component_scores', models.JSONField(blank=True, default=dict, verbose_name='Component Scores')),
+                ('detailed_metrics', models.JSONField(blank=True, default=dict, verbose_name='Detailed Metrics')),
+                ('trends', models.JSONField(blank=True, default=dict, verbose_name='Trends')),
+                ('insights', models.JSONField(blank=True, default=list, verbose_name='Insights')),
+                ('period_start', models.DateTimeField(verbose_name='Period Start')),
+                ('period_end', models.DateTimeField(verbose_name='Period End')),
+                ('calculated_at', models.DateTimeField(verbose_name='Calculated At')),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='performance_snapshots', to='core.shop')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period_days', 'calculated_at'], name='store_integ_period__a2918d_idx')],
+                'constraints': [models.UniqueConstraint(fields=('shop', 'period_days'), name='unique_performance_snapshot_period')],
+            },
+        ),
+    ]
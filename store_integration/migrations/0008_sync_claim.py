@@ -0,0 +1,23 @@
+# Generated by Django 5.1 on 2026-10-19 07:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store_integration', '0007_storeperformancesnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storeintegrationconfig',
+            name='sync_claim_token',
+            field=models.UUIDField(blank=True, null=True, verbose_name='Sync Claim Token'),
+        ),
+        migrations.AddField(
+            model_name='storeintegrationconfig',
+            name='sync_claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Sync Claimed At'),
+        ),
+    ]
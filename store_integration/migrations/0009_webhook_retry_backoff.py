@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-19 07:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store_integration', '0008_sync_claim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhookevent',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, help_text='Retried events are not claimed again before this time', null=True, verbose_name='Next Attempt At'),
+        ),
+    ]
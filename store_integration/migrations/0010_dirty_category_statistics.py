@@ -0,0 +1,28 @@
+# Generated by Django 5.1 on 2026-10-19 07:51
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_dirtyproductrating'),
+        ('store_integration', '0009_webhook_retry_backoff'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtyCategoryStatistics',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('marked_at', models.DateTimeField(db_index=True, verbose_name='Marked At')),
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistics_dirty_mark', to='core.category')),
+            ],
+            options={
+                'verbose_name': 'Dirty Category Statistics',
+                'verbose_name_plural': 'Dirty Category Statistics',
+            },
+        ),
+    ]
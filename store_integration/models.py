@@ -6,7 +6,7 @@ Models for multi-store integration and synchronization.
 
 from django.db import models
 from django.conf import settings
-from core.models import Shop, Product
+from core.models import Shop, Product, Category
 import uuid
 from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal
@@ -103,6 +103,22 @@ class StoreIntegrationConfig(models.Model):
         blank=True,
         verbose_name="Additional Configuration"
     )
+    sync_watermark = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="Sync Watermark",
+        help_text="High-water mark of the last successful sync (updated_at, ETag, Last-Modified)"
+    )
+    sync_claim_token = models.UUIDField(
+        null=True,
+        blank=True,
+        verbose_name="Sync Claim Token"
+    )
+    sync_claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Sync Claimed At"
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name="Created At"
@@ -150,6 +166,13 @@ class ProductMapping(models.Model):
         null=True,
         verbose_name="External Product URL"
     )
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        null=True,
+        verbose_name="Content Hash",
+        help_text="Hash of the last synced external payload"
+    )
     is_active = models.BooleanField(
         default=True,
         verbose_name="Is Active"
@@ -248,6 +271,162 @@ class PriceHistory(models.Model):
         return f"{self.product.name} - {self.shop.name}: ${self.price}"
 
 
+class LatestPrice(models.Model):
+    """
+    Most recent recorded price of a product in a shop.
+
+    One row per (product, shop), upserted in the same transaction as every
+    ``PriceHistory`` insert, so "current price per shop" is a single indexed
+    lookup instead of a scan of the history.
+    """
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='latest_prices'
+    )
+    shop = models.ForeignKey(
+        Shop,
+        on_delete=models.CASCADE,
+        related_name='latest_prices'
+    )
+    price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name="Price"
+    )
+    original_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name="Original Price"
+    )
+    currency = models.CharField(
+        max_length=3,
+        default='USD',
+        verbose_name="Currency"
+    )
+    is_available = models.BooleanField(
+        default=True,
+        verbose_name="Is Available"
+    )
+    stock_quantity = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Stock Quantity"
+    )
+    recorded_at = models.DateTimeField(
+        verbose_name="Recorded At"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'shop'], name='unique_latest_price_product_shop'),
+        ]
+        indexes = [
+            models.Index(fields=['shop', 'product']),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} - {self.shop.name}: ${self.price}"
+
+
+class PriceHistoryRollup(models.Model):
+    """
+    Downsampled price history of a product in a shop.
+
+    Raw ``PriceHistory`` points older than the raw retention window are
+    compacted into one daily OHLC row per (product, shop, day), and daily rows
+    older than the daily window into weekly rows, so long-term trends survive
+    without keeping every point.
+    """
+    RESOLUTION_CHOICES = (
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+    )
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='price_rollups'
+    )
+    shop = models.ForeignKey(
+        Shop,
+        on_delete=models.CASCADE,
+        related_name='price_rollups'
+    )
+    resolution = models.CharField(
+        max_length=10,
+        choices=RESOLUTION_CHOICES,
+        verbose_name="Resolution"
+    )
+    period_start = models.DateTimeField(
+        verbose_name="Period Start"
+    )
+    open_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name="Open Price"
+    )
+    high_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name="High Price"
+    )
+    low_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name="Low Price"
+    )
+    close_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name="Close Price"
+    )
+    currency = models.CharField(
+        max_length=3,
+        default='USD',
+        verbose_name="Currency"
+    )
+    sample_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Sample Count"
+    )
+    available_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Available Count"
+    )
+
+    class Meta:
+        ordering = ['period_start']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product', 'shop', 'resolution', 'period_start'],
+                name='unique_price_rollup_period'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'resolution', 'period_start']),
+        ]
+
+    @property
+    def availability_ratio(self) -> float:
+        return self.available_count / self.sample_count if self.sample_count else 0.0
+
+    def __str__(self):
+        return f"{self.product.name} - {self.shop.name} ({self.resolution} {self.period_start:%Y-%m-%d})"
+
+
 class SyncLog(models.Model):
     """
     Logs synchronization activities for monitoring and debugging.
@@ -328,3 +507,286 @@ class SyncLog(models.Model):
 
     def __str__(self):
         return f"{self.integration_config.shop.name} - {self.get_sync_type_display()} ({self.status})"
+
+
+class WebhookEvent(models.Model):
+    """
+    Received store webhook waiting to be applied.
+
+    Webhook endpoints only verify and enqueue; ``WebhookQueue`` drains the
+    table in batches, coalescing events for the same external product.
+    """
+    ACTION_CHOICES = (
+        ('upsert', 'Create or Update'),
+        ('delete', 'Delete'),
+        ('inventory', 'Inventory Update'),
+    )
+
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('processed', 'Processed'),
+        ('superseded', 'Superseded'),
+        ('failed', 'Failed'),
+    )
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    integration_config = models.ForeignKey(
+        StoreIntegrationConfig,
+        on_delete=models.CASCADE,
+        related_name='webhook_events'
+    )
+    topic = models.CharField(
+        max_length=100,
+        verbose_name="Topic"
+    )
+    action = models.CharField(
+        max_length=20,
+        choices=ACTION_CHOICES,
+        verbose_name="Action"
+    )
+    external_product_id = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name="External Product ID"
+    )
+    payload = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="Payload"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending',
+        verbose_name="Status"
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Attempts"
+    )
+    claim_token = models.UUIDField(
+        null=True,
+        blank=True,
+        verbose_name="Claim Token"
+    )
+    claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Claimed At"
+    )
+    next_attempt_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Next Attempt At",
+        help_text="Retried events are not claimed again before this time"
+    )
+    error = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name="Error"
+    )
+    received_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Received At"
+    )
+    processed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Processed At"
+    )
+
+    class Meta:
+        ordering = ['received_at']
+        indexes = [
+            models.Index(fields=['status', 'received_at']),
+            models.Index(fields=['integration_config', 'external_product_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} {self.external_product_id} ({self.status})"
+
+
+class CategoryStatistics(models.Model):
+    """
+    Materialised per-category product statistics.
+
+    Maintained by ``CategoryStatisticsService`` from the categories queued
+    when products change, or when a store sync finishes, so category pages and the home feed read one row per
+    category instead of aggregating the catalogue on every request.
+    """
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    category = models.OneToOneField(
+        Category,
+        on_delete=models.CASCADE,
+        related_name='statistics'
+    )
+    product_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Active Products"
+    )
+    shop_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Shops Covering Category"
+    )
+    brand_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Brands In Category"
+    )
+    min_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name="Minimum Price"
+    )
+    max_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name="Maximum Price"
+    )
+    avg_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name="Average Price"
+    )
+    price_quantiles = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="Price Quantiles",
+        help_text="Price percentiles (p10, p25, p50, p75, p90)"
+    )
+    store_breakdown = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name="Store Breakdown",
+        help_text="Per-shop product counts and price statistics"
+    )
+    brand_distribution = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name="Brand Distribution",
+        help_text="Per-brand product counts"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Updated At"
+    )
+
+    class Meta:
+        verbose_name_plural = "Category statistics"
+        indexes = [
+            models.Index(fields=['-product_count']),
+        ]
+
+    def __str__(self):
+        return f"{self.category.name}: {self.product_count} products"
+
+
+class DirtyCategoryStatistics(models.Model):
+    """
+    A category whose products changed since its statistics were refreshed.
+    One row per category; marking it again only moves ``marked_at``.
+    """
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    category = models.OneToOneField(
+        Category,
+        on_delete=models.CASCADE,
+        related_name='statistics_dirty_mark'
+    )
+    marked_at = models.DateTimeField(
+        db_index=True,
+        verbose_name="Marked At"
+    )
+
+    class Meta:
+        verbose_name = "Dirty Category Statistics"
+        verbose_name_plural = "Dirty Category Statistics"
+
+    def __str__(self):
+        return f"{self.category_id} ({self.marked_at})"
+
+
+class StorePerformanceSnapshot(models.Model):
+    """
+    Precomputed performance analytics of a shop for an analysis period.
+
+    Refreshed periodically by ``StorePerformanceSnapshotService`` so analytics
+    endpoints read one row per shop instead of scanning sync logs, reviews
+    and prices on every request.
+    """
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    shop = models.ForeignKey(
+        Shop,
+        on_delete=models.CASCADE,
+        related_name='performance_snapshots'
+    )
+    period_days = models.PositiveIntegerField(
+        default=30,
+        verbose_name="Period (days)"
+    )
+    overall_score = models.DecimalField(
+        max_digits=4,
+        decimal_places=2,
+        verbose_name="Overall Score"
+    )
+    component_scores = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="Component Scores"
+    )
+    detailed_metrics = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="Detailed Metrics"
+    )
+    trends = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="Trends"
+    )
+    insights = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name="Insights"
+    )
+    period_start = models.DateTimeField(
+        verbose_name="Period Start"
+    )
+    period_end = models.DateTimeField(
+        verbose_name="Period End"
+    )
+    calculated_at = models.DateTimeField(
+        verbose_name="Calculated At"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['shop', 'period_days'], name='unique_performance_snapshot_period'),
+        ]
+        indexes = [
+            models.Index(fields=['period_days', 'calculated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.shop.name} - {self.period_days}d ({self.overall_score})"
@@ -0,0 +1,522 @@
+"""
+store_integration/performance_engine.py
+---------------------------------------
+Batch store performance scoring over grouped queries.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from django.db.models import Avg, Count, F, Q
+from django.utils import timezone
+
+from core.models import Product, Shop
+from reviews.models import Review, StoreReview
+from .models import LatestPrice, PriceHistory, StoreIntegrationConfig, SyncLog
+
+logger = logging.getLogger(__name__)
+
+
+PERFORMANCE_WEIGHTS = {
+    'reliability_score': 0.25,      # Technical reliability
+    'customer_satisfaction': 0.30,  # Customer reviews and ratings
+    'delivery_performance': 0.20,   # Delivery speed and accuracy
+    'price_competitiveness': 0.15,  # Price comparison with competitors
+    'product_availability': 0.10    # Stock availability and consistency
+}
+
+COMPONENTS = list(PERFORMANCE_WEIGHTS)
+
+
+class StorePerformanceEngine:
+    """
+    Computes performance analytics for many shops at once.
+
+    Every input (sync logs, store and product reviews, prices, availability)
+    is read with one query grouped by shop covering both the current and the
+    previous period, so scoring N shops costs a constant number of queries.
+    Component scores are computed on NumPy arrays with one row per shop.
+    """
+
+    def __init__(self, weights: Dict = None):
+        self.weights = weights or PERFORMANCE_WEIGHTS
+
+    def compute(self, shop_ids: Iterable, days: int = 30, now=None) -> Dict:
+        """
+        Performance analytics keyed by shop id, in the
+        ``calculate_store_performance`` result format.
+        """
+        end_date = now or timezone.now()
+        start_date = end_date - timedelta(days=days)
+        previous_start = start_date - timedelta(days=days)
+
+        shops = list(Shop.objects.filter(id__in=list(shop_ids)))
+        if not shops:
+            return {}
+        ids = [shop.id for shop in shops]
+        current = Q(created_at__gte=start_date, created_at__lte=end_date)
+        previous = Q(created_at__gte=previous_start, created_at__lt=start_date)
+
+        integrated = set(
+            StoreIntegrationConfig.objects.filter(shop_id__in=ids, is_active=True).values_list('shop_id', flat=True)
+        )
+        syncs = self._sync_stats(ids, previous_start, start_date, end_date)
+        store_reviews = self._grouped(
+            StoreReview.objects.filter(shop_id__in=ids, created_at__gte=previous_start, created_at__lte=end_date),
+            'shop_id',
+            count=Count('id', filter=current),
+            avg_overall=Avg('overall_rating', filter=current),
+            avg_delivery=Avg('delivery_rating', filter=current),
+            avg_service=Avg('customer_service_rating', filter=current),
+            avg_quality=Avg('product_quality_rating', filter=current),
+            previous_count=Count('id', filter=previous),
+            previous_avg_overall=Avg('overall_rating', filter=previous),
+        )
+        product_reviews = self._grouped(
+            Review.objects.filter(
+                product__shop_id__in=ids, status='approved',
+                created_at__gte=previous_start, created_at__lte=end_date
+            ),
+            'product__shop_id',
+            count=Count('id', filter=current),
+            avg_rating=Avg('rating', filter=current),
+            positive=Count('id', filter=current & Q(sentiment_label='positive')),
+            previous_count=Count('id', filter=previous),
+            previous_avg_rating=Avg('rating', filter=previous),
+        )
+        active_products = dict(
+            Product.objects.filter(shop_id__in=ids, is_active=True)
+            .values('shop_id').annotate(count=Count('id')).values_list('shop_id', 'count')
+        )
+        availability = self._grouped(
+            PriceHistory.objects.filter(shop_id__in=ids, recorded_at__gte=start_date, recorded_at__lte=end_date),
+            'shop_id',
+            total=Count('id'),
+            available=Count('id', filter=Q(is_available=True)),
+            products=Count('product', distinct=True),
+            stocked=Count('product', distinct=True, filter=Q(stock_quantity__gt=0)),
+        )
+        prices = self._price_comparisons(ids, start_date, end_date)
+
+        components = {
+            'reliability': self._reliability(shops, integrated, syncs),
+            'customer_satisfaction': self._satisfaction(shops, store_reviews, product_reviews),
+            'delivery_performance': self._delivery(shops, store_reviews),
+            'price_competitiveness': self._price_competitiveness(shops, active_products, prices),
+            'product_availability': self._availability(shops, availability),
+        }
+        scores = np.column_stack([
+            [metrics['score'] for metrics in components[name]]
+            for name in ('reliability', 'customer_satisfaction', 'delivery_performance',
+                         'price_competitiveness', 'product_availability')
+        ])
+        overall = scores @ np.array([self.weights[component] for component in COMPONENTS])
+
+        calculated_at = timezone.now().isoformat()
+        results = {}
+        for i, shop in enumerate(shops):
+            component_scores = dict(zip(COMPONENTS, (float(score) for score in scores[i])))
+            results[str(shop.id)] = {
+                'success': True,
+                'shop_id': str(shop.id),
+                'shop_name': shop.name,
+                'analysis_period': {
+                    'start_date': start_date.isoformat(),
+                    'end_date': end_date.isoformat(),
+                    'days': days
+                },
+                'overall_score': round(float(overall[i]), 2),
+                'component_scores': {
+                    component: {
+                        'score': round(score, 2),
+                        'weight': self.weights[component],
+                        'weighted_contribution': round(score * self.weights[component], 2)
+                    }
+                    for component, score in component_scores.items()
+                },
+                'detailed_metrics': {
+                    'reliability': components['reliability'][i],
+                    'customer_satisfaction': components['customer_satisfaction'][i],
+                    'delivery_performance': components['delivery_performance'][i],
+                    'price_competitiveness': components['price_competitiveness'][i],
+                    'product_availability': components['product_availability'][i]
+                },
+                'performance_insights': self.insights(component_scores),
+                'trends': self._trends(
+                    syncs.get(shop.id, {}), store_reviews.get(shop.id, {}), product_reviews.get(shop.id, {})
+                ),
+                'last_calculated': calculated_at
+            }
+        return results
+
+    # Grouped reads
+
+    @staticmethod
+    def _grouped(queryset, key: str, **aggregates) -> Dict:
+        return {row.pop(key): row for row in queryset.values(key).annotate(**aggregates)}
+
+    def _sync_stats(self, ids: List, previous_start, start_date, end_date) -> Dict:
+        """
+        Sync counts for both periods and mean sync duration for the current one.
+        """
+        current = Q(started_at__gte=start_date, started_at__lte=end_date)
+        previous = Q(started_at__gte=previous_start, started_at__lt=start_date)
+        logs = SyncLog.objects.filter(
+            integration_config__shop_id__in=ids, integration_config__is_active=True,
+            started_at__gte=previous_start, started_at__lte=end_date
+        )
+        stats = self._grouped(
+            logs, 'integration_config__shop_id',
+            total=Count('id', filter=current),
+            completed=Count('id', filter=current & Q(status='completed')),
+            failed=Count('id', filter=current & Q(status='failed')),
+            previous_total=Count('id', filter=previous),
+            previous_completed=Count('id', filter=previous & Q(status='completed')),
+        )
+
+        durations = list(
+            logs.filter(current, status='completed', completed_at__isnull=False)
+            .order_by()
+            .values_list('integration_config__shop_id', 'started_at', 'completed_at')
+        )
+        if durations:
+            shop_index = {shop_id: i for i, shop_id in enumerate(ids)}
+            groups = np.array([shop_index[row[0]] for row in durations])
+            seconds = np.array([(row[2] - row[1]).total_seconds() for row in durations])
+            counts = np.bincount(groups, minlength=len(ids))
+            totals = np.bincount(groups, weights=seconds, minlength=len(ids))
+            for shop_id, i in shop_index.items():
+                if counts[i] and shop_id in stats:
+                    stats[shop_id]['avg_duration'] = float(totals[i] / counts[i])
+
+        return stats
+
+    def _price_comparisons(self, ids: List, start_date, end_date) -> Dict:
+        """
+        Competitor price comparisons for every active, available product of the shops.
+        """
+        ours = list(
+            LatestPrice.objects.filter(
+                shop_id__in=ids, is_available=True,
+                product__shop_id=F('shop_id'), product__is_active=True
+            ).values_list('shop_id', 'product_id', 'product__name', 'price')
+        )
+        if not ours:
+            return {}
+
+        competitor_prices = {}
+        for product_id, shop_id, avg_price in (
+            PriceHistory.objects.filter(
+                product__shop_id__in=ids, product__is_active=True, is_available=True,
+                recorded_at__gte=start_date, recorded_at__lte=end_date
+            ).values('product_id', 'shop_id').annotate(avg_price=Avg('price'))
+            .values_list('product_id', 'shop_id', 'avg_price')
+        ):
+            competitor_prices.setdefault(product_id, []).append((shop_id, float(avg_price)))
+
+        pairs = []
+        for shop_id, product_id, name, price in ours:
+            others = [avg for other_shop, avg in competitor_prices.get(product_id, []) if other_shop != shop_id]
+            if others:
+                pairs.append((shop_id, product_id, name, float(price), float(np.mean(others)), min(others)))
+        if not pairs:
+            return {}
+
+        our_price = np.array([pair[3] for pair in pairs])
+        mean_price = np.array([pair[4] for pair in pairs])
+        min_price = np.array([pair[5] for pair in pairs])
+        scores = np.select(
+            [our_price <= min_price, our_price <= mean_price,
+             our_price <= mean_price * 1.1, our_price <= mean_price * 1.2],
+            [5.0, 4.0, 3.0, 2.0],
+            default=1.0
+        )
+
+        comparisons = {}
+        for (shop_id, product_id, name, price, mean, minimum), score in zip(pairs, scores):
+            comparisons.setdefault(shop_id, []).append({
+                'product_id': str(product_id),
+                'product_name': name,
+                'our_price': price,
+                'avg_competitor_price': round(mean, 2),
+                'min_competitor_price': round(minimum, 2),
+                'competitiveness_score': float(score)
+            })
+        return comparisons
+
+    # Component scoring
+
+    def _reliability(self, shops: List[Shop], integrated: set, syncs: Dict) -> List[Dict]:
+        stats = [syncs.get(shop.id, {}) for shop in shops]
+        total = np.array([row.get('total', 0) for row in stats], dtype=float)
+        completed = np.array([row.get('completed', 0) for row in stats], dtype=float)
+        failed = np.array([row.get('failed', 0) for row in stats], dtype=float)
+        duration = np.array([row.get('avg_duration', 0.0) for row in stats])
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            success_rate = np.where(total > 0, completed / total * 100, 100.0)
+            error_rate = np.where(total > 0, failed / total * 100, 0.0)
+        score = (
+            5.0
+            - np.where(success_rate < 95, (95 - success_rate) * 0.05, 0.0)
+            - np.where(error_rate > 5, (error_rate - 5) * 0.02, 0.0)
+            - np.where(duration > 300, np.minimum((duration - 300) / 300, 1.0), 0.0)
+        )
+        score = np.clip(score, 0.0, 5.0)
+
+        results = []
+        for i, shop in enumerate(shops):
+            if shop.id not in integrated or not total[i]:
+                results.append({
+                    'score': 5.0,
+                    'sync_success_rate': 100.0,
+                    'uptime_percentage': 100.0,
+                    'error_rate': 0.0,
+                    'message': (
+                        'No integration data available' if shop.id not in integrated
+                        else 'No sync activity in period'
+                    )
+                })
+                continue
+            results.append({
+                'score': float(score[i]),
+                'sync_success_rate': round(float(success_rate[i]), 2),
+                'error_rate': round(float(error_rate[i]), 2),
+                'total_syncs': int(total[i]),
+                'successful_syncs': int(completed[i]),
+                'failed_syncs': int(failed[i]),
+                'average_sync_duration_seconds': round(float(duration[i]), 2),
+                'uptime_percentage': round(float(success_rate[i]), 2)  # Simplified uptime calculation
+            })
+        return results
+
+    def _satisfaction(self, shops: List[Shop], store_reviews: Dict, product_reviews: Dict) -> List[Dict]:
+        stores = [store_reviews.get(shop.id, {}) for shop in shops]
+        products = [product_reviews.get(shop.id, {}) for shop in shops]
+        store_count = np.array([row.get('count', 0) for row in stores])
+        product_count = np.array([row.get('count', 0) for row in products])
+        overall = np.array([float(row.get('avg_overall') or 0) for row in stores])
+        service = np.array([float(row.get('avg_service') or 0) for row in stores])
+        product_rating = np.array([float(row.get('avg_rating') or 0) for row in products])
+        base = np.array([float(shop.reliability_score) for shop in shops])
+
+        score = np.select(
+            [store_count > 0, product_count > 0],
+            [overall * 0.6 + service * 0.4, product_rating],
+            default=base
+        )
+
+        results = []
+        for i, shop in enumerate(shops):
+            store, product = stores[i], products[i]
+            results.append({
+                'score': float(score[i]),
+                'store_reviews': {
+                    'total_store_reviews': int(store_count[i]),
+                    'average_overall_rating': float(overall[i]),
+                    'average_delivery_rating': float(store.get('avg_delivery') or 0),
+                    'average_service_rating': float(service[i]),
+                    'average_quality_rating': float(store.get('avg_quality') or 0)
+                },
+                'product_reviews': {
+                    'total_product_reviews': int(product_count[i]),
+                    'average_product_rating': float(product_rating[i]),
+                    'positive_sentiment_percentage': (
+                        product.get('positive', 0) / product_count[i] * 100 if product_count[i] else 0.0
+                    )
+                },
+                'total_reviews': int(store_count[i] + product_count[i])
+            })
+        return results
+
+    def _delivery(self, shops: List[Shop], store_reviews: Dict) -> List[Dict]:
+        stores = [store_reviews.get(shop.id, {}) for shop in shops]
+        review_count = np.array([row.get('count', 0) for row in stores])
+        delivery_rating = np.array([float(row.get('avg_delivery') or 0) for row in stores])
+        delivery_days = np.array([shop.average_delivery_days for shop in shops], dtype=float)
+
+        # Without reviews, score the advertised delivery time: 2 days or less is best
+        days_score = np.clip(5.0 - np.maximum(delivery_days - 2, 0) * 0.5, 1.0, 5.0)
+        score = np.where(review_count > 0, delivery_rating, days_score)
+
+        return [
+            {
+                'score': float(score[i]),
+                'average_delivery_rating': round(float(delivery_rating[i]), 2),
+                'delivery_reviews': int(review_count[i]),
+                'average_delivery_days': shop.average_delivery_days,
+                **({} if review_count[i] else {'message': 'No delivery reviews, scored from advertised delivery time'})
+            }
+            for i, shop in enumerate(shops)
+        ]
+
+    def _price_competitiveness(self, shops: List[Shop], active_products: Dict, comparisons: Dict) -> List[Dict]:
+        results = []
+        for shop in shops:
+            if not active_products.get(shop.id):
+                results.append({'score': 3.0, 'message': 'No products found for price comparison'})
+                continue
+            shop_comparisons = comparisons.get(shop.id)
+            if not shop_comparisons:
+                results.append({'score': 3.0, 'message': 'No price comparisons available'})
+                continue
+            scores = np.array([comparison['competitiveness_score'] for comparison in shop_comparisons])
+            overall = round(float(scores.mean()), 2)
+            results.append({
+                'score': overall,
+                'products_compared': len(scores),
+                'average_competitiveness': overall,
+                'price_comparisons': shop_comparisons[:10],  # Return top 10 for display
+                'competitive_products_percentage': float((scores >= 4.0).mean() * 100)
+            })
+        return results
+
+    def _availability(self, shops: List[Shop], availability: Dict) -> List[Dict]:
+        stats = [availability.get(shop.id, {}) for shop in shops]
+        total = np.array([row.get('total', 0) for row in stats], dtype=float)
+        available = np.array([row.get('available', 0) for row in stats], dtype=float)
+        products = np.array([row.get('products', 0) for row in stats], dtype=float)
+        stocked = np.array([row.get('stocked', 0) for row in stats], dtype=float)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            availability_percentage = np.where(total > 0, available / total * 100, 0.0)
+            stock_consistency = np.where(products > 0, stocked / products * 100, 0.0)
+        score = np.clip(
+            5.0
+            - np.where(availability_percentage < 90, (90 - availability_percentage) * 0.05, 0.0)
+            - np.where(stock_consistency < 80, (80 - stock_consistency) * 0.02, 0.0),
+            0.0, 5.0
+        )
+
+        return [
+            {
+                'score': round(float(score[i]), 2),
+                'availability_percentage': round(float(availability_percentage[i]), 2),
+                'stock_consistency_percentage': round(float(stock_consistency[i]), 2),
+                'total_availability_checks': int(total[i]),
+                'products_monitored': int(products[i])
+            } if total[i] else {'score': 3.0, 'message': 'No availability data found'}
+            for i in range(len(shops))
+        ]
+
+    # Trends and insights
+
+    def _trends(self, syncs: Dict, store_reviews: Dict, product_reviews: Dict) -> Dict:
+        """
+        Compare basic metrics of the current period with the previous one.
+        """
+        def success_rate(completed, total):
+            return completed / total * 100 if total else 100
+
+        current = {
+            'store_reviews_count': store_reviews.get('count', 0),
+            'average_store_rating': float(store_reviews.get('avg_overall') or 0),
+            'product_reviews_count': product_reviews.get('count', 0),
+            'average_product_rating': float(product_reviews.get('avg_rating') or 0),
+            'sync_success_rate': success_rate(syncs.get('completed', 0), syncs.get('total', 0))
+        }
+        previous = {
+            'store_reviews_count': store_reviews.get('previous_count', 0),
+            'average_store_rating': float(store_reviews.get('previous_avg_overall') or 0),
+            'product_reviews_count': product_reviews.get('previous_count', 0),
+            'average_product_rating': float(product_reviews.get('previous_avg_rating') or 0),
+            'sync_success_rate': success_rate(syncs.get('previous_completed', 0), syncs.get('previous_total', 0))
+        }
+
+        trends = {}
+        for metric, current_value in current.items():
+            previous_value = previous[metric]
+            if previous_value > 0:
+                change_percentage = ((current_value - previous_value) / previous_value) * 100
+                trends[metric] = {
+                    'current': current_value,
+                    'previous': previous_value,
+                    'change_percentage': round(change_percentage, 2),
+                    'trend': 'improving' if change_percentage > 0 else 'declining' if change_percentage < 0 else 'stable'
+                }
+            else:
+                trends[metric] = {
+                    'current': current_value,
+                    'previous': previous_value,
+                    'change_percentage': 0,
+                    'trend': 'new_data'
+                }
+        return trends
+
+    def insights(self, component_scores: Dict) -> List[str]:
+        """
+        Generate actionable insights based on performance scores.
+        """
+        insights = []
+
+        # Reliability insights
+        if component_scores['reliability_score'] < 3.0:
+            insights.append("Technical reliability needs improvement. Consider optimizing API integration and sync processes.")
+        elif component_scores['reliability_score'] > 4.5:
+            insights.append("Excellent technical reliability. Integration is performing optimally.")
+
+        # Customer satisfaction insights
+        if component_scores['customer_satisfaction'] < 3.0:
+            insights.append("Customer satisfaction is below average. Focus on improving service quality and addressing customer concerns.")
+        elif component_scores['customer_satisfaction'] > 4.5:
+            insights.append("Outstanding customer satisfaction. Continue maintaining high service standards.")
+
+        # Delivery performance insights
+        if component_scores['delivery_performance'] < 3.0:
+            insights.append("Delivery performance needs attention. Consider optimizing logistics and setting realistic delivery expectations.")
+        elif component_scores['delivery_performance'] > 4.5:
+            insights.append("Excellent delivery performance. Fast and reliable delivery is a competitive advantage.")
+
+        # Price competitiveness insights
+        if component_scores['price_competitiveness'] < 3.0:
+            insights.append("Prices are less competitive compared to other stores. Consider price optimization strategies.")
+        elif component_scores['price_competitiveness'] > 4.5:
+            insights.append("Highly competitive pricing. This is a strong selling point for customers.")
+
+        # Availability insights
+        if component_scores['product_availability'] < 3.0:
+            insights.append("Product availability issues detected. Improve inventory management and stock monitoring.")
+        elif component_scores['product_availability'] > 4.5:
+            insights.append("Excellent product availability. Consistent stock levels enhance customer experience.")
+
+        # Overall performance insights
+        overall_avg = sum(component_scores.values()) / len(component_scores)
+        if overall_avg > 4.0:
+            insights.append("Overall performance is excellent. This store is highly recommended for customers.")
+        elif overall_avg < 3.0:
+            insights.append("Overall performance needs improvement across multiple areas. Consider a comprehensive review of operations.")
+
+        return insights
+
+    # Shop metric refresh
+
+    def reliability_scores(self, shops: List[Shop], days: int = 30,
+                           smoothing: float = 0.3) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Updated ``reliability_score`` per shop: the previous score blended with
+        the sync success rate of the last ``days`` days (0-5 scale). Also returns
+        a mask of the shops that had syncs; the others keep their score.
+        """
+        ids = [shop.id for shop in shops]
+        stats = self._grouped(
+            SyncLog.objects.filter(
+                integration_config__shop_id__in=ids,
+                started_at__gte=timezone.now() - timedelta(days=days)
+            ),
+            'integration_config__shop_id',
+            total=Count('id'),
+            completed=Count('id', filter=Q(status='completed')),
+        )
+        current = np.array([float(shop.reliability_score) for shop in shops])
+        total = np.array([stats.get(shop.id, {}).get('total', 0) for shop in shops], dtype=float)
+        completed = np.array([stats.get(shop.id, {}).get('completed', 0) for shop in shops], dtype=float)
+        has_syncs = total > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            success = np.where(has_syncs, completed / total, 0.0)
+        return np.where(has_syncs, current * (1 - smoothing) + success * 5 * smoothing, current), has_syncs
+
+
+# Create singleton instance
+store_performance_engine = StorePerformanceEngine()
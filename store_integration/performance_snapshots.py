@@ -0,0 +1,232 @@
+"""
+store_integration/performance_snapshots.py
+------------------------------------------
+Stored store performance analytics, refreshed in the background.
+"""
+
+import logging
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from core.models import Shop
+from reviews.models import Review, StoreReview
+from .models import PriceHistory, StorePerformanceSnapshot, SyncLog
+from .performance_engine import store_performance_engine
+
+logger = logging.getLogger(__name__)
+
+
+def normalise_shop_ids(shop_ids: Iterable) -> List[str]:
+    """
+    Canonical string form of shop ids, dropping values that are not UUIDs.
+    """
+    normalised = []
+    for shop_id in shop_ids:
+        try:
+            normalised.append(str(uuid.UUID(str(shop_id))))
+        except ValueError:
+            continue
+    return normalised
+
+
+class StorePerformanceSnapshotService:
+    """
+    Serves store performance analytics from ``StorePerformanceSnapshot`` rows.
+
+    Readers get the stored analytics with an ``as_of`` timestamp; only shops
+    without a snapshot for the requested period are computed live (and the
+    result stored). Periods are limited to ``STORE_PERFORMANCE_PERIODS`` so
+    requests cannot create snapshots for arbitrary windows. ``refresh``
+    recomputes snapshots whose shop had new sync logs, reviews or prices
+    since the snapshot was taken, or that are older than
+    ``STORE_PERFORMANCE_SNAPSHOT_MAX_AGE`` seconds, so the rolling window
+    keeps moving for quiet shops.
+    """
+
+    UPDATE_FIELDS = [
+        'overall_score', 'component_scores', 'detailed_metrics', 'trends', 'insights',
+        'period_start', 'period_end', 'calculated_at'
+    ]
+
+    def __init__(self, engine=None):
+        self.engine = engine or store_performance_engine
+        self.default_days = getattr(settings, 'STORE_PERFORMANCE_SNAPSHOT_DAYS', 30)
+        self.max_age = getattr(settings, 'STORE_PERFORMANCE_SNAPSHOT_MAX_AGE', 6 * 3600)
+        self.batch_size = getattr(settings, 'STORE_PERFORMANCE_SNAPSHOT_BATCH_SIZE', 200)
+        self.periods = set(getattr(settings, 'STORE_PERFORMANCE_PERIODS', (7, 30, 90, 365))) | {self.default_days}
+
+    def validate_days(self, days) -> int:
+        """
+        Period in days from a request value, defaulting when empty.
+
+        Raises:
+            ValueError: If the value is not one of the allowed periods
+        """
+        if days in (None, ''):
+            return self.default_days
+        days = int(days)
+        if days not in self.periods:
+            raise ValueError(f"days must be one of {sorted(self.periods)}")
+        return days
+
+    # Reads
+
+    def performances(self, shop_ids: Iterable, days: int = None) -> Dict:
+        """
+        Performance analytics keyed by shop id, from snapshots where available.
+        """
+        days = self.validate_days(days)
+        ids = normalise_shop_ids(shop_ids)
+        results = {
+            str(snapshot.shop_id): self.to_result(snapshot)
+            for snapshot in StorePerformanceSnapshot.objects.filter(
+                shop_id__in=ids, period_days=days
+            ).select_related('shop')
+        }
+
+        missing = [shop_id for shop_id in ids if shop_id not in results]
+        if missing:
+            live = self.engine.compute(missing, days)
+            self.store(live.values(), days)
+            for shop_id, result in live.items():
+                results[shop_id] = {**result, 'as_of': result['last_calculated'], 'source': 'live'}
+        return results
+
+    def get(self, shop_id, days: int = None) -> Dict:
+        """
+        Performance analytics of one shop, or an error dict if it does not exist.
+        """
+        ids = normalise_shop_ids([shop_id])
+        result = self.performances(ids, days).get(ids[0]) if ids else None
+        if result is None:
+            return {'success': False, 'error': f'Shop {shop_id} not found'}
+        return result
+
+    def to_result(self, snapshot: StorePerformanceSnapshot) -> Dict:
+        """
+        Snapshot in the ``calculate_store_performance`` result format.
+        """
+        return {
+            'success': True,
+            'shop_id': str(snapshot.shop_id),
+            'shop_name': snapshot.shop.name,
+            'analysis_period': {
+                'start_date': snapshot.period_start.isoformat(),
+                'end_date': snapshot.period_end.isoformat(),
+                'days': snapshot.period_days
+            },
+            'overall_score': float(snapshot.overall_score),
+            'component_scores': snapshot.component_scores,
+            'detailed_metrics': snapshot.detailed_metrics,
+            'performance_insights': snapshot.insights,
+            'trends': snapshot.trends,
+            'last_calculated': snapshot.calculated_at.isoformat(),
+            'as_of': snapshot.calculated_at.isoformat(),
+            'source': 'snapshot'
+        }
+
+    # Writes
+
+    def store(self, results: Iterable[Dict], days: int):
+        """
+        Upsert engine results as snapshots.
+        """
+        snapshots = [
+            StorePerformanceSnapshot(
+                shop_id=result['shop_id'],
+                period_days=days,
+                overall_score=Decimal(str(result['overall_score'])),
+                component_scores=result['component_scores'],
+                detailed_metrics=result['detailed_metrics'],
+                trends=result['trends'],
+                insights=result['performance_insights'],
+                period_start=datetime.fromisoformat(result['analysis_period']['start_date']),
+                period_end=datetime.fromisoformat(result['analysis_period']['end_date']),
+                calculated_at=datetime.fromisoformat(result['last_calculated'])
+            )
+            for result in results
+        ]
+        StorePerformanceSnapshot.objects.bulk_create(
+            snapshots,
+            update_conflicts=True,
+            unique_fields=['shop', 'period_days'],
+            update_fields=self.UPDATE_FIELDS,
+            batch_size=self.batch_size
+        )
+
+    def refresh(self, shop_ids: Iterable = None, days: int = None, force: bool = False) -> Dict:
+        """
+        Recompute snapshots that are missing, stale or behind new activity.
+
+        Without ``days`` the default period is refreshed for every shop and
+        other allowed periods only for shops that already have a snapshot.
+        """
+        ids = normalise_shop_ids(shop_ids) if shop_ids is not None else [
+            str(shop_id) for shop_id in Shop.objects.values_list('id', flat=True)
+        ]
+        if days:
+            shops_by_period = {self.validate_days(days): ids}
+        else:
+            shops_by_period = {self.default_days: ids}
+            existing = StorePerformanceSnapshot.objects.filter(
+                shop_id__in=ids, period_days__in=self.periods - {self.default_days}
+            ).order_by('period_days').values_list('period_days', 'shop_id')
+            for period, shop_id in existing:
+                shops_by_period.setdefault(period, []).append(str(shop_id))
+
+        refreshed = 0
+        for period, period_ids in shops_by_period.items():
+            dirty = period_ids if force else self.dirty_shops(period_ids, period)
+            for start in range(0, len(dirty), self.batch_size):
+                batch = dirty[start:start + self.batch_size]
+                self.store(self.engine.compute(batch, period).values(), period)
+                refreshed += len(batch)
+
+        logger.info(f"Refreshed {refreshed} store performance snapshots")
+        return {'refreshed': refreshed, 'periods': sorted(shops_by_period), 'shops_considered': len(ids)}
+
+    def dirty_shops(self, shop_ids: List[str], days: int) -> List[str]:
+        """
+        Shops whose snapshot for ``days`` is missing, too old or predates new activity.
+        """
+        calculated = {
+            str(shop_id): calculated_at
+            for shop_id, calculated_at in StorePerformanceSnapshot.objects.filter(
+                shop_id__in=shop_ids, period_days=days
+            ).values_list('shop_id', 'calculated_at')
+        }
+        stale_before = timezone.now() - timedelta(seconds=self.max_age)
+
+        dirty = {
+            shop_id for shop_id in shop_ids
+            if shop_id not in calculated or calculated[shop_id] < stale_before
+        }
+        candidates = [shop_id for shop_id in shop_ids if shop_id not in dirty]
+        if not candidates:
+            return [shop_id for shop_id in shop_ids if shop_id in dirty]
+
+        since = min(calculated[shop_id] for shop_id in candidates)
+        activity = (
+            (SyncLog.objects.filter(integration_config__shop_id__in=candidates, started_at__gt=since),
+             'integration_config__shop_id', 'started_at'),
+            (StoreReview.objects.filter(shop_id__in=candidates, created_at__gt=since), 'shop_id', 'created_at'),
+            (Review.objects.filter(product__shop_id__in=candidates, created_at__gt=since),
+             'product__shop_id', 'created_at'),
+            (PriceHistory.objects.filter(shop_id__in=candidates, recorded_at__gt=since), 'shop_id', 'recorded_at'),
+        )
+        for queryset, key, field in activity:
+            for shop_id, latest in queryset.order_by().values(key).annotate(latest=Max(field)).values_list(key, 'latest'):
+                if latest > calculated[str(shop_id)]:
+                    dirty.add(str(shop_id))
+
+        return [shop_id for shop_id in shop_ids if shop_id in dirty]
+
+
+# Create singleton instance
+store_performance_snapshots = StorePerformanceSnapshotService()
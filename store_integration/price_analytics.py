@@ -0,0 +1,149 @@
+"""
+store_integration/price_analytics.py
+------------------------------------
+Vectorised price statistics over grouped price series.
+
+Series are passed as flat NumPy arrays sorted by group (shop or product) and
+time, plus the start offset of each group, so per-group statistics come from
+``ufunc.reduceat`` instead of Python loops.
+"""
+
+import logging
+from typing import Dict
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Scales the MAD to a standard deviation estimate for normal data
+MAD_SCALE = 1.4826
+
+
+def group_starts(keys: np.ndarray) -> np.ndarray:
+    """
+    Start offsets of runs of equal keys in a sorted array.
+    """
+    if len(keys) == 0:
+        return np.array([], dtype=np.intp)
+    return np.concatenate(([0], np.flatnonzero(keys[1:] != keys[:-1]) + 1))
+
+
+def group_ids(starts: np.ndarray, size: int) -> np.ndarray:
+    """
+    Group index of every element, given the group start offsets.
+    """
+    ids = np.zeros(size, dtype=np.intp)
+    ids[starts[1:]] = 1
+    return np.cumsum(ids)
+
+
+def volatility(prices) -> float:
+    """
+    Population standard deviation of a price series.
+    """
+    prices = np.asarray(prices, dtype=float)
+    return float(prices.std()) if len(prices) > 1 else 0.0
+
+
+def grouped_summary(close: np.ndarray, starts: np.ndarray, low: np.ndarray = None,
+                    high: np.ndarray = None) -> Dict[str, np.ndarray]:
+    """
+    Per-group current/lowest/highest price, change count and volatility.
+
+    ``low`` and ``high`` default to ``close`` (raw points have one price).
+    """
+    low = close if low is None else low
+    high = close if high is None else high
+    counts = np.diff(np.append(starts, len(close)))
+    ends = starts + counts - 1
+
+    # Changes between consecutive points of the same group
+    changed = np.zeros(len(close), dtype=np.int64)
+    changed[1:] = close[1:] != close[:-1]
+    changed[starts] = 0
+
+    sums = np.add.reduceat(close, starts)
+    squares = np.add.reduceat(close * close, starts)
+    means = sums / counts
+    variance = np.maximum(squares / counts - means * means, 0.0)
+
+    return {
+        'current': close[ends],
+        'lowest': np.minimum.reduceat(low, starts),
+        'highest': np.maximum.reduceat(high, starts),
+        'changes': np.add.reduceat(changed, starts),
+        'volatility': np.where(counts > 1, np.sqrt(variance), 0.0),
+    }
+
+
+class PriceAnomalyDetector:
+    """
+    Flags sudden price changes in grouped price series.
+
+    A change is anomalous when its relative size exceeds ``threshold``, or
+    when its robust z-score against the group's recent changes (median and
+    MAD of percentage changes) exceeds ``z_threshold``. The z-score test only
+    applies to groups with at least ``min_changes`` changes.
+    """
+
+    def __init__(self, threshold: float = 0.2, z_threshold: float = None, min_changes: int = None):
+        self.threshold = threshold
+        self.z_threshold = z_threshold or getattr(settings, 'PRICE_ANOMALY_Z_THRESHOLD', 3.5)
+        self.min_changes = min_changes or getattr(settings, 'PRICE_ANOMALY_MIN_CHANGES', 5)
+
+    def detect(self, prices: np.ndarray, starts: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Detect anomalies in ``prices`` grouped by ``starts``.
+
+        Returns arrays ``index`` (position of the anomalous point; the previous
+        point is ``index - 1``), ``change`` (relative change), ``z_score`` and
+        ``severity_high``.
+        """
+        empty = np.array([], dtype=np.intp)
+        if len(prices) < 2:
+            return {'index': empty, 'change': np.array([]), 'z_score': np.array([]),
+                    'severity_high': np.array([], dtype=bool)}
+
+        previous = prices[:-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = np.where(previous > 0, (prices[1:] - previous) / previous, 0.0)
+        # change[i] compares point i + 1 with point i; drop pairs spanning two groups
+        valid = previous > 0
+        valid[starts[1:] - 1] = False
+
+        z_score = self.robust_z_scores(change, valid, starts)
+        magnitude = np.abs(change)
+        flagged = valid & ((magnitude > self.threshold) | (np.abs(z_score) > self.z_threshold))
+        index = np.flatnonzero(flagged)
+
+        return {
+            'index': index + 1,
+            'change': change[index],
+            'z_score': z_score[index],
+            'severity_high': (magnitude[index] > 0.5) | (np.abs(z_score[index]) > 2 * self.z_threshold),
+        }
+
+    def robust_z_scores(self, change: np.ndarray, valid: np.ndarray, starts: np.ndarray) -> np.ndarray:
+        """
+        Modified z-score of every change against its group's median and MAD.
+        """
+        z_score = np.zeros(len(change))
+        ids = group_ids(starts, len(change) + 1)[1:]
+        order = np.flatnonzero(valid)
+        if len(order) == 0:
+            return z_score
+
+        valid_ids = ids[order]
+        bounds = group_starts(valid_ids)
+        for begin, end in zip(bounds, np.append(bounds[1:], len(order))):
+            if end - begin < self.min_changes:
+                continue
+            positions = order[begin:end]
+            values = change[positions]
+            median = np.median(values)
+            mad = np.median(np.abs(values - median)) * MAD_SCALE
+            if mad > 0:
+                z_score[positions] = (values - median) / mad
+        return z_score
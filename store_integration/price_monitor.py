@@ -0,0 +1,201 @@
+"""
+store_integration/price_monitor.py
+----------------------------------
+Batched price and availability monitoring for store integrations.
+"""
+
+import logging
+from decimal import InvalidOperation
+from typing import Dict, Iterable, List
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Product
+from core.search_cache import search_result_cache
+from reviews.models import EngagementEvent
+from .category_stats import category_statistics_service
+from .latest_prices import latest_price_service
+from .models import PriceHistory, ProductMapping
+from .sync_engine import to_price
+
+logger = logging.getLogger(__name__)
+
+
+class PriceMonitor:
+    """
+    Checks current store prices for many mappings at once.
+
+    Mappings are processed in batches. For each batch the current prices come
+    from the platform's list endpoint, the latest recorded price of every
+    product is read from ``LatestPrice`` in one query, price and availability changes
+    are computed with NumPy, and history rows, engagement events, product
+    updates and mapping updates are written in bulk inside one transaction.
+    """
+
+    def __init__(self, integration, batch_size: int = None):
+        self.integration = integration
+        self.config = integration.config
+        self.shop = integration.shop
+        self.batch_size = batch_size or getattr(settings, 'PRICE_MONITOR_BATCH_SIZE', 200)
+
+    def run(self, mappings: Iterable[ProductMapping]) -> Dict:
+        """
+        Monitor every mapping, returning the detected price changes.
+        """
+        mappings = list(mappings)
+        changes, errors = [], 0
+
+        for start in range(0, len(mappings), self.batch_size):
+            batch = mappings[start:start + self.batch_size]
+            try:
+                batch_changes, batch_errors = self.process_batch(batch)
+            except Exception as e:
+                logger.error(f"Error monitoring price batch for {self.shop.name}: {e}")
+                ProductMapping.objects.filter(id__in=[m.id for m in batch]).update(sync_status='error')
+                errors += len(batch)
+                continue
+            changes.extend(batch_changes)
+            errors += batch_errors
+
+        return {
+            'products_monitored': len(mappings),
+            'price_changes_detected': len(changes),
+            'changes': changes,
+            'errors': errors,
+        }
+
+    def process_batch(self, mappings: List[ProductMapping]):
+        """
+        Check one batch of mappings. Returns ``(changes, error_count)``.
+        """
+        current = self.integration.fetch_products_by_ids(
+            [mapping.external_product_id for mapping in mappings]
+        )
+
+        fetched, failed = [], []
+        for mapping in mappings:
+            product_data = current.get(mapping.external_product_id)
+            if product_data is None or isinstance(product_data, Exception):
+                logger.error(
+                    f"Error monitoring price for product {mapping.local_product_id}: "
+                    f"{product_data or 'not returned by store'}"
+                )
+                failed.append(mapping)
+                continue
+            try:
+                price = to_price(product_data.get('price', 0))
+            except (InvalidOperation, TypeError, ValueError) as e:
+                logger.error(f"Invalid price for product {mapping.local_product_id}: {e}")
+                failed.append(mapping)
+                continue
+            fetched.append((mapping, product_data, price))
+
+        latest = self.latest_prices([mapping.local_product_id for mapping, _, _ in fetched])
+
+        # Vectorised diff against the latest recorded state
+        has_latest = np.array([m.local_product_id in latest for m, _, _ in fetched], dtype=bool)
+        old_prices = np.array([
+            float(latest[m.local_product_id][0]) if m.local_product_id in latest else 0.0
+            for m, _, _ in fetched
+        ])
+        old_available = np.array([
+            latest[m.local_product_id][1] if m.local_product_id in latest else False
+            for m, _, _ in fetched
+        ], dtype=bool)
+        new_prices = np.array([float(price) for _, _, price in fetched])
+        new_available = np.array([bool(data.get('is_available', False)) for _, data, _ in fetched], dtype=bool)
+
+        price_diff = np.where(has_latest, new_prices - old_prices, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change_percentage = np.where(
+                has_latest & (old_prices > 0), price_diff / old_prices * 100, 0.0
+            )
+        availability_changed = ~has_latest | (old_available != new_available)
+        changed = ~has_latest | (old_prices != new_prices) | availability_changed
+
+        now = timezone.now()
+        changes, history, events, products = [], [], [], []
+        for i in np.flatnonzero(changed):
+            mapping, product_data, price = fetched[i]
+            product = mapping.local_product
+            change = {
+                'product_id': str(product.id),
+                'product_name': product.name,
+                'old_price': float(old_prices[i]),
+                'new_price': float(new_prices[i]),
+                'price_diff': round(float(price_diff[i]), 2),
+                'change_percentage': round(float(change_percentage[i]), 2),
+                'availability_changed': bool(availability_changed[i]),
+                'new_availability': bool(new_available[i]),
+            }
+            changes.append(change)
+
+            original_price = product_data.get('original_price')
+            history.append(PriceHistory(
+                product=product,
+                shop=self.shop,
+                price=price,
+                original_price=to_price(original_price) if original_price else None,
+                currency=product_data.get('currency', 'USD'),
+                is_available=change['new_availability'],
+                stock_quantity=product_data.get('stock_quantity', 0)
+            ))
+            events.append(EngagementEvent(
+                product=product,
+                shop=self.shop,
+                event_type='price_change',
+                session_id='system',
+                event_data={
+                    'old_price': change['old_price'],
+                    'new_price': change['new_price'],
+                    'change_percentage': change['change_percentage'],
+                    'availability_changed': change['availability_changed']
+                }
+            ))
+
+            # Update product price if this store is its primary source
+            if product.shop_id == self.shop.id and (
+                product.price != price or product.is_active != change['new_availability']
+            ):
+                product.price = price
+                product.is_active = change['new_availability']
+                products.append(product)
+
+        ok = [mapping for mapping, _, _ in fetched]
+        for mapping in ok:
+            mapping.last_sync_at = now
+            mapping.sync_status = 'synced'
+            mapping.updated_at = now
+        for mapping in failed:
+            mapping.sync_status = 'error'
+            mapping.updated_at = now
+
+        with transaction.atomic():
+            latest_price_service.record(history)
+            EngagementEvent.objects.bulk_create(events, batch_size=self.batch_size)
+            if products:
+                Product.objects.bulk_update(products, ['price', 'is_active'], batch_size=self.batch_size)
+                for product in products:
+                    category_statistics_service.mark_dirty(product.category_id)
+            ProductMapping.objects.bulk_update(
+                ok + failed, ['last_sync_at', 'sync_status', 'updated_at'], batch_size=self.batch_size
+            )
+
+        if products:
+            search_result_cache.bump_catalogue_version()
+
+        return changes, len(failed)
+
+    def latest_prices(self, product_ids: List) -> Dict:
+        """
+        Latest ``(price, is_available)`` per product for this shop, in one query.
+        """
+        if not product_ids:
+            return {}
+        return {
+            product_id: (latest.price, latest.is_available)
+            for product_id, latest in latest_price_service.in_shop(product_ids, self.shop.id).items()
+        }
@@ -0,0 +1,290 @@
+"""
+store_integration/price_series.py
+---------------------------------
+Tiered price history: raw points for the recent window, daily and weekly
+OHLC rollups for older data, and resolution-aware reads across the tiers.
+"""
+
+import logging
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from itertools import groupby
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import LatestPrice, PriceHistory, PriceHistoryRollup
+
+logger = logging.getLogger(__name__)
+
+
+def period_start(moment: datetime, resolution: str) -> datetime:
+    """
+    Start (UTC midnight) of the day or ISO week containing ``moment``.
+    """
+    moment = moment.astimezone(dt_timezone.utc)
+    day = datetime.combine(moment.date(), time.min, tzinfo=dt_timezone.utc)
+    if resolution == 'weekly':
+        day -= timedelta(days=day.weekday())
+    return day
+
+
+class PriceBucket:
+    """
+    Running OHLC aggregate of chronologically ordered samples.
+    """
+
+    __slots__ = ('period_start', 'open', 'high', 'low', 'close', 'currency', 'samples', 'available')
+
+    def __init__(self, period_start, open_price, high_price, low_price, close_price,
+                 currency='USD', samples=1, available=0):
+        self.period_start = period_start
+        self.open = open_price
+        self.high = high_price
+        self.low = low_price
+        self.close = close_price
+        self.currency = currency
+        self.samples = samples
+        self.available = available
+
+    @classmethod
+    def from_point(cls, start, price, is_available, currency='USD'):
+        return cls(start, price, price, price, price, currency, 1, int(bool(is_available)))
+
+    @classmethod
+    def from_rollup(cls, start, rollup: PriceHistoryRollup):
+        return cls(start, rollup.open_price, rollup.high_price, rollup.low_price, rollup.close_price,
+                   rollup.currency, rollup.sample_count, rollup.available_count)
+
+    def merge(self, later: 'PriceBucket'):
+        """Fold in a bucket that comes after this one in time."""
+        self.high = max(self.high, later.high)
+        self.low = min(self.low, later.low)
+        self.close = later.close
+        self.currency = later.currency
+        self.samples += later.samples
+        self.available += later.available
+
+    @property
+    def availability_ratio(self) -> float:
+        return self.available / self.samples if self.samples else 0.0
+
+    def to_rollup(self, product_id, shop_id, resolution) -> PriceHistoryRollup:
+        return PriceHistoryRollup(
+            product_id=product_id,
+            shop_id=shop_id,
+            resolution=resolution,
+            period_start=self.period_start,
+            open_price=self.open,
+            high_price=self.high,
+            low_price=self.low,
+            close_price=self.close,
+            currency=self.currency,
+            sample_count=self.samples,
+            available_count=self.available,
+        )
+
+
+class PriceSeriesService:
+    """
+    Keeps price history compact and reads it at a suitable resolution.
+
+    Prices are recorded change-only, so a raw ``PriceHistory`` row marks the
+    moment a price or availability changed and holds until the next row.
+    Raw rows older than ``PRICE_HISTORY_RAW_DAYS`` are compacted into daily
+    OHLC rollups, and daily rollups older than ``PRICE_HISTORY_DAILY_DAYS``
+    into weekly ones. Readers ask for a time range and get per-shop buckets at
+    the coarsest resolution the range needs, merged across tiers.
+    """
+
+    def __init__(self):
+        self.raw_days = getattr(settings, 'PRICE_HISTORY_RAW_DAYS', 90)
+        self.daily_days = getattr(settings, 'PRICE_HISTORY_DAILY_DAYS', 365)
+        self.batch_size = getattr(settings, 'PRICE_HISTORY_COMPACTION_BATCH_SIZE', 200)
+
+    # Compaction
+
+    def compact(self, raw_days: int = None, daily_days: int = None, now=None) -> Dict:
+        """
+        Compact raw points into daily rollups and daily rollups into weekly ones.
+
+        Cutoffs are aligned to day and week boundaries so every period is
+        compacted in one pass.
+        """
+        now = now or timezone.now()
+        raw_days = self.raw_days if raw_days is None else raw_days
+        daily_days = self.daily_days if daily_days is None else daily_days
+
+        raw_cutoff = period_start(now - timedelta(days=raw_days), 'daily')
+        daily_cutoff = period_start(now - timedelta(days=max(daily_days, raw_days)), 'weekly')
+
+        daily_created, raw_deleted = self._compact_raw(raw_cutoff)
+        weekly_created, daily_deleted = self._compact_daily(daily_cutoff)
+
+        logger.info(
+            f"Compacted price history: {raw_deleted} raw points into {daily_created} daily rollups, "
+            f"{daily_deleted} daily rollups into {weekly_created} weekly rollups"
+        )
+        return {
+            'daily_created': daily_created,
+            'raw_deleted': raw_deleted,
+            'weekly_created': weekly_created,
+            'daily_deleted': daily_deleted,
+        }
+
+    def _compact_raw(self, cutoff):
+        old = PriceHistory.objects.filter(recorded_at__lt=cutoff)
+        product_ids = list(old.values_list('product_id', flat=True).distinct())
+        created = deleted = 0
+
+        for start in range(0, len(product_ids), self.batch_size):
+            batch = product_ids[start:start + self.batch_size]
+            points = (
+                PriceHistory.objects
+                .filter(product_id__in=batch, recorded_at__lt=cutoff)
+                .order_by('product_id', 'shop_id', 'recorded_at')
+                .values_list('product_id', 'shop_id', 'recorded_at', 'price', 'is_available', 'currency')
+            )
+            rollups = []
+            for (product_id, shop_id), rows in groupby(points, key=lambda row: row[:2]):
+                for bucket in self.bucket_points(rows, 'daily'):
+                    rollups.append(bucket.to_rollup(product_id, shop_id, 'daily'))
+
+            with transaction.atomic():
+                PriceHistoryRollup.objects.bulk_create(rollups, batch_size=self.batch_size)
+                deleted += PriceHistory.objects.filter(product_id__in=batch, recorded_at__lt=cutoff).delete()[0]
+            created += len(rollups)
+
+        return created, deleted
+
+    def _compact_daily(self, cutoff):
+        old = PriceHistoryRollup.objects.filter(resolution='daily', period_start__lt=cutoff)
+        product_ids = list(old.values_list('product_id', flat=True).distinct())
+        created = deleted = 0
+
+        for start in range(0, len(product_ids), self.batch_size):
+            batch = product_ids[start:start + self.batch_size]
+            dailies = (
+                PriceHistoryRollup.objects
+                .filter(product_id__in=batch, resolution='daily', period_start__lt=cutoff)
+                .order_by('product_id', 'shop_id', 'period_start')
+            )
+            rollups = []
+            for (product_id, shop_id), rows in groupby(dailies, key=lambda r: (r.product_id, r.shop_id)):
+                for bucket in self.bucket_rollups(rows, 'weekly'):
+                    rollups.append(bucket.to_rollup(product_id, shop_id, 'weekly'))
+
+            with transaction.atomic():
+                PriceHistoryRollup.objects.bulk_create(rollups, batch_size=self.batch_size)
+                deleted += PriceHistoryRollup.objects.filter(
+                    product_id__in=batch, resolution='daily', period_start__lt=cutoff
+                ).delete()[0]
+            created += len(rollups)
+
+        return created, deleted
+
+    # Bucketing
+
+    def bucket_points(self, rows: Iterable, resolution: str) -> List[PriceBucket]:
+        """
+        OHLC buckets from chronologically ordered ``(…, recorded_at, price, is_available, currency)`` rows.
+        """
+        buckets = []
+        for *_, recorded_at, price, is_available, currency in rows:
+            self._add(buckets, PriceBucket.from_point(
+                period_start(recorded_at, resolution), price, is_available, currency
+            ))
+        return buckets
+
+    def bucket_rollups(self, rollups: Iterable[PriceHistoryRollup], resolution: str) -> List[PriceBucket]:
+        """
+        Re-bucket chronologically ordered rollups at a coarser resolution.
+        """
+        buckets = []
+        for rollup in rollups:
+            self._add(buckets, PriceBucket.from_rollup(period_start(rollup.period_start, resolution), rollup))
+        return buckets
+
+    @staticmethod
+    def _add(buckets: List[PriceBucket], bucket: PriceBucket):
+        if buckets and buckets[-1].period_start == bucket.period_start:
+            buckets[-1].merge(bucket)
+        else:
+            buckets.append(bucket)
+
+    # Reads
+
+    def resolution_for(self, start, now=None) -> str:
+        """
+        Coarsest resolution needed to cover a range starting at ``start``.
+        """
+        age = (now or timezone.now()) - start
+        if age <= timedelta(days=self.raw_days):
+            return 'raw'
+        if age <= timedelta(days=max(self.daily_days, self.raw_days)):
+            return 'daily'
+        return 'weekly'
+
+    def series(self, product_id, start, resolution: str = None, now=None) -> Dict:
+        """
+        Per-shop price buckets of a product since ``start``.
+
+        Returns ``{'resolution': ..., 'shops': {shop_id: [PriceBucket, ...]}}``.
+        Raw resolution yields one bucket per recorded point. Shops whose price
+        has not changed since before ``start`` get a single bucket carried
+        forward from their latest price.
+        """
+        now = now or timezone.now()
+        resolution = resolution or self.resolution_for(start, now)
+        shops: Dict = {}
+
+        if resolution != 'raw':
+            # Oldest tier first so merged buckets keep open/close order
+            rollups = (
+                PriceHistoryRollup.objects
+                .filter(product_id=product_id, period_start__gte=period_start(start, resolution))
+                .order_by('shop_id', 'resolution', 'period_start')
+            )
+            tiered = sorted(rollups, key=lambda r: (r.shop_id, r.resolution != 'weekly', r.period_start))
+            for shop_id, rows in groupby(tiered, key=lambda r: r.shop_id):
+                for rollup in rows:
+                    self._add(shops.setdefault(shop_id, []),
+                              PriceBucket.from_rollup(period_start(rollup.period_start, resolution), rollup))
+
+        points = (
+            PriceHistory.objects
+            .filter(product_id=product_id, recorded_at__gte=start)
+            .order_by('shop_id', 'recorded_at')
+            .values_list('shop_id', 'recorded_at', 'price', 'is_available', 'currency')
+        )
+        for shop_id, rows in groupby(points, key=lambda row: row[0]):
+            buckets = shops.setdefault(shop_id, [])
+            for _, recorded_at, price, is_available, currency in rows:
+                bucket_start = recorded_at if resolution == 'raw' else period_start(recorded_at, resolution)
+                bucket = PriceBucket.from_point(bucket_start, price, is_available, currency)
+                if resolution == 'raw':
+                    buckets.append(bucket)
+                else:
+                    self._add(buckets, bucket)
+
+        for latest in LatestPrice.objects.filter(product_id=product_id, recorded_at__lt=start):
+            if latest.shop_id not in shops:
+                bucket_start = start if resolution == 'raw' else period_start(start, resolution)
+                shops[latest.shop_id] = [PriceBucket.from_point(
+                    bucket_start, latest.price, latest.is_available, latest.currency
+                )]
+
+        return {'resolution': resolution, 'shops': shops}
+
+
+def prices_differ(latest: LatestPrice, price, is_available) -> bool:
+    """
+    Whether a new observation changes the recorded state (change-only recording).
+    """
+    return latest is None or Decimal(latest.price) != Decimal(price) or latest.is_available != bool(is_available)
+
+
+# Create singleton instance
+price_series_service = PriceSeriesService()
@@ -12,8 +12,11 @@ from django.core.cache import cache
 from datetime import timedelta
 from .models import StoreIntegrationConfig, ProductMapping, PriceHistory
 from .tasks import monitor_price_changes, sync_inventory_levels, send_price_alerts
-from core.models import Product
+from .price_analytics import PriceAnomalyDetector, group_starts, grouped_summary, volatility
+from .price_series import price_series_service
+from core.models import Product, Shop
 import json
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -165,14 +168,11 @@ class RealTimeSyncService:
         try:
             product = Product.objects.get(id=product_id)
             
-            # Get price history for the last N days
+            # Get price history for the last N days at a resolution suited to the range
             start_date = timezone.now() - timedelta(days=days)
-            price_history = PriceHistory.objects.filter(
-                product=product,
-                recorded_at__gte=start_date
-            ).select_related('shop').order_by('recorded_at')
+            series = price_series_service.series(product.id, start_date)
             
-            if not price_history.exists():
+            if not series['shops']:
                 return {
                     'success': True,
                     'product_id': product_id,
@@ -180,48 +180,48 @@ class RealTimeSyncService:
                     'trends': {}
                 }
             
-            # Group by shop and calculate trends
-            shop_trends = {}
+            shop_names = dict(Shop.objects.filter(id__in=series['shops']).values_list('id', 'name'))
+            
+            # Flatten the per-shop series into arrays grouped by shop
+            shop_ids = list(series['shops'])
+            buckets = [bucket for shop_id in shop_ids for bucket in series['shops'][shop_id]]
+            counts = np.array([len(series['shops'][shop_id]) for shop_id in shop_ids])
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            close = np.array([float(bucket.close) for bucket in buckets])
+            summary = grouped_summary(
+                close, starts,
+                low=np.array([float(bucket.low) for bucket in buckets]),
+                high=np.array([float(bucket.high) for bucket in buckets])
+            )
             
-            for record in price_history:
-                shop_id = str(record.shop.id)
-                if shop_id not in shop_trends:
-                    shop_trends[shop_id] = {
-                        'shop_name': record.shop.name,
-                        'prices': [],
-                        'availability': [],
-                        'current_price': None,
-                        'lowest_price': None,
-                        'highest_price': None,
-                        'price_changes': 0
+            shop_trends = {}
+            for i, shop_id in enumerate(shop_ids):
+                trend = {
+                    'shop_name': shop_names.get(shop_id),
+                    'resolution': series['resolution'],
+                    'prices': [],
+                    'availability': [],
+                    'current_price': float(summary['current'][i]),
+                    'lowest_price': float(summary['lowest'][i]),
+                    'highest_price': float(summary['highest'][i]),
+                    'price_changes': int(summary['changes'][i]),
+                    'volatility': float(summary['volatility'][i])
+                }
+                for bucket in series['shops'][shop_id]:
+                    point = {
+                        'price': float(bucket.close),
+                        'date': bucket.period_start.isoformat(),
+                        'available': bucket.availability_ratio >= 0.5
                     }
-                
-                trend = shop_trends[shop_id]
-                trend['prices'].append({
-                    'price': float(record.price),
-                    'date': record.recorded_at.isoformat(),
-                    'available': record.is_available
-                })
-                
-                # Update statistics
-                if trend['current_price'] is None or record.recorded_at > timezone.now() - timedelta(hours=24):
-                    trend['current_price'] = float(record.price)
-                
-                if trend['lowest_price'] is None or record.price < trend['lowest_price']:
-                    trend['lowest_price'] = float(record.price)
-                
-                if trend['highest_price'] is None or record.price > trend['highest_price']:
-                    trend['highest_price'] = float(record.price)
-            
-            # Calculate price change frequency
-            for shop_id, trend in shop_trends.items():
-                prices = [p['price'] for p in trend['prices']]
-                if len(prices) > 1:
-                    changes = sum(1 for i in range(1, len(prices)) if prices[i] != prices[i-1])
-                    trend['price_changes'] = changes
-                    trend['volatility'] = self._calculate_volatility(prices)
-                else:
-                    trend['volatility'] = 0
+                    if series['resolution'] != 'raw':
+                        point.update({
+                            'open': float(bucket.open),
+                            'low': float(bucket.low),
+                            'high': float(bucket.high),
+                            'availability_ratio': round(bucket.availability_ratio, 3)
+                        })
+                    trend['prices'].append(point)
+                shop_trends[str(shop_id)] = trend
             
             # Find best deals
             current_prices = {
@@ -244,6 +244,7 @@ class RealTimeSyncService:
                 'product_id': product_id,
                 'product_name': product.name,
                 'analysis_period_days': days,
+                'resolution': series['resolution'],
                 'shop_trends': shop_trends,
                 'best_current_deal': best_deal,
                 'total_shops': len(shop_trends)
@@ -265,12 +266,7 @@ class RealTimeSyncService:
         """
         Calculate price volatility (standard deviation).
         """
-        if len(prices) < 2:
-            return 0.0
-        
-        mean_price = sum(prices) / len(prices)
-        variance = sum((p - mean_price) ** 2 for p in prices) / len(prices)
-        return variance ** 0.5
+        return volatility(prices)
     
     def detect_price_anomalies(self, product_id: str, threshold: float = 0.2) -> Dict:
         """
@@ -286,49 +282,22 @@ class RealTimeSyncService:
         try:
             product = Product.objects.get(id=product_id)
             
-            # Get recent price history (last 7 days)
+            # Get recent price history (last 7 days) grouped by shop
             start_date = timezone.now() - timedelta(days=7)
-            recent_prices = PriceHistory.objects.filter(
-                product=product,
-                recorded_at__gte=start_date
-            ).select_related('shop').order_by('shop', 'recorded_at')
-            
-            anomalies = []
-            
-            # Group by shop and check for anomalies
-            shop_prices = {}
-            for record in recent_prices:
-                shop_id = str(record.shop.id)
-                if shop_id not in shop_prices:
-                    shop_prices[shop_id] = []
-                shop_prices[shop_id].append(record)
-            
-            for shop_id, prices in shop_prices.items():
-                if len(prices) < 2:
-                    continue
-                
-                # Sort by date
-                prices.sort(key=lambda x: x.recorded_at)
-                
-                # Check for sudden price changes
-                for i in range(1, len(prices)):
-                    prev_price = prices[i-1].price
-                    curr_price = prices[i].price
-                    
-                    if prev_price > 0:
-                        change_percentage = abs(curr_price - prev_price) / prev_price
-                        
-                        if change_percentage > threshold:
-                            anomalies.append({
-                                'shop_id': shop_id,
-                                'shop_name': prices[i].shop.name,
-                                'previous_price': float(prev_price),
-                                'current_price': float(curr_price),
-                                'change_percentage': change_percentage * 100,
-                                'change_type': 'increase' if curr_price > prev_price else 'decrease',
-                                'detected_at': prices[i].recorded_at.isoformat(),
-                                'severity': 'high' if change_percentage > 0.5 else 'medium'
-                            })
+            rows = list(
+                PriceHistory.objects.filter(product=product, recorded_at__gte=start_date)
+                .order_by('shop_id', 'recorded_at')
+                .values_list('shop_id', 'shop__name', 'price', 'recorded_at')
+            )
+            
+            anomalies = [
+                {
+                    'shop_id': str(shop_id),
+                    'shop_name': shop_name,
+                    **details
+                }
+                for (shop_id, shop_name), details in self._find_anomalies(rows, threshold)
+            ]
             
             return {
                 'success': True,
@@ -351,6 +320,87 @@ class RealTimeSyncService:
                 'error': str(e)
             }
     
+    def detect_store_price_anomalies(self, shop_id: str, threshold: float = 0.2, days: int = 7) -> Dict:
+        """
+        Detect price anomalies for every product of a store in one pass.
+        
+        Args:
+            shop_id: Shop ID
+            threshold: Percentage threshold for anomaly detection (default 20%)
+            days: Number of days of history to analyze
+            
+        Returns:
+            Dict with anomaly detection results for the whole store
+        """
+        try:
+            shop = Shop.objects.get(id=shop_id)
+            
+            start_date = timezone.now() - timedelta(days=days)
+            rows = list(
+                PriceHistory.objects.filter(shop=shop, recorded_at__gte=start_date)
+                .order_by('product_id', 'recorded_at')
+                .values_list('product_id', 'product__name', 'price', 'recorded_at')
+            )
+            
+            anomalies = [
+                {
+                    'product_id': str(product_id),
+                    'product_name': product_name,
+                    **details
+                }
+                for (product_id, product_name), details in self._find_anomalies(rows, threshold)
+            ]
+            
+            return {
+                'success': True,
+                'shop_id': str(shop.id),
+                'shop_name': shop.name,
+                'analysis_period_days': days,
+                'products_analyzed': len({row[0] for row in rows}),
+                'anomalies_detected': len(anomalies),
+                'anomalies': anomalies,
+                'threshold_used': threshold * 100
+            }
+            
+        except Shop.DoesNotExist:
+            return {
+                'success': False,
+                'error': f'Shop {shop_id} not found'
+            }
+        except Exception as e:
+            logger.error(f"Error detecting price anomalies for shop {shop_id}: {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def _find_anomalies(self, rows: List, threshold: float):
+        """
+        Yield ``((group_id, group_name), details)`` for anomalous changes in
+        ``(group_id, group_name, price, recorded_at)`` rows sorted by group and time.
+        """
+        if len(rows) < 2:
+            return
+        
+        group_keys = np.array([str(row[0]) for row in rows])
+        prices = np.array([float(row[2]) for row in rows])
+        found = PriceAnomalyDetector(threshold).detect(prices, group_starts(group_keys))
+        
+        for index, change, z_score, high in zip(
+            found['index'], found['change'], found['z_score'], found['severity_high']
+        ):
+            group_id, group_name, price, recorded_at = rows[index]
+            previous_price = prices[index - 1]
+            yield (group_id, group_name), {
+                'previous_price': float(previous_price),
+                'current_price': float(price),
+                'change_percentage': abs(float(change)) * 100,
+                'z_score': round(float(z_score), 2),
+                'change_type': 'increase' if change > 0 else 'decrease',
+                'detected_at': recorded_at.isoformat(),
+                'severity': 'high' if high else 'medium'
+            }
+    
     def get_sync_status(self, config_id: str = None) -> Dict:
         """
         Get current synchronization status for stores.
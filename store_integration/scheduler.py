@@ -0,0 +1,180 @@
+"""
+store_integration/scheduler.py
+------------------------------
+Concurrent scheduler for multi-store synchronization.
+"""
+
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import StoreIntegrationConfig
+
+logger = logging.getLogger(__name__)
+
+
+SYNC_INTERVALS = {
+    'realtime': timedelta(minutes=5),
+    'hourly': timedelta(hours=1),
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+    'manual': timedelta(days=365),  # Effectively never auto-sync
+}
+
+# Lower rank syncs first when stores are equally overdue
+FREQUENCY_RANK = {'realtime': 0, 'hourly': 1, 'daily': 2, 'weekly': 3, 'manual': 4}
+
+
+class StoreSyncScheduler:
+    """
+    Runs store synchronizations in a bounded worker pool.
+
+    Stores are ordered by how overdue they are relative to their
+    ``sync_frequency`` (never-synced stores first), so a large backlog drains
+    the most stale, most frequently synced stores before the rest. A sync
+    claims its store's config row with a conditional update of
+    ``sync_claim_token``, so the same store is never synced twice at once,
+    whether from the pool, another Celery worker or the management command.
+    Claims older than ``STORE_SYNC_LOCK_TIMEOUT`` are treated as abandoned.
+    Progress is written to the store's ``SyncLog`` as chunks are applied.
+    """
+
+    def __init__(self):
+        self.max_workers = getattr(settings, 'STORE_SYNC_MAX_WORKERS', 4)
+        self.lock_timeout = getattr(settings, 'STORE_SYNC_LOCK_TIMEOUT', 3 * 3600)
+
+    def staleness(self, config: StoreIntegrationConfig, now=None) -> float:
+        """
+        Time since the last sync as a multiple of the store's sync interval.
+        """
+        if not config.last_sync_at:
+            return float('inf')
+        now = now or timezone.now()
+        interval = SYNC_INTERVALS.get(config.sync_frequency, SYNC_INTERVALS['daily'])
+        return (now - config.last_sync_at) / interval
+
+    def is_due(self, config: StoreIntegrationConfig, now=None) -> bool:
+        return self.staleness(config, now) >= 1
+
+    def prioritise(self, configs: Iterable[StoreIntegrationConfig], due_only: bool = True,
+                   now=None) -> List[StoreIntegrationConfig]:
+        """
+        Order configs by descending staleness, then by sync frequency.
+        """
+        now = now or timezone.now()
+        ranked = []
+        for config in configs:
+            staleness = self.staleness(config, now)
+            if due_only and staleness < 1:
+                continue
+            ranked.append((-staleness, FREQUENCY_RANK.get(config.sync_frequency, 2), str(config.id), config))
+        ranked.sort(key=lambda item: item[:3])
+        return [item[3] for item in ranked]
+
+    def acquire(self, config_id) -> Optional[str]:
+        """
+        Claim the store for syncing, returning a token or None if it is claimed.
+        """
+        now = timezone.now()
+        token = uuid.uuid4()
+        claimed = StoreIntegrationConfig.objects.filter(
+            Q(sync_claim_token__isnull=True) | Q(sync_claimed_at__lt=now - timedelta(seconds=self.lock_timeout)),
+            id=config_id
+        ).update(sync_claim_token=token, sync_claimed_at=now)
+        return token.hex if claimed else None
+
+    def release(self, config_id, token: str):
+        StoreIntegrationConfig.objects.filter(id=config_id, sync_claim_token=token).update(
+            sync_claim_token=None, sync_claimed_at=None
+        )
+
+    def is_locked(self, config_id) -> bool:
+        return StoreIntegrationConfig.objects.filter(
+            id=config_id,
+            sync_claim_token__isnull=False,
+            sync_claimed_at__gte=timezone.now() - timedelta(seconds=self.lock_timeout)
+        ).exists()
+
+    def sync_config(self, config: StoreIntegrationConfig, full_sync: bool = False) -> Dict:
+        """
+        Sync one store under its lock.
+        """
+        from .services import StoreIntegrationService
+
+        token = self.acquire(config.id)
+        if token is None:
+            logger.info(f"Sync already running for {config.shop.name}, skipping")
+            return {'success': False, 'skipped': True, 'error': 'Sync already in progress'}
+
+        try:
+            integration = StoreIntegrationService.get_integration(config)
+            return integration.sync_products(full_sync=full_sync)
+        except Exception as e:
+            logger.error(f"Failed to sync {config.shop.name}: {e}")
+            return {'success': False, 'error': str(e)}
+        finally:
+            self.release(config.id, token)
+
+    def run(self, configs: Iterable[StoreIntegrationConfig] = None, full_sync: bool = False,
+            due_only: bool = False, max_workers: int = None,
+            on_complete: Callable[[StoreIntegrationConfig, Dict], None] = None) -> List[Dict]:
+        """
+        Sync stores concurrently in priority order.
+
+        Args:
+            configs: Configs to consider, defaults to all active integrations
+            full_sync: Perform full instead of incremental syncs
+            due_only: Skip stores that are not yet due for a sync
+            max_workers: Pool size, defaults to ``STORE_SYNC_MAX_WORKERS``
+            on_complete: Called with ``(config, result)`` as each store finishes
+
+        Returns:
+            List of ``{'shop', 'platform', 'result'}`` dicts in priority order
+        """
+        if configs is None:
+            configs = StoreIntegrationConfig.objects.filter(is_active=True).select_related('shop')
+        configs = self.prioritise(configs, due_only=due_only)
+        max_workers = max(1, min(max_workers or self.max_workers, len(configs) or 1))
+
+        results = {}
+
+        def finish(config, result):
+            results[config.id] = {
+                'shop': config.shop.name,
+                'platform': config.platform,
+                'result': result
+            }
+            if on_complete:
+                on_complete(config, result)
+
+        if max_workers == 1:
+            for config in configs:
+                finish(config, self.sync_config(config, full_sync))
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='store-sync') as executor:
+                futures = {
+                    executor.submit(self._run_in_worker, config, full_sync): config
+                    for config in configs
+                }
+                for future in as_completed(futures):
+                    finish(futures[future], future.result())
+
+        return [results[config.id] for config in configs]
+
+    def _run_in_worker(self, config, full_sync):
+        # Worker threads open their own database connection; close it when done
+        try:
+            return self.sync_config(config, full_sync)
+        finally:
+            connection.close()
+
+
+# Create singleton instance
+store_sync_scheduler = StoreSyncScheduler()
@@ -129,3 +129,5 @@ class StorePerformanceSerializer(serializers.Serializer):
     average_price_competitiveness = serializers.DecimalField(max_digits=5, decimal_places=2)
     last_sync_status = serializers.CharField()
     sync_frequency = serializers.CharField()
+    overall_score = serializers.DecimalField(max_digits=4, decimal_places=2, required=False, allow_null=True)
+    as_of = serializers.DateTimeField(required=False, allow_null=True)
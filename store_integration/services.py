@@ -4,19 +4,91 @@ store_integration/services.py
 Services for integrating with external stores and synchronizing data.
 """
 
-import requests
 import logging
-from typing import Dict, List, Optional, Any
+import queue
+import threading
+from typing import Dict, Iterator, List, Optional, Any, Tuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+from urllib.parse import parse_qs, urlparse
 from django.conf import settings
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from decimal import Decimal
 from .models import StoreIntegrationConfig, ProductMapping, PriceHistory, SyncLog
+from .category_stats import category_statistics_service
+from .latest_prices import latest_price_service
+from .sync_engine import BulkSyncEngine, normalise_product_data, product_changes
+from .http_client import StoreHTTPClient, get_store_client
+from core.search_cache import search_result_cache
 from core.models import Product, Shop, Brand, Category
 import json
 
 logger = logging.getLogger(__name__)
 
 
+def prefetch_pages(pages: Iterator[List[Dict]], depth: int = 1) -> Iterator[List[Dict]]:
+    """
+    Run a page iterator in a background thread, keeping at most ``depth``
+    pages buffered, so the next page downloads while the current one is
+    being written.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    done = object()
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        # Give up once the consumer has gone away
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for page in pages:
+                if not put(page):
+                    return
+            put(done)
+        except BaseException as e:
+            put(e)
+
+    worker = threading.Thread(target=produce, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """
+    Parse a platform timestamp; naive values are taken as UTC.
+    """
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = parse_datetime(str(value))
+        except ValueError:
+            return None
+        if parsed is None:
+            return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
 class BaseStoreIntegration:
     """
     Base class for store integrations.
@@ -25,6 +97,15 @@ class BaseStoreIntegration:
     def __init__(self, config: StoreIntegrationConfig):
         self.config = config
         self.shop = config.shop
+        # Watermark candidates observed during the current product walk
+        self.sync_state = {}
+    
+    @property
+    def http(self) -> StoreHTTPClient:
+        """
+        Pooled, rate-limited HTTP client shared by all integrations of this store.
+        """
+        return get_store_client(self.config)
         
     def authenticate(self) -> bool:
         """
@@ -38,6 +119,128 @@ class BaseStoreIntegration:
         """
         raise NotImplementedError("Subclasses must implement fetch_products method")
     
+    def fetch_many_product_details(self, external_ids: List[str]) -> Dict[str, Any]:
+        """
+        Fetch product details concurrently within the store's rate limit.
+
+        Returns a dict of external id to product data, or to the exception
+        raised while fetching it.
+        """
+        external_ids = list(external_ids)
+        results = self.http.map(self.fetch_product_details, external_ids)
+        return dict(zip(external_ids, results))
+    
+    # Largest number of ids the platform's list endpoint accepts in one call
+    LIST_BY_IDS_LIMIT = None
+    
+    def fetch_products_by_ids(self, external_ids: List[str]) -> Dict[str, Any]:
+        """
+        Fetch many products through the platform's list endpoint.
+
+        Ids are sent in groups of ``LIST_BY_IDS_LIMIT``, with the groups
+        fetched concurrently. Returns a dict of external id to product data;
+        ids missing from the response are left out, and every id of a failed
+        group maps to the exception. Platforms without such an endpoint fall
+        back to ``fetch_many_product_details``.
+        """
+        external_ids = [str(external_id) for external_id in external_ids]
+        if not self.LIST_BY_IDS_LIMIT:
+            return self.fetch_many_product_details(external_ids)
+        
+        groups = [
+            external_ids[start:start + self.LIST_BY_IDS_LIMIT]
+            for start in range(0, len(external_ids), self.LIST_BY_IDS_LIMIT)
+        ]
+        results = {}
+        for group, products in zip(groups, self.http.map(self.fetch_product_list, groups)):
+            if isinstance(products, Exception):
+                results.update({external_id: products for external_id in group})
+                continue
+            for product_data in products:
+                results[str(product_data.get('id'))] = product_data
+        return results
+    
+    def fetch_product_list(self, external_ids: List[str]) -> List[Dict]:
+        """
+        Fetch up to ``LIST_BY_IDS_LIMIT`` products by id in one request.
+        """
+        raise NotImplementedError("Subclasses with a list endpoint must implement fetch_product_list")
+    
+    def iter_product_pages(self, page_size: int = 100, since: Dict = None) -> Iterator[List[Dict]]:
+        """
+        Yield pages of products until the external catalogue is exhausted.
+
+        Subclasses override this to follow their platform's pagination and to
+        ask only for products changed since the ``since`` watermark; the
+        default walks ``fetch_products`` by offset and ignores ``since``.
+        """
+        offset = 0
+        while True:
+            products = self.fetch_products(limit=page_size, offset=offset)
+            if products:
+                yield products
+            if len(products) < page_size:
+                return
+            offset += page_size
+    
+    def iter_products(self, page_size: int = 100, since: Dict = None) -> Iterator[Dict]:
+        """
+        Yield every product (changed since ``since``, when given), fetching
+        the next page in the background.
+        """
+        self.sync_state = {}
+        latest = None
+        for page in prefetch_pages(self.iter_product_pages(page_size, since=since)):
+            for product_data in page:
+                updated_at = parse_timestamp(product_data.get('updated_at'))
+                if updated_at and (latest is None or updated_at > latest):
+                    latest = updated_at
+                    self.sync_state['updated_at'] = latest.isoformat()
+                yield product_data
+    
+    def conditional_headers(self, since: Dict = None) -> Dict:
+        """
+        ``If-None-Match``/``If-Modified-Since`` headers for the first page of a delta sync.
+        """
+        headers = {}
+        if since:
+            if since.get('etag'):
+                headers['If-None-Match'] = since['etag']
+            if since.get('last_modified'):
+                headers['If-Modified-Since'] = since['last_modified']
+        return headers
+    
+    def observe_response(self, response):
+        """
+        Remember the validators of a first-page response for the next delta sync.
+        """
+        if response.status_code == 304:
+            self.sync_state['not_modified'] = True
+            return
+        for header, key in (('ETag', 'etag'), ('Last-Modified', 'last_modified')):
+            value = response.headers.get(header)
+            if value:
+                self.sync_state[key] = value
+    
+    def next_watermark(self, previous: Dict = None) -> Dict:
+        """
+        Merge what the last product walk observed into the previous watermark.
+        """
+        watermark = dict(previous or {})
+        if self.sync_state.get('not_modified'):
+            return watermark
+        observed = parse_timestamp(self.sync_state.get('updated_at'))
+        if observed and (
+            not watermark.get('updated_at') or observed > parse_timestamp(watermark['updated_at'])
+        ):
+            watermark['updated_at'] = observed.isoformat()
+        for key in ('etag', 'last_modified'):
+            if self.sync_state.get(key):
+                watermark[key] = self.sync_state[key]
+            else:
+                watermark.pop(key, None)
+        return watermark
+    
     def fetch_product_details(self, external_id: str) -> Dict:
         """
         Fetch detailed product information.
@@ -58,23 +261,26 @@ class BaseStoreIntegration:
             if not self.authenticate():
                 raise Exception("Authentication failed")
             
-            products_data = self.fetch_products()
-            processed = 0
-            created = 0
-            updated = 0
-            errors = []
+            # Incremental syncs only ask for products changed since the
+            # watermark, and skip payloads whose content hash is unchanged
+            since = None if full_sync else (self.config.sync_watermark or None)
+            sync_log.summary = {'since': since} if since else {}
+            products_data = self.iter_products(since=since)
             
-            for product_data in products_data:
-                try:
-                    result = self.process_product(product_data)
-                    processed += 1
-                    if result['created']:
-                        created += 1
-                    else:
-                        updated += 1
-                except Exception as e:
-                    errors.append(f"Product {product_data.get('id', 'unknown')}: {str(e)}")
-                    logger.error(f"Error processing product: {e}")
+            # Apply the products in bulk chunks; category statistics are
+            # refreshed once per touched category after the run
+            with category_statistics_service.deferred():
+                result = BulkSyncEngine(self, skip_unchanged=not full_sync).run(
+                    products_data, progress=lambda totals: self._record_progress(sync_log, totals)
+                )
+            
+            processed = result['processed']
+            created = result['created']
+            updated = result['updated']
+            errors = result['errors']
+            
+            # Invalidate cached search results for the new catalogue state
+            search_result_cache.bump_catalogue_version()
             
             sync_log.status = 'completed' if not errors else 'partial'
             sync_log.products_processed = processed
@@ -82,12 +288,27 @@ class BaseStoreIntegration:
             sync_log.products_updated = updated
             sync_log.errors_count = len(errors)
             sync_log.error_details = '\n'.join(errors) if errors else None
+            sync_log.summary = {
+                **sync_log.summary,
+                'unchanged': result['unchanged'],
+                'not_modified': bool(self.sync_state.get('not_modified')),
+            }
             sync_log.completed_at = timezone.now()
             sync_log.save()
             
             # Update shop's last sync time
             self.shop.last_sync_at = timezone.now()
             self.shop.save()
+            self.config.last_sync_at = self.shop.last_sync_at
+            
+            # Only move the watermark forward when every product was applied,
+            # so failed products are fetched again next time
+            if not errors:
+                self.config.sync_watermark = self.next_watermark(since)
+            StoreIntegrationConfig.objects.filter(pk=self.config.pk).update(
+                last_sync_at=self.config.last_sync_at,
+                sync_watermark=self.config.sync_watermark
+            )
             
             return {
                 'success': True,
@@ -109,20 +330,47 @@ class BaseStoreIntegration:
                 'error': str(e)
             }
     
-    def process_product(self, product_data: Dict) -> Dict:
+    def _record_progress(self, sync_log: SyncLog, totals: Dict):
+        """
+        Write running sync totals to the log so long syncs can be followed.
+        """
+        sync_log.products_processed = totals['processed']
+        sync_log.products_created = totals['created']
+        sync_log.products_updated = totals['updated']
+        sync_log.errors_count = len(totals['errors'])
+        sync_log.summary = {
+            **(sync_log.summary or {}),
+            'unchanged': totals['unchanged'],
+            'progress_at': timezone.now().isoformat(),
+        }
+        SyncLog.objects.filter(pk=sync_log.pk).update(
+            products_processed=sync_log.products_processed,
+            products_created=sync_log.products_created,
+            products_updated=sync_log.products_updated,
+            errors_count=sync_log.errors_count,
+            summary=sync_log.summary
+        )
+
+    def process_product(self, product_data: Dict, force: bool = False) -> Dict:
         """
         Process a single product from external store.
+
+        Payloads whose content hash matches the mapping's stored hash are
+        skipped without any writes unless ``force`` is set.
         """
         external_id = str(product_data.get('id'))
+        row = normalise_product_data(product_data)
         
         # Check if product mapping exists
         try:
-            mapping = ProductMapping.objects.get(
+            mapping = ProductMapping.objects.select_related('local_product').get(
                 integration_config=self.config,
                 external_product_id=external_id
             )
             product = mapping.local_product
             created = False
+            if not force and mapping.content_hash == row['content_hash'] and mapping.sync_status == 'synced':
+                return {'created': False, 'changed': False, 'product': product}
         except ProductMapping.DoesNotExist:
             # Create new product
             product = self.create_product_from_data(product_data)
@@ -136,17 +384,19 @@ class BaseStoreIntegration:
             created = True
         
         # Update product data
-        self.update_product_from_data(product, product_data)
+        changed_fields = [] if created else self.update_product_from_data(product, product_data)
         
         # Record price history
-        self.record_price_history(product, product_data)
+        if created or 'price' in changed_fields:
+            self.record_price_history(product, product_data)
         
         # Update mapping
         mapping.last_sync_at = timezone.now()
         mapping.sync_status = 'synced'
-        mapping.save()
+        mapping.content_hash = row['content_hash']
+        mapping.save(update_fields=['last_sync_at', 'sync_status', 'content_hash', 'updated_at'])
         
-        return {'created': created, 'product': product}
+        return {'created': created, 'changed': created or bool(changed_fields), 'product': product}
     
     def create_product_from_data(self, product_data: Dict) -> Product:
         """
@@ -187,26 +437,23 @@ class BaseStoreIntegration:
         
         return product
     
-    def update_product_from_data(self, product: Product, product_data: Dict):
+    def update_product_from_data(self, product: Product, product_data: Dict) -> List[str]:
         """
         Update existing product with data from external store.
+
+        Only fields whose value changed are written; nothing is saved when the
+        payload matches the product. Returns the changed field names.
         """
-        # Update basic fields
-        product.name = product_data.get('name', product.name)
-        product.description = product_data.get('description', product.description)
-        product.price = Decimal(str(product_data.get('price', product.price)))
+        changes = product_changes(product, normalise_product_data(product_data))
+        if not changes:
+            return []
         
-        if product_data.get('original_price'):
-            product.original_price = Decimal(str(product_data.get('original_price')))
+        for field, value in changes.items():
+            setattr(product, field, value)
         
-        product.image_url = product_data.get('image_url', product.image_url)
-        product.is_active = product_data.get('is_active', product.is_active)
-        
-        # Update rating if provided
-        if product_data.get('rating'):
-            product.rating = Decimal(str(product_data.get('rating')))
-        
-        product.save()
+        # The save marks the product for the rating tracker to re-rate
+        product.save(update_fields=list(changes))
+        return list(changes)
     
     def record_price_history(self, product: Product, product_data: Dict):
         """
@@ -219,20 +466,17 @@ class BaseStoreIntegration:
             original_price = Decimal(str(product_data.get('original_price')))
         
         # Only record if price has changed or it's the first record
-        latest_price = PriceHistory.objects.filter(
-            product=product,
-            shop=self.shop
-        ).first()
+        latest_price = latest_price_service.get(product.id, self.shop.id)
         
         if not latest_price or latest_price.price != price:
-            PriceHistory.objects.create(
+            latest_price_service.record([PriceHistory(
                 product=product,
                 shop=self.shop,
                 price=price,
                 original_price=original_price,
                 is_available=product_data.get('is_available', True),
                 stock_quantity=product_data.get('stock_quantity')
-            )
+            )])
 
 
 class ShopifyIntegration(BaseStoreIntegration):
@@ -240,20 +484,22 @@ class ShopifyIntegration(BaseStoreIntegration):
     Integration with Shopify stores.
     """
     
+    def get_headers(self) -> Dict:
+        return {
+            'X-Shopify-Access-Token': self.config.access_token,
+            'Content-Type': 'application/json'
+        }
+    
     def authenticate(self) -> bool:
         """
         Authenticate with Shopify API.
         """
         try:
-            headers = {
-                'X-Shopify-Access-Token': self.config.access_token,
-                'Content-Type': 'application/json'
-            }
+            headers = self.get_headers()
             
-            response = requests.get(
+            response = self.http.get(
                 f"{self.config.store_url}/admin/api/2023-10/shop.json",
-                headers=headers,
-                timeout=30
+                headers=headers
             )
             
             return response.status_code == 200
@@ -264,24 +510,44 @@ class ShopifyIntegration(BaseStoreIntegration):
     def fetch_products(self, limit: int = 100, offset: int = 0) -> List[Dict]:
         """
         Fetch products from Shopify.
+
+        Shopify paginates with cursors, so ``offset`` cannot be honoured; this
+        returns the first page. Use ``iter_product_pages`` to walk the catalogue.
         """
-        headers = {
-            'X-Shopify-Access-Token': self.config.access_token,
-            'Content-Type': 'application/json'
-        }
+        products, _ = self.fetch_product_page(limit=limit)
+        return products
+    
+    def fetch_product_page(self, limit: int = 100, page_info: str = None,
+                           since: Dict = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Fetch one page of products and the ``page_info`` cursor of the next page.
+
+        ``since`` only applies to the first page; later pages carry the filter
+        in their cursor.
+        """
+        headers = self.get_headers()
         
-        params = {
-            'limit': min(limit, 250),  # Shopify max is 250
-            'page_info': offset if offset else None
-        }
+        # Shopify rejects other filters when page_info is present
+        params = {'limit': min(limit, 250)}  # Shopify max is 250
+        if page_info:
+            params['page_info'] = page_info
+        elif since:
+            updated_at = parse_timestamp(since.get('updated_at'))
+            if updated_at:
+                params['updated_at_min'] = updated_at.isoformat()
+            headers.update(self.conditional_headers(since))
         
-        response = requests.get(
+        response = self.http.get(
             f"{self.config.store_url}/admin/api/2023-10/products.json",
             headers=headers,
-            params=params,
-            timeout=30
+            params=params
         )
         
+        if not page_info:
+            self.observe_response(response)
+        if response.status_code == 304:
+            return [], None
+        
         if response.status_code == 200:
             data = response.json()
             products = []
@@ -291,10 +557,65 @@ class ShopifyIntegration(BaseStoreIntegration):
                 transformed = self.transform_shopify_product(product)
                 products.append(transformed)
             
-            return products
+            return products, self._next_page_info(response)
+        else:
+            raise Exception(f"Failed to fetch products: {response.status_code}")
+    
+    def fetch_product_details(self, external_id: str) -> Dict:
+        """
+        Fetch a single product from Shopify.
+        """
+        response = self.http.get(
+            f"{self.config.store_url}/admin/api/2023-10/products/{external_id}.json",
+            headers=self.get_headers()
+        )
+        
+        if response.status_code == 200:
+            return self.transform_shopify_product(response.json().get('product', {}))
+        else:
+            raise Exception(f"Failed to fetch product {external_id}: {response.status_code}")
+    
+    LIST_BY_IDS_LIMIT = 250
+    
+    def fetch_product_list(self, external_ids: List[str]) -> List[Dict]:
+        """
+        Fetch products by id with the ``ids`` filter of products.json.
+        """
+        response = self.http.get(
+            f"{self.config.store_url}/admin/api/2023-10/products.json",
+            headers=self.get_headers(),
+            params={'ids': ','.join(external_ids), 'limit': len(external_ids)}
+        )
+        
+        if response.status_code == 200:
+            return [self.transform_shopify_product(p) for p in response.json().get('products', [])]
         else:
             raise Exception(f"Failed to fetch products: {response.status_code}")
     
+    def iter_product_pages(self, page_size: int = 100, since: Dict = None) -> Iterator[List[Dict]]:
+        """
+        Follow Shopify's Link header ``page_info`` cursors.
+        """
+        page_info = None
+        while True:
+            products, page_info = self.fetch_product_page(
+                limit=page_size, page_info=page_info, since=since
+            )
+            if products:
+                yield products
+            if not page_info:
+                return
+    
+    @staticmethod
+    def _next_page_info(response) -> Optional[str]:
+        """
+        Extract the ``page_info`` of the ``rel="next"`` Link header, if any.
+        """
+        next_url = response.links.get('next', {}).get('url')
+        if not next_url:
+            return None
+        return parse_qs(urlparse(next_url).query).get('page_info', [None])[0]
+    
     def transform_shopify_product(self, shopify_product: Dict) -> Dict:
         """
         Transform Shopify product data to our format.
@@ -320,7 +641,8 @@ class ShopifyIntegration(BaseStoreIntegration):
             'is_active': shopify_product.get('status') == 'active',
             'is_available': variant.get('inventory_quantity', 0) > 0,
             'stock_quantity': variant.get('inventory_quantity', 0),
-            'url': f"{self.config.store_url}/products/{shopify_product.get('handle', '')}"
+            'url': f"{self.config.store_url}/products/{shopify_product.get('handle', '')}",
+            'updated_at': shopify_product.get('updated_at')
         }
 
 
@@ -329,27 +651,29 @@ class WooCommerceIntegration(BaseStoreIntegration):
     Integration with WooCommerce stores.
     """
 
+    def get_headers(self) -> Dict:
+        import base64
+
+        # WooCommerce uses basic auth with consumer key and secret
+        credentials = base64.b64encode(
+            f"{self.config.api_key}:{self.config.api_secret}".encode()
+        ).decode()
+
+        return {
+            'Authorization': f'Basic {credentials}',
+            'Content-Type': 'application/json'
+        }
+
     def authenticate(self) -> bool:
         """
         Authenticate with WooCommerce API.
         """
         try:
-            import base64
-
-            # WooCommerce uses basic auth with consumer key and secret
-            credentials = base64.b64encode(
-                f"{self.config.api_key}:{self.config.api_secret}".encode()
-            ).decode()
+            headers = self.get_headers()
 
-            headers = {
-                'Authorization': f'Basic {credentials}',
-                'Content-Type': 'application/json'
-            }
-
-            response = requests.get(
+            response = self.http.get(
                 f"{self.config.store_url}/wp-json/wc/v3/system_status",
-                headers=headers,
-                timeout=30
+                headers=headers
             )
 
             return response.status_code == 200
@@ -361,30 +685,43 @@ class WooCommerceIntegration(BaseStoreIntegration):
         """
         Fetch products from WooCommerce.
         """
-        import base64
-
-        credentials = base64.b64encode(
-            f"{self.config.api_key}:{self.config.api_secret}".encode()
-        ).decode()
+        products, _ = self.fetch_product_page(page=(offset // limit) + 1, per_page=limit)
+        return products
 
-        headers = {
-            'Authorization': f'Basic {credentials}',
-            'Content-Type': 'application/json'
-        }
+    def fetch_product_page(self, page: int = 1, per_page: int = 100,
+                           since: Dict = None) -> Tuple[List[Dict], int]:
+        """
+        Fetch one page of products and the total number of pages.
+        """
+        headers = self.get_headers()
 
         params = {
-            'per_page': min(limit, 100),  # WooCommerce max is 100
-            'page': (offset // limit) + 1,
+            'per_page': min(per_page, 100),  # WooCommerce max is 100
+            'page': page,
             'status': 'publish'
         }
-
-        response = requests.get(
+        if since:
+            updated_at = parse_timestamp(since.get('updated_at'))
+            if updated_at:
+                # modified_after is exclusive and second-granular; step back a
+                # second so edits within the watermark's second are not missed
+                modified_after = updated_at.astimezone(dt_timezone.utc) - timedelta(seconds=1)
+                params['modified_after'] = modified_after.strftime('%Y-%m-%dT%H:%M:%S')
+                params['dates_are_gmt'] = 'true'
+            if page == 1:
+                headers.update(self.conditional_headers(since))
+
+        response = self.http.get(
             f"{self.config.store_url}/wp-json/wc/v3/products",
             headers=headers,
-            params=params,
-            timeout=30
+            params=params
         )
 
+        if page == 1:
+            self.observe_response(response)
+        if response.status_code == 304:
+            return [], page
+
         if response.status_code == 200:
             products = response.json()
             transformed_products = []
@@ -393,10 +730,55 @@ class WooCommerceIntegration(BaseStoreIntegration):
                 transformed = self.transform_woocommerce_product(product)
                 transformed_products.append(transformed)
 
-            return transformed_products
+            total_pages = int(response.headers.get('X-WP-TotalPages', page))
+            return transformed_products, total_pages
+        else:
+            raise Exception(f"Failed to fetch products: {response.status_code}")
+
+    def fetch_product_details(self, external_id: str) -> Dict:
+        """
+        Fetch a single product from WooCommerce.
+        """
+        response = self.http.get(
+            f"{self.config.store_url}/wp-json/wc/v3/products/{external_id}",
+            headers=self.get_headers()
+        )
+
+        if response.status_code == 200:
+            return self.transform_woocommerce_product(response.json())
+        else:
+            raise Exception(f"Failed to fetch product {external_id}: {response.status_code}")
+
+    LIST_BY_IDS_LIMIT = 100
+
+    def fetch_product_list(self, external_ids: List[str]) -> List[Dict]:
+        """
+        Fetch products by id with the ``include`` filter.
+        """
+        response = self.http.get(
+            f"{self.config.store_url}/wp-json/wc/v3/products",
+            headers=self.get_headers(),
+            params={'include': ','.join(external_ids), 'per_page': len(external_ids)}
+        )
+
+        if response.status_code == 200:
+            return [self.transform_woocommerce_product(p) for p in response.json()]
         else:
             raise Exception(f"Failed to fetch products: {response.status_code}")
 
+    def iter_product_pages(self, page_size: int = 100, since: Dict = None) -> Iterator[List[Dict]]:
+        """
+        Walk WooCommerce ``page`` numbers up to ``X-WP-TotalPages``.
+        """
+        page = 1
+        while True:
+            products, total_pages = self.fetch_product_page(page=page, per_page=page_size, since=since)
+            if products:
+                yield products
+            if not products or page >= total_pages:
+                return
+            page += 1
+
     def transform_woocommerce_product(self, wc_product: Dict) -> Dict:
         """
         Transform WooCommerce product data to our format.
@@ -423,7 +805,8 @@ class WooCommerceIntegration(BaseStoreIntegration):
             'is_available': wc_product.get('stock_status') == 'instock',
             'stock_quantity': wc_product.get('stock_quantity', 0),
             'rating': rating,
-            'url': wc_product.get('permalink', '')
+            'url': wc_product.get('permalink', ''),
+            'updated_at': wc_product.get('date_modified_gmt')
         }
 
 
@@ -432,20 +815,22 @@ class MagentoIntegration(BaseStoreIntegration):
     Integration with Magento stores.
     """
 
+    def get_headers(self) -> Dict:
+        return {
+            'Authorization': f'Bearer {self.config.access_token}',
+            'Content-Type': 'application/json'
+        }
+
     def authenticate(self) -> bool:
         """
         Authenticate with Magento API.
         """
         try:
-            headers = {
-                'Authorization': f'Bearer {self.config.access_token}',
-                'Content-Type': 'application/json'
-            }
+            headers = self.get_headers()
 
-            response = requests.get(
+            response = self.http.get(
                 f"{self.config.store_url}/rest/V1/modules",
-                headers=headers,
-                timeout=30
+                headers=headers
             )
 
             return response.status_code == 200
@@ -457,24 +842,36 @@ class MagentoIntegration(BaseStoreIntegration):
         """
         Fetch products from Magento.
         """
-        headers = {
-            'Authorization': f'Bearer {self.config.access_token}',
-            'Content-Type': 'application/json'
-        }
+        products, _ = self.fetch_product_page(current_page=(offset // limit) + 1, page_size=limit)
+        return products
+
+    def fetch_product_page(self, current_page: int = 1, page_size: int = 100,
+                           since: Dict = None) -> Tuple[List[Dict], int]:
+        """
+        Fetch one ``searchCriteria`` page of products and the total product count.
+        """
+        headers = self.get_headers()
 
         params = {
-            'searchCriteria[pageSize]': min(limit, 100),
-            'searchCriteria[currentPage]': (offset // limit) + 1,
+            'searchCriteria[pageSize]': min(page_size, 100),
+            'searchCriteria[currentPage]': current_page,
             'searchCriteria[filterGroups][0][filters][0][field]': 'status',
             'searchCriteria[filterGroups][0][filters][0][value]': '1',  # Enabled
             'searchCriteria[filterGroups][0][filters][0][conditionType]': 'eq'
         }
-
-        response = requests.get(
+        updated_at = parse_timestamp(since.get('updated_at')) if since else None
+        if updated_at:
+            # Filter groups are ANDed together
+            params.update({
+                'searchCriteria[filterGroups][1][filters][0][field]': 'updated_at',
+                'searchCriteria[filterGroups][1][filters][0][value]': updated_at.astimezone(dt_timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+                'searchCriteria[filterGroups][1][filters][0][conditionType]': 'gteq'
+            })
+
+        response = self.http.get(
             f"{self.config.store_url}/rest/V1/products",
             headers=headers,
-            params=params,
-            timeout=30
+            params=params
         )
 
         if response.status_code == 200:
@@ -486,10 +883,75 @@ class MagentoIntegration(BaseStoreIntegration):
                 transformed = self.transform_magento_product(product)
                 transformed_products.append(transformed)
 
-            return transformed_products
+            return transformed_products, data.get('total_count', 0)
+        else:
+            raise Exception(f"Failed to fetch products: {response.status_code}")
+
+    def fetch_product_details(self, external_id: str) -> Dict:
+        """
+        Fetch a single product from Magento by entity id.
+        """
+        params = {
+            'searchCriteria[filterGroups][0][filters][0][field]': 'entity_id',
+            'searchCriteria[filterGroups][0][filters][0][value]': external_id,
+            'searchCriteria[filterGroups][0][filters][0][conditionType]': 'eq'
+        }
+
+        response = self.http.get(
+            f"{self.config.store_url}/rest/V1/products",
+            headers=self.get_headers(),
+            params=params
+        )
+
+        if response.status_code == 200:
+            items = response.json().get('items', [])
+            if not items:
+                raise Exception(f"Product {external_id} not found")
+            return self.transform_magento_product(items[0])
+        else:
+            raise Exception(f"Failed to fetch product {external_id}: {response.status_code}")
+
+    LIST_BY_IDS_LIMIT = 100
+
+    def fetch_product_list(self, external_ids: List[str]) -> List[Dict]:
+        """
+        Fetch products by entity id with an ``in`` search filter.
+        """
+        params = {
+            'searchCriteria[pageSize]': len(external_ids),
+            'searchCriteria[filterGroups][0][filters][0][field]': 'entity_id',
+            'searchCriteria[filterGroups][0][filters][0][value]': ','.join(external_ids),
+            'searchCriteria[filterGroups][0][filters][0][conditionType]': 'in'
+        }
+
+        response = self.http.get(
+            f"{self.config.store_url}/rest/V1/products",
+            headers=self.get_headers(),
+            params=params
+        )
+
+        if response.status_code == 200:
+            return [self.transform_magento_product(p) for p in response.json().get('items', [])]
         else:
             raise Exception(f"Failed to fetch products: {response.status_code}")
 
+    def iter_product_pages(self, page_size: int = 100, since: Dict = None) -> Iterator[List[Dict]]:
+        """
+        Walk ``searchCriteria[currentPage]`` until ``total_count`` is reached.
+        """
+        page_size = min(page_size, 100)
+        current_page = 1
+        while True:
+            products, total_count = self.fetch_product_page(
+                current_page=current_page, page_size=page_size, since=since
+            )
+            if products:
+                yield products
+            # Magento repeats the last page when currentPage runs past the end
+            if not products or current_page * page_size >= total_count:
+                return
+            current_page += 1
+
     def transform_magento_product(self, magento_product: Dict) -> Dict:
         """
         Transform Magento product data to our format.
@@ -520,7 +982,8 @@ class MagentoIntegration(BaseStoreIntegration):
             'is_available': custom_attrs.get('quantity_and_stock_status', {}).get('is_in_stock', False),
             'stock_quantity': 0,  # Would need inventory lookup
             'rating': 0,  # Would need review lookup
-            'url': f"{self.config.store_url}/catalog/product/view/id/{magento_product.get('id')}"
+            'url': f"{self.config.store_url}/catalog/product/view/id/{magento_product.get('id')}",
+            'updated_at': magento_product.get('updated_at')
         }
 
 
@@ -548,31 +1011,13 @@ class StoreIntegrationService:
         return integration_class(config)
     
     @classmethod
-    def sync_all_stores(cls):
+    def sync_all_stores(cls, max_workers: int = None):
         """
-        Sync all active store integrations.
+        Sync all active store integrations concurrently, most stale first.
         """
-        configs = StoreIntegrationConfig.objects.filter(is_active=True)
-        results = []
-        
-        for config in configs:
-            try:
-                integration = cls.get_integration(config)
-                result = integration.sync_products()
-                results.append({
-                    'shop': config.shop.name,
-                    'platform': config.platform,
-                    'result': result
-                })
-            except Exception as e:
-                logger.error(f"Failed to sync {config.shop.name}: {e}")
-                results.append({
-                    'shop': config.shop.name,
-                    'platform': config.platform,
-                    'result': {'success': False, 'error': str(e)}
-                })
-        
-        return results
+        from .scheduler import store_sync_scheduler
+
+        return store_sync_scheduler.run(max_workers=max_workers)
     
     @classmethod
     def sync_store(cls, shop_id: str):
@@ -581,11 +1026,13 @@ class StoreIntegrationService:
         """
         try:
             config = StoreIntegrationConfig.objects.get(shop_id=shop_id, is_active=True)
-            integration = cls.get_integration(config)
-            return integration.sync_products()
         except StoreIntegrationConfig.DoesNotExist:
             raise ValueError(f"No active integration found for shop {shop_id}")
 
+        from .scheduler import store_sync_scheduler
+
+        return store_sync_scheduler.sync_config(config)
+
     @classmethod
     def test_integration(cls, config: StoreIntegrationConfig) -> Dict:
         """
@@ -831,13 +1278,9 @@ class WebhookHandler:
                     external_product_id=external_id
                 )
 
-                # Update the product
+                # Update the product; unchanged payloads are skipped
                 product_details = integration.fetch_product_details(external_id)
-                integration.update_product_from_data(mapping.local_product, product_details)
-                integration.record_price_history(mapping.local_product, product_details)
-
-                mapping.last_sync_at = timezone.now()
-                mapping.save()
+                integration.process_product(product_details)
 
                 return {
                     'success': True,
@@ -0,0 +1,46 @@
+"""
+store_integration/signals.py
+----------------------------
+Signal handlers that keep store integration read models in step with the catalogue.
+"""
+
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from core.models import Product
+from .category_stats import category_statistics_service
+from .latest_prices import latest_price_service
+from .models import PriceHistory
+
+# Product fields that feed CategoryStatistics
+CATEGORY_STATS_FIELDS = {'category', 'shop', 'brand', 'price', 'is_active'}
+
+
+@receiver(post_init, sender=Product)
+def remember_product_category(sender, instance, **kwargs):
+    # Keep the loaded category so a move between categories refreshes both
+    instance._original_category_id = instance.__dict__.get('category_id')
+
+
+@receiver(post_save, sender=Product)
+def refresh_category_statistics_on_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not CATEGORY_STATS_FIELDS.intersection(update_fields):
+        return
+
+    original_category_id = getattr(instance, '_original_category_id', None)
+    if original_category_id and original_category_id != instance.category_id:
+        category_statistics_service.mark_dirty(original_category_id)
+    category_statistics_service.mark_dirty(instance.category_id)
+    instance._original_category_id = instance.category_id
+
+
+@receiver(post_delete, sender=Product)
+def refresh_category_statistics_on_delete(sender, instance, **kwargs):
+    category_statistics_service.mark_dirty(instance.category_id)
+
+
+@receiver(post_save, sender=PriceHistory)
+def update_latest_price_on_save(sender, instance, created=False, **kwargs):
+    # Bulk writers go through latest_price_service.record; this covers single saves
+    if created:
+        latest_price_service.upsert([instance])
@@ -0,0 +1,364 @@
+"""
+store_integration/sync_engine.py
+--------------------------------
+Batched product synchronization engine used by store integrations.
+"""
+
+import hashlib
+import json
+import logging
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Product, Brand, Category
+from core.rating_tracker import product_rating_tracker
+from .models import ProductMapping, PriceHistory
+from .category_stats import category_statistics_service
+from .latest_prices import latest_price_service
+
+logger = logging.getLogger(__name__)
+
+
+# External fields that do not map to product columns but still count as content
+HASHED_EXTRA_FIELDS = ('sku', 'url', 'is_available', 'stock_quantity')
+
+
+def to_price(value) -> Decimal:
+    # Match the column precision so unchanged prices compare equal
+    return Decimal(str(value)).quantize(Decimal('0.01'))
+
+
+def normalise_product_data(product_data: Dict) -> Dict:
+    """
+    Convert an external product dict into typed column values plus its content hash.
+    """
+    price = product_data.get('price')
+    original_price = product_data.get('original_price')
+    row = {
+        'name': product_data.get('name'),
+        'description': product_data.get('description'),
+        'price': to_price(price) if price is not None else None,
+        'original_price': to_price(original_price) if original_price else None,
+        'image_url': product_data.get('image_url'),
+        'is_active': product_data.get('is_active'),
+        'category': product_data.get('category') or 'Uncategorized',
+        'brand': product_data.get('brand'),
+    }
+    row['content_hash'] = content_hash(row, product_data)
+    row['data'] = product_data
+    return row
+
+
+def content_hash(row: Dict, product_data: Dict) -> str:
+    """
+    Stable hash of a normalised payload, ignoring volatile fields like ``updated_at``.
+    """
+    content = {key: value for key, value in row.items() if key not in ('data', 'content_hash')}
+    content.update({field: product_data.get(field) for field in HASHED_EXTRA_FIELDS})
+    payload = json.dumps(content, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def product_changes(product: Product, row: Dict) -> Dict:
+    """
+    Column values from a normalised row that differ from the product's current ones.
+    """
+    values = {
+        'name': row['name'] if row['name'] is not None else product.name,
+        'description': row['description'] if row['description'] is not None else product.description,
+        'price': row['price'] if row['price'] is not None else product.price,
+        'original_price': row['original_price'] or product.original_price,
+        'image_url': row['image_url'] if row['image_url'] is not None else product.image_url,
+        'is_active': row['is_active'] if row['is_active'] is not None else product.is_active,
+    }
+    return {field: value for field, value in values.items() if getattr(product, field) != value}
+
+
+class BulkSyncEngine:
+    """
+    Applies external product data to the catalogue in chunks.
+
+    Each chunk is handled in one transaction with a fixed number of queries:
+    mappings, categories, brands and latest prices are prefetched into dicts,
+    incoming rows are diffed against the current products, and the changes are
+    written with ``bulk_create``/``bulk_update`` plus a single ``PriceHistory``
+    bulk insert and ``LatestPrice`` upsert.
+
+    Every normalised row carries a content hash that is stored on its
+    ``ProductMapping``. With ``skip_unchanged`` set, rows whose hash matches
+    the stored one are not diffed or written at all.
+    """
+
+    def __init__(self, integration, chunk_size: int = None, skip_unchanged: bool = True):
+        self.integration = integration
+        self.config = integration.config
+        self.shop = integration.shop
+        self.chunk_size = chunk_size or getattr(settings, 'SYNC_CHUNK_SIZE', 500)
+        self.skip_unchanged = skip_unchanged
+
+    def run(self, products_data: Iterable[Dict],
+            progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Synchronize an iterable of external product dicts.
+
+        ``progress`` is called with the running totals after every chunk.
+
+        Returns:
+            Dict with processed/created/updated/unchanged counts, error messages
+            and the external ids of chunks that failed as a whole (``failed``)
+        """
+        totals = {'processed': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'errors': [], 'failed': []}
+
+        for chunk in self._chunks(products_data):
+            try:
+                with transaction.atomic():
+                    result = self.process_chunk(chunk)
+            except Exception as e:
+                logger.error(f"Error syncing chunk for {self.shop.name}: {e}")
+                totals['errors'].extend(
+                    f"Product {data.get('id', 'unknown')}: {str(e)}" for data in chunk
+                )
+                totals['failed'].extend(str(data.get('id')) for data in chunk)
+                continue
+
+            for key in ('processed', 'created', 'updated', 'unchanged'):
+                totals[key] += result[key]
+            totals['errors'].extend(result['errors'])
+
+            if progress:
+                progress(totals)
+
+        return totals
+
+    def process_chunk(self, chunk: List[Dict]) -> Dict:
+        """
+        Apply one chunk of external product data. Must run inside a transaction.
+        """
+        now = timezone.now()
+        errors = []
+
+        # Normalise incoming rows, last occurrence of an external id wins
+        rows = {}
+        for product_data in chunk:
+            external_id = str(product_data.get('id'))
+            try:
+                rows[external_id] = normalise_product_data(product_data)
+            except (InvalidOperation, TypeError, ValueError) as e:
+                errors.append(f"Product {external_id}: {str(e)}")
+
+        if not rows:
+            return {'processed': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'errors': errors}
+
+        # Prefetch current state
+        mappings = {
+            mapping.external_product_id: mapping
+            for mapping in ProductMapping.objects.filter(
+                integration_config=self.config,
+                external_product_id__in=rows.keys()
+            ).select_related('local_product', 'local_product__brand')
+        }
+        new_rows = {ext_id: row for ext_id, row in rows.items() if ext_id not in mappings}
+        skipped = {
+            ext_id for ext_id, mapping in mappings.items()
+            if self.skip_unchanged and mapping.content_hash == rows[ext_id]['content_hash']
+        }
+        changed_mappings = {
+            ext_id: mapping for ext_id, mapping in mappings.items() if ext_id not in skipped
+        }
+        categories = self._get_or_create_categories({row['category'] for row in new_rows.values()})
+        brands = self._get_or_create_brands({row['brand'] for row in new_rows.values() if row['brand']})
+
+        created_products, new_mappings = self._build_new_products(
+            new_rows, categories, brands, errors
+        )
+        changed_products, unchanged, rejected = self._diff_existing_products(
+            rows, changed_mappings, {product.name for product in created_products}, errors
+        )
+        unchanged += len(skipped)
+
+        # Write products and mappings
+        Product.objects.bulk_create(created_products, batch_size=self.chunk_size)
+        self._update_products(changed_products)
+        ProductMapping.objects.bulk_create(new_mappings, batch_size=self.chunk_size)
+
+        # Mappings whose payload hash matched stay untouched, rejected rows are retried next sync
+        mappings = {ext_id: mapping for ext_id, mapping in mappings.items() if ext_id not in rejected}
+        changed_mappings = {ext_id: mapping for ext_id, mapping in changed_mappings.items() if ext_id not in rejected}
+        touched_mappings = [
+            mapping for ext_id, mapping in mappings.items()
+            if ext_id not in skipped or mapping.sync_status != 'synced'
+        ]
+        for mapping in touched_mappings:
+            mapping.last_sync_at = now
+            mapping.sync_status = 'synced'
+            mapping.content_hash = rows[mapping.external_product_id]['content_hash']
+            mapping.updated_at = now
+        if touched_mappings:
+            ProductMapping.objects.bulk_update(
+                touched_mappings, ['last_sync_at', 'sync_status', 'content_hash', 'updated_at'],
+                batch_size=self.chunk_size
+            )
+
+        # Record price history for new products and changed prices
+        synced = {ext_id: mapping.local_product for ext_id, mapping in changed_mappings.items()}
+        synced.update({mapping.external_product_id: mapping.local_product for mapping in new_mappings})
+        self._record_price_history(synced, rows)
+
+        for product in created_products + changed_products:
+            category_statistics_service.mark_dirty(product.category_id)
+        product_rating_tracker.mark([product.id for product in created_products + changed_products], 'sync')
+
+        return {
+            'processed': len(mappings) + len(new_mappings),
+            'created': len(created_products),
+            'updated': len(changed_products),
+            'unchanged': unchanged,
+            'errors': errors
+        }
+
+    def _update_products(self, products: List[Product]):
+        """
+        Bulk update changed products, writing only the columns that changed.
+        """
+        groups = {}
+        for product in products:
+            groups.setdefault(product._changed_fields, []).append(product)
+        for fields, group in groups.items():
+            Product.objects.bulk_update(group, list(fields), batch_size=self.chunk_size)
+
+    def _chunks(self, products_data: Iterable[Dict]) -> Iterator[List[Dict]]:
+        chunk = []
+        for product_data in products_data:
+            chunk.append(product_data)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _get_or_create_categories(self, names) -> Dict[str, Category]:
+        categories = {c.name: c for c in Category.objects.filter(name__in=names)}
+        missing = [
+            Category(name=name, description=f'Category for {name}')
+            for name in names if name not in categories
+        ]
+        if missing:
+            Category.objects.bulk_create(missing, ignore_conflicts=True)
+            categories = {c.name: c for c in Category.objects.filter(name__in=names)}
+        return categories
+
+    def _get_or_create_brands(self, names) -> Dict[str, Brand]:
+        brands = {b.name: b for b in Brand.objects.filter(name__in=names)}
+        missing = [
+            Brand(name=name, popularity=Decimal('50.0'), rating=Decimal('3.0'))
+            for name in names if name not in brands
+        ]
+        if missing:
+            Brand.objects.bulk_create(missing, ignore_conflicts=True)
+            brands = {b.name: b for b in Brand.objects.filter(name__in=names)}
+        return brands
+
+    def _build_new_products(self, new_rows: Dict, categories: Dict, brands: Dict, errors: List):
+        """
+        Build unsaved products and mappings for rows without a mapping.
+        """
+        names = {row['name'] or 'Unnamed Product' for row in new_rows.values()}
+        taken = set(Product.objects.filter(name__in=names).values_list('name', flat=True))
+
+        products, mappings = [], []
+        for external_id, row in new_rows.items():
+            data = row['data']
+            name = row['name'] or 'Unnamed Product'
+            if name in taken:
+                # Product names are unique across the catalogue
+                errors.append(f"Product {external_id}: product named '{name}' already exists")
+                continue
+            taken.add(name)
+
+            product = Product(
+                name=name,
+                description=row['description'] or '',
+                price=row['price'] if row['price'] is not None else Decimal('0'),
+                original_price=row['original_price'],
+                category=categories[row['category']],
+                brand=brands.get(row['brand']) if row['brand'] else None,
+                shop=self.shop,
+                image_url=row['image_url'] or '',
+                is_active=row['is_active'] if row['is_active'] is not None else True,
+            )
+            # Provisional until the rating tracker rates the new product
+            product.rating = Decimal(str(product.auto_rating))
+            products.append(product)
+            mappings.append(ProductMapping(
+                local_product=product,
+                integration_config=self.config,
+                external_product_id=external_id,
+                external_sku=data.get('sku', ''),
+                external_url=data.get('url', ''),
+                content_hash=row['content_hash'],
+                last_sync_at=timezone.now(),
+                sync_status='synced'
+            ))
+        return products, mappings
+
+    def _diff_existing_products(self, rows: Dict, mappings: Dict, reserved_names, errors: List):
+        """
+        Apply incoming values to mapped products, returning those that changed,
+        the unchanged count and the external ids rejected for a taken name.
+        """
+        renames = {
+            row['name'] for external_id, row in rows.items()
+            if external_id in mappings and row['name'] not in (None, mappings[external_id].local_product.name)
+        }
+        taken = set(reserved_names)
+        taken.update(Product.objects.filter(name__in=renames).values_list('name', flat=True))
+
+        changed, unchanged, rejected = [], 0, set()
+        for external_id, mapping in mappings.items():
+            row = rows[external_id]
+            product = mapping.local_product
+            changes = product_changes(product, row)
+            if 'name' in changes:
+                if changes['name'] in taken:
+                    # Product names are unique across the catalogue
+                    errors.append(f"Product {external_id}: product named '{changes['name']}' already exists")
+                    rejected.add(external_id)
+                    continue
+                taken.add(changes['name'])
+            for field, value in changes.items():
+                setattr(product, field, value)
+
+            if changes:
+                product._changed_fields = tuple(sorted(changes))
+                changed.append(product)
+            else:
+                unchanged += 1
+        return changed, unchanged, rejected
+
+    def _record_price_history(self, products: Dict[str, Product], rows: Dict):
+        """
+        Insert one PriceHistory row per product whose price changed, in bulk.
+        """
+        latest_prices = latest_price_service.in_shop(
+            [product.id for product in products.values()], self.shop.id
+        )
+
+        history = []
+        for external_id, product in products.items():
+            row = rows[external_id]
+            price = row['price'] if row['price'] is not None else Decimal('0')
+            latest_price = latest_prices.get(product.id)
+            if latest_price is None or latest_price.price != price:
+                history.append(PriceHistory(
+                    product=product,
+                    shop=self.shop,
+                    price=price,
+                    original_price=row['original_price'],
+                    is_available=row['data'].get('is_available', True),
+                    stock_quantity=row['data'].get('stock_quantity')
+                ))
+        latest_price_service.record(history)
@@ -7,12 +7,20 @@ Celery tasks for real-time synchronization and background processing.
 from celery import shared_task
 from django.utils import timezone
 from django.conf import settings
-from .models import StoreIntegrationConfig, PriceHistory, SyncLog, ProductMapping
+from .models import StoreIntegrationConfig, PriceHistory, SyncLog, ProductMapping, LatestPrice
 from .services import StoreIntegrationService
+from .scheduler import store_sync_scheduler
+from .price_monitor import PriceMonitor
+from .latest_prices import latest_price_service
+from .price_series import price_series_service, prices_differ
+from .webhook_queue import webhook_queue
+from .performance_engine import store_performance_engine
+from .performance_snapshots import store_performance_snapshots
 from core.models import Product, Shop
 from reviews.models import EngagementEvent
 import logging
 from datetime import timedelta
+from decimal import Decimal
 from typing import Dict, List, Optional
 from django.db import transaction
 
@@ -25,10 +33,10 @@ def sync_store_products(self, config_id: str, full_sync: bool = False):
     Celery task to synchronize products from a specific store.
     """
     try:
-        config = StoreIntegrationConfig.objects.get(id=config_id, is_active=True)
-        integration = StoreIntegrationService.get_integration(config)
+        config = StoreIntegrationConfig.objects.select_related('shop').get(id=config_id, is_active=True)
         
-        result = integration.sync_products(full_sync=full_sync)
+        # Runs under the store's sync lock, so overlapping triggers are skipped
+        result = store_sync_scheduler.sync_config(config, full_sync=full_sync)
         
         logger.info(f"Sync completed for {config.shop.name}: {result}")
         return result
@@ -74,95 +82,9 @@ def monitor_price_changes(self, config_id: str, product_ids: List[str] = None):
                 is_active=True
             )
 
-        price_changes = []
-
-        for mapping in mappings:
-            try:
-                # Fetch current product data
-                product_data = integration.fetch_product_details(
-                    mapping.external_product_id
-                )
-
-                # Get latest price history
-                latest_price = PriceHistory.objects.filter(
-                    product=mapping.local_product,
-                    shop=config.shop
-                ).first()
-
-                current_price = float(product_data.get('price', 0))
-                current_availability = product_data.get('is_available', False)
-
-                # Check for price or availability changes
-                price_changed = (
-                    not latest_price or
-                    latest_price.price != current_price or
-                    latest_price.is_available != current_availability
-                )
-
-                if price_changed:
-                    # Record new price history
-                    with transaction.atomic():
-                        price_history = PriceHistory.objects.create(
-                            product=mapping.local_product,
-                            shop=config.shop,
-                            price=current_price,
-                            original_price=product_data.get('original_price'),
-                            currency=product_data.get('currency', 'USD'),
-                            is_available=current_availability,
-                            stock_quantity=product_data.get('stock_quantity', 0)
-                        )
-
-                        # Calculate price change
-                        if latest_price:
-                            price_diff = current_price - latest_price.price
-                            change_percentage = (price_diff / latest_price.price) * 100 if latest_price.price > 0 else 0
-                        else:
-                            price_diff = 0
-                            change_percentage = 0
-
-                        price_changes.append({
-                            'product_id': str(mapping.local_product.id),
-                            'product_name': mapping.local_product.name,
-                            'old_price': latest_price.price if latest_price else 0,
-                            'new_price': current_price,
-                            'price_diff': price_diff,
-                            'change_percentage': change_percentage,
-                            'availability_changed': (
-                                not latest_price or
-                                latest_price.is_available != current_availability
-                            ),
-                            'new_availability': current_availability
-                        })
-
-                        # Update product price if it's the primary source
-                        if config.shop == mapping.local_product.shop:
-                            mapping.local_product.price = current_price
-                            mapping.local_product.is_active = current_availability
-                            mapping.local_product.save()
-
-                        # Create engagement event for price change
-                        EngagementEvent.objects.create(
-                            product=mapping.local_product,
-                            shop=config.shop,
-                            event_type='price_change',
-                            session_id='system',
-                            event_data={
-                                'old_price': latest_price.price if latest_price else 0,
-                                'new_price': current_price,
-                                'change_percentage': change_percentage,
-                                'availability_changed': price_changes[-1]['availability_changed']
-                            }
-                        )
-
-                # Update mapping sync status
-                mapping.last_sync_at = timezone.now()
-                mapping.sync_status = 'synced'
-                mapping.save()
-
-            except Exception as e:
-                logger.error(f"Error monitoring price for product {mapping.local_product.id}: {e}")
-                mapping.sync_status = 'error'
-                mapping.save()
+        mappings = mappings.select_related('local_product')
+        result = PriceMonitor(integration).run(mappings)
+        price_changes = result['changes']
 
         # Trigger price alert notifications if there are significant changes
         if price_changes:
@@ -173,8 +95,9 @@ def monitor_price_changes(self, config_id: str, product_ids: List[str] = None):
 
         return {
             'success': True,
-            'products_monitored': len(mappings),
-            'price_changes_detected': len(price_changes),
+            'products_monitored': result['products_monitored'],
+            'price_changes_detected': result['price_changes_detected'],
+            'errors': result['errors'],
             'changes': price_changes
         }
 
@@ -291,25 +214,34 @@ def sync_inventory_levels(config_id: str):
 def sync_all_stores():
     """
     Celery task to synchronize all active store integrations.
+
+    Due stores are queued most stale first; stores already syncing are skipped.
     """
-    configs = StoreIntegrationConfig.objects.filter(is_active=True)
+    configs = StoreIntegrationConfig.objects.filter(is_active=True).select_related('shop')
+    due = store_sync_scheduler.prioritise(configs)
+    due_ids = {config.id for config in due}
     results = []
     
-    for config in configs:
+    for config in due + [config for config in configs if config.id not in due_ids]:
         try:
-            # Check if it's time to sync based on frequency
-            if should_sync_now(config):
-                result = sync_store_products.delay(str(config.id))
+            if config.id not in due_ids:
                 results.append({
                     'shop': config.shop.name,
-                    'task_id': result.id,
-                    'status': 'queued'
+                    'status': 'skipped',
+                    'reason': 'not_due_for_sync'
                 })
-            else:
+            elif store_sync_scheduler.is_locked(config.id):
                 results.append({
                     'shop': config.shop.name,
                     'status': 'skipped',
-                    'reason': 'not_due_for_sync'
+                    'reason': 'sync_in_progress'
+                })
+            else:
+                result = sync_store_products.delay(str(config.id))
+                results.append({
+                    'shop': config.shop.name,
+                    'task_id': result.id,
+                    'status': 'queued'
                 })
         except Exception as e:
             logger.error(f"Failed to queue sync for {config.shop.name}: {e}")
@@ -329,62 +261,108 @@ def update_price_history():
     """
     updated_count = 0
     error_count = 0
+    total_processed = 0
+    batch_size = getattr(settings, 'LATEST_PRICE_BATCH_SIZE', 500)
     
     # Get all active products
-    products = Product.objects.filter(is_active=True).select_related('shop')
+    products = Product.objects.filter(is_active=True).only(
+        'id', 'shop_id', 'price', 'original_price', 'is_active'
+    ).order_by('id')
     
-    for product in products:
-        try:
-            # Check if we need to record a new price entry
-            latest_price = PriceHistory.objects.filter(
-                product=product,
-                shop=product.shop
-            ).first()
-            
-            # Record new price if it's different or if it's been more than 24 hours
-            should_record = False
-            
-            if not latest_price:
-                should_record = True
-            elif latest_price.price != product.price:
-                should_record = True
-            elif timezone.now() - latest_price.recorded_at > timedelta(hours=24):
-                should_record = True
-            
-            if should_record:
-                PriceHistory.objects.create(
-                    product=product,
-                    shop=product.shop,
-                    price=product.price,
-                    original_price=product.original_price,
-                    is_available=product.is_active,
-                    currency='USD'  # Default currency
-                )
-                updated_count += 1
-                
-        except Exception as e:
-            logger.error(f"Failed to update price history for product {product.id}: {e}")
-            error_count += 1
+    batch = []
+    for product in products.iterator(chunk_size=batch_size):
+        batch.append(product)
+        if len(batch) >= batch_size:
+            updated, errors = _record_current_prices(batch)
+            updated_count += updated
+            error_count += errors
+            total_processed += len(batch)
+            batch = []
+    if batch:
+        updated, errors = _record_current_prices(batch)
+        updated_count += updated
+        error_count += errors
+        total_processed += len(batch)
     
     return {
         'updated_count': updated_count,
         'error_count': error_count,
-        'total_processed': products.count()
+        'total_processed': total_processed
     }
 
 
+def _record_current_prices(products: List[Product]):
+    """
+    Record a price entry for each product whose price or availability changed.
+    Returns ``(recorded, errors)``.
+
+    History is change-only: an unchanged price is not re-recorded, the last
+    entry holds until the next change.
+    """
+    latest_prices = {
+        (latest.product_id, latest.shop_id): latest
+        for latest in LatestPrice.objects.filter(product_id__in=[product.id for product in products])
+    }
+    
+    history = []
+    for product in products:
+        latest_price = latest_prices.get((product.id, product.shop_id))
+        if prices_differ(latest_price, product.price, product.is_active):
+            history.append(PriceHistory(
+                product_id=product.id,
+                shop_id=product.shop_id,
+                price=product.price,
+                original_price=product.original_price,
+                is_available=product.is_active,
+                currency='USD'  # Default currency
+            ))
+    
+    try:
+        latest_price_service.record(history)
+    except Exception as e:
+        logger.error(f"Failed to update price history for {len(history)} products: {e}")
+        return 0, len(history)
+    return len(history), 0
+
+
+@shared_task
+def compact_price_history(raw_days: Optional[int] = None, daily_days: Optional[int] = None):
+    """
+    Task to compact old price history into daily and weekly rollups.
+    """
+    return price_series_service.compact(raw_days=raw_days, daily_days=daily_days)
+
+
 @shared_task
 def cleanup_old_price_history(days_to_keep: int = 90):
     """
     Task to clean up old price history records.
+
+    Raw points older than ``days_to_keep`` are compacted into rollups rather
+    than deleted, so long-term trends are kept.
     """
-    cutoff_date = timezone.now() - timedelta(days=days_to_keep)
-    
-    deleted_count, _ = PriceHistory.objects.filter(
-        recorded_at__lt=cutoff_date
-    ).delete()
-    
-    logger.info(f"Cleaned up {deleted_count} old price history records")
+    result = price_series_service.compact(raw_days=days_to_keep)
+    return {'deleted_count': result['raw_deleted'], **result}
+
+
+@shared_task
+def process_webhook_events(max_batches: Optional[int] = None):
+    """
+    Task to apply queued store webhooks in coalesced batches.
+    """
+    result = webhook_queue.process(max_batches=max_batches)
+    if result['claimed']:
+        logger.info(f"Applied webhook batch: {result}")
+    return result
+
+
+@shared_task
+def cleanup_webhook_events(days_to_keep: int = 7):
+    """
+    Task to clean up applied webhook events.
+    """
+    deleted_count = webhook_queue.purge(days_to_keep)
+    logger.info(f"Cleaned up {deleted_count} old webhook events")
     return {'deleted_count': deleted_count}
 
 
@@ -403,42 +381,65 @@ def cleanup_old_sync_logs(days_to_keep: int = 30):
     return {'deleted_count': deleted_count}
 
 
+@shared_task
+def refresh_category_statistics(category_ids: List[str] = None):
+    """
+    Task to rebuild materialised category statistics.
+    """
+    from .category_stats import category_statistics_service
+
+    if category_ids:
+        refreshed = category_statistics_service.refresh_categories(category_ids)
+    else:
+        refreshed = category_statistics_service.refresh_all()
+
+    logger.info(f"Refreshed statistics for {refreshed} categories")
+    return {'refreshed_categories': refreshed}
+
+
+@shared_task
+def refresh_dirty_category_statistics():
+    """
+    Task to refresh statistics of categories whose products changed.
+    """
+    from .category_stats import category_statistics_service
+
+    refreshed = category_statistics_service.refresh_dirty()
+    logger.info(f"Refreshed statistics for {refreshed} changed categories")
+    return {'refreshed_categories': refreshed}
+
+
 @shared_task
 def update_shop_performance_metrics():
     """
     Task to update shop performance metrics based on recent data.
     """
-    shops = Shop.objects.all()
-    updated_count = 0
+    shops = list(Shop.objects.only('id', 'reliability_score'))
+    if not shops:
+        return {'updated_shops': 0}
     
-    for shop in shops:
-        try:
-            # Calculate reliability score based on sync success rate
-            recent_syncs = SyncLog.objects.filter(
-                integration_config__shop=shop,
-                started_at__gte=timezone.now() - timedelta(days=30)
-            )
-            
-            if recent_syncs.exists():
-                success_rate = recent_syncs.filter(
-                    status='completed'
-                ).count() / recent_syncs.count()
-                
-                # Update reliability score (weighted average)
-                new_reliability = (success_rate * 5)  # Convert to 0-5 scale
-                shop.reliability_score = (
-                    shop.reliability_score * 0.7 + new_reliability * 0.3
-                )
-                
-                shop.save()
-                updated_count += 1
-                
-        except Exception as e:
-            logger.error(f"Failed to update performance metrics for shop {shop.id}: {e}")
+    # Reliability from the sync success rate, blended with the previous score
+    scores, has_syncs = store_performance_engine.reliability_scores(shops, days=30)
+    
+    updated = []
+    for shop, score, synced in zip(shops, scores, has_syncs):
+        if synced:
+            shop.reliability_score = Decimal(str(round(float(score), 2)))
+            updated.append(shop)
+    Shop.objects.bulk_update(updated, ['reliability_score'], batch_size=500)
+    updated_count = len(updated)
     
     return {'updated_shops': updated_count}
 
 
+@shared_task
+def refresh_store_performance_snapshots(days: Optional[int] = None, force: bool = False):
+    """
+    Task to refresh stored store performance analytics for shops with new activity.
+    """
+    return store_performance_snapshots.refresh(days=days, force=force)
+
+
 @shared_task
 def send_price_alerts():
     """
@@ -486,23 +487,7 @@ def should_sync_now(config: StoreIntegrationConfig) -> bool:
     """
     Determine if a store should be synced now based on its frequency setting.
     """
-    if not config.last_sync_at:
-        return True
-    
-    now = timezone.now()
-    time_since_last_sync = now - config.last_sync_at
-    
-    frequency_intervals = {
-        'realtime': timedelta(minutes=5),
-        'hourly': timedelta(hours=1),
-        'daily': timedelta(days=1),
-        'weekly': timedelta(weeks=1),
-        'manual': timedelta(days=365)  # Effectively never auto-sync
-    }
-    
-    required_interval = frequency_intervals.get(config.sync_frequency, timedelta(days=1))
-    
-    return time_since_last_sync >= required_interval
+    return store_sync_scheduler.is_due(config)
 
 
 # Periodic task setup (would be configured in celery beat schedule)
@@ -515,16 +500,44 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'store_integration.tasks.update_price_history',
         'schedule': 1800.0,  # Every 30 minutes
     },
-    'cleanup-old-data': {
-        'task': 'store_integration.tasks.cleanup_old_price_history',
+    'compact-price-history': {
+        'task': 'store_integration.tasks.compact_price_history',
+        'schedule': 86400.0,  # Daily
+    },
+    'process-webhook-events': {
+        'task': 'store_integration.tasks.process_webhook_events',
+        'schedule': 10.0,  # Every 10 seconds
+    },
+    'cleanup-webhook-events': {
+        'task': 'store_integration.tasks.cleanup_webhook_events',
         'schedule': 86400.0,  # Daily
     },
     'update-performance-metrics': {
         'task': 'store_integration.tasks.update_shop_performance_metrics',
         'schedule': 21600.0,  # Every 6 hours
     },
+    'refresh-store-performance-snapshots': {
+        'task': 'store_integration.tasks.refresh_store_performance_snapshots',
+        'schedule': 1800.0,  # Every 30 minutes
+    },
     'send-price-alerts': {
         'task': 'store_integration.tasks.send_price_alerts',
         'schedule': 3600.0,  # Every hour
     },
+    'refresh-category-statistics': {
+        'task': 'store_integration.tasks.refresh_category_statistics',
+        'schedule': 86400.0,  # Daily
+    },
+    'refresh-dirty-category-statistics': {
+        'task': 'store_integration.tasks.refresh_dirty_category_statistics',
+        'schedule': 300.0,  # Every 5 minutes
+    },
+    'update-dirty-product-ratings': {
+        'task': 'products.tasks.update_dirty_product_ratings',
+        'schedule': 60.0,  # Every minute
+    },
+    'score-pending-review-sentiment': {
+        'task': 'reviews.tasks.score_pending_review_sentiment',
+        'schedule': 60.0,  # Every minute
+    },
 }
@@ -0,0 +1,738 @@
+from django.test import TestCase
+from core.models import User, Shop, Category, Product
+from store_integration.models import CategoryStatistics, StoreIntegrationConfig, ProductMapping, PriceHistory
+from store_integration.aggregation_services import ProductAggregationService
+from store_integration.category_stats import category_statistics_service
+from store_integration.services import BaseStoreIntegration
+from store_integration.sync_engine import BulkSyncEngine
+
+
+def create_shop(name):
+    user = User.objects.create_user(
+        username=f"{name}_owner", password="owner123",
+        email=f"{name}@example.com", user_type='owner'
+    )
+    return Shop.objects.create(
+        name=name, owner=user.owner_profile,
+        address="Main street", url=f"https://{name}.example.com"
+    )
+
+
+class CategoryStatisticsTest(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name="Electronics")
+        self.shop_a = create_shop("shop_a")
+        self.shop_b = create_shop("shop_b")
+        Product.objects.create(name="Laptop", price=1000, category=self.category, shop=self.shop_a)
+        Product.objects.create(name="Phone", price=500, category=self.category, shop=self.shop_a)
+        Product.objects.create(name="Tablet", price=300, category=self.category, shop=self.shop_b)
+
+    def test_refresh_category(self):
+        stats = category_statistics_service.refresh_category(self.category.id)
+        self.assertEqual(stats.product_count, 3)
+        self.assertEqual(stats.shop_count, 2)
+        self.assertEqual(float(stats.min_price), 300)
+        self.assertEqual(float(stats.max_price), 1000)
+        self.assertEqual(stats.price_quantiles['p50'], 500)
+
+    def test_category_aggregation_reads_statistics(self):
+        data = ProductAggregationService.get_category_aggregation(self.category.id)
+        self.assertEqual(data['total_products'], 3)
+        self.assertEqual(data['total_stores'], 2)
+        self.assertEqual(data['overall_price_range']['min'], 300)
+        self.assertTrue(CategoryStatistics.objects.filter(category=self.category).exists())
+
+    def test_deferred_refresh_after_product_change(self):
+        category_statistics_service.refresh_category(self.category.id)
+        with category_statistics_service.deferred():
+            Product.objects.create(name="Monitor", price=200, category=self.category, shop=self.shop_b)
+        stats = CategoryStatistics.objects.get(category=self.category)
+        self.assertEqual(stats.product_count, 4)
+        self.assertEqual(float(stats.min_price), 200)
+
+    def test_saves_queue_categories_for_the_periodic_refresh(self):
+        from unittest import mock
+        from store_integration.models import DirtyCategoryStatistics
+        category_statistics_service.refresh_category(self.category.id)
+        with mock.patch.object(category_statistics_service, 'refresh_categories') as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                for index in range(3):
+                    Product.objects.create(name=f"Cable {index}", price=10, category=self.category, shop=self.shop_b)
+        refresh.assert_not_called()
+        self.assertTrue(DirtyCategoryStatistics.objects.filter(category=self.category).exists())
+
+        self.assertGreaterEqual(category_statistics_service.refresh_dirty(), 1)
+        self.assertEqual(category_statistics_service.pending_count(), 0)
+        self.assertEqual(CategoryStatistics.objects.get(category=self.category).product_count, 6)
+
+
+class BulkSyncEngineTest(TestCase):
+    def setUp(self):
+        self.shop = create_shop("sync_shop")
+        self.config = StoreIntegrationConfig.objects.create(
+            shop=self.shop, platform='shopify', store_url='https://sync.example.com'
+        )
+        self.engine = BulkSyncEngine(BaseStoreIntegration(self.config), chunk_size=2)
+
+    def products(self, price=10):
+        return [
+            {'id': 1, 'name': 'Sync Phone', 'price': price, 'category': 'Phones', 'brand': 'Acme'},
+            {'id': 2, 'name': 'Sync Case', 'price': 5, 'category': 'Accessories'},
+            {'id': 3, 'name': 'Sync Charger', 'price': 7, 'category': 'Accessories'},
+        ]
+
+    def test_creates_then_diffs(self):
+        result = self.engine.run(self.products())
+        self.assertEqual((result['created'], result['updated'], result['errors']), (3, 0, []))
+        self.assertEqual(ProductMapping.objects.filter(integration_config=self.config).count(), 3)
+        self.assertEqual(PriceHistory.objects.filter(shop=self.shop).count(), 3)
+
+        result = self.engine.run(self.products(price=12))
+        self.assertEqual((result['created'], result['updated'], result['unchanged']), (0, 1, 2))
+        self.assertEqual(PriceHistory.objects.filter(shop=self.shop).count(), 4)
+        self.assertEqual(float(Product.objects.get(name='Sync Phone').price), 12)
+
+    def test_unchanged_payloads_are_skipped_by_hash(self):
+        from unittest import mock
+        self.engine.run(self.products())
+        self.assertTrue(all(ProductMapping.objects.values_list('content_hash', flat=True)))
+
+        with mock.patch.object(self.engine, '_diff_existing_products', wraps=self.engine._diff_existing_products) as diff:
+            result = self.engine.run(self.products())
+        self.assertEqual((result['processed'], result['updated'], result['unchanged']), (3, 0, 3))
+        self.assertTrue(all(not call.args[1] for call in diff.call_args_list))
+        self.assertEqual(PriceHistory.objects.filter(shop=self.shop).count(), 3)
+
+    def test_process_product_writes_only_changes(self):
+        integration = self.engine.integration
+        data = {'id': 9, 'name': 'Single Lamp', 'price': 20, 'category': 'Lighting'}
+        self.assertTrue(integration.process_product(data)['created'])
+
+        with self.assertNumQueries(1):
+            result = integration.process_product(data)
+        self.assertFalse(result['changed'])
+
+        result = integration.process_product({**data, 'price': 25})
+        self.assertTrue(result['changed'])
+        self.assertEqual(float(Product.objects.get(name='Single Lamp').price), 25)
+        self.assertEqual(PriceHistory.objects.filter(product=result['product']).count(), 2)
+
+    def test_duplicate_name_is_reported(self):
+        Product.objects.create(
+            name='Sync Case', price=1, shop=self.shop,
+            category=Category.objects.create(name='Other')
+        )
+        result = self.engine.run(self.products())
+        self.assertEqual(result['created'], 2)
+        self.assertEqual(len(result['errors']), 1)
+
+    def test_rename_to_taken_name_fails_only_that_row(self):
+        self.engine.run(self.products())
+        products = self.products(price=12)
+        products[1]['name'] = 'Sync Charger'
+        result = self.engine.run(products)
+        self.assertEqual((result['updated'], result['unchanged']), (1, 1))
+        self.assertEqual(result['errors'], ["Product 2: product named 'Sync Charger' already exists"])
+        self.assertEqual(float(Product.objects.get(name='Sync Phone').price), 12)
+        self.assertTrue(Product.objects.filter(name='Sync Case').exists())
+        self.assertEqual(ProductMapping.objects.get(external_product_id='2').sync_status, 'synced')
+
+
+class PlatformPaginationTest(TestCase):
+    def setUp(self):
+        self.shop = create_shop("paged_shop")
+
+    def response(self, json_data, links=None, headers=None):
+        from unittest import mock
+        return mock.Mock(status_code=200, json=lambda: json_data, links=links or {}, headers=headers or {})
+
+    def test_shopify_follows_link_header(self):
+        from unittest import mock
+        from store_integration.services import ShopifyIntegration
+        config = StoreIntegrationConfig.objects.create(shop=self.shop, platform='shopify', store_url='https://s.example.com')
+        next_link = {'next': {'url': 'https://s.example.com/admin/api/2023-10/products.json?limit=2&page_info=abc'}}
+        pages = [
+            self.response({'products': [{'id': 1, 'variants': [{'price': '1'}]}, {'id': 2, 'variants': [{'price': '2'}]}]}, next_link),
+            self.response({'products': [{'id': 3, 'variants': [{'price': '3'}]}]}),
+        ]
+        with mock.patch('store_integration.http_client.StoreHTTPClient.get', side_effect=pages) as get:
+            ids = [p['id'] for p in ShopifyIntegration(config).iter_products(page_size=2)]
+        self.assertEqual(ids, [1, 2, 3])
+        self.assertEqual(get.call_args_list[1].kwargs['params'], {'limit': 2, 'page_info': 'abc'})
+
+    def test_shopify_fetches_by_ids_in_groups(self):
+        from unittest import mock
+        from store_integration.services import ShopifyIntegration
+        config = StoreIntegrationConfig.objects.create(shop=self.shop, platform='shopify', store_url='https://s.example.com')
+        page = self.response({'products': [{'id': 1, 'variants': [{'price': '1'}]}]})
+        with mock.patch.object(ShopifyIntegration, 'LIST_BY_IDS_LIMIT', 2), \
+                mock.patch('store_integration.http_client.StoreHTTPClient.get', return_value=page) as get:
+            products = ShopifyIntegration(config).fetch_products_by_ids(['1', '2', '3'])
+        self.assertEqual(list(products), ['1'])
+        self.assertEqual(sorted(c.kwargs['params']['ids'] for c in get.call_args_list), ['1,2', '3'])
+
+    def test_woocommerce_walks_pages(self):
+        from unittest import mock
+        from store_integration.services import WooCommerceIntegration
+        config = StoreIntegrationConfig.objects.create(shop=self.shop, platform='woocommerce', store_url='https://w.example.com')
+        pages = [
+            self.response([{'id': 1, 'price': '1'}], headers={'X-WP-TotalPages': '2'}),
+            self.response([{'id': 2, 'price': '2'}], headers={'X-WP-TotalPages': '2'}),
+        ]
+        with mock.patch('store_integration.http_client.StoreHTTPClient.get', side_effect=pages):
+            ids = [p['id'] for p in WooCommerceIntegration(config).iter_products(page_size=1)]
+        self.assertEqual(ids, [1, 2])
+
+
+class PriceMonitorTest(TestCase):
+    def setUp(self):
+        from store_integration.services import ShopifyIntegration
+        self.shop = create_shop("monitor_shop")
+        self.config = StoreIntegrationConfig.objects.create(
+            shop=self.shop, platform='shopify', store_url='https://m.example.com'
+        )
+        self.integration = ShopifyIntegration(self.config)
+        category = Category.objects.create(name="Monitored")
+        self.mappings = []
+        for i, price in enumerate([10, 20, 30], start=1):
+            product = Product.objects.create(name=f"Monitored {i}", price=price, category=category, shop=self.shop)
+            PriceHistory.objects.create(product=product, shop=self.shop, price=price + 5)
+            PriceHistory.objects.create(product=product, shop=self.shop, price=price)
+            self.mappings.append(ProductMapping.objects.create(
+                local_product=product, integration_config=self.config, external_product_id=str(i)
+            ))
+
+    def test_batches_detect_and_record_changes(self):
+        from unittest import mock
+        from reviews.models import EngagementEvent
+        from store_integration.price_monitor import PriceMonitor
+
+        current = {
+            '1': {'id': 1, 'price': 10, 'is_available': True},
+            '2': {'id': 2, 'price': 25, 'is_available': True},
+        }
+        with mock.patch.object(self.integration, 'fetch_products_by_ids', return_value=current) as fetch:
+            result = PriceMonitor(self.integration, batch_size=2).run(
+                ProductMapping.objects.filter(integration_config=self.config).order_by('external_product_id').select_related('local_product')
+            )
+
+        self.assertEqual(fetch.call_count, 2)
+        self.assertEqual((result['products_monitored'], result['errors']), (3, 1))
+        self.assertEqual([c['product_name'] for c in result['changes']], ['Monitored 2'])
+        self.assertEqual(result['changes'][0]['change_percentage'], 25.0)
+        self.assertEqual(float(Product.objects.get(name='Monitored 2').price), 25)
+        self.assertEqual(EngagementEvent.objects.filter(event_type='price_change').count(), 1)
+        self.assertEqual(PriceHistory.objects.filter(product__name='Monitored 2').count(), 3)
+        self.assertEqual(ProductMapping.objects.get(external_product_id='3').sync_status, 'error')
+
+
+class LatestPriceTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Priced")
+        self.shop_a = create_shop("price_shop_a")
+        self.shop_b = create_shop("price_shop_b")
+        self.product = Product.objects.create(name="Priced Item", price=50, category=category, shop=self.shop_a)
+
+    def test_history_writes_maintain_latest_price(self):
+        from store_integration.latest_prices import latest_price_service
+        from store_integration.models import LatestPrice
+        PriceHistory.objects.create(product=self.product, shop=self.shop_a, price=55)
+        PriceHistory.objects.create(product=self.product, shop=self.shop_a, price=50)
+        latest_price_service.record([
+            PriceHistory(product=self.product, shop=self.shop_b, price=48),
+            PriceHistory(product=self.product, shop=self.shop_b, price=45),
+        ])
+        self.assertEqual(LatestPrice.objects.count(), 2)
+        prices = {lp.shop.name: float(lp.price) for lp in latest_price_service.for_product(self.product.id)}
+        self.assertEqual(prices, {'price_shop_a': 50.0, 'price_shop_b': 45.0})
+
+    def test_recorded_prices_mark_products_for_rerating(self):
+        from django.core.cache import cache
+        from core.models import DirtyProductRating
+        from store_integration.latest_prices import latest_price_service
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            latest_price_service.record([PriceHistory(product=self.product, shop=self.shop_b, price=48)])
+        self.assertEqual(
+            list(DirtyProductRating.objects.values_list('product_id', 'reason')), [(self.product.id, 'price')]
+        )
+
+    def test_late_observation_keeps_newer_latest_price(self):
+        from datetime import timedelta
+        from store_integration.latest_prices import latest_price_service
+        recorded = PriceHistory.objects.create(product=self.product, shop=self.shop_a, price=40)
+        # A concurrent writer that recorded earlier but committed later
+        latest_price_service.upsert([PriceHistory(
+            product=self.product, shop=self.shop_a, price=60, recorded_at=recorded.recorded_at - timedelta(seconds=1)
+        )])
+        latest = latest_price_service.get(self.product.id, self.shop_a.id)
+        self.assertEqual((float(latest.price), latest.recorded_at), (40.0, recorded.recorded_at))
+
+    def test_price_comparison_reads_latest_prices(self):
+        from django.urls import reverse
+        from rest_framework.test import APIClient
+        PriceHistory.objects.create(product=self.product, shop=self.shop_a, price=50)
+        PriceHistory.objects.create(product=self.product, shop=self.shop_b, price=45)
+        api = APIClient()
+        api.force_authenticate(self.shop_a.owner.user)
+        response = api.get(reverse('realtime-sync-price-comparison'), {'product_id': str(self.product.id)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([store['price'] for store in response.data['stores']], [45.0, 50.0])
+
+
+class PriceSeriesTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Series")
+        self.shop = create_shop("series_shop")
+        self.product = Product.objects.create(name="Series Item", price=50, category=category, shop=self.shop)
+
+    def record(self, price, days_ago, hours=0):
+        from datetime import timedelta
+        from django.utils import timezone
+        history = PriceHistory.objects.create(product=self.product, shop=self.shop, price=price)
+        PriceHistory.objects.filter(id=history.id).update(
+            recorded_at=timezone.now() - timedelta(days=days_ago) + timedelta(hours=hours)
+        )
+
+    def test_compaction_keeps_long_term_trends(self):
+        from store_integration.models import PriceHistoryRollup
+        from store_integration.price_series import price_series_service
+        from store_integration.realtime_sync import realtime_sync_service
+        self.record(60, 200)
+        self.record(55, 200, hours=1)
+        self.record(52, 100)
+        self.record(50, 5)
+
+        result = price_series_service.compact(raw_days=90, daily_days=180)
+        self.assertEqual(result['raw_deleted'], 3)
+        self.assertEqual(PriceHistory.objects.count(), 1)
+        weekly = PriceHistoryRollup.objects.get(resolution='weekly')
+        self.assertEqual((float(weekly.open_price), float(weekly.low_price), float(weekly.close_price)), (60, 55, 55))
+        self.assertEqual(weekly.sample_count, 2)
+        self.assertEqual(PriceHistoryRollup.objects.filter(resolution='daily').count(), 1)
+
+        trends = realtime_sync_service.get_price_trends(str(self.product.id), days=400)
+        trend = trends['shop_trends'][str(self.shop.id)]
+        self.assertEqual(trends['resolution'], 'weekly')
+        self.assertEqual([p['price'] for p in trend['prices']], [55.0, 52.0, 50.0])
+        self.assertEqual(trend['highest_price'], 60.0)
+
+    def test_unchanged_prices_are_not_re_recorded(self):
+        from store_integration.tasks import update_price_history
+        update_price_history()
+        PriceHistory.objects.update(recorded_at=PriceHistory.objects.get().recorded_at.replace(year=2000))
+        update_price_history()
+        self.assertEqual(PriceHistory.objects.count(), 1)
+
+
+class PriceAnomalyTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Anomalies")
+        self.shop_a = create_shop("anomaly_shop_a")
+        self.shop_b = create_shop("anomaly_shop_b")
+        self.phone = Product.objects.create(name="Anomaly Phone", price=100, category=category, shop=self.shop_a)
+        self.case = Product.objects.create(name="Anomaly Case", price=10, category=category, shop=self.shop_a)
+        for price in (100, 101, 40, 100):
+            PriceHistory.objects.create(product=self.phone, shop=self.shop_a, price=price)
+        for price in (100, 70):
+            PriceHistory.objects.create(product=self.phone, shop=self.shop_b, price=price)
+        for price in (10, 10.5):
+            PriceHistory.objects.create(product=self.case, shop=self.shop_a, price=price)
+
+    def test_grouped_summary(self):
+        import numpy as np
+        from store_integration.price_analytics import grouped_summary
+        summary = grouped_summary(np.array([3.0, 1.0, 2.0, 5.0, 5.0]), np.array([0, 3]))
+        self.assertEqual(summary['lowest'].tolist(), [1.0, 5.0])
+        self.assertEqual(summary['highest'].tolist(), [3.0, 5.0])
+        self.assertEqual(summary['current'].tolist(), [2.0, 5.0])
+        self.assertEqual(summary['changes'].tolist(), [2, 0])
+        self.assertAlmostEqual(summary['volatility'][0], np.std([3.0, 1.0, 2.0]))
+
+    def test_product_anomalies_grouped_by_shop(self):
+        from store_integration.realtime_sync import realtime_sync_service
+        result = realtime_sync_service.detect_price_anomalies(str(self.phone.id))
+        found = sorted((a['shop_name'], a['previous_price'], a['current_price'], a['severity'])
+                       for a in result['anomalies'])
+        self.assertEqual(found, [
+            ('anomaly_shop_a', 40.0, 100.0, 'high'),
+            ('anomaly_shop_a', 101.0, 40.0, 'high'),
+            ('anomaly_shop_b', 100.0, 70.0, 'medium'),
+        ])
+
+    def test_store_anomalies_in_one_pass(self):
+        from store_integration.realtime_sync import realtime_sync_service
+        result = realtime_sync_service.detect_store_price_anomalies(str(self.shop_a.id))
+        self.assertEqual(result['products_analyzed'], 2)
+        self.assertEqual(result['anomalies_detected'], 2)
+        self.assertEqual({a['product_name'] for a in result['anomalies']}, {'Anomaly Phone'})
+
+
+class DeltaSyncTest(TestCase):
+    def setUp(self):
+        self.config = StoreIntegrationConfig.objects.create(
+            shop=create_shop("delta_shop"), platform='shopify', store_url='https://d.example.com',
+            sync_watermark={'updated_at': '2024-01-01T00:00:00+00:00', 'etag': '"v1"'}
+        )
+
+    def response(self, status_code, products=(), headers=None):
+        from unittest import mock
+        return mock.Mock(
+            status_code=status_code, links={}, headers=headers or {},
+            json=lambda: {'products': list(products)}
+        )
+
+    def test_requests_only_changed_products(self):
+        from unittest import mock
+        from store_integration.services import ShopifyIntegration
+        integration = ShopifyIntegration(self.config)
+        page = self.response(200, [
+            {'id': 1, 'updated_at': '2024-02-01T10:00:00+02:00', 'variants': [{'price': '1'}]},
+            {'id': 2, 'updated_at': '2024-01-15T00:00:00Z', 'variants': [{'price': '2'}]},
+        ], headers={'ETag': '"v2"'})
+        with mock.patch('store_integration.http_client.StoreHTTPClient.get', return_value=page) as get:
+            ids = [p['id'] for p in integration.iter_products(since=self.config.sync_watermark)]
+        self.assertEqual(ids, [1, 2])
+        self.assertEqual(get.call_args.kwargs['params']['updated_at_min'], '2024-01-01T00:00:00+00:00')
+        self.assertEqual(get.call_args.kwargs['headers']['If-None-Match'], '"v1"')
+        watermark = integration.next_watermark(self.config.sync_watermark)
+        self.assertEqual(watermark, {'updated_at': '2024-02-01T10:00:00+02:00', 'etag': '"v2"'})
+
+    def test_not_modified_keeps_watermark(self):
+        from unittest import mock
+        from store_integration.services import ShopifyIntegration
+        integration = ShopifyIntegration(self.config)
+        with mock.patch('store_integration.http_client.StoreHTTPClient.get', return_value=self.response(304)):
+            self.assertEqual(list(integration.iter_products(since=self.config.sync_watermark)), [])
+        self.assertEqual(integration.next_watermark(self.config.sync_watermark), self.config.sync_watermark)
+
+
+class WebhookQueueTest(TestCase):
+    def setUp(self):
+        self.shop = create_shop("webhook_shop")
+        self.config = StoreIntegrationConfig.objects.create(
+            shop=self.shop, platform='shopify', store_url='https://hooks.example.com'
+        )
+        self.removed = Product.objects.create(
+            name="Hooked Case", price=5, shop=self.shop, category=Category.objects.create(name="Hooks")
+        )
+        ProductMapping.objects.create(
+            integration_config=self.config, local_product=self.removed, external_product_id='2'
+        )
+
+    def test_events_are_coalesced_and_applied_in_bulk(self):
+        from unittest import mock
+        from store_integration.models import WebhookEvent
+        from store_integration.webhook_queue import webhook_queue
+        for price in (10, 11, 12):
+            webhook_queue.enqueue(self.config, 'products/update', {'id': 1, 'price': price})
+        webhook_queue.enqueue(self.config, 'products/delete', {'id': 2})
+        self.assertIsNone(webhook_queue.enqueue(self.config, 'orders/create', {'id': 3}))
+
+        current = {'1': {'id': 1, 'name': 'Hooked Phone', 'price': 12, 'category': 'Phones'}}
+        with mock.patch('store_integration.services.BaseStoreIntegration.fetch_products_by_ids',
+                        return_value=current) as fetch:
+            result = webhook_queue.process()
+
+        fetch.assert_called_once_with(['1'])
+        self.assertEqual((result['processed'], result['superseded']), (2, 2))
+        self.assertEqual(float(Product.objects.get(name='Hooked Phone').price), 12)
+        self.removed.refresh_from_db()
+        self.assertFalse(self.removed.is_active)
+        self.assertFalse(WebhookEvent.objects.filter(status='pending').exists())
+
+    def test_failed_fetch_is_retried(self):
+        from unittest import mock
+        from store_integration.models import WebhookEvent
+        from store_integration.webhook_queue import webhook_queue
+        webhook_queue.enqueue(self.config, 'products/update', {'id': 1})
+        with mock.patch('store_integration.services.BaseStoreIntegration.fetch_products_by_ids',
+                        return_value={'1': RuntimeError('store down')}):
+            result = webhook_queue.process()
+        # Not claimed again until its retry time
+        self.assertEqual((result['claimed'], result['retried']), (1, 1))
+        event = WebhookEvent.objects.get()
+        self.assertEqual((event.status, event.attempts), ('pending', 1))
+        self.assertGreater(event.next_attempt_at, event.claimed_at)
+
+    def test_failed_sync_chunk_is_retried(self):
+        from unittest import mock
+        from store_integration.models import WebhookEvent
+        from store_integration.webhook_queue import webhook_queue
+        webhook_queue.enqueue(self.config, 'products/update', {'id': 1})
+        current = {'1': {'id': 1, 'name': 'Hooked Phone', 'price': 12, 'category': 'Phones'}}
+        with mock.patch('store_integration.services.BaseStoreIntegration.fetch_products_by_ids',
+                        return_value=current), \
+                mock.patch('store_integration.sync_engine.BulkSyncEngine.process_chunk',
+                           side_effect=RuntimeError('database busy')):
+            result = webhook_queue.process()
+        self.assertEqual((result['processed'], result['retried']), (0, 1))
+        self.assertEqual(WebhookEvent.objects.get().status, 'pending')
+
+
+class StorePerformanceEngineTest(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from store_integration.models import SyncLog
+        category = Category.objects.create(name="Performance")
+        self.shops = [create_shop(f"perf_shop_{i}") for i in range(3)]
+        self.cheap = self.shops[0]
+        config = StoreIntegrationConfig.objects.create(
+            shop=self.cheap, platform='shopify', store_url='https://perf.example.com'
+        )
+        for status in ('completed', 'completed', 'failed'):
+            log = SyncLog.objects.create(integration_config=config, sync_type='full', status=status)
+            SyncLog.objects.filter(id=log.id).update(completed_at=log.started_at + timedelta(seconds=60))
+        product = Product.objects.create(name="Perf Phone", price=90, category=category, shop=self.cheap)
+        PriceHistory.objects.create(product=product, shop=self.cheap, price=90)
+        PriceHistory.objects.create(product=product, shop=self.shops[1], price=100)
+        self.now = timezone.now()
+
+    def test_query_count_is_constant(self):
+        from store_integration.performance_engine import store_performance_engine
+        with self.assertNumQueries(10):
+            results = store_performance_engine.compute([shop.id for shop in self.shops])
+        with self.assertNumQueries(10):
+            store_performance_engine.compute([self.cheap.id])
+
+        cheap = results[str(self.cheap.id)]
+        reliability = cheap['detailed_metrics']['reliability']
+        self.assertEqual((reliability['total_syncs'], reliability['failed_syncs']), (3, 1))
+        self.assertEqual(cheap['component_scores']['price_competitiveness']['score'], 5.0)
+        self.assertEqual(
+            results[str(self.shops[2].id)]['detailed_metrics']['reliability']['message'],
+            'No integration data available'
+        )
+
+    def test_comparative_analytics_ranks_shops(self):
+        from store_integration.analytics_service import store_analytics_service
+        result = store_analytics_service.get_comparative_analytics([str(shop.id) for shop in self.shops])
+        self.assertEqual(result['shops_compared'], 3)
+        self.assertEqual([shop['overall_rank'] for shop in result['comparative_data']], [1, 2, 3])
+
+    def test_shop_reliability_refresh(self):
+        from store_integration.tasks import update_shop_performance_metrics
+        self.assertEqual(update_shop_performance_metrics(), {'updated_shops': 1})
+        self.cheap.refresh_from_db()
+        self.assertEqual(float(self.cheap.reliability_score), 4.5)
+
+
+class StorePerformanceSnapshotTest(TestCase):
+    def setUp(self):
+        self.shop = create_shop("snapshot_shop")
+        self.config = StoreIntegrationConfig.objects.create(
+            shop=self.shop, platform='shopify', store_url='https://snap.example.com'
+        )
+
+    def test_snapshot_served_after_live_fallback(self):
+        from store_integration.performance_snapshots import store_performance_snapshots
+        first = store_performance_snapshots.get(str(self.shop.id))
+        self.assertEqual(first['source'], 'live')
+
+        with self.assertNumQueries(1):
+            second = store_performance_snapshots.get(str(self.shop.id))
+        self.assertEqual(second['source'], 'snapshot')
+        self.assertEqual(second['as_of'], first['as_of'])
+        self.assertEqual(second['overall_score'], first['overall_score'])
+
+    def test_refresh_only_recomputes_shops_with_activity(self):
+        from store_integration.models import SyncLog
+        from store_integration.performance_snapshots import store_performance_snapshots
+        quiet = create_shop("quiet_shop")
+        ids = [self.shop.id, quiet.id]
+        self.assertEqual(store_performance_snapshots.refresh(ids)['refreshed'], 2)
+        self.assertEqual(store_performance_snapshots.refresh(ids)['refreshed'], 0)
+
+        SyncLog.objects.create(integration_config=self.config, sync_type='full', status='completed')
+        self.assertEqual(store_performance_snapshots.dirty_shops([str(i) for i in ids], 30), [str(self.shop.id)])
+
+    def test_refresh_keeps_to_stored_periods(self):
+        from store_integration.models import StorePerformanceSnapshot
+        from store_integration.performance_snapshots import store_performance_snapshots
+        quiet = create_shop("quiet_shop")
+        store_performance_snapshots.get(str(self.shop.id), 7)
+        with self.assertRaises(ValueError):
+            store_performance_snapshots.get(str(self.shop.id), -5)
+
+        result = store_performance_snapshots.refresh([self.shop.id, quiet.id], force=True)
+        self.assertEqual((result['periods'], result['refreshed']), ([7, 30], 3))
+        self.assertFalse(StorePerformanceSnapshot.objects.filter(shop=quiet, period_days=7).exists())
+
+    def test_performance_endpoint_reports_as_of(self):
+        from django.urls import reverse
+        from rest_framework.test import APIClient
+        api = APIClient()
+        api.force_authenticate(self.shop.owner.user)
+        response = api.get(reverse('store-analytics-performance-metrics'), {'shop_id': str(self.shop.id)})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('as_of', response.data)
+        response = api.get(reverse('store-analytics-performance-metrics'), {'shop_id': str(self.shop.id), 'days': -1})
+        self.assertEqual(response.status_code, 400)
+
+        response = api.get(reverse('store-performance-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['last_sync_status'], 'never_synced')
+        self.assertIsNotNone(response.data[0]['as_of'])
+
+
+class StoreHTTPClientTest(TestCase):
+    """Runs the shared HTTP client against a local stub server."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        import json
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            hits = {}
+
+            def do_GET(self):
+                count = Handler.hits[self.path] = Handler.hits.get(self.path, 0) + 1
+                if self.path == '/flaky' and count < 3:
+                    self.send_response(503)
+                    self.send_header('Retry-After', '0')
+                    self.end_headers()
+                    return
+                body = json.dumps({'path': self.path, 'count': count}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        cls.handler = Handler
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def http_client(self, **kwargs):
+        from store_integration.http_client import StoreHTTPClient
+        return StoreHTTPClient(base_url=self.base_url, backoff_base=0.01, **kwargs)
+
+    def test_retries_transient_errors(self):
+        response = self.http_client(max_retries=3).get('/flaky')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 3)
+
+    def test_concurrent_map_keeps_order(self):
+        from store_integration.http_client import TokenBucket
+        client = self.http_client(max_concurrency=4, rate_limiter=TokenBucket(rate=1000, burst=100))
+        results = client.map(lambda n: client.get(f'/item/{n}').json()['path'], range(10))
+        self.assertEqual(results, [f'/item/{n}' for n in range(10)])
+
+    def test_async_client(self):
+        import asyncio
+        from store_integration.http_client import AsyncStoreHTTPClient
+        async_client = AsyncStoreHTTPClient(self.http_client())
+
+        async def fetch_all():
+            return await async_client.gather(async_client.get(f'/async/{n}') for n in range(5))
+
+        responses = asyncio.run(fetch_all())
+        self.assertEqual([r.json()['path'] for r in responses], [f'/async/{n}' for n in range(5)])
+
+
+class StoreSyncSchedulerTest(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        now = timezone.now()
+        self.fresh = StoreIntegrationConfig.objects.create(
+            shop=create_shop("fresh_shop"), platform='shopify', sync_frequency='daily',
+            last_sync_at=now - timedelta(hours=1)
+        )
+        self.stale = StoreIntegrationConfig.objects.create(
+            shop=create_shop("stale_shop"), platform='shopify', sync_frequency='hourly',
+            last_sync_at=now - timedelta(hours=5)
+        )
+        self.never = StoreIntegrationConfig.objects.create(
+            shop=create_shop("never_shop"), platform='shopify', sync_frequency='weekly'
+        )
+
+    def test_prioritises_by_staleness(self):
+        from store_integration.scheduler import store_sync_scheduler
+        configs = StoreIntegrationConfig.objects.all()
+        self.assertEqual(store_sync_scheduler.prioritise(configs), [self.never, self.stale])
+        self.assertEqual(store_sync_scheduler.prioritise(configs, due_only=False)[-1], self.fresh)
+
+    def test_run_streams_progress_and_respects_locks(self):
+        from unittest import mock
+        from store_integration.models import SyncLog
+        from store_integration.scheduler import store_sync_scheduler
+        from store_integration.services import ShopifyIntegration
+
+        products = [{'id': i, 'name': f'Sched {i}', 'price': i, 'category': 'Sched'} for i in range(1, 4)]
+        token = store_sync_scheduler.acquire(self.fresh.id)
+        try:
+            with mock.patch.object(ShopifyIntegration, 'authenticate', return_value=True), \
+                    mock.patch.object(ShopifyIntegration, 'iter_products', return_value=iter(products)):
+                results = store_sync_scheduler.run(max_workers=1)
+        finally:
+            store_sync_scheduler.release(self.fresh.id, token)
+
+        by_shop = {r['shop']: r['result'] for r in results}
+        self.assertTrue(by_shop['fresh_shop']['skipped'])
+        self.assertEqual(by_shop['never_shop']['created'], 3)
+        log = SyncLog.objects.get(integration_config=self.never)
+        self.assertEqual((log.status, log.products_processed), ('completed', 3))
+        self.assertIn('progress_at', log.summary)
+        self.never.refresh_from_db()
+        self.assertIsNotNone(self.never.last_sync_at)
+        self.assertFalse(store_sync_scheduler.is_locked(self.never.id))
+
+    def test_claim_is_held_in_the_database(self):
+        import uuid
+        from datetime import timedelta
+        from django.utils import timezone
+        from store_integration.scheduler import store_sync_scheduler
+
+        token = store_sync_scheduler.acquire(self.fresh.id)
+        self.assertIsNotNone(token)
+        self.assertIsNone(store_sync_scheduler.acquire(self.fresh.id))
+        store_sync_scheduler.release(self.fresh.id, uuid.uuid4().hex)
+        self.assertTrue(store_sync_scheduler.is_locked(self.fresh.id))
+
+        # Claims left behind by a crashed worker expire
+        StoreIntegrationConfig.objects.filter(id=self.fresh.id).update(
+            sync_claimed_at=timezone.now() - timedelta(seconds=store_sync_scheduler.lock_timeout + 1)
+        )
+        self.assertFalse(store_sync_scheduler.is_locked(self.fresh.id))
+        self.assertIsNotNone(store_sync_scheduler.acquire(self.fresh.id))
+
+
+class UnifiedSearchPageTest(TestCase):
+    def test_grouped_products_are_not_repeated_on_later_pages(self):
+        category = Category.objects.create(name="Phones")
+        shop_a, shop_b = create_shop("search_a"), create_shop("search_b")
+        Product.objects.create(name="Phone X 128GB", price=100, category=category, shop=shop_a)
+        Product.objects.create(name="Phone X 128 GB", price=110, category=category, shop=shop_b)
+        Product.objects.create(name="Laptop Y", price=120, category=category, shop=shop_a)
+
+        shown, cursor = [], None
+        while True:
+            page = ProductAggregationService.get_unified_search_page('', cursor=cursor, page_size=1)
+            shown += [store['price'] for group in page['results'] for store in group['stores']]
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(sorted(shown), [100.0, 110.0, 120.0])
+
+        # Only grouped products ahead of the position stay in the cursor
+        first = ProductAggregationService.get_unified_search_page('', page_size=1)
+        _, grouped = ProductAggregationService._decode_search_cursor(first['next_cursor'])
+        self.assertEqual(list(grouped.values()), [110])
+
+        with self.assertRaises(ValueError):
+            ProductAggregationService.get_unified_search_page('', page_size=0)
@@ -8,7 +8,7 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q, Count, Avg, Min, Max
+from django.db.models import Q, Count, Avg, Min, Max, OuterRef, Subquery
 from django.utils import timezone
 from datetime import timedelta
 from .models import StoreIntegrationConfig, ProductMapping, PriceHistory, SyncLog
@@ -18,8 +18,10 @@ from .serializers import (
     ProductComparisonSerializer, StorePerformanceSerializer
 )
 from .services import StoreIntegrationService
+from .latest_prices import latest_price_service
 from .aggregation_services import ProductAggregationService
 from core.models import Product, Shop
+from core.renderers import StreamingJSONResponse, should_stream
 import logging
 
 logger = logging.getLogger(__name__)
@@ -198,16 +200,17 @@ class ProductComparisonViewSet(viewsets.ViewSet):
         """
         # Get products that exist in multiple stores
         products_with_multiple_stores = Product.objects.annotate(
-            store_count=Count('shop', distinct=True)
+            store_count=Count('latest_prices__shop', distinct=True)
         ).filter(store_count__gt=1)
         
         comparisons = []
         
-        for product in products_with_multiple_stores[:20]:  # Limit for performance
-            # Get price history for this product across all stores
-            price_data = PriceHistory.objects.filter(
-                product=product
-            ).select_related('shop').order_by('shop', '-recorded_at').distinct('shop')
+        products = list(products_with_multiple_stores[:20])  # Limit for performance
+        latest_prices = latest_price_service.for_products([product.id for product in products])
+        
+        for product in products:
+            # Latest price for this product in every store
+            price_data = latest_prices.get(product.id, [])
             
             stores_data = []
             prices = []
@@ -256,9 +259,7 @@ class ProductComparisonViewSet(viewsets.ViewSet):
             return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
         
         # Get all stores that have this product
-        price_data = PriceHistory.objects.filter(
-            product=product
-        ).select_related('shop').order_by('shop', '-recorded_at').distinct('shop')
+        price_data = latest_price_service.for_product(product.id)
         
         stores_data = []
         for price_record in price_data:
@@ -310,29 +311,29 @@ class StorePerformanceViewSet(viewsets.ViewSet):
         """
         Get performance metrics for all stores.
         """
-        shops = Shop.objects.annotate(
+        latest_sync = SyncLog.objects.filter(
+            integration_config__shop=OuterRef('pk')
+        ).order_by('-started_at').values('status')[:1]
+        shops = list(Shop.objects.annotate(
             total_products=Count('products'),
-            active_products=Count('products', filter=Q(products__is_active=True))
-        ).prefetch_related('integration_config')
+            active_products=Count('products', filter=Q(products__is_active=True)),
+            last_sync_status=Subquery(latest_sync)
+        ).select_related('integration_config'))
+        
+        # Simplified price metric: average recorded price per shop, in one grouped query
+        average_prices = dict(
+            PriceHistory.objects.order_by().values('shop_id').annotate(
+                avg_price=Avg('price')
+            ).values_list('shop_id', 'avg_price')
+        )
+        
+        from .performance_snapshots import store_performance_snapshots
+        snapshots = store_performance_snapshots.performances([shop.id for shop in shops])
         
         performance_data = []
         
         for shop in shops:
-            # Calculate average price competitiveness
-            # This is a simplified metric - you might want to make it more sophisticated
-            avg_price = PriceHistory.objects.filter(shop=shop).aggregate(
-                avg_price=Avg('price')
-            )['avg_price'] or 0
-            
-            # Get latest sync status
-            latest_sync = SyncLog.objects.filter(
-                integration_config__shop=shop
-            ).first()
-            
-            sync_status = 'never_synced'
-            if latest_sync:
-                sync_status = latest_sync.status
-            
+            snapshot = snapshots.get(str(shop.id), {})
             performance = {
                 'shop_id': str(shop.id),
                 'shop_name': shop.name,
@@ -341,9 +342,11 @@ class StorePerformanceViewSet(viewsets.ViewSet):
                 'customer_service_rating': float(shop.customer_service_rating),
                 'total_products': shop.total_products,
                 'active_products': shop.active_products,
-                'average_price_competitiveness': float(avg_price),
-                'last_sync_status': sync_status,
-                'sync_frequency': getattr(shop.integration_config, 'sync_frequency', 'manual') if hasattr(shop, 'integration_config') else 'manual'
+                'average_price_competitiveness': float(average_prices.get(shop.id) or 0),
+                'last_sync_status': shop.last_sync_status or 'never_synced',
+                'sync_frequency': getattr(shop.integration_config, 'sync_frequency', 'manual') if hasattr(shop, 'integration_config') else 'manual',
+                'overall_score': snapshot.get('overall_score'),
+                'as_of': snapshot.get('as_of')
             }
             performance_data.append(performance)
         
@@ -492,7 +495,7 @@ class StoreIntegrationManagementViewSet(viewsets.ViewSet):
             # Update config with webhook URL
             if webhook_result.get('success'):
                 config.webhook_url = webhook_result.get('webhook_url', '')
-                config.save()
+                config.save(update_fields=['webhook_url', 'updated_at'])
 
             return Response(webhook_result)
 
@@ -544,16 +547,8 @@ class WebhookReceiverViewSet(viewsets.ViewSet):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            # Process webhook
-            webhook_data = {
-                'topic': request.META.get('HTTP_X_SHOPIFY_TOPIC'),
-                **request.data
-            }
-
-            from .services import WebhookHandler
-            result = WebhookHandler.handle_shopify_webhook(webhook_data, config)
-
-            return Response(result)
+            # Queue webhook; the worker applies it in bulk
+            return Response(self._enqueue(config, request.META.get('HTTP_X_SHOPIFY_TOPIC'), request.data))
 
         except Exception as e:
             logger.error(f"Error processing Shopify webhook: {e}")
@@ -597,11 +592,8 @@ class WebhookReceiverViewSet(viewsets.ViewSet):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            # Process webhook
-            from .services import WebhookHandler
-            result = WebhookHandler.handle_woocommerce_webhook(request.data, config)
-
-            return Response(result)
+            # Queue webhook; the worker applies it in bulk
+            return Response(self._enqueue(config, request.data.get('action'), request.data))
 
         except Exception as e:
             logger.error(f"Error processing WooCommerce webhook: {e}")
@@ -610,6 +602,16 @@ class WebhookReceiverViewSet(viewsets.ViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def _enqueue(self, config, topic, payload) -> dict:
+        """
+        Store a verified webhook for asynchronous processing.
+        """
+        from .webhook_queue import webhook_queue
+        event = webhook_queue.enqueue(config, topic, dict(payload))
+        if event is None:
+            return {'success': True, 'message': f'Unhandled topic: {topic}'}
+        return {'success': True, 'queued': True, 'event_id': str(event.id)}
+
     def _verify_shopify_webhook(self, request) -> bool:
         """
         Verify Shopify webhook signature.
@@ -824,6 +826,47 @@ class RealTimeSyncViewSet(viewsets.ViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['get'])
+    def store_price_anomalies(self, request):
+        """
+        Detect price anomalies for every product of a store.
+        """
+        try:
+            shop_id = request.query_params.get('shop_id')
+            threshold = float(request.query_params.get('threshold', 0.2))
+            days = int(request.query_params.get('days', 7))
+
+            if not shop_id:
+                return Response(
+                    {'error': 'shop_id is required'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            if not request.user.is_staff and not Shop.objects.filter(
+                id=shop_id, owner__user=request.user
+            ).exists():
+                return Response(
+                    {'error': 'Access denied to this shop'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+
+            from .realtime_sync import realtime_sync_service
+            result = realtime_sync_service.detect_store_price_anomalies(shop_id, threshold, days)
+
+            return Response(result)
+
+        except ValueError:
+            return Response(
+                {'error': 'Invalid threshold or days parameter'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            logger.error(f"Error detecting store price anomalies: {e}")
+            return Response(
+                {'error': 'Failed to detect price anomalies'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
     @action(detail=False, methods=['get'])
     def sync_status(self, request):
         """
@@ -859,9 +902,7 @@ class RealTimeSyncViewSet(viewsets.ViewSet):
                 )
 
             # Get latest prices from all stores
-            latest_prices = PriceHistory.objects.filter(
-                product_id=product_id
-            ).select_related('shop').order_by('shop', '-recorded_at').distinct('shop')
+            latest_prices = latest_price_service.for_product(product_id)
 
             if not latest_prices.exists():
                 return Response({
@@ -953,14 +994,38 @@ class ProductAggregationViewSet(viewsets.ViewSet):
         # Remove None values
         filters = {k: v for k, v in filters.items() if v is not None}
 
-        results = ProductAggregationService.get_unified_search_results(query, filters)
+        try:
+            page_size = min(int(request.query_params.get('page_size', 20)), 100)
+            page = ProductAggregationService.get_unified_search_page(
+                query,
+                filters,
+                cursor=request.query_params.get('cursor') or None,
+                page_size=page_size,
+                include_total=request.query_params.get('include_total') == 'true'
+            )
+        except ValueError as e:
+            return Response(
+                {'error': f'Invalid parameter: {e}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        return Response({
+        data = {
             'query': query,
             'filters': filters,
-            'results': results,
-            'total_groups': len(results)
-        })
+            'results': page['results'],
+            'total_groups': len(page['results']),
+            'pagination': {
+                'page_size': page_size,
+                'has_next': page['has_next'],
+                'next_cursor': page['next_cursor'],
+                'total_products': page['total_products'],
+                'total_is_exact': page['total_is_exact']
+            }
+        }
+
+        if should_stream(request, page_size):
+            return StreamingJSONResponse(data)
+        return Response(data)
 
     @action(detail=False, methods=['get'])
     def category_aggregation(self, request):
@@ -1028,8 +1093,9 @@ class StoreAnalyticsViewSet(viewsets.ViewSet):
         Get comprehensive performance metrics for a store.
         """
         try:
+            from .performance_snapshots import store_performance_snapshots
             shop_id = request.query_params.get('shop_id')
-            days = int(request.query_params.get('days', 30))
+            days = store_performance_snapshots.validate_days(request.query_params.get('days'))
 
             if not shop_id:
                 return Response(
@@ -1051,8 +1117,7 @@ class StoreAnalyticsViewSet(viewsets.ViewSet):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            from .analytics_service import store_analytics_service
-            result = store_analytics_service.calculate_store_performance(shop_id, days)
+            result = store_performance_snapshots.get(shop_id, days)
 
             return Response(result)
 
@@ -1074,8 +1139,9 @@ class StoreAnalyticsViewSet(viewsets.ViewSet):
         Get comparative analytics for multiple stores.
         """
         try:
+            from .performance_snapshots import store_performance_snapshots
             shop_ids = request.query_params.getlist('shop_ids')
-            days = int(request.query_params.get('days', 30))
+            days = store_performance_snapshots.validate_days(request.query_params.get('days'))
 
             if not shop_ids:
                 return Response(
@@ -1156,14 +1222,14 @@ class StoreAnalyticsViewSet(viewsets.ViewSet):
                 })
 
             # Get recent sync logs
-            recent_logs = SyncLog.objects.filter(
+            recent_logs = list(SyncLog.objects.filter(
                 integration_config=config
-            ).order_by('-started_at')[:20]
+            ).order_by('-started_at')[:20])
 
             # Calculate reliability metrics
-            total_syncs = recent_logs.count()
-            successful_syncs = recent_logs.filter(status='completed').count()
-            failed_syncs = recent_logs.filter(status='failed').count()
+            total_syncs = len(recent_logs)
+            successful_syncs = sum(1 for log in recent_logs if log.status == 'completed')
+            failed_syncs = sum(1 for log in recent_logs if log.status == 'failed')
 
             success_rate = (successful_syncs / total_syncs * 100) if total_syncs > 0 else 0
 
@@ -1192,6 +1258,13 @@ class StoreAnalyticsViewSet(viewsets.ViewSet):
                 'sync_history': sync_history
             }
 
+            # Period reliability metrics from the performance snapshot
+            from .performance_snapshots import store_performance_snapshots
+            performance = store_performance_snapshots.get(shop_id)
+            if performance.get('success'):
+                reliability_data['period_metrics'] = performance['detailed_metrics']['reliability']
+                reliability_data['as_of'] = performance['as_of']
+
             return Response({
                 'shop_id': shop_id,
                 'shop_name': shop.name,
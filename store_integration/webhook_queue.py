@@ -0,0 +1,267 @@
+"""
+store_integration/webhook_queue.py
+----------------------------------
+Durable webhook queue: receipt enqueues, a worker coalesces and applies in bulk.
+"""
+
+import logging
+import uuid
+from datetime import timedelta
+from itertools import groupby
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.models import Product
+from core.search_cache import search_result_cache
+from .category_stats import category_statistics_service
+from .models import ProductMapping, StoreIntegrationConfig, WebhookEvent
+from .services import StoreIntegrationService
+from .sync_engine import BulkSyncEngine
+
+logger = logging.getLogger(__name__)
+
+
+# platform -> webhook topic -> queued action
+WEBHOOK_ACTIONS = {
+    'shopify': {
+        'products/create': 'upsert',
+        'products/update': 'upsert',
+        'products/delete': 'delete',
+        'inventory_levels/update': 'inventory',
+    },
+    'woocommerce': {
+        'product.created': 'upsert',
+        'product.updated': 'upsert',
+        'product.deleted': 'delete',
+    },
+}
+
+
+class WebhookQueue:
+    """
+    Queue of received webhooks stored in the ``WebhookEvent`` table.
+
+    Webhook endpoints call ``enqueue`` and answer immediately. ``process``
+    claims pending events in batches, keeps only the newest event per
+    external product (older ones are marked superseded), fetches the current
+    state of all updated products with the platform's list endpoint and
+    applies it through ``BulkSyncEngine``; deletions become two bulk updates.
+    Events that fail are retried up to ``WEBHOOK_QUEUE_MAX_ATTEMPTS`` times,
+    waiting ``WEBHOOK_QUEUE_RETRY_DELAY`` seconds before the second attempt
+    and twice as long before each later one. Events left in ``processing``
+    by a crashed worker are reclaimed after ``WEBHOOK_QUEUE_CLAIM_TIMEOUT``
+    seconds.
+    """
+
+    def __init__(self):
+        self.batch_size = getattr(settings, 'WEBHOOK_QUEUE_BATCH_SIZE', 500)
+        self.max_attempts = getattr(settings, 'WEBHOOK_QUEUE_MAX_ATTEMPTS', 5)
+        self.claim_timeout = getattr(settings, 'WEBHOOK_QUEUE_CLAIM_TIMEOUT', 600)
+        self.retry_delay = getattr(settings, 'WEBHOOK_QUEUE_RETRY_DELAY', 60)
+
+    def enqueue(self, config: StoreIntegrationConfig, topic: str, payload: Dict) -> Optional[WebhookEvent]:
+        """
+        Store a verified webhook. Returns None for topics the queue does not handle.
+        """
+        action = WEBHOOK_ACTIONS.get(config.platform, {}).get(topic or '')
+        if action is None:
+            return None
+        external_id = payload.get('inventory_item_id') if action == 'inventory' else payload.get('id')
+        return WebhookEvent.objects.create(
+            integration_config=config,
+            topic=topic,
+            action=action,
+            external_product_id=str(external_id) if external_id is not None else '',
+            payload=payload
+        )
+
+    def process(self, max_batches: int = None) -> Dict:
+        """
+        Drain pending events batch by batch.
+        """
+        totals = {'claimed': 0, 'processed': 0, 'superseded': 0, 'failed': 0, 'retried': 0}
+        self.release_stale()
+
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            events = self.claim()
+            if not events:
+                break
+            batches += 1
+            totals['claimed'] += len(events)
+            for key, value in self.apply(events).items():
+                totals[key] += value
+
+        return totals
+
+    def claim(self) -> List[WebhookEvent]:
+        """
+        Claim the oldest pending events for this worker.
+        """
+        now = timezone.now()
+        ids = list(
+            WebhookEvent.objects.filter(status='pending')
+            .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+            .order_by('received_at')
+            .values_list('id', flat=True)[:self.batch_size]
+        )
+        if not ids:
+            return []
+        token = uuid.uuid4()
+        # Only rows still pending are taken, so concurrent workers never share an event
+        WebhookEvent.objects.filter(id__in=ids, status='pending').update(
+            status='processing', claim_token=token, claimed_at=now, attempts=F('attempts') + 1
+        )
+        return list(
+            WebhookEvent.objects.filter(claim_token=token, status='processing')
+            .select_related('integration_config__shop')
+            .order_by('integration_config_id', 'received_at')
+        )
+
+    def release_stale(self):
+        """
+        Return events claimed by a worker that never finished them to the queue.
+        """
+        cutoff = timezone.now() - timedelta(seconds=self.claim_timeout)
+        WebhookEvent.objects.filter(status='processing', claimed_at__lt=cutoff).update(status='pending')
+
+    def apply(self, events: List[WebhookEvent]) -> Dict:
+        """
+        Apply claimed events, grouped by store.
+        """
+        counts = {'processed': 0, 'superseded': 0, 'failed': 0, 'retried': 0}
+        for _, group in groupby(events, key=lambda event: event.integration_config_id):
+            group = list(group)
+            try:
+                outcome = self.apply_store_events(group[0].integration_config, group)
+            except Exception as e:
+                logger.error(f"Error applying webhooks for {group[0].integration_config.shop.name}: {e}")
+                outcome = {event.id: ('retry', str(e)) for event in group}
+            self.finish(group, outcome, counts)
+        return counts
+
+    def apply_store_events(self, config: StoreIntegrationConfig, events: List[WebhookEvent]) -> Dict:
+        """
+        Coalesce and apply one store's events. Returns ``{event_id: (outcome, error)}``.
+        """
+        outcome = {}
+        latest = {}
+        for event in events:
+            key = (event.action == 'inventory', event.external_product_id)
+            previous = latest.get(key)
+            if previous is not None:
+                outcome[previous.id] = ('superseded', None)
+            latest[key] = event
+
+        upserts = [event for event in latest.values() if event.action == 'upsert']
+        deletes = [event for event in latest.values() if event.action == 'delete']
+
+        # Inventory levels arrive per inventory item; product stock is
+        # refreshed by the next sync, so these are acknowledged only
+        for event in latest.values():
+            if event.action == 'inventory':
+                outcome[event.id] = ('processed', None)
+
+        if deletes:
+            self.apply_deletes(config, [event.external_product_id for event in deletes])
+            outcome.update({event.id: ('processed', None) for event in deletes})
+
+        if upserts:
+            outcome.update(self.apply_upserts(config, upserts))
+
+        return outcome
+
+    def apply_deletes(self, config: StoreIntegrationConfig, external_ids: List[str]):
+        """
+        Deactivate the products and mappings of deleted external products.
+        """
+        mappings = ProductMapping.objects.filter(
+            integration_config=config, external_product_id__in=external_ids
+        )
+        product_ids = list(mappings.values_list('local_product_id', flat=True))
+        mappings.update(is_active=False, updated_at=timezone.now())
+        category_ids = set(
+            Product.objects.filter(id__in=product_ids, is_active=True).values_list('category_id', flat=True)
+        )
+        if Product.objects.filter(id__in=product_ids, is_active=True).update(is_active=False):
+            for category_id in category_ids:
+                category_statistics_service.mark_dirty(category_id)
+            search_result_cache.bump_catalogue_version()
+
+    def apply_upserts(self, config: StoreIntegrationConfig, events: List[WebhookEvent]) -> Dict:
+        """
+        Fetch the current state of updated products in bulk and apply it.
+        """
+        integration = StoreIntegrationService.get_integration(config)
+        current = integration.fetch_products_by_ids([event.external_product_id for event in events])
+
+        outcome, products_data = {}, []
+        for event in events:
+            product_data = current.get(event.external_product_id)
+            if isinstance(product_data, Exception):
+                outcome[event.id] = ('retry', str(product_data))
+            elif product_data is None:
+                # No longer listed by the store; nothing to apply
+                outcome[event.id] = ('processed', 'Product not returned by store')
+            else:
+                products_data.append(product_data)
+
+        if products_data:
+            with category_statistics_service.deferred():
+                result = BulkSyncEngine(integration).run(products_data)
+            if result['created'] or result['updated']:
+                search_result_cache.bump_catalogue_version()
+
+            errors = {}
+            for message in result['errors']:
+                external_id = message.split(':', 1)[0][len('Product '):]
+                errors[external_id] = message
+            # Rows of a chunk that failed as a whole were not applied
+            failed = set(result['failed'])
+            for event in events:
+                if event.id not in outcome:
+                    result_status = 'retry' if event.external_product_id in failed else 'processed'
+                    outcome[event.id] = (result_status, errors.get(event.external_product_id))
+
+        return outcome
+
+    def finish(self, events: List[WebhookEvent], outcome: Dict, counts: Dict):
+        """
+        Persist the outcome of every claimed event in bulk.
+        """
+        now = timezone.now()
+        for event in events:
+            result, error = outcome.get(event.id, ('retry', 'Event was not applied'))
+            event.next_attempt_at = None
+            if result == 'retry':
+                result = 'pending' if event.attempts < self.max_attempts else 'failed'
+                counts['retried' if result == 'pending' else 'failed'] += 1
+                if result == 'pending':
+                    event.next_attempt_at = now + timedelta(seconds=self.retry_delay * 2 ** (event.attempts - 1))
+            else:
+                counts[result] += 1
+            event.status = result
+            event.error = error
+            event.claim_token = None
+            event.processed_at = now if result in ('processed', 'superseded') else None
+        WebhookEvent.objects.bulk_update(
+            events, ['status', 'error', 'claim_token', 'next_attempt_at', 'processed_at'],
+            batch_size=self.batch_size
+        )
+
+    def purge(self, days_to_keep: int = 7) -> int:
+        """
+        Delete finished events older than ``days_to_keep`` days.
+        """
+        cutoff = timezone.now() - timedelta(days=days_to_keep)
+        deleted, _ = WebhookEvent.objects.filter(
+            status__in=['processed', 'superseded'], processed_at__lt=cutoff
+        ).delete()
+        return deleted
+
+
+# Create singleton instance
+webhook_queue = WebhookQueue()